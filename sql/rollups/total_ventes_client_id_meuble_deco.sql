@@ -0,0 +1,12 @@
+SELECT
+    client_id,
+    SUM(CASE WHEN product_type = 'MEUBLE' THEN ventes ELSE 0 END) AS ventes_meuble,
+    SUM(CASE WHEN product_type = 'DECO' THEN ventes ELSE 0 END) AS ventes_deco
+FROM
+    sales_client_product_type
+WHERE
+    year = 2019
+GROUP BY
+    client_id
+ORDER BY
+    ventes_meuble
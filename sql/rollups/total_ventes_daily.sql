@@ -0,0 +1,9 @@
+SELECT
+    date,
+    ventes
+FROM
+    sales_daily
+WHERE
+    date BETWEEN DATE(2019, 1, 1) AND DATE(2019, 12, 31)
+ORDER BY
+    date
@@ -0,0 +1,265 @@
+"""
+This module contains co-mention analytics of drugs, computed with sparse matrix products over the matching output.
+
+Matches are loaded as binary incidence matrices, one per ``ref_type``:
+- drug × journal, from journal mentions,
+- drug × publication, from publication mentions (publications being identified by their title).
+
+Co-mention counts of two drugs are the number of journals (or publications) mentioning both of them, i.e. the entries
+of ``A @ A.T``. Incidence matrices of several ``ref_type`` are combined before the product, so that questions can be
+restricted to some sources or exclude others.
+
+Journal mentions of the output do not carry the source of the publication they were found in: they are attributed to
+the ``ref_type`` of the publications mentioning the same drug at the same date, e.g. a journal mention is attributed to
+"pubmed_publication" when a pubmed publication mentions its drug at its date.
+"""
+
+import argparse
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.pipeline.logs import add_logging_arguments, configure_logging
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_REF_TYPE = "journal"
+ENTITIES = ("journal", "publication")
+
+
+class CoMentionAnalytics:
+    """
+    Sparse drug × journal and drug × publication incidence matrices of matching results.
+
+    :param matches: List of formatted matches, as written by the pipeline.
+    :type matches: List[Dict[str, str]]
+    """
+
+    def __init__(self, matches: List[Dict[str, str]]):
+        df = pd.DataFrame.from_records(matches, columns=["drug", "title", "ref_type", "date_mention"])
+        ref_type_codes, ref_types = pd.factorize(df["ref_type"])
+        drug_ids, drugs = self._factorize_normalized(df["drug"].to_numpy())
+        is_journal = ref_type_codes == (ref_types.get_loc(JOURNAL_REF_TYPE) if JOURNAL_REF_TYPE in ref_types else -2)
+        journal_ids, journals = self._factorize_normalized(df["title"].to_numpy()[is_journal])
+        publication_ids, publications = self._factorize_normalized(df["title"].to_numpy()[~is_journal])
+        self.drugs: List[str] = list(drugs)
+        self.drug_ids = {drug: i for i, drug in enumerate(self.drugs)}
+        self.entities = {"journal": list(journals), "publication": list(publications)}
+
+        df_journals = pd.DataFrame({
+            "drug_id": drug_ids[is_journal], "entity_id": journal_ids, "date_mention": df["date_mention"][is_journal]
+        })
+        df_publications = pd.DataFrame({
+            "drug_id": drug_ids[~is_journal], "entity_id": publication_ids, "ref_type": ref_type_codes[~is_journal],
+            "date_mention": df["date_mention"][~is_journal]
+        })
+        df_journals = df_journals[(df_journals["drug_id"] >= 0) & (df_journals["entity_id"] >= 0)]
+        df_publications = df_publications[
+            (df_publications["drug_id"] >= 0) & (df_publications["entity_id"] >= 0)
+            & (df_publications["ref_type"] >= 0)
+        ]
+
+        # journal mentions are attributed to the ref_types of the publications mentioning their drug at their date
+        dated_ref_types = df_publications[["drug_id", "date_mention", "ref_type"]].drop_duplicates()
+        df_journals = df_journals.merge(dated_ref_types, on=["drug_id", "date_mention"], how="left")
+        df_journals["ref_type"] = df_journals["ref_type"].fillna(-1).astype(int)
+
+        self.matrices: Dict[Tuple[str, str], sparse.csr_matrix] = {}
+        for entity, df_entity in [("journal", df_journals), ("publication", df_publications)]:
+            entity_ref_types = df_entity["ref_type"].to_numpy()
+            for ref_type_code in np.unique(entity_ref_types):
+                mask = entity_ref_types == ref_type_code
+                ref_type = ref_types[ref_type_code] if ref_type_code >= 0 else JOURNAL_REF_TYPE
+                self.matrices[(entity, ref_type)] = self._binary_matrix(
+                    df_entity["drug_id"].to_numpy()[mask], df_entity["entity_id"].to_numpy()[mask],
+                    (len(self.drugs), len(self.entities[entity])))
+        logger.info(
+            "Built incidence matrices of %s drugs, %s journals and %s publications.", len(self.drugs),
+            len(self.entities['journal']), len(self.entities['publication']))
+
+    @staticmethod
+    def _factorize_normalized(values: np.ndarray) -> Tuple[np.ndarray, pd.Index]:
+        """
+        Encode values as ids of their lowercase stripped forms, in order of first appearance, missing and empty values
+        being encoded as -1. Values are normalized once per distinct value.
+        """
+
+        codes, uniques = pd.factorize(values)
+        normalized = pd.Index(uniques, dtype=object).str.strip().str.lower()
+        normalized_codes, normalized_uniques = pd.factorize(normalized.where(normalized != "", None))
+        normalized_codes = np.append(normalized_codes, -1)
+        return normalized_codes[codes], normalized_uniques
+
+    @staticmethod
+    def _binary_matrix(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> sparse.csr_matrix:
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+        matrix.data[:] = 1
+        return matrix
+
+    @classmethod
+    def from_file(cls, matches_path: str) -> "CoMentionAnalytics":
+        """
+        Build the analytics from a matches file.
+
+        :param matches_path: Path to the JSON file containing matching results.
+        :type matches_path: str
+        :return: The analytics.
+        :rtype: CoMentionAnalytics
+        """
+
+        with open(matches_path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @property
+    def ref_types(self) -> List[str]:
+        return sorted({ref_type for _, ref_type in self.matrices})
+
+    def incidence(self, by: str = "journal", ref_types: Optional[Iterable[str]] = None) -> sparse.csr_matrix:
+        """
+        Get the binary drug × entity incidence matrix, restricted to some ref_types.
+
+        :param by: Entity co-mentioning drugs, "journal" or "publication".
+        :type by: str
+        :param ref_types: ref_types to keep e.g. ["pubmed_publication"], all if not provided.
+        :type ref_types: Optional[Iterable[str]]
+        :return: The incidence matrix, of shape (number of drugs, number of entities).
+        :rtype: sparse.csr_matrix
+        :raises ValueError: If the entity is unknown.
+        """
+
+        if by not in ENTITIES:
+            raise ValueError(f"Unknown entity '{by}', expected one of {ENTITIES}.")
+        ref_types = set(ref_types) if ref_types is not None else None
+        matrix = sparse.csr_matrix((len(self.drugs), len(self.entities[by])), dtype=np.int32)
+        for (entity, ref_type), ref_type_matrix in self.matrices.items():
+            if entity == by and (ref_types is None or ref_type in ref_types):
+                matrix = matrix + ref_type_matrix
+        matrix.data[:] = 1
+        return matrix
+
+    def co_mentions(self, by: str = "journal", ref_types: Optional[Iterable[str]] = None) -> sparse.csr_matrix:
+        """
+        Get the drug × drug co-mention counts, the diagonal holding the number of entities mentioning each drug.
+
+        :param by: Entity co-mentioning drugs, "journal" or "publication".
+        :type by: str
+        :param ref_types: ref_types to keep, all if not provided.
+        :type ref_types: Optional[Iterable[str]]
+        :return: The co-mention matrix, of shape (number of drugs, number of drugs).
+        :rtype: sparse.csr_matrix
+        """
+
+        matrix = self.incidence(by=by, ref_types=ref_types)
+        return (matrix @ matrix.T).tocsr()
+
+    def related_drugs(
+            self, drug: str, by: str = "journal", include: Optional[Iterable[str]] = None,
+            exclude: Optional[Iterable[str]] = None, k: int = 10) -> List[Tuple[str, int]]:
+        """
+        Get the drugs co-mentioned with a drug, e.g. drugs appearing in the same journals as a drug via pubmed but not
+        via clinical trials.
+
+        :param drug: Drug name.
+        :type drug: str
+        :param by: Entity co-mentioning drugs, "journal" or "publication".
+        :type by: str
+        :param include: ref_types the co-mentions are counted on, all if not provided.
+        :type include: Optional[Iterable[str]]
+        :param exclude: ref_types the drugs must not be co-mentioned on.
+        :type exclude: Optional[Iterable[str]]
+        :param k: Number of drugs to return.
+        :type k: int
+        :return: List of (drug, number of co-mentioning entities), by decreasing count then drug name.
+        :rtype: List[Tuple[str, int]]
+        """
+
+        drug_id = self.drug_ids.get(drug.strip().lower())
+        if drug_id is None:
+            return []
+        included = self.incidence(by=by, ref_types=include)
+        counts = np.asarray((included @ included[drug_id].T).todense()).ravel()
+        if exclude:
+            excluded = self.incidence(by=by, ref_types=exclude)
+            counts[np.asarray((excluded @ excluded[drug_id].T).todense()).ravel() > 0] = 0
+        counts[drug_id] = 0
+        return self._top_k(counts, k)
+
+    def _top_k(self, counts: np.ndarray, k: int) -> List[Tuple[str, int]]:
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > k:
+            threshold = np.partition(counts[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[counts[candidates] >= threshold]
+        ranked = sorted(candidates, key=lambda i: (-counts[i], self.drugs[i]))[:k]
+        return [(self.drugs[i], int(counts[i])) for i in ranked]
+
+    def top_pairs(
+            self, by: str = "journal", ref_types: Optional[Iterable[str]] = None,
+            k: int = 10) -> List[Tuple[str, str, int]]:
+        """
+        Get the pairs of drugs co-mentioned by the most entities.
+
+        :param by: Entity co-mentioning drugs, "journal" or "publication".
+        :type by: str
+        :param ref_types: ref_types to keep, all if not provided.
+        :type ref_types: Optional[Iterable[str]]
+        :param k: Number of pairs to return.
+        :type k: int
+        :return: List of (drug, drug, number of co-mentioning entities), by decreasing count then drug names.
+        :rtype: List[Tuple[str, str, int]]
+        """
+
+        pairs = sparse.triu(self.co_mentions(by=by, ref_types=ref_types), k=1).tocoo()
+        top = np.arange(pairs.nnz)
+        if pairs.nnz > k:
+            # ties with the k-th count are kept so that pairs are ranked by name deterministically
+            threshold = np.partition(pairs.data, pairs.nnz - k)[pairs.nnz - k]
+            top = top[pairs.data >= threshold]
+        ranked = sorted(
+            top, key=lambda i: (-pairs.data[i], self.drugs[pairs.row[i]], self.drugs[pairs.col[i]]))[:k]
+        return [(self.drugs[pairs.row[i]], self.drugs[pairs.col[i]], int(pairs.data[i])) for i in ranked]
+
+    def top_entities(
+            self, by: str = "journal", ref_types: Optional[Iterable[str]] = None,
+            k: int = 10) -> List[Tuple[str, int]]:
+        """
+        Get the journals (or publications) mentioning the most distinct drugs.
+
+        :param by: Entity mentioning drugs, "journal" or "publication".
+        :type by: str
+        :param ref_types: ref_types to keep, all if not provided.
+        :type ref_types: Optional[Iterable[str]]
+        :param k: Number of entities to return.
+        :type k: int
+        :return: List of (entity, number of distinct drugs), by decreasing count then first mention.
+        :rtype: List[Tuple[str, int]]
+        """
+
+        counts = np.asarray(self.incidence(by=by, ref_types=ref_types).sum(axis=0)).ravel()
+        ranked = np.argsort(-counts, kind="stable")[:k]
+        return [(self.entities[by][i], int(counts[i])) for i in ranked if counts[i] > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
+    parser.add_argument("matches_path", type=str, help="Path to the matches file")
+    parser.add_argument("--by", choices=ENTITIES, default="journal", help="Entity co-mentioning drugs")
+    parser.add_argument("--drug", type=str, help="Print the drugs co-mentioned with a drug")
+    parser.add_argument("--include", nargs="+", help="ref_types co-mentions are counted on")
+    parser.add_argument("--exclude", nargs="+", help="ref_types drugs must not be co-mentioned on")
+    parser.add_argument("--pairs", action="store_true", help="Print the most co-mentioned pairs of drugs")
+    parser.add_argument("--top-k", type=int, default=10, help="Number of results")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+    analytics = CoMentionAnalytics.from_file(args.matches_path)
+    if args.drug:
+        results = analytics.related_drugs(
+            args.drug, by=args.by, include=args.include, exclude=args.exclude, k=args.top_k)
+    elif args.pairs:
+        results = analytics.top_pairs(by=args.by, ref_types=args.include, k=args.top_k)
+    else:
+        results = analytics.top_entities(by=args.by, ref_types=args.include, k=args.top_k)
+    for result in results:
+        print("\t".join(str(value) for value in reversed(result)))
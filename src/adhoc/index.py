@@ -0,0 +1,555 @@
+"""
+This module contains the persisted query index of the matching output, answering ad-hoc questions without reading the
+matches file.
+
+The index is written by the load stage next to the matches file as a compact ``<stem>.index.json`` and holds:
+- the distinct drugs and journals, journals being kept in order of first mention so that ties are broken as a scan of
+  the matches file does,
+- for every journal, the bitmap of the ids of the drugs it mentions,
+- for every drug, the bitmap of the ids of the journals mentioning it,
+- the journal mentions sorted by date, as the distinct dates (integer day ordinals) and the offset of the first mention
+  of each date, so that the mentions of a date range are found by bisection and are the only ones read,
+- for every drug, its timeline: the number of mentions per date and ref_type sorted by date, timelines being stored one
+  after the other with the offset of each drug, so that the timeline of a drug within a date range is bisected too,
+- the size and modification time of the matches file it was built from, to detect stale indexes.
+
+The dated arrays (journal mentions and drug timelines) are written apart as a single integer array within
+``<stem>.index.dates.npy``, which is memory-mapped by the loaded index, so that only dated questions read it and only
+the pages of their date range are read. An index on an object store is read through the block cache, its dated arrays
+being read as a whole on the first dated question.
+
+Per-journal distinct drug counts and the journal ranking are computed when the index is loaded, and the drugs by first
+mention date on the first question about them. Mentions without a valid "YYYY-MM-DD" date are left out of dated
+questions.
+"""
+
+import logging
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from src.pipeline.process.load import save_json
+from src.pipeline.process.storage import is_url, object_version, open_input, open_output, path_exists, read_json, \
+    replace_output
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 3
+
+# Dated arrays of the index, in their order within the ".dates.npy" file
+DATED_ARRAYS = [
+    ("journal_mentions", "dates"), ("journal_mentions", "offsets"), ("journal_mentions", "drugs"),
+    ("journal_mentions", "journals"), ("drug_timelines", "offsets"), ("drug_timelines", "dates"),
+    ("drug_timelines", "ref_types"), ("drug_timelines", "counts"),
+]
+
+
+def index_path(matches_path: str) -> str:
+    """
+    Build the path of the index written next to a matches file.
+
+    :param matches_path: Path of the matches file.
+    :type matches_path: str
+    :return: Path of the JSON index.
+    :rtype: str
+    """
+
+    return "{}.index.json".format(os.path.splitext(matches_path)[0])
+
+
+def dated_arrays_path(file_index_path: str) -> str:
+    """
+    Build the path of the dated arrays written next to a JSON index.
+
+    :param file_index_path: Path of the JSON index.
+    :type file_index_path: str
+    :return: Path of the ".npy" dated arrays.
+    :rtype: str
+    """
+
+    return "{}.dates.npy".format(os.path.splitext(file_index_path)[0])
+
+
+def _file_signature(path: str) -> Dict[str, Any]:
+    if is_url(path):
+        # objects have no modification time on every store, their version is recorded instead
+        import fsspec
+
+        fs, object_path = fsspec.core.url_to_fs(path)
+        info = fs.info(object_path)
+        return {"size": info["size"], "version": object_version(info)}
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def to_ordinal(value: Any) -> Optional[int]:
+    """
+    Convert a "YYYY-MM-DD" date to its day ordinal.
+
+    :param value: Date string, possibly followed by a time.
+    :type value: Any
+    :return: The proleptic Gregorian ordinal of the date, or None if it is not a valid date.
+    :rtype: Optional[int]
+    """
+
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def date_bounds(start: Optional[str], end: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Convert the bounds of a date range to day ordinals.
+
+    :param start: First "YYYY-MM-DD" date of the range, unbounded if not provided.
+    :type start: Optional[str]
+    :param end: Last "YYYY-MM-DD" date of the range, unbounded if not provided.
+    :type end: Optional[str]
+    :return: The ordinals of the bounds, None for an unbounded side.
+    :rtype: Tuple[Optional[int], Optional[int]]
+    :raises ValueError: If a bound is not a valid date.
+    """
+
+    bounds = []
+    for bound in (start, end):
+        ordinal = to_ordinal(bound) if bound is not None else None
+        if bound is not None and ordinal is None:
+            raise ValueError(f"Invalid date '{bound}', expected YYYY-MM-DD.")
+        bounds.append(ordinal)
+    return bounds[0], bounds[1]
+
+
+def _runs(keys: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    Encode sorted keys as their distinct values and the offset of the first key of each value, followed by the number
+    of keys.
+    """
+
+    values, offsets = [], []
+    for i, key in enumerate(keys):
+        if not values or values[-1] != key:
+            values.append(key)
+            offsets.append(i)
+    offsets.append(len(keys))
+    return values, offsets
+
+
+class MatchesIndex:
+    """
+    Index of the drugs mentioned by each journal within matching results.
+
+    :param drugs: Distinct drug names, a drug id being its position.
+    :type drugs: List[str]
+    :param journals: Distinct journal names in order of first mention, a journal id being its position.
+    :type journals: List[str]
+    :param journal_drugs: Bitmap of the ids of the drugs mentioned by each journal.
+    :type journal_drugs: List[int]
+    :param drug_journals: Bitmap of the ids of the journals mentioning each drug, derived from journal bitmaps if not
+                          provided.
+    :type drug_journals: Optional[List[int]]
+    :param matches_signature: Size and modification time of the matches file the index was built from.
+    :type matches_signature: Optional[Dict[str, int]]
+    :param ref_types: Distinct ref_types of the mentions, a ref_type id being its position.
+    :type ref_types: Optional[List[str]]
+    :param journal_mentions: Journal mentions sorted by date: distinct "dates" ordinals, the "offsets" of their first
+                             mention followed by the number of mentions, and the "drugs" and "journals" ids of each
+                             mention.
+    :type journal_mentions: Optional[Dict[str, Sequence[int]]]
+    :param drug_timelines: Timelines of the drugs, one after the other: the "offsets" of the first entry of each drug
+                           followed by the number of entries, and the "dates" ordinal, "ref_types" id and "counts" of
+                           mentions of each entry, sorted by date then ref_type within a drug.
+    :type drug_timelines: Optional[Dict[str, Sequence[int]]]
+    :param dated_arrays: Path of the ".npy" file the journal mentions and drug timelines are memory-mapped from on
+                         first use, along with the length of each of the ``DATED_ARRAYS``, if not provided.
+    :type dated_arrays: Optional[Tuple[str, List[int]]]
+    """
+
+    def __init__(
+            self, drugs: List[str], journals: List[str], journal_drugs: List[int],
+            drug_journals: Optional[List[int]] = None, matches_signature: Optional[Dict[str, int]] = None,
+            ref_types: Optional[List[str]] = None, journal_mentions: Optional[Dict[str, Sequence[int]]] = None,
+            drug_timelines: Optional[Dict[str, Sequence[int]]] = None,
+            dated_arrays: Optional[Tuple[str, List[int]]] = None):
+        self.drugs = drugs
+        self.journals = journals
+        self.journal_drugs = journal_drugs
+        self.matches_signature = matches_signature
+        self.drug_ids = {drug: i for i, drug in enumerate(drugs)}
+        self.journal_ids = {journal: i for i, journal in enumerate(journals)}
+        self.journal_counts = [bin(bitmap).count("1") for bitmap in journal_drugs]
+        # stable sort keeps journals with as many drugs in order of first mention
+        self.ranking = sorted(range(len(journals)), key=lambda i: -self.journal_counts[i])
+        if drug_journals is None:
+            drug_journals = [0] * len(drugs)
+            for journal_id, bitmap in enumerate(journal_drugs):
+                for drug_id in self._bitmap_ids(bitmap):
+                    drug_journals[drug_id] |= 1 << journal_id
+        self.drug_journals = drug_journals
+        self.ref_types = ref_types or []
+        self._dated_arrays = dated_arrays
+        self._journal_mentions: Optional[Dict[str, np.ndarray]] = None
+        self._drug_timelines: Optional[Dict[str, np.ndarray]] = None
+        self._first_mentions: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        if dated_arrays is None:
+            journal_mentions = journal_mentions or {"dates": [], "offsets": [0], "drugs": [], "journals": []}
+            drug_timelines = drug_timelines or {
+                "offsets": [0] * (len(drugs) + 1), "dates": [], "ref_types": [], "counts": []}
+            self._journal_mentions = {name: np.asarray(values, dtype=np.int64)
+                                      for name, values in journal_mentions.items()}
+            self._drug_timelines = {name: np.asarray(values, dtype=np.int64) for name, values in drug_timelines.items()}
+
+    def _map_dated_arrays(self) -> None:
+        path, lengths = self._dated_arrays
+        with open_input(path) as source:
+            # objects cannot be mapped, they are read as a whole
+            array = np.load(source, mmap_mode="r" if isinstance(source, str) else None)
+        arrays: Dict[str, Dict[str, np.ndarray]] = defaultdict(dict)
+        start = 0
+        for (group, name), length in zip(DATED_ARRAYS, lengths):
+            arrays[group][name] = array[start:start + length]
+            start += length
+        self._journal_mentions, self._drug_timelines = arrays["journal_mentions"], arrays["drug_timelines"]
+
+    @property
+    def journal_mentions(self) -> Dict[str, np.ndarray]:
+        """
+        Journal mentions sorted by date, memory-mapped on first use for a loaded index.
+        """
+
+        if self._journal_mentions is None:
+            self._map_dated_arrays()
+        return self._journal_mentions
+
+    @property
+    def drug_timelines(self) -> Dict[str, np.ndarray]:
+        """
+        Timelines of the drugs, memory-mapped on first use for a loaded index.
+        """
+
+        if self._drug_timelines is None:
+            self._map_dated_arrays()
+        return self._drug_timelines
+
+    @property
+    def first_mentions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dates of first mention and ids of the drugs with a dated mention, by date of first mention then drug id.
+        """
+
+        if self._first_mentions is None:
+            offsets, dates = self.drug_timelines["offsets"], self.drug_timelines["dates"]
+            drug_ids = np.flatnonzero(offsets[1:] > offsets[:-1])
+            first_dates = np.asarray(dates[offsets[drug_ids]])
+            order = np.lexsort((drug_ids, first_dates))
+            self._first_mentions = first_dates[order], drug_ids[order]
+        return self._first_mentions
+
+    @staticmethod
+    def _bitmap_ids(bitmap: int) -> List[int]:
+        return [i for i, bit in enumerate(reversed(bin(bitmap)[2:])) if bit == "1"]
+
+    @staticmethod
+    def _to_bitmap(ids: Set[int]) -> int:
+        bits = bytearray((max(ids) >> 3) + 1 if ids else 0)
+        for i in ids:
+            bits[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bits, "little")
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Dict[str, str]]) -> "MatchesIndex":
+        """
+        Build the index from matching results, journals and drugs being normalized as lowercase stripped names.
+
+        :param matches: Formatted matches, journal mentions having the "journal" ref_type. They are read once, so they
+                        can be streamed, and need not be sorted by date.
+        :type matches: Iterable[Dict[str, str]]
+        :return: The index.
+        :rtype: MatchesIndex
+        """
+
+        drug_ids: Dict[str, int] = {}
+        journal_ids: Dict[str, int] = {}
+        ref_type_ids: Dict[str, int] = {}
+        journal_drugs: Dict[int, Set[int]] = defaultdict(set)
+        drug_journals: Dict[int, Set[int]] = defaultdict(set)
+        journal_mentions: Set[Tuple[int, int, int]] = set()
+        timeline_counts: Dict[Tuple[int, int, int], int] = defaultdict(int)
+        # dates repeat across mentions, so each distinct date string is parsed once
+        ordinals: Dict[Any, Optional[int]] = {}
+        for entry in matches:
+            drug = (entry.get("drug") or "").strip().lower()
+            if not drug:
+                continue
+            ref_type = entry.get("ref_type") or ""
+            journal = (entry.get("title") or "").strip().lower() if ref_type == "journal" else ""
+            if ref_type == "journal" and not journal:
+                continue
+            drug_id = drug_ids.setdefault(drug, len(drug_ids))
+            date_mention = entry.get("date_mention")
+            if date_mention not in ordinals:
+                ordinals[date_mention] = to_ordinal(date_mention)
+            ordinal = ordinals[date_mention]
+            if journal:
+                journal_id = journal_ids.setdefault(journal, len(journal_ids))
+                journal_drugs[journal_id].add(drug_id)
+                drug_journals[drug_id].add(journal_id)
+                if ordinal is not None:
+                    journal_mentions.add((ordinal, drug_id, journal_id))
+            if ordinal is not None:
+                timeline_counts[(drug_id, ordinal, ref_type_ids.setdefault(ref_type, len(ref_type_ids)))] += 1
+
+        sorted_mentions = sorted(journal_mentions)
+        mention_dates, mention_offsets = _runs([mention[0] for mention in sorted_mentions])
+        timeline = sorted(timeline_counts.items())
+        drug_offsets = [0] * (len(drug_ids) + 1)
+        for (drug_id, _, _), _ in timeline:
+            drug_offsets[drug_id + 1] += 1
+        for drug_id in range(len(drug_ids)):
+            drug_offsets[drug_id + 1] += drug_offsets[drug_id]
+        return cls(
+            drugs=list(drug_ids), journals=list(journal_ids),
+            journal_drugs=[cls._to_bitmap(journal_drugs[i]) for i in range(len(journal_ids))],
+            drug_journals=[cls._to_bitmap(drug_journals[i]) for i in range(len(drug_ids))],
+            ref_types=list(ref_type_ids),
+            journal_mentions={
+                "dates": mention_dates, "offsets": mention_offsets,
+                "drugs": [mention[1] for mention in sorted_mentions],
+                "journals": [mention[2] for mention in sorted_mentions],
+            },
+            drug_timelines={
+                "offsets": drug_offsets, "dates": [key[1] for key, _ in timeline],
+                "ref_types": [key[2] for key, _ in timeline], "counts": [count for _, count in timeline],
+            }
+        )
+
+    def save(self, file_output_path: str, matches_path: Optional[str] = None) -> None:
+        """
+        Save the index to a compact JSON file, and its dated arrays to the ".npy" file next to it.
+
+        :param file_output_path: The path (including filename) to save the JSON index.
+        :type file_output_path: str
+        :param matches_path: Path of the matches file the index was built from, whose size and modification time are
+                             recorded to detect stale indexes.
+        :type matches_path: Optional[str]
+        :return: None
+        """
+
+        if matches_path is not None:
+            self.matches_signature = _file_signature(matches_path)
+        arrays = [getattr(self, group)[name] for group, name in DATED_ARRAYS]
+        # a loaded index may still map the previous file, which is replaced rather than overwritten
+        arrays_path = dated_arrays_path(file_output_path)
+        with open_output(f"{arrays_path}.tmp", binary=True) as f:
+            np.save(f, np.concatenate(arrays).astype(np.int64, copy=False))
+        replace_output(f"{arrays_path}.tmp", arrays_path)
+        save_json(
+            data={
+                "version": INDEX_VERSION,
+                "matches": self.matches_signature,
+                "drugs": self.drugs,
+                "journals": self.journals,
+                "journal_drugs": [format(bitmap, "x") for bitmap in self.journal_drugs],
+                "drug_journals": [format(bitmap, "x") for bitmap in self.drug_journals],
+                "ref_types": self.ref_types,
+                "dated_arrays": [len(array) for array in arrays]
+            },
+            file_output_path=file_output_path, indent=None
+        )
+
+    @classmethod
+    def load(cls, file_input_path: str) -> "MatchesIndex":
+        """
+        Load an index from a JSON file, its dated arrays being memory-mapped on first use.
+
+        :param file_input_path: Local path or URL of the JSON index.
+        :type file_input_path: str
+        :return: The index.
+        :rtype: MatchesIndex
+        :raises FileNotFoundError: If the index file or its dated arrays do not exist.
+        :raises ValueError: If the index was written with another index version.
+        """
+
+        data = read_json(file_input_path)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {data.get('version')} in: {file_input_path}")
+        arrays_path = dated_arrays_path(file_input_path)
+        if not path_exists(arrays_path):
+            raise FileNotFoundError(f"Dated arrays of the index not found at: {arrays_path}")
+        return cls(
+            drugs=data["drugs"], journals=data["journals"],
+            journal_drugs=[int(bitmap, 16) for bitmap in data["journal_drugs"]],
+            drug_journals=[int(bitmap, 16) for bitmap in data["drug_journals"]],
+            matches_signature=data["matches"], ref_types=data["ref_types"],
+            dated_arrays=(arrays_path, data["dated_arrays"])
+        )
+
+    def is_fresh(self, matches_path: str) -> bool:
+        """
+        Check whether the index was built from the current version of a matches file.
+
+        :param matches_path: Local path or URL of the matches file.
+        :type matches_path: str
+        :return: True if the matches file size and modification time are the recorded ones.
+        :rtype: bool
+        """
+
+        return path_exists(matches_path) and self.matches_signature == _file_signature(matches_path)
+
+    @staticmethod
+    def _bisect(
+            dates: np.ndarray, start: Optional[int], end: Optional[int], lo: int = 0,
+            hi: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Find the positions of the sorted dates of ``dates[lo:hi]`` within a range of ordinals, bounds included.
+        """
+
+        hi = len(dates) if hi is None else int(hi)
+        lo = int(lo)
+        low = lo + int(np.searchsorted(dates[lo:hi], start, side="left")) if start is not None else lo
+        high = lo + int(np.searchsorted(dates[lo:hi], end, side="right")) if end is not None else hi
+        return low, max(low, high)
+
+    def _window(self, start: Optional[str], end: Optional[str]) -> range:
+        """
+        Get the positions of the journal mentions dated within a range of "YYYY-MM-DD" dates, bounds included.
+        """
+
+        low, high = self._bisect(self.journal_mentions["dates"], *date_bounds(start, end))
+        offsets = self.journal_mentions["offsets"]
+        return range(int(offsets[low]), int(offsets[high]))
+
+    def _window_journal_drugs(self, start: Optional[str], end: Optional[str]) -> Dict[int, Set[int]]:
+        journal_drugs: Dict[int, Set[int]] = defaultdict(set)
+        window = self._window(start, end)
+        drug_ids = self.journal_mentions["drugs"][window.start:window.stop].tolist()
+        journal_ids = self.journal_mentions["journals"][window.start:window.stop].tolist()
+        for drug_id, journal_id in zip(drug_ids, journal_ids):
+            journal_drugs[journal_id].add(drug_id)
+        return journal_drugs
+
+    def top_journals(
+            self, k: int = 1, with_ties: bool = False, start: Optional[str] = None,
+            end: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        Get the journals mentioning the greatest numbers of distinct drugs, within a date range if provided, e.g. from
+        "2020-01-01" to "2020-12-31" for the journals mentioning the most drugs in 2020. Only the mentions within the
+        range are read.
+
+        :param k: Number of journals to return.
+        :type k: int
+        :param with_ties: Whether journals tied with the k-th one are returned too.
+        :type with_ties: bool
+        :param start: First "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type start: Optional[str]
+        :param end: Last "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type end: Optional[str]
+        :return: List of (journal, number of distinct drugs), by decreasing number of drugs then first mention.
+        :rtype: List[Tuple[str, int]]
+        :raises ValueError: If a bound is not a valid date.
+        """
+
+        if start is None and end is None:
+            ranking, counts = self.ranking, self.journal_counts
+        else:
+            counts = {journal_id: len(drugs) for journal_id, drugs in self._window_journal_drugs(start, end).items()}
+            ranking = sorted(counts, key=lambda i: (-counts[i], i))
+        n_journals = min(k, len(ranking))
+        if with_ties and n_journals:
+            last_count = counts[ranking[n_journals - 1]]
+            while n_journals < len(ranking) and counts[ranking[n_journals]] == last_count:
+                n_journals += 1
+        return [(self.journals[i], counts[i]) for i in ranking[:n_journals]]
+
+    def drugs_of_journal(self, journal: str, start: Optional[str] = None, end: Optional[str] = None) -> Set[str]:
+        """
+        Get the distinct drugs mentioned by a journal, within a date range if provided.
+
+        :param journal: Journal name.
+        :type journal: str
+        :param start: First "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type start: Optional[str]
+        :param end: Last "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type end: Optional[str]
+        :return: Set of drug names, empty for an unknown journal.
+        :rtype: Set[str]
+        :raises ValueError: If a bound is not a valid date.
+        """
+
+        journal_id = self.journal_ids.get(journal.strip().lower())
+        if journal_id is None:
+            return set()
+        if start is None and end is None:
+            drug_ids = self._bitmap_ids(self.journal_drugs[journal_id])
+        else:
+            drug_ids = self._window_journal_drugs(start, end).get(journal_id, set())
+        return {self.drugs[i] for i in drug_ids}
+
+    def drug_timeline(
+            self, drug: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, str, int]]:
+        """
+        Get the timeline of the mentions of a drug, within a date range if provided. Only the timeline entries of the
+        drug within the range are read.
+
+        :param drug: Drug name.
+        :type drug: str
+        :param start: First "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type start: Optional[str]
+        :param end: Last "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type end: Optional[str]
+        :return: List of ("YYYY-MM-DD" date, ref_type, number of mentions), by date then ref_type id, empty for an
+                 unknown drug.
+        :rtype: List[Tuple[str, str, int]]
+        :raises ValueError: If a bound is not a valid date.
+        """
+
+        bounds = date_bounds(start, end)
+        drug_id = self.drug_ids.get(drug.strip().lower())
+        if drug_id is None:
+            return []
+        timelines, offsets = self.drug_timelines, self.drug_timelines["offsets"]
+        low, high = self._bisect(timelines["dates"], *bounds, lo=offsets[drug_id], hi=offsets[drug_id + 1])
+        return [
+            (date.fromordinal(ordinal).isoformat(), self.ref_types[ref_type_id], count)
+            for ordinal, ref_type_id, count in zip(
+                timelines["dates"][low:high].tolist(), timelines["ref_types"][low:high].tolist(),
+                timelines["counts"][low:high].tolist())
+        ]
+
+    def first_mentioned_drugs(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        Get the drugs first mentioned within a date range, e.g. the drugs which first appeared after a date.
+
+        :param start: First "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type start: Optional[str]
+        :param end: Last "YYYY-MM-DD" date of the range, unbounded if not provided.
+        :type end: Optional[str]
+        :return: List of (drug, "YYYY-MM-DD" date of first mention), by date of first mention.
+        :rtype: List[Tuple[str, str]]
+        :raises ValueError: If a bound is not a valid date.
+        """
+
+        first_dates, drug_ids = self.first_mentions
+        low, high = self._bisect(first_dates, *date_bounds(start, end))
+        return [
+            (self.drugs[drug_id], date.fromordinal(ordinal).isoformat())
+            for ordinal, drug_id in zip(first_dates[low:high].tolist(), drug_ids[low:high].tolist())
+        ]
+
+    def journals_of_drug(self, drug: str) -> List[str]:
+        """
+        Get the journals mentioning a drug.
+
+        :param drug: Drug name.
+        :type drug: str
+        :return: List of journal names in order of first mention, empty for an unknown drug.
+        :rtype: List[str]
+        """
+
+        drug_id = self.drug_ids.get(drug.strip().lower())
+        if drug_id is None:
+            return []
+        return [self.journals[i] for i in self._bitmap_ids(self.drug_journals[drug_id])]
@@ -1,20 +1,153 @@
 import json
 import logging
 from collections import defaultdict
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import argparse
+from src.adhoc.index import MatchesIndex, index_path, date_bounds, to_ordinal
+from src.pipeline.logs import add_logging_arguments, configure_logging
+from src.pipeline.process.storage import path_exists, read_json
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
-def get_journal_with_most_drug_mentions(matches_path: str) -> Optional[Dict[str, object]]:
+def load_index(matches_path: str) -> Optional[MatchesIndex]:
+    """
+    Load the index written next to a matches file, if it exists and was built from its current version.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :return: The index, or None if it is missing, stale or unreadable.
+    :rtype: Optional[MatchesIndex]
+    """
+
+    path = index_path(matches_path)
+    if not path_exists(path):
+        return None
+    try:
+        index = MatchesIndex.load(path)
+    except (ValueError, KeyError, FileNotFoundError) as e:
+        logger.warning("Ignoring unreadable index %s: %s", path, e)
+        return None
+    if not index.is_fresh(matches_path):
+        logger.warning("Ignoring index %s, built from another version of %s.", path, matches_path)
+        return None
+    return index
+
+
+def build_index(matches_path: str) -> MatchesIndex:
+    """
+    Build and save the index of an existing matches file, e.g. a file written before indexes were emitted.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :return: The index.
+    :rtype: MatchesIndex
+    """
+
+    index = MatchesIndex.from_matches(read_json(matches_path))
+    index.save(index_path(matches_path), matches_path=matches_path)
+    return index
+
+
+def get_top_journals(
+        matches_path: str, k: int = 1, with_ties: bool = False, start: Optional[str] = None,
+        end: Optional[str] = None) -> List[Tuple[str, int]]:
+    """
+    Get the journals mentioning the greatest numbers of unique drugs, from the index of a matches file.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :param k: Number of journals to return.
+    :type k: int
+    :param with_ties: Whether journals tied with the k-th one are returned too.
+    :type with_ties: bool
+    :param start: Only count the mentions dated from this "YYYY-MM-DD" date, included.
+    :type start: Optional[str]
+    :param end: Only count the mentions dated until this "YYYY-MM-DD" date, included.
+    :type end: Optional[str]
+    :return: List of (journal, number of unique drugs).
+    :rtype: List[Tuple[str, int]]
+    """
+
+    index = load_index(matches_path) or build_index(matches_path)
+    return index.top_journals(k=k, with_ties=with_ties, start=start, end=end)
+
+
+def get_drug_journals(matches_path: str, drug: str) -> List[str]:
+    """
+    Get the journals mentioning a drug, from the index of a matches file.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :param drug: Drug name.
+    :type drug: str
+    :return: List of journal names.
+    :rtype: List[str]
+    """
+
+    index = load_index(matches_path) or build_index(matches_path)
+    return index.journals_of_drug(drug)
+
+
+def get_drug_timeline(
+        matches_path: str, drug: str, start: Optional[str] = None,
+        end: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    Get the number of mentions of a drug per date and ref_type, from the index of a matches file.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :param drug: Drug name.
+    :type drug: str
+    :param start: Only keep the mentions dated from this "YYYY-MM-DD" date, included.
+    :type start: Optional[str]
+    :param end: Only keep the mentions dated until this "YYYY-MM-DD" date, included.
+    :type end: Optional[str]
+    :return: List of (date, ref_type, number of mentions), by date.
+    :rtype: List[Tuple[str, str, int]]
+    """
+
+    index = load_index(matches_path) or build_index(matches_path)
+    return index.drug_timeline(drug, start=start, end=end)
+
+
+def get_first_mentioned_drugs(
+        matches_path: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Get the drugs whose first mention is dated within a range, e.g. the drugs which first appeared after a date, from
+    the index of a matches file.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
+    :type matches_path: str
+    :param start: First "YYYY-MM-DD" date of the range, included.
+    :type start: Optional[str]
+    :param end: Last "YYYY-MM-DD" date of the range, included.
+    :type end: Optional[str]
+    :return: List of (drug, date of first mention), by date of first mention.
+    :rtype: List[Tuple[str, str]]
+    """
+
+    index = load_index(matches_path) or build_index(matches_path)
+    return index.first_mentioned_drugs(start=start, end=end)
+
+
+def get_journal_with_most_drug_mentions(
+        matches_path: str, use_index: bool = True, start: Optional[str] = None,
+        end: Optional[str] = None) -> Optional[Dict[str, object]]:
     """
     Extracts the journal that mentions the greatest number of unique drugs
-    from a JSON file containing matching results.
+    from a JSON file containing matching results, within a date range if provided.
 
-    :param matches_path: Path to the JSON file containing matching results.
+    The answer is read from the index written next to the matches file when it is up to date, without reading the
+    matches file, the mentions of a date range being found by bisection of the index.
+
+    :param matches_path: Local path or URL of the JSON file containing matching results.
     :type matches_path: str
+    :param use_index: Whether the index of the matches file should be used when available.
+    :type use_index: bool
+    :param start: Only count the mentions dated from this "YYYY-MM-DD" date, included.
+    :type start: Optional[str]
+    :param end: Only count the mentions dated until this "YYYY-MM-DD" date, included.
+    :type end: Optional[str]
 
     :return: A dictionary with the journal name and the set of unique drugs it mentions,
              or None if no journal entries are found or an error occurs.
@@ -23,16 +156,34 @@ def get_journal_with_most_drug_mentions(matches_path: str) -> Optional[Dict[str,
 
     :raises FileNotFoundError: If the input JSON file does not exist.
     :raises json.JSONDecodeError: If the JSON file is not properly formatted.
+    :raises ValueError: If a bound of the date range is not a valid date.
     :raises Exception: For any unexpected errors during processing.
     """
 
+    start_ordinal, end_ordinal = date_bounds(start, end)
     try:
-        with open(matches_path, "r", encoding="utf-8") as f:
-            matches = json.load(f)
+        index = load_index(matches_path) if use_index else None
+        if index is not None:
+            top_journals = index.top_journals(k=1, start=start, end=end)
+            if not top_journals:
+                logger.warning("No journal mentionning drugs founds.")
+                return None
+            journal, n_drugs = top_journals[0]
+            mentions = index.drugs_of_journal(journal, start=start, end=end)
+            logger.info(
+                "The journal mentioning the max number of drugs is '%s' with %s drugs: %s.", journal, n_drugs, mentions)
+            return {"journal": journal, "mentions": mentions}
+
+        matches = read_json(matches_path)
 
         journal_to_drugs = defaultdict(set)
 
         for entry in matches:
+            if start is not None or end is not None:
+                ordinal = to_ordinal(entry.get("date_mention"))
+                if ordinal is None or (start_ordinal is not None and ordinal < start_ordinal) or \
+                        (end_ordinal is not None and ordinal > end_ordinal):
+                    continue
             if entry.get("ref_type") == "journal":
                 journal = entry.get("title", "").strip().lower()
                 drug = entry.get("drug", "").strip().lower()
@@ -40,7 +191,7 @@ def get_journal_with_most_drug_mentions(matches_path: str) -> Optional[Dict[str,
                     journal_to_drugs[journal].add(drug)
 
         if not journal_to_drugs:
-            logging.warning("No journal mentionning drugs founds.")
+            logger.warning("No journal mentionning drugs founds.")
             return None
 
         max_journal = max(journal_to_drugs.items(), key=lambda x: len(x[1]))
@@ -48,23 +199,49 @@ def get_journal_with_most_drug_mentions(matches_path: str) -> Optional[Dict[str,
 
         result = {"journal": max_journal[0], "mentions": max_journal_occurrences}
 
-        logging.info(
-            f"The journal mentioning the max number of drugs is "
-            f"'{max_journal[0]}' with {len(max_journal[1])} drugs: "
-            f"{max_journal_occurrences}."
-        )
+        logger.info(
+            "The journal mentioning the max number of drugs is '%s' with %s drugs: %s.", max_journal[0],
+            len(max_journal[1]), max_journal_occurrences)
 
         return result
     except FileNotFoundError:
-        logging.error(f"Error: The file {matches_path} does not exist.")
         raise FileNotFoundError(f"Error: The file {matches_path} does not exist.")
     except json.JSONDecodeError as e:
-        logging.error(f"Error: Failed to parse JSON file. More details here: {e}")
+        logger.error("Error: Failed to parse JSON file. More details here: %s", e)
     except Exception as e:
-        logging.error(f"An unexpected error occurred. More details here: {e}")
+        logger.error("An unexpected error occurred. More details here: %s", e)
 
 if __name__=="__main__":
     parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
     parser.add_argument("matches_path", type=str, help="Path to the matches file")
+    parser.add_argument("--top-k", type=int, help="Print the k journals mentioning the most drugs")
+    parser.add_argument("--ties", action="store_true", help="Include journals tied with the k-th one")
+    parser.add_argument("--drug", type=str, help="Print the journals mentioning a drug")
+    parser.add_argument("--timeline", type=str, help="Print the number of mentions of a drug per date and ref_type")
+    parser.add_argument("--first-mentioned", action="store_true", help="Print the drugs first mentioned in the range")
+    parser.add_argument("--start", type=str, help="Only read the mentions dated from this YYYY-MM-DD date")
+    parser.add_argument("--end", type=str, help="Only read the mentions dated until this YYYY-MM-DD date")
+    parser.add_argument("--build-index", action="store_true", help="(Re)build the index of the matches file")
+    parser.add_argument("--no-index", action="store_true", help="Scan the matches file instead of using its index")
     args = parser.parse_args()
-    get_journal_with_most_drug_mentions(args.matches_path)
+    configure_logging(level=args.log_level, log_format=args.log_format)
+    if args.build_index:
+        build_index(args.matches_path)
+    if args.top_k:
+        for journal, n_drugs in get_top_journals(
+                args.matches_path, k=args.top_k, with_ties=args.ties, start=args.start, end=args.end):
+            print(f"{n_drugs}\t{journal}")
+    elif args.drug:
+        for journal in get_drug_journals(args.matches_path, drug=args.drug):
+            print(journal)
+    elif args.timeline:
+        for date_mention, ref_type, n_mentions in get_drug_timeline(
+                args.matches_path, drug=args.timeline, start=args.start, end=args.end):
+            print(f"{date_mention}\t{ref_type}\t{n_mentions}")
+    elif args.first_mentioned:
+        for drug, date_mention in get_first_mentioned_drugs(args.matches_path, start=args.start, end=args.end):
+            print(f"{date_mention}\t{drug}")
+    else:
+        get_journal_with_most_drug_mentions(
+            args.matches_path, use_index=not args.no_index, start=args.start, end=args.end)
@@ -0,0 +1,351 @@
+"""
+This module contains the ad-hoc query server, answering parameterized questions on matching results over HTTP.
+
+The server loads the matches file once and keeps it in memory as:
+- a ``MatchesIndex`` answering journal and drug questions,
+- the dated mentions sorted by date as parallel lists of interned values, answering date range questions by bisection.
+
+Before answering, the server checks the modification time of the matches file and reloads it when it changed, e.g.
+when the pipeline wrote a new output. Responses are cached with LRU eviction, the cache being cleared on reload.
+
+Run it with ``python -m src.adhoc.server <matches_path> --port 8765`` (or ``--unix-socket <path>``), then query e.g.:
+- ``/top-journals?k=10&ties=true&start=2020-01-01&end=2020-12-31``
+- ``/journal-drugs?journal=psychopharmacology``
+- ``/drug-journals?drug=tetracycline``
+- ``/drug-timeline?drug=tetracycline&start=2020-01-01``
+- ``/mentions?start=2020-01-01&end=2020-06-30&drug=tetracycline&ref_type=journal&limit=100``
+- ``/health``
+"""
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import stat
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+from src.adhoc.index import MatchesIndex, date_bounds
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe cache of responses evicting the least recently used entries.
+
+    :param max_size: Maximum number of cached entries.
+    :type max_size: int
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Snapshot:
+    """
+    Matching results loaded from a version of the matches file.
+    """
+
+    def __init__(self, matches: List[Dict[str, str]], mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        self.index = MatchesIndex.from_matches(matches)
+        # dated mentions sorted by date, values being interned so that repeated names are stored once
+        dated = sorted(
+            (
+                (sys.intern(entry["date_mention"]), sys.intern(entry.get("drug") or ""), entry.get("title") or "",
+                 sys.intern(entry.get("ref_type") or ""))
+                for entry in matches if isinstance(entry.get("date_mention"), str)
+            ),
+            key=lambda mention: mention[0]
+        )
+        self.dates = [mention[0] for mention in dated]
+        self.drugs = [mention[1] for mention in dated]
+        self.titles = [mention[2] for mention in dated]
+        self.ref_types = [mention[3] for mention in dated]
+
+
+class MatchesStore:
+    """
+    In-memory matching results, reloaded when the matches file changes.
+
+    Queries read a single snapshot of the results, which is replaced as a whole on reload, and cached responses are
+    keyed by the version of the matches file they were computed from.
+
+    :param matches_path: Path to the JSON file containing matching results.
+    :type matches_path: str
+    :param cache_size: Maximum number of cached responses.
+    :type cache_size: int
+    """
+
+    def __init__(self, matches_path: str, cache_size: int = 1024):
+        self.matches_path = matches_path
+        self.cache = LRUCache(max_size=cache_size)
+        self.n_reloads = 0
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> _Snapshot:
+        """
+        Reload the matches file if its modification time changed since it was loaded, clearing the response cache.
+
+        :return: The current snapshot of the matching results.
+        :rtype: _Snapshot
+        :raises FileNotFoundError: If the matches file does not exist.
+        :raises json.JSONDecodeError: If the matches file cannot be parsed and no previous version was loaded.
+        """
+
+        mtime_ns = os.stat(self.matches_path).st_mtime_ns
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.mtime_ns != mtime_ns:
+                try:
+                    with open(self.matches_path, "r", encoding="utf-8") as f:
+                        matches = json.load(f)
+                except json.JSONDecodeError as e:
+                    # the matches file may be being rewritten, the previous version keeps being served meanwhile
+                    if self._snapshot is None:
+                        raise
+                    logger.warning("Failed to reload %s, serving its previous version: %s", self.matches_path, e)
+                    return self._snapshot
+                self._snapshot = _Snapshot(matches, mtime_ns=mtime_ns)
+                self.n_reloads += 1
+                self.cache.clear()
+                logger.info("Loaded %s matches from: %s", len(matches), self.matches_path)
+            return self._snapshot
+
+    @staticmethod
+    def top_journals(
+            snapshot: _Snapshot, k: int = 1, ties: bool = False, start: Optional[str] = None,
+            end: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [
+            {"journal": journal, "n_drugs": n_drugs}
+            for journal, n_drugs in snapshot.index.top_journals(k, with_ties=ties, start=start, end=end)
+        ]
+
+    @staticmethod
+    def mentions(
+            snapshot: _Snapshot, start: Optional[str] = None, end: Optional[str] = None, drug: Optional[str] = None,
+            ref_type: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get the mentions dated within a range of "YYYY-MM-DD" dates, bounds included.
+
+        :param snapshot: Snapshot of the matching results.
+        :type snapshot: _Snapshot
+        :param start: First date of the range, unbounded if not provided.
+        :type start: Optional[str]
+        :param end: Last date of the range, unbounded if not provided.
+        :type end: Optional[str]
+        :param drug: Only keep mentions of this drug.
+        :type drug: Optional[str]
+        :param ref_type: Only keep mentions of this reference type e.g. "journal".
+        :type ref_type: Optional[str]
+        :param limit: Maximum number of mentions returned, all if not provided.
+        :type limit: Optional[int]
+        :return: The number of mentions within the range and the mentions, by date.
+        :rtype: Dict[str, Any]
+        :raises ValueError: If a bound is not a valid date.
+        """
+
+        date_bounds(start, end)
+        low = bisect_left(snapshot.dates, start) if start else 0
+        high = bisect_right(snapshot.dates, end) if end else len(snapshot.dates)
+        positions = range(low, high)
+        if drug is not None:
+            drug = drug.strip().lower()
+            positions = [i for i in positions if snapshot.drugs[i] == drug]
+        if ref_type is not None:
+            positions = [i for i in positions if snapshot.ref_types[i] == ref_type]
+        mentions = [
+            {"drug": snapshot.drugs[i], "title": snapshot.titles[i], "ref_type": snapshot.ref_types[i],
+             "date_mention": snapshot.dates[i]}
+            for i in positions[:limit]
+        ]
+        return {"count": len(positions), "mentions": mentions}
+
+    def health(self, snapshot: _Snapshot) -> Dict[str, Any]:
+        return {
+            "matches_path": self.matches_path, "n_reloads": self.n_reloads, "n_dated_mentions": len(snapshot.dates),
+            "n_drugs": len(snapshot.index.drugs), "n_journals": len(snapshot.index.journals),
+            "cache_size": len(self.cache), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses
+        }
+
+    def query(self, route: str, params: Dict[str, str]) -> Any:
+        """
+        Answer a query, from the response cache when possible.
+
+        :param route: Query route e.g. "/top-journals".
+        :type route: str
+        :param params: Query parameters.
+        :type params: Dict[str, str]
+        :return: The JSON serializable answer.
+        :rtype: Any
+        :raises KeyError: If the route is unknown.
+        :raises ValueError: If a parameter is missing or invalid.
+        """
+
+        snapshot = self.refresh()
+        if route == "/health":
+            return self.health(snapshot)
+        key = (snapshot.mtime_ns, route, tuple(sorted(params.items())))
+        response = self.cache.get(key)
+        if response is None:
+            response = self._answer(snapshot, route, params)
+            self.cache.put(key, response)
+        return response
+
+    def _answer(self, snapshot: _Snapshot, route: str, params: Dict[str, str]) -> Any:
+        if route == "/top-journals":
+            return self.top_journals(
+                snapshot, k=int(params.get("k", 1)), ties=params.get("ties", "false").lower() == "true",
+                start=params.get("start"), end=params.get("end"))
+        if route == "/journal-drugs":
+            return sorted(snapshot.index.drugs_of_journal(_required(params, "journal")))
+        if route == "/drug-journals":
+            return snapshot.index.journals_of_drug(_required(params, "drug"))
+        if route == "/drug-timeline":
+            return [
+                {"date_mention": date_mention, "ref_type": ref_type, "count": count}
+                for date_mention, ref_type, count in snapshot.index.drug_timeline(
+                    _required(params, "drug"), start=params.get("start"), end=params.get("end"))
+            ]
+        if route == "/mentions":
+            return self.mentions(
+                snapshot, start=params.get("start"), end=params.get("end"), drug=params.get("drug"),
+                ref_type=params.get("ref_type"), limit=int(params["limit"]) if "limit" in params else None
+            )
+        raise KeyError(route)
+
+
+def _required(params: Dict[str, str], name: str) -> str:
+    if name not in params:
+        raise ValueError(f"Missing query parameter '{name}'.")
+    return params[name]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler answering GET queries with the matches store of the server.
+    """
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        try:
+            self._send_json(200, self.server.store.query(url.path, dict(parse_qsl(url.query))))
+        except KeyError:
+            self._send_json(404, {"error": f"Unknown query '{url.path}'."})
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.error("Error answering query '%s'. More details here: %s", self.path, e)
+            self._send_json(500, {"error": str(e)})
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(
+        matches_path: str, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None,
+        cache_size: int = 1024) -> socketserver.BaseServer:
+    """
+    Create the query server, loading the matches file.
+
+    :param matches_path: Path to the JSON file containing matching results.
+    :type matches_path: str
+    :param host: Host the HTTP server listens on.
+    :type host: str
+    :param port: Port the HTTP server listens on, a free port if 0.
+    :type port: int
+    :param unix_socket: Path of a Unix socket to listen on instead of a TCP port.
+    :type unix_socket: Optional[str]
+    :param cache_size: Maximum number of cached responses.
+    :type cache_size: int
+    :return: The server, to be run with ``serve_forever``.
+    :rtype: socketserver.BaseServer
+    """
+
+    store = MatchesStore(matches_path, cache_size=cache_size)
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            # only a stale socket of a previous server is replaced, never another file
+            if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                raise ValueError(f"Path exists and is not a Unix socket: {unix_socket}")
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, QueryHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.store = store
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
+    parser.add_argument("matches_path", type=str, help="Path to the matches file")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--unix-socket", type=str, help="Unix socket to listen on instead of a TCP port")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Maximum number of cached responses")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+    query_server = create_server(
+        args.matches_path, host=args.host, port=args.port, unix_socket=args.unix_socket, cache_size=args.cache_size)
+    logger.info("Serving ad-hoc queries on: %s", query_server.server_address)
+    try:
+        query_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        query_server.server_close()
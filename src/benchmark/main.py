@@ -0,0 +1,376 @@
+"""
+This module contains the benchmark suite of the pipeline, run on synthetic data generated at a given scale.
+
+Each stage (``load_csv``/``load_json``, ``DataValidator``, ``DataCleaner``, ``DataMatcher``, ``DataAggregator``,
+``save_json``) and the end-to-end run are timed, throughput and memory are reported, and results are compared against
+a stored baseline.
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_MATCH_MAPPING, VALIDATION_SCHEMA
+from src.config.run_config import RunConfig
+from src.benchmark.synthetic import SyntheticDataGenerator
+from src.pipeline.instrumentation import RunRecorder
+from src.pipeline.process.extract import load_csv, load_json
+from src.pipeline.process.load import save_json
+from src.pipeline.process.transform.utils import concatenate_dataframe_list
+from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.validating import DataValidator
+from src.pipeline.process.transform.matching import DataMatcher
+from src.pipeline.process.transform.aggregating import DataAggregator
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules imported before the first stage runs, with the command line entry point and with the Prefect flow
+COLD_START_IMPORTS = {
+    "cli": ["src.pipeline.cli", "src.pipeline.runner", "src.pipeline.task"],
+    "prefect": ["src.pipeline.dag", "src.pipeline.task"],
+}
+
+# Predefined scales, "large" being the 10k drugs x 5M titles target
+SCALES = {
+    "tiny": {"n_drugs": 50, "n_pubmed_csv": 1_000, "n_pubmed_json": 1_000, "n_clinical": 500},
+    "small": {"n_drugs": 1_000, "n_pubmed_csv": 25_000, "n_pubmed_json": 25_000, "n_clinical": 10_000},
+    "medium": {"n_drugs": 5_000, "n_pubmed_csv": 250_000, "n_pubmed_json": 250_000, "n_clinical": 100_000},
+    "large": {"n_drugs": 10_000, "n_pubmed_csv": 2_500_000, "n_pubmed_json": 2_500_000, "n_clinical": 500_000},
+}
+
+
+def run_stages(
+        paths: Dict[str, str], output_dir: str, trace_allocations: bool = False,
+        engine: str = "pandas", fuzzy_max_distance: Optional[int] = None,
+        compare_cleaning: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run and measure each stage of the pipeline, one after the other, on the generated inputs.
+
+    :param paths: Paths of the generated inputs, keyed by the DeployConfig attribute names.
+    :type paths: Dict[str, str]
+    :param output_dir: Directory where the matching output is written.
+    :type output_dir: str
+    :param trace_allocations: Whether Python allocations should be traced, which slows down the stages.
+    :type trace_allocations: bool
+    :param engine: Name of the dataframe engine executing cleaning, concatenation and matching.
+    :type engine: str
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy matching, measured on pubmed titles along with exact
+                               matching if provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param compare_cleaning: Whether vectorized cleaning (``DataCleaner.clean_vectorized``) should be measured on each
+                             input too, as the "DataCleaner[<dataset>][vectorized]" stages, before the cleaning of the
+                             engine. Allocation peaks are comparable when allocations are traced.
+    :type compare_cleaning: bool
+    :return: Measurements of the benchmarked stages, in execution order.
+    :rtype: List[Dict[str, Any]]
+    """
+
+    with RunRecorder(trace_allocations=trace_allocations) as recorder:
+        def measure(stage, func, **kwargs):
+            return recorder.measure(stage, func, (), kwargs)
+
+        df_drugs = measure("load_csv[drugs]", load_csv, csv_path=paths["path_to_drugs"])
+        df_pubmed_csv = measure("load_csv[pubmed]", load_csv, csv_path=paths["path_to_pubmed_csv"])
+        df_pubmed_json = measure("load_json[pubmed]", load_json, json_path=paths["path_to_pubmed_json"])
+        df_clinical = measure("load_csv[clinical]", load_csv, csv_path=paths["path_to_clinical_trials"])
+
+        raw_datasets = [
+            ("drugs", "drugs", df_drugs), ("pubmed_csv", "pubmed", df_pubmed_csv),
+            ("pubmed_json", "pubmed", df_pubmed_json), ("clinical", "clinical", df_clinical)
+        ]
+        for dataset, data_source, df in raw_datasets:
+            measure(f"DataValidator[{dataset}]", DataValidator(data_source, **VALIDATION_SCHEMA[data_source]), df=df)
+
+        if compare_cleaning:
+            # run first, as cleaning with the "pandas" engine modifies its input in place
+            for dataset, data_source, df in raw_datasets:
+                cleaner = DataCleaner(**COLS_CLEAN_MAPPING[data_source])
+                measure(f"DataCleaner[{dataset}][vectorized]", cleaner.clean_vectorized, df=df)
+
+        df_drugs = measure("DataCleaner[drugs]", DataCleaner(**COLS_CLEAN_MAPPING["drugs"], engine=engine), df=df_drugs)
+        pubmed_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["pubmed"], engine=engine)
+        df_pubmed_csv = measure("DataCleaner[pubmed_csv]", pubmed_cleaner, df=df_pubmed_csv)
+        df_pubmed_json = measure("DataCleaner[pubmed_json]", pubmed_cleaner, df=df_pubmed_json)
+        df_pubmed = measure(
+            "concatenate_dataframe_list[pubmed]", concatenate_dataframe_list, dfs=[df_pubmed_json, df_pubmed_csv],
+            engine=engine)
+        df_clinical = measure(
+            "DataCleaner[clinical]", DataCleaner(**COLS_CLEAN_MAPPING["clinical"], engine=engine), df=df_clinical)
+
+        clinical_matches = measure(
+            "DataMatcher[clinical]", DataMatcher(**COLS_MATCH_MAPPING["drugs_clinical"], engine=engine),
+            df_drugs=df_drugs, df_publications=df_clinical)
+        pubmed_matches = measure(
+            "DataMatcher[pubmed]", DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"], engine=engine),
+            df_drugs=df_drugs, df_publications=df_pubmed)
+        if fuzzy_max_distance is not None:
+            measure(
+                "DataMatcher[pubmed][fuzzy]",
+                DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"], fuzzy_max_distance=fuzzy_max_distance),
+                df_drugs=df_drugs, df_publications=df_pubmed)
+        aggregated_matches = measure(
+            "DataAggregator", DataAggregator(), data=[clinical_matches, pubmed_matches])
+        measure(
+            "save_json", save_json, data=aggregated_matches,
+            file_output_path=os.path.join(output_dir, "matches_stages.json"))
+
+    return [stage for stage in recorder.stages if stage["parent"] is None]
+
+
+def run_end_to_end(
+        paths: Dict[str, str], output_dir: str, rows_in: int, engine: str = "pandas",
+        execution_mode: str = "sequential") -> Dict[str, Any]:
+    """
+    Run and measure the whole pipeline as executed by the Prefect flow, without the orchestration overhead.
+
+    :param paths: Paths of the generated inputs, keyed by the DeployConfig attribute names.
+    :type paths: Dict[str, str]
+    :param output_dir: Directory where the matching output is written.
+    :type output_dir: str
+    :param rows_in: Number of input rows across all sources, used to compute the end-to-end throughput.
+    :type rows_in: int
+    :param engine: Name of the dataframe engine executing cleaning, concatenation and matching.
+    :type engine: str
+    :param execution_mode: "sequential", "pipelined" or "partitioned", the latter ones being measured as the
+                           "end_to_end[<execution_mode>]" stage.
+    :type execution_mode: str
+    :return: Measurement of the end-to-end run.
+    :rtype: Dict[str, Any]
+    """
+
+    from src.pipeline.runner import run_pipeline
+
+    r_config = RunConfig(
+        **paths, path_to_output_matching=os.path.join(output_dir, "matches.json"), engine=engine,
+        execution_mode=execution_mode)
+    stage = "end_to_end" if execution_mode == "sequential" else f"end_to_end[{execution_mode}]"
+    with RunRecorder(trace_allocations=False) as recorder:
+        recorder.measure(stage, run_pipeline, (r_config,), {})
+    measurement = recorder.stages[-1]
+    measurement["rows_in"] = rows_in
+    return measurement
+
+
+def measure_cold_start(repeat: int = 3) -> Dict[str, float]:
+    """
+    Measure the cold start of each entry point, as the time for a fresh interpreter to import the modules needed
+    before the first stage runs.
+
+    :param repeat: Number of interpreters started per entry point, the fastest start being kept.
+    :type repeat: int
+    :return: Cold start time in seconds by entry point.
+    :rtype: Dict[str, float]
+    """
+
+    cold_start = {}
+    for entry_point, modules in COLD_START_IMPORTS.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-c", "; ".join(f"import {module}" for module in modules)],
+                cwd=PROJECT_ROOT, check=True, capture_output=True
+            )
+            timings.append(time.perf_counter() - start)
+        cold_start[entry_point] = round(min(timings), 3)
+        logger.info("Cold start of the %s entry point: %ss.", entry_point, cold_start[entry_point])
+    return cold_start
+
+
+def summarize(measurements: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize measurements as throughput and memory figures keyed by stage name.
+
+    :param measurements: Stage measurements as recorded by the run recorder.
+    :type measurements: List[Dict[str, Any]]
+    :return: Wall time, CPU time, rows in/out, throughput (input rows per second) and memory figures by stage.
+    :rtype: Dict[str, Dict[str, Any]]
+    """
+
+    summary = {}
+    for measurement in measurements:
+        wall_time = measurement["wall_time_s"]
+        rows_in = measurement["rows_in"] or measurement["rows_out"] or 0
+        summary[measurement["stage"]] = {
+            "wall_time_s": wall_time,
+            "cpu_time_s": measurement["cpu_time_s"],
+            "rows_in": measurement["rows_in"],
+            "rows_out": measurement["rows_out"],
+            "rows_per_s": round(rows_in / wall_time, 1) if wall_time else None,
+            "peak_rss_bytes": measurement["peak_rss_bytes"],
+            "alloc_peak_bytes": measurement["alloc_peak_bytes"]
+        }
+    return summary
+
+
+def compare_to_baseline(
+        results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare benchmark results against a baseline of the same scale and engine.
+
+    A stage regresses when its wall time exceeds the baseline one by more than the tolerance.
+
+    :param results: Benchmark results, as returned by ``run_benchmark``.
+    :type results: Dict[str, Any]
+    :param baseline: Baseline results of the same scale.
+    :type baseline: Dict[str, Any]
+    :param tolerance: Accepted relative slowdown, e.g. 0.2 for 20%.
+    :type tolerance: float
+    :return: Comparison of each stage found within both results, flagged with ``regression``.
+    :rtype: List[Dict[str, Any]]
+    :raises ValueError: If the baseline was recorded at a different scale or with a different engine.
+    """
+
+    if baseline["scale"] != results["scale"]:
+        raise ValueError(f"Baseline scale {baseline['scale']} differs from benchmark scale {results['scale']}.")
+    if baseline.get("engine", "pandas") != results.get("engine", "pandas"):
+        raise ValueError(f"Baseline engine {baseline.get('engine', 'pandas')} differs from benchmark engine "
+                         f"{results.get('engine', 'pandas')}.")
+
+    comparison = []
+    for stage, measurement in results["stages"].items():
+        baseline_measurement = baseline["stages"].get(stage)
+        if baseline_measurement is None:
+            continue
+        ratio = measurement["wall_time_s"] / max(baseline_measurement["wall_time_s"], 1e-9)
+        comparison.append({
+            "stage": stage,
+            "baseline_wall_time_s": baseline_measurement["wall_time_s"],
+            "wall_time_s": measurement["wall_time_s"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + tolerance
+        })
+    return comparison
+
+
+def run_benchmark(
+        scale: Dict[str, int], seed: int = 42, work_dir: Optional[str] = None, end_to_end: bool = True,
+        trace_allocations: bool = False, engine: str = "pandas",
+        execution_mode: str = "sequential", fuzzy_max_distance: Optional[int] = None,
+        compare_cleaning: bool = False) -> Dict[str, Any]:
+    """
+    Generate synthetic inputs at a given scale then benchmark each stage and the end-to-end run.
+
+    :param scale: Generator sizes (n_drugs, n_pubmed_csv, n_pubmed_json, n_clinical).
+    :type scale: Dict[str, int]
+    :param seed: Seed of the synthetic data generator.
+    :type seed: int
+    :param work_dir: Directory for generated inputs and outputs, a temporary one if not provided.
+    :type work_dir: Optional[str]
+    :param end_to_end: Whether the end-to-end run should be benchmarked too.
+    :type end_to_end: bool
+    :param trace_allocations: Whether Python allocations should be traced during the stage benchmark.
+    :type trace_allocations: bool
+    :param engine: Name of the dataframe engine executing cleaning, concatenation and matching.
+    :type engine: str
+    :param execution_mode: Execution mode of the end-to-end run, "sequential", "pipelined" or "partitioned".
+    :type execution_mode: str
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy matching, measured on pubmed titles if provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param compare_cleaning: Whether vectorized cleaning should be measured next to the cleaning of the engine.
+    :type compare_cleaning: bool
+    :return: Benchmark results with the scale, seed, engine and the summary of each stage.
+    :rtype: Dict[str, Any]
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = work_dir or tmp_dir
+        paths = SyntheticDataGenerator(seed=seed, **scale).write(os.path.join(work_dir, "input"))
+        output_dir = os.path.join(work_dir, "output")
+        measurements = run_stages(
+            paths, output_dir, trace_allocations=trace_allocations, engine=engine,
+            fuzzy_max_distance=fuzzy_max_distance, compare_cleaning=compare_cleaning)
+        if end_to_end:
+            rows_in = sum(stage["rows_out"] for stage in measurements if stage["stage"].startswith("load_"))
+            measurements.append(run_end_to_end(
+                paths, output_dir, rows_in=rows_in, engine=engine, execution_mode=execution_mode))
+    return {"scale": scale, "seed": seed, "engine": engine, "stages": summarize(measurements)}
+
+
+def _print_results(results: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]) -> None:
+    ratios = {row["stage"]: row for row in comparison or []}
+    print(f"{'stage':<36}{'wall (s)':>10}{'cpu (s)':>10}{'rows/s':>14}{'peak RSS (MB)':>15}{'vs baseline':>13}")
+    for stage, measurement in results["stages"].items():
+        peak_rss = measurement["peak_rss_bytes"]
+        row = ratios.get(stage)
+        print(
+            f"{stage:<36}{measurement['wall_time_s']:>10.3f}{measurement['cpu_time_s']:>10.3f}"
+            f"{measurement['rows_per_s'] or 0:>14,.0f}"
+            f"{(peak_rss or 0) / 2 ** 20:>15.1f}"
+            f"{(str(row['ratio']) + ('x !' if row['regression'] else 'x')) if row else '-':>13}"
+        )
+    for entry_point, wall_time in results.get("cold_start", {}).items():
+        print(f"{'cold_start[' + entry_point + ']':<36}{wall_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_logging_arguments(parser)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Predefined synthetic data scale")
+    parser.add_argument("--n-drugs", type=int, help="Override the number of drugs")
+    parser.add_argument("--n-titles", type=int, help="Override the number of pubmed titles (half CSV, half JSON)")
+    parser.add_argument("--n-clinical", type=int, help="Override the number of clinical trials")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data generator")
+    parser.add_argument("--work-dir", type=str, help="Directory kept for generated inputs and outputs")
+    parser.add_argument("--no-end-to-end", action="store_true", help="Skip the end-to-end run")
+    parser.add_argument("--trace-allocations", action="store_true", help="Trace Python allocations per stage")
+    parser.add_argument(
+        "--engine", choices=["pandas", "pandas_vectorized", "polars", "duckdb"], default="pandas",
+        help="Dataframe engine")
+    parser.add_argument(
+        "--execution-mode", choices=["sequential", "pipelined", "partitioned"], default="sequential",
+        help="Execution mode of the end-to-end run")
+    parser.add_argument("--fuzzy-max-distance", type=int, help="Also measure fuzzy matching of pubmed titles")
+    parser.add_argument(
+        "--compare-cleaning", action="store_true", help="Also measure vectorized cleaning of each input")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="Path to the baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Accepted relative slowdown vs baseline")
+    parser.add_argument("--output", type=str, help="Path where the JSON results are saved")
+    parser.add_argument("--cold-start", action="store_true", help="Measure the cold start of the entry points")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    scale = dict(SCALES[args.scale])
+    if args.n_drugs is not None:
+        scale["n_drugs"] = args.n_drugs
+    if args.n_titles is not None:
+        scale["n_pubmed_csv"] = args.n_titles // 2
+        scale["n_pubmed_json"] = args.n_titles - args.n_titles // 2
+    if args.n_clinical is not None:
+        scale["n_clinical"] = args.n_clinical
+
+    results = run_benchmark(
+        scale=scale, seed=args.seed, work_dir=args.work_dir, end_to_end=not args.no_end_to_end,
+        trace_allocations=args.trace_allocations, engine=args.engine, execution_mode=args.execution_mode,
+        fuzzy_max_distance=args.fuzzy_max_distance, compare_cleaning=args.compare_cleaning)
+    if args.cold_start:
+        results["cold_start"] = measure_cold_start()
+
+    comparison = None
+    if args.save_baseline:
+        save_json(data=results, file_output_path=args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            comparison = compare_to_baseline(results, baseline, tolerance=args.tolerance)
+            results["baseline_comparison"] = comparison
+        except ValueError as e:
+            logger.warning("Skipping baseline comparison: %s", e)
+
+    if args.output:
+        save_json(data=results, file_output_path=args.output)
+    _print_results(results, comparison)
+    if comparison and any(row["regression"] for row in comparison):
+        raise SystemExit(1)
@@ -0,0 +1,300 @@
+"""
+This module contains a deterministic synthetic data generator for the drugs, pubmed (CSV and JSON) and clinical trials
+sources, used to benchmark the pipeline at scale.
+
+Title vocabulary, journal names, id formats and date formats mirror the samples within ``notebook/data``.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ENCODING = "utf-8"
+
+# Drugs of notebook/data, always generated first so that sample-based expectations still hold at scale
+SEED_DRUGS = [
+    ("A04AD", "DIPHENHYDRAMINE"), ("S03AA", "TETRACYCLINE"), ("V03AB", "ETHANOL"), ("A03BA", "ATROPINE"),
+    ("A01AD", "EPINEPHRINE"), ("6302001", "ISOPRENALINE"), ("R01AD", "BETAMETHASONE")
+]
+
+DRUG_PREFIXES = [
+    "ace", "ami", "ato", "azi", "bena", "beta", "bupi", "cefa", "cipro", "clo", "dexa", "diclo", "dilti", "doxy",
+    "ena", "eso", "flu", "gaba", "hydro", "ibu", "lami", "levo", "lisi", "lora", "meto", "metro", "mida", "nife",
+    "olme", "ome", "para", "pravi", "predni", "quina", "rami", "rosu", "sima", "sulfa", "tetra", "vala"
+]
+DRUG_STEMS = [
+    "bu", "ca", "da", "di", "fe", "ga", "ki", "lo", "mi", "na", "pe", "pro", "ra", "si", "ta", "ti", "tro", "va",
+    "xa", "zo"
+]
+DRUG_SUFFIXES = [
+    "amine", "azole", "caine", "cillin", "cycline", "dipine", "dronate", "fibrate", "floxacin", "gliptin",
+    "lukast", "mab", "mycin", "nacin", "olol", "olone", "oxetine", "parin", "pine", "prazole", "pril", "profen",
+    "ridone", "sartan", "setron", "statin", "tadine", "terol", "tidine", "vir"
+]
+
+TITLE_VOCABULARY = [
+    "a", "acute", "administration", "after", "alternatives", "among", "an", "analysis", "and", "application",
+    "arrest", "associated", "bone", "cardiac", "changes", "children", "chronic", "clinical", "cohort", "comparison",
+    "controlled", "cost", "dose", "double-blind", "effects", "efficacy", "evaluation", "extinction", "fear",
+    "following", "for", "formation", "group", "healthy", "high", "implications", "in", "induced", "infarction",
+    "infusion", "inflammation", "injection", "is", "low", "mice", "model", "mortality", "multicenter", "of",
+    "on", "outcomes", "pain", "patients", "patterns", "pharmacokinetics", "phase", "placebo", "poisoning",
+    "postoperative", "prevention", "randomized", "rates", "rats", "reactions", "related", "resistance", "response",
+    "risk", "safety", "sedative", "severe", "skin", "strains", "study", "symptoms", "syndrome", "the", "therapy",
+    "time", "to", "topical", "treatment", "trial", "versus", "vs", "weakness", "with", "withdrawal", "year-old"
+]
+
+JOURNAL_TOPICS = [
+    "allergy and clinical immunology", "anesthesia", "back and musculoskeletal rehabilitation", "cardiology",
+    "clinical pharmacology", "dermatology", "emergency nursing", "endocrinology", "food protection",
+    "gastroenterology", "hepatology", "infectious diseases", "maternal-fetal & neonatal medicine", "nephrology",
+    "neurology", "oncology", "pediatrics", "photochemistry and photobiology", "psychopharmacology",
+    "pulmonology", "rheumatology", "toxicology", "urology", "veterinary research"
+]
+JOURNAL_TEMPLATES = [
+    "Journal of {}", "The journal of {}", "The Journal of {}", "American journal of {}", "Annals of {}",
+    "European journal of {}", "Archives of {}"
+]
+
+# Noise mirroring notebook/data: non ASCII characters, escaped bytes and punctuation within titles
+TITLE_NOISE = ["™", "(", ")", ":", ",", "\\xc3\\xb1", "ñ", "é"]
+
+
+class SyntheticDataGenerator:
+    """
+    A class generating deterministic synthetic input data for the pipeline.
+
+    The same parameters (including the seed) always produce byte-identical files.
+
+    :param n_drugs: Number of drugs to generate.
+    :type n_drugs: int
+    :param n_pubmed_csv: Number of pubmed publications within the CSV file.
+    :type n_pubmed_csv: int
+    :param n_pubmed_json: Number of pubmed publications within the JSON file.
+    :type n_pubmed_json: int
+    :param n_clinical: Number of clinical trials.
+    :type n_clinical: int
+    :param n_journals: Number of distinct journals publications are spread across.
+    :type n_journals: int
+    :param mention_rate: Fraction of titles mentioning at least one drug.
+    :type mention_rate: float
+    :param noise_rate: Fraction of rows with noise (missing values, duplicated ids, special characters).
+    :type noise_rate: float
+    :param seed: Seed of the random generator.
+    :type seed: int
+    :param chunk_size: Number of rows generated and written at once, bounding the generator memory.
+    :type chunk_size: int
+    """
+
+    def __init__(
+            self, n_drugs: int, n_pubmed_csv: int, n_pubmed_json: int, n_clinical: int, n_journals: int = 500,
+            mention_rate: float = 0.3, noise_rate: float = 0.01, seed: int = 42, chunk_size: int = 100_000):
+        max_drugs = len(SEED_DRUGS) + len(DRUG_PREFIXES) * len(DRUG_STEMS) * len(DRUG_SUFFIXES)
+        if n_drugs > max_drugs:
+            raise ValueError(f"Cannot generate more than {max_drugs} distinct drugs.")
+        self.n_drugs = n_drugs
+        self.n_pubmed_csv = n_pubmed_csv
+        self.n_pubmed_json = n_pubmed_json
+        self.n_clinical = n_clinical
+        self.n_journals = n_journals
+        self.mention_rate = mention_rate
+        self.noise_rate = noise_rate
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self._drug_names = None
+        self._journals = None
+
+    def _rng(self, stream: int) -> np.random.Generator:
+        """
+        Get an independent random generator for a given stream, so that each source is reproducible on its own.
+        """
+
+        return np.random.default_rng([self.seed, stream])
+
+    @property
+    def drug_names(self) -> List[str]:
+        if self._drug_names is None:
+            rng = self._rng(0)
+            combinations = [
+                prefix + stem + suffix
+                for prefix in DRUG_PREFIXES for stem in DRUG_STEMS for suffix in DRUG_SUFFIXES
+            ]
+            n_generated = max(self.n_drugs - len(SEED_DRUGS), 0)
+            generated = [combinations[i].upper() for i in rng.permutation(len(combinations))[:n_generated]]
+            self._drug_names = [drug for _, drug in SEED_DRUGS][:self.n_drugs] + generated
+        return self._drug_names
+
+    @property
+    def journals(self) -> List[str]:
+        if self._journals is None:
+            rng = self._rng(1)
+            journals = []
+            for i in range(self.n_journals):
+                template = JOURNAL_TEMPLATES[rng.integers(len(JOURNAL_TEMPLATES))]
+                topic = JOURNAL_TOPICS[i % len(JOURNAL_TOPICS)]
+                volume = i // len(JOURNAL_TOPICS)
+                journals.append(template.format(topic) + (f". Section {volume}" if volume else ""))
+            self._journals = journals
+        return self._journals
+
+    def generate_drugs(self) -> pd.DataFrame:
+        """
+        Generate the drugs dataset.
+
+        :return: Drugs DataFrame with the same columns as notebook/data/drugs.csv.
+        :rtype: pd.DataFrame
+        """
+
+        atccodes = [code for code, _ in SEED_DRUGS][:self.n_drugs]
+        seed_codes = set(atccodes)
+        i = 0
+        while len(atccodes) < self.n_drugs:
+            atccode = "{}{:02d}{}{}".format(
+                chr(ord("A") + i % 26), (i // 26) % 100, chr(ord("A") + (i // 2600) % 26), chr(ord("A") + i % 7))
+            if atccode not in seed_codes:
+                atccodes.append(atccode)
+            i += 1
+        return pd.DataFrame({"atccode": atccodes, "drug": self.drug_names})
+
+    def _generate_titles(self, rng: np.random.Generator, n_rows: int) -> List[str]:
+        """
+        Generate publication titles, a fraction of them mentioning one or two drugs in various letter cases.
+        """
+
+        lengths = rng.integers(6, 19, size=n_rows)
+        words = rng.integers(len(TITLE_VOCABULARY), size=(n_rows, 18))
+        mentions = rng.random(n_rows) < self.mention_rate
+        second_mentions = rng.random(n_rows) < 0.2
+        drugs = rng.integers(len(self.drug_names), size=(n_rows, 2))
+        cases = rng.integers(3, size=(n_rows, 2))
+        positions = rng.random((n_rows, 2))
+        noisy = rng.random(n_rows) < self.noise_rate
+        noises = rng.integers(len(TITLE_NOISE), size=n_rows)
+        final_dots = rng.random(n_rows) < 0.5
+
+        titles = []
+        for i in range(n_rows):
+            tokens = [TITLE_VOCABULARY[w] for w in words[i, :lengths[i]]]
+            if mentions[i]:
+                for j in range(2 if second_mentions[i] else 1):
+                    drug = self.drug_names[drugs[i, j]]
+                    drug = drug if cases[i, j] == 0 else drug.lower() if cases[i, j] == 1 else drug.capitalize()
+                    tokens.insert(int(positions[i, j] * len(tokens)), drug)
+            if noisy[i]:
+                tokens.insert(len(tokens) // 2, TITLE_NOISE[noises[i]])
+            title = " ".join(tokens)
+            titles.append(title[0].upper() + title[1:] + ("." if final_dots[i] else ""))
+        return titles
+
+    @staticmethod
+    def _generate_dates(rng: np.random.Generator, n_rows: int, format_weights: Dict[str, float]) -> List[str]:
+        """
+        Generate dates between 2018 and 2021 in a mix of the formats found within notebook/data.
+        """
+
+        days = pd.to_datetime("2018-01-01") + pd.to_timedelta(rng.integers(0, 4 * 365, size=n_rows), unit="D")
+        formats = rng.choice(list(format_weights), size=n_rows, p=list(format_weights.values()))
+        dates = pd.Series(days.strftime("%d/%m/%Y"))
+        iso = formats == "iso"
+        dates[iso] = days[iso].strftime("%Y-%m-%d")
+        long = formats == "long"
+        dates[long] = days[long].day.astype(str) + " " + days[long].strftime("%B %Y")
+        return dates.tolist()
+
+    def _generate_publications(
+            self, stream: int, n_rows: int, start_row: int, title_col: str, id_format: str,
+            date_weights: Dict[str, float], id_offset: int = 0) -> pd.DataFrame:
+        """
+        Generate a chunk of publications with noise: duplicated ids, missing titles and journals.
+        """
+
+        rng = self._rng(stream * 1_000_003 + start_row)
+        ids = [id_format.format(id_offset + start_row + i + 1) for i in range(n_rows)]
+        duplicated = np.flatnonzero(rng.random(n_rows) < self.noise_rate / 2)
+        for i in duplicated[duplicated > 0]:
+            ids[i] = ids[i - 1]
+        titles = self._generate_titles(rng, n_rows)
+        journals = [self.journals[j] for j in rng.integers(len(self.journals), size=n_rows)]
+        for i in np.flatnonzero(rng.random(n_rows) < self.noise_rate / 2):
+            titles[i] = "  "
+        for i in np.flatnonzero(rng.random(n_rows) < self.noise_rate / 2):
+            journals[i] = ""
+        return pd.DataFrame({
+            "id": ids,
+            title_col: titles,
+            "date": self._generate_dates(rng, n_rows, date_weights),
+            "journal": journals
+        })
+
+    def _chunks(self, n_rows: int) -> range:
+        return range(0, n_rows, self.chunk_size)
+
+    def write_csv(self, stream: int, n_rows: int, path: str, title_col: str, id_format: str,
+                  date_weights: Dict[str, float]) -> None:
+        """
+        Write a publications CSV file chunk by chunk.
+        """
+
+        for start_row in self._chunks(n_rows):
+            df = self._generate_publications(
+                stream, min(self.chunk_size, n_rows - start_row), start_row, title_col, id_format, date_weights)
+            df.to_csv(path, mode="w" if start_row == 0 else "a", header=start_row == 0, index=False,
+                      encoding=ENCODING)
+        if n_rows == 0:
+            pd.DataFrame(columns=["id", title_col, "date", "journal"]).to_csv(path, index=False, encoding=ENCODING)
+
+    def write_json(self, stream: int, n_rows: int, path: str) -> None:
+        """
+        Write the pubmed JSON file chunk by chunk as a single JSON array, as in notebook/data/pubmed.json.
+        Ids follow the ones of the pubmed CSV file.
+        """
+
+        with open(path, "w", encoding=ENCODING) as f:
+            f.write("[")
+            for start_row in self._chunks(n_rows):
+                df = self._generate_publications(
+                    stream, min(self.chunk_size, n_rows - start_row), start_row, "title", "{}",
+                    {"dmy": 0.8, "iso": 0.2}, id_offset=self.n_pubmed_csv)
+                records = df.to_dict(orient="records")
+                # Ids are sometimes integers and sometimes strings within notebook/data/pubmed.json
+                for i, record in enumerate(records):
+                    if (start_row + i) % 2 == 0:
+                        record["id"] = int(record["id"])
+                f.write(("," if start_row else "") + ",".join(
+                    json.dumps(record, ensure_ascii=False) for record in records))
+            f.write("]")
+
+    def write(self, output_dir: str) -> Dict[str, str]:
+        """
+        Generate all sources and write them within a directory.
+
+        :param output_dir: Directory where the input files are written.
+        :type output_dir: str
+        :return: Paths of the generated files, keyed by the DeployConfig attribute names.
+        :rtype: Dict[str, str]
+        """
+
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {
+            "path_to_drugs": os.path.join(output_dir, "drugs.csv"),
+            "path_to_pubmed_csv": os.path.join(output_dir, "pubmed.csv"),
+            "path_to_pubmed_json": os.path.join(output_dir, "pubmed.json"),
+            "path_to_clinical_trials": os.path.join(output_dir, "clinical_trials.csv"),
+        }
+        self.generate_drugs().to_csv(paths["path_to_drugs"], index=False, encoding=ENCODING)
+        self.write_csv(
+            stream=2, n_rows=self.n_pubmed_csv, path=paths["path_to_pubmed_csv"], title_col="title",
+            id_format="{}", date_weights={"dmy": 0.8, "iso": 0.2})
+        self.write_json(stream=3, n_rows=self.n_pubmed_json, path=paths["path_to_pubmed_json"])
+        self.write_csv(
+            stream=4, n_rows=self.n_clinical, path=paths["path_to_clinical_trials"], title_col="scientific_title",
+            id_format="NCT{:08d}", date_weights={"long": 0.8, "dmy": 0.2})
+        logger.info(
+            "Generated %s drugs, %s pubmed publications and %s clinical trials within: %s", self.n_drugs,
+            self.n_pubmed_csv + self.n_pubmed_json, self.n_clinical, output_dir)
+        return paths
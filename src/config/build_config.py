@@ -28,6 +28,40 @@ COLS_CLEAN_MAPPING = {
     }
 }
 
+# Expected raw columns of each source of data, validated between extraction and cleaning. Dtypes are the allowed kinds
+# of each column, ids possibly being read as floats when some are missing and dates as datetimes from JSON files.
+VALIDATION_SCHEMA = {
+    "drugs": {
+        "dtypes": {"atccode": ["string"], "drug": ["string"]},
+        "max_null_rates": {"atccode": 0.0, "drug": 0.0},
+        "date_columns": [],
+        "min_date_parse_rate": 1.0,
+        "id_column": "atccode",
+        "max_duplicate_id_rate": 0.0
+    },
+    "pubmed": {
+        "dtypes": {
+            "id": ["integer", "float", "string"], "title": ["string"], "date": ["string", "datetime"],
+            "journal": ["string"]
+        },
+        "max_null_rates": {"id": 0.01, "title": 0.01, "date": 0.01, "journal": 0.01},
+        "date_columns": ["date"],
+        "min_date_parse_rate": 0.99,
+        "id_column": "id",
+        "max_duplicate_id_rate": 0.0
+    },
+    "clinical": {
+        "dtypes": {
+            "id": ["string"], "scientific_title": ["string"], "date": ["string", "datetime"], "journal": ["string"]
+        },
+        "max_null_rates": {"id": 0.01, "scientific_title": 0.01, "date": 0.01, "journal": 0.01},
+        "date_columns": ["date"],
+        "min_date_parse_rate": 0.99,
+        "id_column": "id",
+        "max_duplicate_id_rate": 0.0
+    }
+}
+
 # Mapping for handling matching drugs within each source of publications data
 COLS_MATCH_MAPPING = {
     "drugs_clinical": {
@@ -44,4 +78,19 @@ COLS_MATCH_MAPPING = {
         "date_col_name": "date",
         "data_source": "pubmed"
     }
-}
\ No newline at end of file
+}
+# Mapping for columns identifying duplicate publications within each source of publications data
+COLS_DEDUP_MAPPING = {
+    "pubmed": {
+        "title_col_name": "title",
+        "journal_col_name": "journal",
+        "date_col_name": "date",
+        "data_source": "pubmed"
+    },
+    "clinical": {
+        "title_col_name": "scientific_title",
+        "journal_col_name": "journal",
+        "date_col_name": "date",
+        "data_source": "clinical"
+    }
+}
@@ -3,6 +3,7 @@ This module contains declarations of config variables used for deploying prefect
 (to be deferenciated from inner config variables instanciated when building the project."
 """
 
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 
@@ -24,6 +25,116 @@ class DeployConfig(BaseModel):
 
     :param path_to_output_matching: Path where output matching results will be saved under JSON format.
     :type path_to_output_matching: str
+
+    :param enable_instrumentation: Whether per-stage performance measurements should be recorded and saved as a JSON
+                                   run report next to the output matching results.
+    :type enable_instrumentation: bool
+
+    :param engine: Dataframe engine executing cleaning and matching, "pandas" (default), "pandas_vectorized" for
+                   pandas with vectorized cleaning copying DataFrames once, "polars" for lazy, multithreaded execution,
+                   or "duckdb" for SQL execution reading input files directly.
+    :type engine: str
+
+    :param duckdb_memory_limit: Memory limit of the "duckdb" engine e.g. "4GB", beyond which intermediate tables are
+                                spilled to disk, 80% of the RAM if not provided.
+    :type duckdb_memory_limit: Optional[str]
+
+    :param duckdb_temp_directory: Directory where the "duckdb" engine spills larger-than-memory intermediate tables.
+    :type duckdb_temp_directory: Optional[str]
+
+    :param execution_mode: "sequential" (default) to run stages one after the other on whole datasets, or "pipelined"
+                           to run extract, clean, match, aggregate and load concurrently over batches of input rows,
+                           linked by bounded queues, or "partitioned" to split publications into hash partitions of
+                           their cleaned id, cleaned and matched by separate worker processes (Prefect tasks when run as
+                           the Prefect flow) then merged.
+    :type execution_mode: str
+
+    :param pipelined_batch_size: Number of input rows per batch in "pipelined" mode.
+    :type pipelined_batch_size: int
+
+    :param pipelined_queue_depth: Number of batches waiting between two stages in "pipelined" mode, beyond which the
+                                  producing stage blocks.
+    :type pipelined_queue_depth: int
+
+    :param n_partitions: Number of publication partitions in "partitioned" mode.
+    :type n_partitions: int
+
+    :param partition_workers: Number of worker processes running partitions in "partitioned" mode, the number of CPUs
+                              if not provided.
+    :type partition_workers: Optional[int]
+
+    :param memory_budget: Target memory (RSS) of the run e.g. "2GB". When set, the run is pipelined and the batch size
+                          of each source is estimated from a sample of its rows to stay under the budget, then adapted
+                          to the observed RSS. Decisions are logged and reported within the run report. Not applied in
+                          "partitioned" mode.
+    :type memory_budget: Optional[str]
+
+    :param near_deduplication: Whether publications of the same date with similar titles (MinHash/LSH estimate of the
+                               Jaccard similarity of title shingles) should be collapsed before matching, along with
+                               exact duplicates of the cleaned title, journal and date which are always collapsed.
+                               Not supported by the "duckdb" engine, which only collapses exact duplicates.
+    :type near_deduplication: bool
+
+    :param near_duplicate_threshold: Estimated title similarity above which publications are near duplicates.
+    :type near_duplicate_threshold: float
+
+    :param fuzzy_max_distance: Maximum edit distance of drug mentions in titles, found with an index of the drug names
+                               so that misspelled or differently hyphenated mentions match too. Each match records its
+                               "distance". Drugs are matched exactly if not provided, and always with the "duckdb"
+                               engine.
+    :type fuzzy_max_distance: Optional[int]
+
+    :param strict_validation: Whether the run should stop when a raw input fails a validation check (missing columns,
+                              unexpected dtypes, null rates, date parse rates, duplicate ids), failures being only
+                              reported within the quality report saved next to the output matching results otherwise.
+                              Missing columns always stop the run.
+    :type strict_validation: bool
+
+    :param handoff_directory: Directory where the cleaned DataFrames and match tables of the "sequential" execution
+                              mode are handed off between stages as Arrow IPC files, memory-mapped by the consuming
+                              stage, e.g. "/dev/shm" to hand off through shared memory. Results are passed in memory if
+                              not provided. Other execution modes and the "duckdb" engine do not use it. Within the
+                              single process of a local run, handing off costs a write and a read per stage. Requires
+                              pyarrow.
+    :type handoff_directory: Optional[str]
+
+    :param storage_cache_directory: Directory of the local cache of the input blocks read from object-store URLs e.g.
+                                    "gs://bucket/pubmed.csv", "~/.cache/drug-data-pipeline/blocks" if not provided.
+    :type storage_cache_directory: Optional[str]
+
+    :param storage_cache_size: Size of the cache of input blocks e.g. "2GiB" (default), beyond which the least recently
+                               used blocks are evicted. Blocks are not cached if not provided.
+    :type storage_cache_size: Optional[str]
+
+    :param output_format: Format of the output matching results, "json" (default) to overwrite a JSON file along with
+                          its ad-hoc query index, or "table" to upsert them into a versioned match table, a directory
+                          of Parquet files and a JSON transaction log (see ``src.pipeline.process.table``) which
+                          readers can query at any version. "table" requires the "sequential" execution mode and
+                          pyarrow.
+    :type output_format: Literal["json", "table"]
+
+    :param log_level: Minimum level of the records logged by the flow e.g. "INFO" (default) or "DEBUG", logging being
+                      configured at flow start (see ``src.pipeline.logs``).
+    :type log_level: str
+
+    :param log_format: Format of the records logged by the flow, "text" (default) or "json" for one JSON object per
+                       line.
+    :type log_format: Literal["text", "json"]
+
+    :param profiling_mode: Opt-in profiling of the pipeline stages, one of "cprofile", "tracemalloc" or "sampling".
+                           Profile dumps and a top-N hotspot summary are written within a "<stem>.profiles" directory
+                           next to the output matching results, cleared at the start of every profiled run.
+    :type profiling_mode: Optional[str]
+
+    :param profiling_stages: Names of the stages to profile e.g. ["task_matching_drug_pubmed"], all ``task_*``
+                             stages if not provided.
+    :type profiling_stages: Optional[List[str]]
+
+    :param profiling_top_n: Number of hotspots kept within profiling summaries.
+    :type profiling_top_n: int
+
+    :param profiling_sampling_interval: Interval in seconds between two stack samples in "sampling" mode.
+    :type profiling_sampling_interval: float
     """
 
     path_to_drugs : str
@@ -31,3 +142,27 @@ class DeployConfig(BaseModel):
     path_to_pubmed_json: str
     path_to_clinical_trials: str
     path_to_output_matching: str
+    enable_instrumentation: bool = False
+    engine: Literal["pandas", "pandas_vectorized", "polars", "duckdb"] = "pandas"
+    duckdb_memory_limit: Optional[str] = None
+    duckdb_temp_directory: Optional[str] = None
+    execution_mode: Literal["sequential", "pipelined", "partitioned"] = "sequential"
+    pipelined_batch_size: int = 50_000
+    pipelined_queue_depth: int = 4
+    n_partitions: int = 8
+    partition_workers: Optional[int] = None
+    memory_budget: Optional[str] = None
+    near_deduplication: bool = False
+    near_duplicate_threshold: float = 0.8
+    fuzzy_max_distance: Optional[int] = None
+    strict_validation: bool = False
+    handoff_directory: Optional[str] = None
+    storage_cache_directory: Optional[str] = None
+    storage_cache_size: Optional[str] = "2GiB"
+    output_format: Literal["json", "table"] = "json"
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+    profiling_mode: Optional[Literal["cprofile", "tracemalloc", "sampling"]] = None
+    profiling_stages: Optional[List[str]] = None
+    profiling_top_n: int = 20
+    profiling_sampling_interval: float = 0.005
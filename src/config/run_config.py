@@ -0,0 +1,106 @@
+"""
+This module contains the lightweight run configuration of the pipeline, used by the command line entry point.
+
+It accepts the same fields as ``DeployConfig`` but is a plain dataclass, so that running the pipeline locally does not
+import pydantic nor prefect.
+"""
+
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+ENGINES = ("pandas", "pandas_vectorized", "polars", "duckdb")
+EXECUTION_MODES = ("sequential", "pipelined", "partitioned")
+PROFILING_MODES = ("cprofile", "tracemalloc", "sampling")
+OUTPUT_FORMATS = ("json", "table")
+LOG_FORMATS = ("text", "json")
+
+
+@dataclass
+class RunConfig:
+    """
+    Configuration of a pipeline run, with the fields and defaults of ``DeployConfig``.
+
+    See ``src.config.deploy_config.DeployConfig`` for the description of each field.
+    """
+
+    path_to_drugs: str
+    path_to_pubmed_csv: str
+    path_to_pubmed_json: str
+    path_to_clinical_trials: str
+    path_to_output_matching: str
+    enable_instrumentation: bool = False
+    engine: str = "pandas"
+    duckdb_memory_limit: Optional[str] = None
+    duckdb_temp_directory: Optional[str] = None
+    execution_mode: str = "sequential"
+    pipelined_batch_size: int = 50_000
+    pipelined_queue_depth: int = 4
+    n_partitions: int = 8
+    partition_workers: Optional[int] = None
+    memory_budget: Optional[str] = None
+    near_deduplication: bool = False
+    near_duplicate_threshold: float = 0.8
+    fuzzy_max_distance: Optional[int] = None
+    strict_validation: bool = False
+    handoff_directory: Optional[str] = None
+    storage_cache_directory: Optional[str] = None
+    storage_cache_size: Optional[str] = "2GiB"
+    output_format: str = "json"
+    log_level: str = "INFO"
+    log_format: str = "text"
+    profiling_mode: Optional[str] = None
+    profiling_stages: Optional[List[str]] = None
+    profiling_top_n: int = 20
+    profiling_sampling_interval: float = 0.005
+
+    def __post_init__(self):
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{self.engine}', expected one of {ENGINES}.")
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{self.execution_mode}', expected one of {EXECUTION_MODES}.")
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{self.output_format}', expected one of {OUTPUT_FORMATS}.")
+        if self.log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{self.log_format}', expected one of {LOG_FORMATS}.")
+        if self.profiling_mode is not None and self.profiling_mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode '{self.profiling_mode}', expected one of {PROFILING_MODES}.")
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "RunConfig":
+        """
+        Build a run configuration from deployment parameters.
+
+        :param config: DeployConfig fields, possibly nested under a "d_config" key as flow parameters are.
+        :type config: Dict[str, Any]
+        :return: The run configuration.
+        :rtype: RunConfig
+        :raises ValueError: If a field is unknown, a required field is missing or a value is not supported.
+        """
+
+        if set(config) == {"d_config"}:
+            config = config["d_config"]
+        known_fields = {field.name for field in fields(cls)}
+        unknown_fields = sorted(set(config) - known_fields)
+        if unknown_fields:
+            raise ValueError(f"Unknown configuration fields: {unknown_fields}")
+        try:
+            return cls(**config)
+        except TypeError as e:
+            raise ValueError(f"Invalid configuration: {e}")
+
+    @classmethod
+    def from_file(cls, config_path: str) -> "RunConfig":
+        """
+        Load a run configuration from a JSON file holding DeployConfig fields.
+
+        :param config_path: Path to the JSON configuration file.
+        :type config_path: str
+        :return: The run configuration.
+        :rtype: RunConfig
+        :raises FileNotFoundError: If the configuration file does not exist.
+        :raises ValueError: If the configuration is not valid.
+        """
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
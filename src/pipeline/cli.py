@@ -0,0 +1,68 @@
+"""
+This module contains the command line entry point of the pipeline.
+
+By default the pipeline steps run directly from a JSON file holding ``DeployConfig`` fields, without importing prefect
+nor pydantic, which keeps the start of local runs, tests and short-lived containers fast. The Prefect flow is only
+imported when requested with ``--prefect``.
+
+Usage:
+    python -m src.pipeline.cli config.json [--prefect] [--partition N ...]
+"""
+
+import argparse
+import logging
+import time
+from typing import List, Optional
+from src.config.run_config import RunConfig
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_from_file(config_path: str, orchestrated: bool = False, partitions: Optional[List[int]] = None) -> None:
+    """
+    Run the pipeline from a JSON configuration file.
+
+    :param config_path: Path to the JSON file holding DeployConfig fields.
+    :type config_path: str
+    :param orchestrated: Whether the pipeline runs as the Prefect flow instead of directly.
+    :type orchestrated: bool
+    :param partitions: In "partitioned" execution mode, partitions of the previous run to run again before merging,
+                       e.g. failed ones.
+    :type partitions: Optional[List[int]]
+    :return: None
+    :raises ValueError: If the configuration is not valid.
+    """
+
+    r_config = RunConfig.from_file(config_path)
+    if orchestrated:
+        from dataclasses import asdict
+        from src.config.deploy_config import DeployConfig
+        from src.pipeline.dag import main_flow
+
+        main_flow(DeployConfig(**asdict(r_config)), partitions=partitions)
+    else:
+        from src.pipeline.runner import run_pipeline
+
+        run_pipeline(r_config, partitions=partitions)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the drug-publication matching pipeline.")
+    add_logging_arguments(parser)
+    parser.add_argument("config_path", type=str, help="Path to the JSON file holding DeployConfig fields")
+    parser.add_argument("--prefect", action="store_true", help="Run the pipeline as the Prefect flow")
+    parser.add_argument(
+        "--partition", type=int, action="append", dest="partitions",
+        help="Partition of the previous partitioned run to run again before merging, e.g. a failed one"
+    )
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    start = time.perf_counter()
+    run_from_file(args.config_path, orchestrated=args.prefect, partitions=args.partitions)
+    logger.info("Pipeline run completed in %.3fs.", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
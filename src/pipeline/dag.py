@@ -1,71 +1,169 @@
-from prefect import flow, task
-from src.pipeline.task import task_extract_drugs, task_extract_pubmed, task_extract_clinical_trials,\
-    task_clean_drugs, task_clean_merge_pubmed, task_clean_clinical, task_matching_drug_pubmed,\
-    task_matching_drug_clinical, task_aggregating_matches, task_load_matches
+from typing import Any, Dict, List, Optional
+from prefect import flow, task, unmapped
+from prefect.artifacts import create_table_artifact
+from src.pipeline.instrumentation import RunRecorder, record_event, run_report_path
+from src.pipeline.logs import configure_logging, shutdown_logging
+from src.pipeline.partitioned import PartitionedRunner
+from src.pipeline.profiling import StageProfiler, profile_output_dir
+from src.pipeline.runner import configure_run_storage, run_pipeline
 from src.config.deploy_config import DeployConfig
 
 @flow(name='drug_data_dag')
-def main_flow(d_config: DeployConfig):
+def main_flow(d_config: DeployConfig, partitions: Optional[List[int]] = None):
     """
     Prefect workflow to orchestrate the entire drug-publication matching pipeline.
 
     This flow coordinates the extraction, cleaning, matching, aggregation,
     and saving of drug-related clinical trial and publication data.
 
+    In "partitioned" execution mode, the input files are split by a first task, each partition is cleaned and matched
+    by its own task, which the task runner of the flow may run on any of its workers, and a last task merges their
+    matches. A failed partition task is retried once.
+
     :param d_config: Deployment configuration object containing paths to input data
                      and output locations.
     :type d_config: DeployConfig
+    :param partitions: In "partitioned" execution mode, partitions of the previous run to run again before merging,
+                       e.g. failed ones.
+    :type partitions: Optional[List[int]]
+    """
+
+    configure_logging(level=d_config.log_level, log_format=d_config.log_format)
+    try:
+        _run_flow(d_config, partitions=partitions)
+    finally:
+        shutdown_logging()
+
+
+def _run_flow(d_config: DeployConfig, partitions: Optional[List[int]] = None) -> None:
+    """
+    Run the tasks of the flow in the execution mode of the configuration, see ``main_flow``.
+    """
+
+    if d_config.execution_mode != "partitioned":
+        run(d_config, partitions=partitions)
+        return
+
+    if d_config.output_format == "table":
+        raise ValueError("The match table output requires the sequential execution mode, got 'partitioned'.")
+    configure_run_storage(d_config)
+    profiler = None
+    if d_config.profiling_mode:
+        profiler = StageProfiler(
+            mode=d_config.profiling_mode, output_dir=profile_output_dir(d_config.path_to_output_matching),
+            stages=d_config.profiling_stages, top_n=d_config.profiling_top_n,
+            sampling_interval=d_config.profiling_sampling_interval
+        )
+        profiler.reset()
+    with RunRecorder(
+            enabled=d_config.enable_instrumentation or profiler is not None,
+            trace_allocations=d_config.enable_instrumentation, profiler=profiler) as recorder:
+        if partitions is None:
+            partitions = split_partitions(d_config)
+        else:
+            partitioned_runner(d_config).check_split(d_config.path_to_output_matching)
+        summaries = run_partition.map(unmapped(d_config), partitions)
+        merge_partitions(d_config, summaries=summaries)
+    if profiler is not None:
+        profiler.save_summary()
+    if d_config.enable_instrumentation:
+        recorder.save(file_output_path=run_report_path(d_config.path_to_output_matching))
+        create_table_artifact(
+            key="run-report", table=recorder.report()["stages"],
+            description="Per-stage performance measurements of the pipeline run."
+        )
+
+
+def partitioned_runner(d_config: DeployConfig) -> PartitionedRunner:
+    """
+    Build the runner of the "partitioned" execution mode from the deployment configuration.
+
+    :param d_config: Deployment configuration object.
+    :type d_config: DeployConfig
+    :return: The partitioned runner.
+    :rtype: PartitionedRunner
     """
 
-    run(d_config)
+    return PartitionedRunner(
+        n_partitions=d_config.n_partitions, max_workers=d_config.partition_workers, engine=d_config.engine,
+        near_duplicates=d_config.near_deduplication, similarity_threshold=d_config.near_duplicate_threshold,
+        fuzzy_max_distance=d_config.fuzzy_max_distance, strict_validation=d_config.strict_validation
+    )
 
 
 @task
-def run(d_config):
+def split_partitions(d_config: DeployConfig) -> List[int]:
+    """
+    Split the publications of the input files into hash partitions of their cleaned id.
+
+    :param d_config: Deployment configuration object containing all necessary file paths.
+    :type d_config: DeployConfig
+    :return: The partitions to run.
+    :rtype: List[int]
+    """
+
+    return partitioned_runner(d_config).split(
+        path_to_drugs=d_config.path_to_drugs, path_to_pubmed_csv=d_config.path_to_pubmed_csv,
+        path_to_pubmed_json=d_config.path_to_pubmed_json, path_to_clinical_trials=d_config.path_to_clinical_trials,
+        file_output_path=d_config.path_to_output_matching
+    )
+
+
+@task(retries=1)
+def run_partition(d_config: DeployConfig, partition: int) -> Dict[str, Any]:
+    """
+    Clean and match the publications of a partition.
+
+    :param d_config: Deployment configuration object containing all necessary file paths.
+    :type d_config: DeployConfig
+    :param partition: Partition to run.
+    :type partition: int
+    :return: Summary of the partition.
+    :rtype: Dict[str, Any]
+    """
+
+    summary = partitioned_runner(d_config).run_partition(d_config.path_to_output_matching, partition)
+    record_event({"event": "partition", **summary})
+    return summary
+
+
+@task
+def merge_partitions(d_config: DeployConfig, summaries: List[Dict[str, Any]]) -> int:
+    """
+    Merge and save the matches of every partition.
+
+    :param d_config: Deployment configuration object containing all necessary file paths.
+    :type d_config: DeployConfig
+    :param summaries: Summaries of the partitions run by the flow, waited for before merging.
+    :type summaries: List[Dict[str, Any]]
+    :return: Number of saved matches.
+    :rtype: int
+    """
+
+    return partitioned_runner(d_config).merge(d_config.path_to_output_matching)
+
+
+@task
+def run(d_config, partitions: Optional[List[int]] = None):
     """
     Execute the main data processing pipeline steps as a Prefect task.
 
-    Steps performed:
-    1. Extract drug data from clinical trials source.
-    2. Extract publication data from PubMed (both JSON and CSV).
-    3. Extract clinical trial data from clinical trials source.
-    4. Clean the drug data.
-    5. Clean and merge PubMed data from JSON and CSV sources.
-    6. Clean clinical trial data.
-    7. Perform matching of drugs with clinical trial data.
-    8. Perform matching of drugs with PubMed publication data.
-    9. Aggregate matching results from clinical and publication sources.
-    10. Save aggregated matching results to the configured output path.
+    The steps are run by ``run_pipeline``, shared with the command line entry point.
+
+    When instrumentation is enabled, the per-stage measurements are saved as a JSON run report next to the output
+    and attached to the flow run as a table artifact. When profiling is enabled, profile dumps and a hotspot summary
+    of the selected stages are written within the "<stem>.profiles" directory next to the output.
 
     :param d_config: Deployment configuration object containing all necessary file paths.
     :type d_config: DeployConfig
+    :param partitions: Partitions of the previous partitioned run to run again before merging.
+    :type partitions: Optional[List[int]]
     :return: None
     """
 
-    df_drugs = task_extract_drugs(
-        path_to_drugs=d_config.path_to_drugs
-    )
-    df_pubmed_json, df_pubmed_csv = task_extract_pubmed(
-        path_to_pubmed_csv=d_config.path_to_pubmed_csv,
-        path_to_pubmed_json=d_config.path_to_pubmed_json
-    )
-    df_clinical_trials = task_extract_clinical_trials(
-        path_to_clinical_trials=d_config.path_to_clinical_trials
-    )
-    df_drugs = task_clean_drugs(df_drugs=df_drugs)
-    df_pubmed = task_clean_merge_pubmed(
-        df_pubmed_json=df_pubmed_json, df_pubmed_csv=df_pubmed_csv
-    )
-    df_clinical_trials = task_clean_clinical(df_clinical_trials=df_clinical_trials)
-    drug_clinical_matches = task_matching_drug_clinical(
-        df_drugs=df_drugs, df_clinical_trials=df_clinical_trials
-    )
-    drug_pubmed_matches = task_matching_drug_pubmed(
-        df_drugs=df_drugs, df_pubmed=df_pubmed
-    )
-    aggregated_matches = task_aggregating_matches(
-        drug_clinical_matches=drug_clinical_matches, drug_pubmed_matches=drug_pubmed_matches
-    )
-    task_load_matches(
-        aggregated_matches=aggregated_matches, file_output_path=d_config.path_to_output_matching,
-    )
+    recorder = run_pipeline(d_config, partitions=partitions)
+    if d_config.enable_instrumentation:
+        create_table_artifact(
+            key="run-report", table=recorder.report()["stages"],
+            description="Per-stage performance measurements of the pipeline run."
+        )
@@ -0,0 +1,351 @@
+"""
+This module contains the handoff of intermediate results between stages as Arrow IPC files, which consuming stages
+memory-map instead of unpickling a copy.
+
+Files are written uncompressed in the Arrow IPC file format (Feather v2), so that reading one maps its buffers rather
+than decoding them: numeric columns without nulls are used in place by pandas, while string columns are still converted
+to the Python objects of object columns. Object columns holding other values than strings, e.g. the integer and string
+ids of raw extracted datasets, are written as JSON text and decoded back to the very same values. A directory within a
+memory-backed file system e.g. ``/dev/shm`` on Linux hands off through shared memory.
+
+While a ``HandoffStore`` is active, the cleaning, deduplication, matching and aggregation tasks of ``src.pipeline.task``
+write their DataFrames and match tables within its directory and return ``FrameHandle``s, holding the path and number
+of rows of a file only, which can be passed to other processes or Prefect tasks at no cost. Tasks accept handles or
+in-memory values alike, handed off values being read back as they were written, e.g. match records with their keys,
+NaN values and integers. Match tables stay columnar within their file: the aggregation converts them to records, as it
+compares whole records, while the final JSON output is written from the columns batch by batch (see ``iter_records``).
+
+Within a single process, as in the "sequential" execution mode, a handoff costs a write and a read per stage over
+passing results in memory; it pays off once stages run in other processes or on other nodes. The partitioned execution
+mode always hands off its cleaned drugs and the raw rows of its partitions with ``save_frame``.
+
+pyarrow is an optional dependency, only imported when a frame is handed off.
+"""
+
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Number of records per record batch of a match table, the unit in which ``iter_records`` converts records
+RECORD_BATCH_SIZE = 2 ** 16
+
+# Store currently handing off task results, None when results are passed in memory
+_ACTIVE_STORE: Optional["HandoffStore"] = None
+
+
+@dataclass(frozen=True)
+class FrameHandle:
+    """
+    Reference to a DataFrame or a match table handed off as an Arrow IPC file.
+
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :param n_rows: Number of rows of the file.
+    :type n_rows: int
+    :param records: Whether the file holds a match table, loaded as a list of records, rather than a DataFrame.
+    :type records: bool
+    """
+
+    path: str
+    n_rows: int
+    records: bool = False
+
+    def load(self) -> Union[pd.DataFrame, List[Dict[str, Any]]]:
+        """
+        Memory-map the handed off file.
+
+        :return: The DataFrame, or the list of records of a match table.
+        :rtype: Union[pd.DataFrame, List[Dict[str, Any]]]
+        """
+
+        return load_records(self.path) if self.records else load_frame(self.path)
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, float) and value != value
+
+
+def save_frame(df: pd.DataFrame, path: str) -> FrameHandle:
+    """
+    Write a DataFrame to an uncompressed Arrow IPC file, through a temporary file renamed once complete.
+
+    Arrow holds the NaN values of object columns, e.g. unparsed dates, as nulls which pandas reads back as None: the
+    rows holding NaN are listed within the schema metadata, so that ``load_frame`` restores them. Object columns
+    holding other values than strings, e.g. integers mixed with strings which Arrow cannot hold, or integers which
+    pandas would read back as an int64 column, are written as JSON text, listed within the schema metadata as well.
+
+    :param df: DataFrame to hand off.
+    :type df: pd.DataFrame
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :return: Handle of the written file.
+    :rtype: FrameHandle
+    :raises ValueError: If a column cannot be converted to Arrow, e.g. an object column holding values which are not
+                        serializable to JSON.
+    """
+
+    import pyarrow as pa
+
+    json_columns = [
+        i for i, dtype in enumerate(df.dtypes)
+        if dtype == object and pd.api.types.infer_dtype(df.iloc[:, i], skipna=True) not in ("string", "empty")
+    ]
+    if json_columns:
+        df = df.copy(deep=False)
+        for i in json_columns:
+            try:
+                df.isetitem(i, pd.Series([json.dumps(value) for value in df.iloc[:, i]], index=df.index, dtype=object))
+            except TypeError as e:
+                raise ValueError(f"DataFrame cannot be handed off as an Arrow IPC file: {e}")
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"DataFrame cannot be handed off as an Arrow IPC file: {e}")
+    metadata = {}
+    if json_columns:
+        metadata[b"handoff_json"] = json.dumps([str(df.columns[i]) for i in json_columns])
+    nan_rows = {}
+    for i, column in enumerate(df.columns):
+        if df.dtypes.iloc[i] == object and i not in json_columns:
+            is_na = df.iloc[:, i].isna().to_numpy()
+            is_nan = df.iloc[:, i][is_na].map(_is_nan).to_numpy(dtype=bool)
+            if is_nan.all() and is_nan.any():
+                nan_rows[str(column)] = None
+            elif is_nan.any():
+                nan_rows[str(column)] = is_na.nonzero()[0][is_nan].tolist()
+    if nan_rows:
+        metadata[b"handoff_nan"] = json.dumps(nan_rows)
+    if metadata:
+        table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return FrameHandle(path=path, n_rows=table.num_rows)
+
+
+def save_records(records: List[Dict[str, Any]], path: str) -> FrameHandle:
+    """
+    Write a match table to an uncompressed Arrow IPC file, so that ``load_records`` reads back the very same records.
+
+    Columns are built from the values of the records rather than through a DataFrame, so that integers stay integers,
+    and written by record batches of ``RECORD_BATCH_SIZE`` records.
+    A column missing from some records, or holding NaN next to non-float values (e.g. the date of a mention whose date
+    could not be parsed), is written along with a boolean mask column, listed within the schema metadata, marking the
+    records missing it or holding NaN.
+
+    :param records: Records of the match table.
+    :type records: List[Dict[str, Any]]
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :return: Handle of the written file.
+    :rtype: FrameHandle
+    :raises ValueError: If a column cannot be converted to Arrow, e.g. a column mixing integers and strings.
+    """
+
+    import pyarrow as pa
+
+    columns = list(dict.fromkeys(column for record in records for column in record))
+    arrays, masks = {}, {"missing": [], "nan": []}
+    try:
+        for column in columns:
+            values = [record.get(column) for record in records]
+            if any(column not in record for record in records):
+                masks["missing"].append(column)
+                arrays[f"__missing__{column}"] = pa.array([column not in record for record in records])
+            is_nan = [_is_nan(value) for value in values]
+            if any(is_nan) and not all(value is None or isinstance(value, float) for value in values):
+                # NaN within e.g. a string or integer column is written as null and marked by a mask
+                masks["nan"].append(column)
+                arrays[f"__nan__{column}"] = pa.array(is_nan)
+                values = [None if nan else value for value, nan in zip(values, is_nan)]
+            arrays[column] = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"Records cannot be handed off as an Arrow IPC file: {e}")
+    table = pa.table(arrays).replace_schema_metadata({"handoff": json.dumps({"columns": columns, **masks})})
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=RECORD_BATCH_SIZE)
+    os.replace(tmp_path, path)
+    return FrameHandle(path=path, n_rows=len(records), records=True)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read a match table from an Arrow IPC file written by ``save_records``, record batch by record batch, so that only
+    the records of a batch are held as Python objects while the table stays memory-mapped.
+
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :return: Iterator over the records, with the keys, values and types they were written with.
+    :rtype: Iterator[Dict[str, Any]]
+    """
+
+    import pyarrow as pa
+
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    layout = json.loads(reader.schema.metadata[b"handoff"])
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        records = [{column: record[column] for column in layout["columns"]} for record in batch.to_pylist()]
+        for column in layout["nan"]:
+            for record, is_nan in zip(records, batch.column(f"__nan__{column}").to_pylist()):
+                if is_nan:
+                    record[column] = float("nan")
+        for column in layout["missing"]:
+            for record, is_missing in zip(records, batch.column(f"__missing__{column}").to_pylist()):
+                if is_missing:
+                    del record[column]
+        yield from records
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a match table from an Arrow IPC file written by ``save_records``, converting all its records to Python
+    objects, see ``iter_records``.
+
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :return: The records, with the keys, values and types they were written with.
+    :rtype: List[Dict[str, Any]]
+    """
+
+    return list(iter_records(path))
+
+
+def load_frame(path: str) -> pd.DataFrame:
+    """
+    Read a DataFrame from an Arrow IPC file, memory-mapping its buffers.
+
+    The mapping is kept open by the buffers used in place by the DataFrame, and released along with them. Columns
+    written as JSON text are decoded back to object columns.
+
+    :param path: Path of the Arrow IPC file.
+    :type path: str
+    :return: The DataFrame, with the index and dtypes it was written with.
+    :rtype: pd.DataFrame
+    """
+
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    # blocks are not consolidated, which would copy columns of a same dtype into a single array
+    df = table.to_pandas(split_blocks=True)
+    metadata = table.schema.metadata or {}
+    nan_rows = json.loads(metadata.get(b"handoff_nan", b"{}"))
+    json_columns = set(json.loads(metadata.get(b"handoff_json", b"[]")))
+    for i, column in enumerate(df.columns):
+        if str(column) in json_columns:
+            df.isetitem(i, pd.Series([json.loads(value) for value in df.iloc[:, i]], index=df.index, dtype=object))
+        elif str(column) in nan_rows:
+            rows = nan_rows[str(column)]
+            values = df.iloc[:, i].to_numpy(dtype=object, copy=True)
+            values[pd.isna(values) if rows is None else rows] = np.nan
+            df.isetitem(i, values)
+    return df
+
+
+class HandoffStore:
+    """
+    Directory where task results are handed off as Arrow IPC files.
+
+    Used as a context manager, the store becomes the active one for the duration of the ``with`` block, within a
+    temporary directory created inside ``directory`` so that concurrent runs sharing it do not collide. The temporary
+    directory is removed on exit unless ``keep`` is set.
+
+    :param directory: Parent directory of the handed off files e.g. "/dev/shm", the system temporary directory if not
+                      provided.
+    :type directory: Optional[str]
+    :param enabled: Whether task results should be handed off; a disabled store never becomes active.
+    :type enabled: bool
+    :param keep: Whether the handed off files should be kept on exit, e.g. to inspect intermediate results.
+    :type keep: bool
+    """
+
+    def __init__(self, directory: Optional[str] = None, enabled: bool = True, keep: bool = False):
+        self.directory = directory
+        self.enabled = enabled
+        self.keep = keep
+        self.path: Optional[str] = None
+        self._ids = itertools.count()
+
+    def __enter__(self) -> "HandoffStore":
+        global _ACTIVE_STORE
+
+        if not self.enabled:
+            return self
+        if _ACTIVE_STORE is not None:
+            raise RuntimeError("Another handoff store is already active.")
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="handoff-", dir=self.directory)
+        _ACTIVE_STORE = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _ACTIVE_STORE
+
+        if not self.enabled:
+            return
+        _ACTIVE_STORE = None
+        if not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def save(self, value: Union[pd.DataFrame, List[Dict[str, Any]]], name: str) -> FrameHandle:
+        """
+        Hand off a DataFrame or a match table within the store.
+
+        :param value: DataFrame, or list of records of a match table.
+        :type value: Union[pd.DataFrame, List[Dict[str, Any]]]
+        :param name: Name of the result, prefixed by a sequence number within the file name.
+        :type name: str
+        :return: Handle of the written file.
+        :rtype: FrameHandle
+        """
+
+        path = os.path.join(self.path, f"{next(self._ids):04d}-{name}.arrow")
+        if isinstance(value, pd.DataFrame):
+            return save_frame(value, path)
+        return save_records(value, path)
+
+
+def handoff(value: Union[pd.DataFrame, List[Dict[str, Any]]], name: str) -> Union[pd.DataFrame, List, FrameHandle]:
+    """
+    Hand off a task result within the active store, if any.
+
+    :param value: DataFrame, or list of records of a match table.
+    :type value: Union[pd.DataFrame, List[Dict[str, Any]]]
+    :param name: Name of the result.
+    :type name: str
+    :return: Handle of the handed off result, or the result itself when no store is active.
+    :rtype: Union[pd.DataFrame, List, FrameHandle]
+    """
+
+    store = _ACTIVE_STORE
+    if store is None:
+        return value
+    handle = store.save(value, name)
+    logger.debug("Handed off %s to %s.", name, handle.path, extra={"rows": handle.n_rows})
+    return handle
+
+
+def resolve(value: Any) -> Any:
+    """
+    Load a handed off task input, any other value being returned as is.
+
+    :param value: Task input, possibly a ``FrameHandle``.
+    :type value: Any
+    :return: The DataFrame or list of records of a handle, or the input itself.
+    :rtype: Any
+    """
+
+    return value.load() if isinstance(value, FrameHandle) else value
@@ -0,0 +1,317 @@
+"""
+This module contains the instrumentation layer used to measure the performance of the pipeline stages.
+
+Every decorated stage (``task_*`` functions and ``DataCleaner``/``DataMatcher``/``DataAggregator`` steps) records
+wall time, CPU time, rows in/out, peak RSS and Python allocation deltas while a ``RunRecorder`` is active.
+When no recorder is active, the decorator only performs a single global lookup before calling the stage.
+"""
+
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from src.pipeline.process.load import save_json
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource is not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Recorder currently collecting measurements, None when instrumentation is disabled
+_ACTIVE_RECORDER: Optional["RunRecorder"] = None
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """
+    Get the peak resident set size of the current process.
+
+    :return: Peak RSS in bytes, or None if it cannot be measured on this platform.
+    :rtype: Optional[int]
+    """
+
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is expressed in bytes on macOS and in kilobytes on Linux
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def count_rows(obj: Any) -> Optional[int]:
+    """
+    Count the rows carried by a stage input or output.
+
+    DataFrames count their rows, lists of records count their entries, lists of lists and tuples count the rows of
+    their members, and handed off results (see ``src.pipeline.handoff.FrameHandle``) the rows of their file. Any other
+    object is not countable.
+
+    :param obj: Stage argument or return value.
+    :type obj: Any
+    :return: Number of rows, or None if the object does not carry rows.
+    :rtype: Optional[int]
+    """
+
+    # pandas is not imported here to keep the import of stages cheap, DataFrames only exist once it is imported
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(obj, pd.DataFrame):
+        return len(obj)
+    if isinstance(obj, list):
+        if obj and all(isinstance(item, list) for item in obj):
+            return sum(len(item) for item in obj)
+        return len(obj)
+    if isinstance(getattr(obj, "n_rows", None), int):
+        return obj.n_rows
+    if isinstance(obj, tuple):
+        counts = [count for count in (count_rows(item) for item in obj) if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def run_report_path(file_output_path: str) -> str:
+    """
+    Build the path of the run report written next to the matching output.
+
+    :param file_output_path: Path of the matching output file.
+    :type file_output_path: str
+    :return: Path of the JSON run report.
+    :rtype: str
+    """
+
+    return "{}.run_report.json".format(os.path.splitext(file_output_path)[0])
+
+
+class _StageFrame:
+    """
+    Measurements of a stage currently being executed.
+    """
+
+    def __init__(self, stage: str, parent: Optional[str], alloc_start: int):
+        self.stage = stage
+        self.parent = parent
+        self.alloc_start = alloc_start
+        self.alloc_peak = alloc_start
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+
+class RunRecorder:
+    """
+    Collect per-stage performance measurements for a pipeline run.
+
+    Used as a context manager, the recorder becomes the active one for the duration of the ``with`` block, and every
+    stage decorated with ``instrument`` reports to it. Nested stages keep a reference to their parent stage, stages
+    running within different threads being nested separately.
+
+    :param enabled: Whether measurements should be collected; a disabled recorder never becomes active.
+    :type enabled: bool
+    :param trace_allocations: Whether Python allocations should be traced with tracemalloc.
+    :type trace_allocations: bool
+    :param profiler: Optional profiler of the selected stages, see ``src.pipeline.profiling.StageProfiler``.
+    :type profiler: Optional[StageProfiler]
+    """
+
+    def __init__(self, enabled: bool = True, trace_allocations: bool = True, profiler: Optional[Any] = None):
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations
+        self.profiler = profiler
+        self.stages: List[Dict[str, Any]] = []
+        self.events: List[Dict[str, Any]] = []
+        self._local = threading.local()
+        self._started_tracemalloc = False
+        self._started_at: Optional[str] = None
+        self._wall_start: Optional[float] = None
+        self._wall_time: Optional[float] = None
+
+    def __enter__(self) -> "RunRecorder":
+        global _ACTIVE_RECORDER
+
+        if not self.enabled:
+            return self
+        if _ACTIVE_RECORDER is not None:
+            raise RuntimeError("Another run recorder is already active.")
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        self._wall_start = time.perf_counter()
+        _ACTIVE_RECORDER = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _ACTIVE_RECORDER
+
+        if not self.enabled:
+            return
+        _ACTIVE_RECORDER = None
+        self._wall_time = time.perf_counter() - self._wall_start
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        logger.info("Recorded %s stage measurements in %.3fs.", len(self.stages), self._wall_time)
+
+    @property
+    def _stack(self) -> List[_StageFrame]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _traced_memory(self) -> tuple[int, int]:
+        """
+        Get the current and peak traced Python allocations, (0, 0) when allocations are not traced.
+        """
+
+        if self.trace_allocations and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        return 0, 0
+
+    def _reset_peak(self) -> None:
+        if self.trace_allocations and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def measure(self, stage: str, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """
+        Execute a stage and record its measurements.
+
+        :param stage: Name of the stage.
+        :type stage: str
+        :param func: Stage callable.
+        :type func: Callable
+        :param args: Positional arguments of the stage.
+        :type args: tuple
+        :param kwargs: Keyword arguments of the stage.
+        :type kwargs: dict
+        :return: The value returned by the stage.
+        :rtype: Any
+        """
+
+        current, peak = self._traced_memory()
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            parent.alloc_peak = max(parent.alloc_peak, peak)
+        self._reset_peak()
+        frame = _StageFrame(stage=stage, parent=parent.stage if parent else None, alloc_start=current)
+        self._stack.append(frame)
+        try:
+            if self.profiler is not None and self.profiler.should_profile(stage, frame.parent):
+                with self.profiler.profile(stage):
+                    result = func(*args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+        finally:
+            wall_time = time.perf_counter() - frame.wall_start
+            cpu_time = time.process_time() - frame.cpu_start
+            current, peak = self._traced_memory()
+            frame.alloc_peak = max(frame.alloc_peak, peak)
+            self._stack.pop()
+            if parent is not None:
+                parent.alloc_peak = max(parent.alloc_peak, frame.alloc_peak)
+            self._reset_peak()
+
+        rows_in = [count_rows(value) for value in list(args) + list(kwargs.values())]
+        rows_in = [count for count in rows_in if count is not None]
+        measurement = {
+            "stage": stage,
+            "parent": frame.parent,
+            "wall_time_s": round(wall_time, 6),
+            "cpu_time_s": round(cpu_time, 6),
+            "rows_in": sum(rows_in) if rows_in else None,
+            "rows_out": count_rows(result),
+            "peak_rss_bytes": get_peak_rss_bytes(),
+            "alloc_delta_bytes": current - frame.alloc_start,
+            "alloc_peak_bytes": frame.alloc_peak - frame.alloc_start
+        }
+        self.stages.append(measurement)
+        logger.debug(
+            "Stage %s ran in %.3fs.", stage, wall_time,
+            extra={"stage": stage, "rows_in": measurement["rows_in"], "rows_out": measurement["rows_out"]})
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the machine-readable run report.
+
+        :return: Dictionary with the run timings, the list of stage measurements in completion order and the events
+                 recorded during the run.
+        :rtype: Dict[str, Any]
+        """
+
+        return {
+            "started_at": self._started_at,
+            "wall_time_s": round(self._wall_time, 6) if self._wall_time is not None else None,
+            "peak_rss_bytes": get_peak_rss_bytes(),
+            "trace_allocations": self.trace_allocations,
+            "stages": self.stages,
+            "events": self.events
+        }
+
+    def save(self, file_output_path: str) -> None:
+        """
+        Save the run report to a JSON file.
+
+        :param file_output_path: The path (including filename) to save the report.
+        :type file_output_path: str
+        :return: None
+        """
+
+        save_json(data=self.report(), file_output_path=file_output_path)
+
+
+def current_stage() -> Optional[str]:
+    """
+    Get the innermost stage being measured within the current thread by the active run recorder.
+
+    :return: Name of the stage, None if no recorder is active or no stage is running.
+    :rtype: Optional[str]
+    """
+
+    recorder = _ACTIVE_RECORDER
+    if recorder is None:
+        return None
+    stack = getattr(recorder._local, "stack", None)
+    return stack[-1].stage if stack else None
+
+
+def record_event(event: Dict[str, Any]) -> None:
+    """
+    Record an event e.g. a run-time decision within the report of the active run recorder, if any.
+
+    :param event: JSON serializable description of the event.
+    :type event: Dict[str, Any]
+    :return: None
+    """
+
+    recorder = _ACTIVE_RECORDER
+    if recorder is not None:
+        recorder.events.append(event)
+
+
+def instrument(stage: Optional[str] = None) -> Callable:
+    """
+    Decorate a pipeline stage so that it is measured by the active run recorder.
+
+    :param stage: Name of the stage, defaults to the qualified name of the decorated callable.
+    :type stage: Optional[str]
+    :return: The decorator.
+    :rtype: Callable
+    """
+
+    def decorator(func: Callable) -> Callable:
+        stage_name = stage or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _ACTIVE_RECORDER
+            if recorder is None:
+                return func(*args, **kwargs)
+            return recorder.measure(stage_name, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
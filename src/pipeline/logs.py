@@ -0,0 +1,236 @@
+"""
+This module contains the logging setup shared by the pipeline, the ad-hoc scripts, the benchmarks and the sales
+analytics.
+
+Modules log through their own ``logging.getLogger(__name__)`` logger with %-style arguments, so that a message is only
+formatted when a handler writes it, and never configure logging themselves. Entry points call ``configure_logging``
+once, which installs on the root logger:
+- a ``QueueHandler`` putting records on an in-memory queue, the records being written by a ``QueueListener`` thread so
+  that formatting and writing happen off the hot path,
+- a ``StageFilter`` adding to each record the instrumented stage running when it was logged,
+- a ``RateLimitFilter`` letting through a bounded number of records of a same message per stage and interval, the next
+  record let through counting the suppressed ones.
+
+Records carry the structured fields passed as ``extra`` (see ``STRUCTURED_FIELDS``), e.g.
+``logger.info("Matched %s rows.", n_rows, extra={"source": "pubmed", "rows": n_rows})``, which the text format
+appends as ``key=value`` pairs and the JSON format writes as keys of one JSON object per line.
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, TextIO
+from src.pipeline.instrumentation import current_stage
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_FORMATS = ("text", "json")
+
+# Record attributes written as structured fields when set, from ``extra`` or from the filters
+STRUCTURED_FIELDS = ("stage", "source", "rows", "rows_in", "rows_out", "partition", "batch", "suppressed")
+
+# Installed queue handler with its listener, level of the root logger before the setup and arguments of the setup, None
+# until logging is configured
+_HANDLER: Optional[logging.handlers.QueueHandler] = None
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+_ROOT_LEVEL: Optional[int] = None
+_CONFIG: Optional[Dict[str, Any]] = None
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {field: getattr(record, field) for field in STRUCTURED_FIELDS if getattr(record, field, None) is not None}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Format records as ``TEXT_FORMAT`` lines followed by their structured fields.
+    """
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " [" + " ".join(f"{field}={value}" for field, value in fields.items()) + "]"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as JSON objects with the time, level, logger, message, structured fields and exception if any.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record)
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class StageFilter(logging.Filter):
+    """
+    Add the instrumented stage running within the current thread to records logged without a stage, when a run
+    recorder is active.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "stage", None) is None:
+            record.stage = current_stage()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most ``burst`` records of a same message template and stage per ``interval`` seconds, records of
+    the ERROR level and above being always let through.
+
+    The first record let through once a new interval starts carries the number of records suppressed during the
+    previous one as its ``suppressed`` field.
+
+    :param burst: Maximum number of records of a same message and stage per interval.
+    :type burst: int
+    :param interval: Duration of an interval in seconds.
+    :type interval: float
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 1.0):
+        super().__init__()
+        if burst < 1:
+            raise ValueError(f"Rate limit burst must be at least 1, got {burst}.")
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        # the template is used rather than the message, so that records are not formatted to be counted
+        key = (record.name, getattr(record, "stage", None), record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler enqueuing records as they are, formatting being left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(
+        level: str = "INFO", log_format: str = "text", stream: Optional[TextIO] = None, rate_limit_burst: int = 10,
+        rate_limit_interval: float = 1.0) -> logging.handlers.QueueListener:
+    """
+    Configure the logging of the pipeline, replacing any previous setup made by this function.
+
+    :param level: Minimum level of the logged records e.g. "INFO" or "DEBUG".
+    :type level: str
+    :param log_format: "text" for ``TEXT_FORMAT`` lines, or "json" for one JSON object per line.
+    :type log_format: str
+    :param stream: Stream records are written to, stderr if not provided.
+    :type stream: Optional[TextIO]
+    :param rate_limit_burst: Maximum number of records of a same message and stage per interval.
+    :type rate_limit_burst: int
+    :param rate_limit_interval: Duration of a rate limiting interval in seconds.
+    :type rate_limit_interval: float
+    :return: The started listener writing the queued records.
+    :rtype: logging.handlers.QueueListener
+    :raises ValueError: If the log format is unknown.
+    """
+
+    global _HANDLER, _LISTENER, _ROOT_LEVEL, _CONFIG
+
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format '{log_format}', expected one of {LOG_FORMATS}.")
+    shutdown_logging()
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    records = queue.SimpleQueue()
+    _HANDLER = _QueueHandler(records)
+    _HANDLER.addFilter(StageFilter())
+    _HANDLER.addFilter(RateLimitFilter(burst=rate_limit_burst, interval=rate_limit_interval))
+    root = logging.getLogger()
+    _ROOT_LEVEL = root.level
+    root.addHandler(_HANDLER)
+    root.setLevel(level)
+    _LISTENER = logging.handlers.QueueListener(records, output)
+    _LISTENER.start()
+    _CONFIG = {
+        "level": level, "log_format": log_format, "rate_limit_burst": rate_limit_burst,
+        "rate_limit_interval": rate_limit_interval
+    }
+    return _LISTENER
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the ``--log-level`` and ``--log-format`` options of ``configure_logging`` to the parser of an entry point.
+
+    :param parser: Command line parser.
+    :type parser: argparse.ArgumentParser
+    :return: None
+    """
+
+    parser.add_argument("--log-level", type=str, default="INFO", help="Minimum level of logged records")
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="Format of logged records")
+
+
+def shutdown_logging() -> None:
+    """
+    Write the queued records and remove the handler installed by ``configure_logging``, if any, restoring the level of
+    the root logger.
+
+    :return: None
+    """
+
+    global _HANDLER, _LISTENER
+
+    if _LISTENER is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_HANDLER)
+    root.setLevel(_ROOT_LEVEL)
+    _LISTENER.stop()
+    _HANDLER, _LISTENER = None, None
+
+
+def logging_config() -> Optional[Dict[str, Any]]:
+    """
+    Get the arguments of the current logging setup, e.g. to configure the logging of worker processes alike.
+
+    :return: Keyword arguments of ``configure_logging`` (the stream excluded), None if logging is not configured.
+    :rtype: Optional[Dict[str, Any]]
+    """
+
+    return dict(_CONFIG) if _LISTENER is not None else None
+
+
+atexit.register(shutdown_logging)
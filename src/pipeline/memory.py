@@ -0,0 +1,206 @@
+"""
+This module contains the memory budget of pipelined runs, sizing batches so that the process stays under a target
+resident set size (RSS).
+
+Before a source file is read, the memory of its rows is estimated from a sample, and its batch size is chosen so that
+all the batches in flight (held within queues or processed by a stage) fit within the budget left by the current RSS.
+While the file is read, the batch size is halved whenever the observed RSS exceeds the budget, and grown back towards
+its initial size once the RSS is well below it. Every decision is logged and reported within the run report events.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+from typing import IO, Any, Dict, List, Optional, Union
+import pandas as pd
+from src.pipeline.instrumentation import get_peak_rss_bytes, record_event
+from src.pipeline.process.extract import iter_json_records
+from src.pipeline.process.storage import open_input
+
+logger = logging.getLogger(__name__)
+
+MEMORY_UNITS = {
+    "B": 1, "KB": 10 ** 3, "MB": 10 ** 6, "GB": 10 ** 9, "TB": 10 ** 12,
+    "KIB": 2 ** 10, "MIB": 2 ** 20, "GIB": 2 ** 30, "TIB": 2 ** 40,
+}
+
+# Peak memory of a batch within the stages relative to the memory of its rows, cleaning copying the columns it
+# standardizes and matching building a record per match
+BATCH_MEMORY_FACTOR = 4
+
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1_000_000
+SAMPLE_ROWS = 1_000
+# Bytes of a JSON input read at most to sample its first rows
+SAMPLE_BYTES = 16 * 2 ** 20
+
+# RSS ratio of the budget under which a shrunk batch size is grown back
+GROW_THRESHOLD = 0.5
+
+
+def parse_memory_size(size: Union[str, int]) -> int:
+    """
+    Parse a memory size such as "512MB" or "2GiB".
+
+    :param size: Memory size as a number of bytes or a number followed by a unit.
+    :type size: Union[str, int]
+    :return: Number of bytes.
+    :rtype: int
+    :raises ValueError: If the size cannot be parsed or is not positive.
+    """
+
+    if isinstance(size, int):
+        n_bytes = size
+    else:
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([A-Za-z]*)\s*", size)
+        unit = match.group(2).upper() if match else None
+        if match is None or (unit and unit not in MEMORY_UNITS):
+            raise ValueError(f"Invalid memory size '{size}', expected e.g. '512MB' or '2GiB'.")
+        n_bytes = int(float(match.group(1)) * MEMORY_UNITS[unit or "B"])
+    if n_bytes <= 0:
+        raise ValueError(f"Memory size must be positive: {size}")
+    return n_bytes
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    Get the current resident set size of the process, falling back to the peak one where it cannot be read.
+
+    :return: RSS in bytes, or None if it cannot be measured on this platform.
+    :rtype: Optional[int]
+    """
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return get_peak_rss_bytes()
+
+
+def _read_json_sample(
+        f: IO[bytes], sample_rows: int, max_bytes: int = SAMPLE_BYTES) -> Optional[List[Dict[str, Any]]]:
+    # decodes the first records of a JSON array, None meaning that the content is not an array of records
+    records: List[Dict[str, Any]] = []
+    try:
+        for record in iter_json_records(f, max_bytes=max_bytes):
+            records.append(record)
+            if len(records) == sample_rows:
+                break
+    except ValueError:
+        # a prefix cut within a later record still samples the first ones
+        return records or None
+    return records
+
+
+def estimate_row_bytes(path: str, sample_rows: int = SAMPLE_ROWS) -> Optional[float]:
+    """
+    Estimate the memory of a row of an input file, from the in-memory size of its first rows.
+
+    Only a prefix of the file is read: ``sample_rows`` CSV rows, or the first records of a JSON array decoded one by
+    one within ``SAMPLE_BYTES``, so that sizing batches does not load the input the budget is meant to bound.
+
+    :param path: Local path or URL of the CSV or JSON input file, an object being streamed through the block cache.
+    :type path: str
+    :param sample_rows: Number of rows of the sample.
+    :type sample_rows: int
+    :return: Bytes per row, or None if no row could be sampled e.g. for an empty file or a first JSON record larger
+             than ``SAMPLE_BYTES``.
+    :rtype: Optional[float]
+    """
+
+    with open_input(path) as source:
+        if path.lower().endswith(".json"):
+            with open(source, "rb") if isinstance(source, str) else source as f:
+                records = _read_json_sample(f, sample_rows)
+            if records is None:
+                # JSON objects other than arrays of records cannot be read partially, the whole file is sampled
+                with open_input(path) as whole:
+                    df_sample = pd.read_json(whole, encoding="utf-8").head(sample_rows)
+            else:
+                # the sample is parsed by pandas as the whole file would be, e.g. with the same dtypes
+                df_sample = pd.read_json(io.StringIO(json.dumps(records)), encoding="utf-8")
+        else:
+            df_sample = pd.read_csv(source, encoding="utf-8", nrows=sample_rows)
+    if df_sample.empty:
+        return None
+    return float(df_sample.memory_usage(index=False, deep=True).sum()) / len(df_sample)
+
+
+class MemoryBudget:
+    """
+    Memory budget of a pipelined run, choosing and adapting the batch size of each source file.
+
+    :param budget: Target RSS of the process e.g. "2GB".
+    :type budget: Union[str, int]
+    :param queue_depth: Number of batches each queue between two stages holds.
+    :type queue_depth: int
+    :param n_stages: Number of pipelined stages.
+    :type n_stages: int
+    """
+
+    def __init__(self, budget: Union[str, int], queue_depth: int, n_stages: int = 5):
+        self.budget_bytes = parse_memory_size(budget)
+        # batches held within the queues between stages, plus the one processed by each stage
+        self.batches_in_flight = (n_stages - 1) * queue_depth + n_stages
+        self.initial_sizes: Dict[str, int] = {}
+        self.decisions: List[Dict[str, object]] = []
+
+    def _decide(self, decision: str, **details) -> None:
+        entry = {"decision": decision, "budget_bytes": self.budget_bytes, "rss_bytes": get_rss_bytes(), **details}
+        self.decisions.append(entry)
+        logger.info("Memory budget decision: %s", entry)
+        record_event({"event": "memory_budget", **entry})
+
+    def initial_batch_size(self, path: str) -> int:
+        """
+        Choose the batch size of a source file from the memory of a sample of its rows and the budget left. When no
+        row can be sampled, the memory of a row is unknown and the minimum batch size is chosen.
+
+        :param path: Path to the CSV or JSON input file.
+        :type path: str
+        :return: Number of rows per batch.
+        :rtype: int
+        """
+
+        row_bytes = estimate_row_bytes(path)
+        if row_bytes is None:
+            self.initial_sizes[path] = MIN_BATCH_SIZE
+            self._decide("unsampled_batch_size", path=path, batch_size=MIN_BATCH_SIZE)
+            return MIN_BATCH_SIZE
+        available_bytes = self.budget_bytes - (get_rss_bytes() or 0)
+        batch_size = int(max(available_bytes, 0) / (row_bytes * BATCH_MEMORY_FACTOR * self.batches_in_flight))
+        batch_size = min(max(batch_size, MIN_BATCH_SIZE), MAX_BATCH_SIZE)
+        self.initial_sizes[path] = batch_size
+        self._decide(
+            "initial_batch_size", path=path, row_bytes=round(row_bytes, 1), available_bytes=available_bytes,
+            batches_in_flight=self.batches_in_flight, batch_size=batch_size
+        )
+        return batch_size
+
+    def adapt(self, path: str, batch_size: int) -> int:
+        """
+        Adapt the batch size of a source file to the observed RSS, before reading its next batch.
+
+        :param path: Path to the input file.
+        :type path: str
+        :param batch_size: Current number of rows per batch.
+        :type batch_size: int
+        :return: Number of rows of the next batch.
+        :rtype: int
+        """
+
+        rss_bytes = get_rss_bytes()
+        if rss_bytes is None:
+            return batch_size
+        if rss_bytes > self.budget_bytes and batch_size > MIN_BATCH_SIZE:
+            new_size = max(batch_size // 2, MIN_BATCH_SIZE)
+            self._decide("shrink_batch_size", path=path, previous_batch_size=batch_size, batch_size=new_size)
+            return new_size
+        initial_size = self.initial_sizes.get(path, batch_size)
+        if rss_bytes < self.budget_bytes * GROW_THRESHOLD and batch_size < initial_size:
+            new_size = min(batch_size * 2, initial_size)
+            self._decide("grow_batch_size", path=path, previous_batch_size=batch_size, batch_size=new_size)
+            return new_size
+        return batch_size
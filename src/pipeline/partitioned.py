@@ -0,0 +1,428 @@
+"""
+This module contains the partitioned execution mode, in which publications are hash-partitioned by cleaned id and each
+partition is cleaned and matched independently, by a pool of worker processes or by Prefect tasks, before a final merge.
+
+A run has three steps, sharing a work directory ``<stem>.partitions`` next to the output, or within the local
+``~/.cache/drug-data-pipeline/partitions`` directory when the output is an object-store URL:
+- ``split``: the input files are extracted and validated, drugs are cleaned once and written as an Arrow IPC file which
+  every partition memory-maps (see ``src.pipeline.handoff``), and the raw publication rows of each file are assigned
+  to partition ``crc32(cleaned id) % n_partitions``, the cleaned id being the prefixed string id built by cleaning.
+  Raw rows are written as Arrow IPC files as well, their columns mixing types e.g. integer and string ids being
+  written as JSON text so that cleaning sees the very same values. CRC32 does not depend on the process
+  (unlike ``hash``, which is salted per interpreter), so rows land in the same partition on any worker and across
+  reruns, and rows sharing an id land in the same partition, where cleaning keeps the first one as the sequential
+  execution does.
+- ``run_partition``: the rows of a partition are cleaned, deduplicated and matched against all the drugs, and its
+  matches are written to ``part-<partition>/matches.json``. A partition only reads the work directory, so any process
+  or machine sharing it can run any partition, and a failed partition can be run again alone.
+- ``merge``: the matches of every partition are aggregated, clinical trials first as in the sequential execution, and
+  saved to the output along with their ad-hoc query index.
+
+Output matches are the sequential ones, in partition order. Exact duplicate publications spread over partitions are
+matched in each of them, their identical matches being collapsed by the merge, while near duplicates are only collapsed
+within a partition.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_DEDUP_MAPPING, COLS_MATCH_MAPPING, VALIDATION_SCHEMA
+from src.pipeline.handoff import load_frame, save_frame
+from src.pipeline.instrumentation import instrument, record_event
+from src.pipeline.logs import configure_logging, logging_config
+from src.pipeline.process.extract import load_csv, load_json
+from src.pipeline.process.load import save_json
+from src.pipeline.process.storage import is_url
+from src.pipeline.process.transform.aggregating import DataAggregator
+from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.deduplicating import PublicationDeduplicator
+from src.pipeline.process.transform.matching import DataMatcher
+from src.pipeline.process.transform.utils import concatenate_dataframe_list
+from src.pipeline.process.transform.validating import DataValidator, quality_report_path, save_quality_report
+
+logger = logging.getLogger(__name__)
+
+# Publication files of a partition, in the order of the sequential execution, with their data source
+PARTITION_FILES = {"clinical": "clinical", "pubmed_json": "pubmed", "pubmed_csv": "pubmed"}
+
+_MANIFEST = "manifest.json"
+_DRUGS = "drugs.arrow"
+
+# Local directory of the work directories of the runs whose output is an object-store URL
+PARTITIONS_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "drug-data-pipeline", "partitions")
+
+
+def partition_ids(ids: pd.Series, n_partitions: int) -> np.ndarray:
+    """
+    Assign ids to partitions, by the CRC32 of their UTF-8 encoding modulo the number of partitions.
+
+    :param ids: Cleaned ids.
+    :type ids: pd.Series
+    :param n_partitions: Number of partitions.
+    :type n_partitions: int
+    :return: Partition of each id.
+    :rtype: np.ndarray
+    """
+
+    hashes = np.fromiter((zlib.crc32(str(value).encode("utf-8")) for value in ids), dtype=np.uint32, count=len(ids))
+    return (hashes % n_partitions).astype(np.int64)
+
+
+def partition_dir(file_output_path: str) -> str:
+    """
+    Build the path of the work directory of a partitioned run, next to the matching output. The work directory of an
+    object-store output lies within the local ``PARTITIONS_DIRECTORY`` instead, named after a hash of its URL, as it
+    is written and read with local file operations.
+
+    :param file_output_path: Path or URL of the matching output file.
+    :type file_output_path: str
+    :return: Path of the work directory.
+    :rtype: str
+    """
+
+    if is_url(file_output_path):
+        url_hash = hashlib.sha256(file_output_path.encode("utf-8")).hexdigest()[:16]
+        stem = os.path.splitext(file_output_path.rstrip("/").rsplit("/", 1)[-1])[0]
+        return os.path.join(PARTITIONS_DIRECTORY, f"{stem}-{url_hash}.partitions")
+    return "{}.partitions".format(os.path.splitext(file_output_path)[0])
+
+
+def _part_dir(work_dir: str, partition: int) -> str:
+    return os.path.join(work_dir, f"part-{partition:05d}")
+
+
+def run_partition(
+        work_dir: str, partition: int, engine: str = "pandas", near_duplicates: bool = False,
+        similarity_threshold: float = 0.8, fuzzy_max_distance: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Clean, deduplicate and match the publications of a partition, writing its matches within the work directory.
+
+    The matches are written to a temporary file then renamed, so that a partition interrupted midway has no matches
+    and is reported as missing by the merge.
+
+    :param work_dir: Work directory of the partitioned run, as written by ``PartitionedRunner.split``.
+    :type work_dir: str
+    :param partition: Partition to run.
+    :type partition: int
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed along with
+                            exact duplicates.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :return: Summary of the partition: its number of input rows per file, of matches, its duration and process id.
+    :rtype: Dict[str, Any]
+    """
+
+    start = time.perf_counter()
+    part_dir = _part_dir(work_dir, partition)
+    df_drugs = load_frame(os.path.join(work_dir, _DRUGS))
+    dfs_clean: Dict[str, List[pd.DataFrame]] = {"clinical": [], "pubmed": []}
+    rows = {}
+    for name, source in PARTITION_FILES.items():
+        df = load_frame(os.path.join(part_dir, f"{name}.arrow"))
+        rows[name] = len(df)
+        if len(df):
+            dfs_clean[source].append(DataCleaner(**COLS_CLEAN_MAPPING[source], engine=engine)(df=df))
+    matches = {}
+    for source, dfs in dfs_clean.items():
+        matches[source] = []
+        if not dfs:
+            continue
+        df = concatenate_dataframe_list(dfs=dfs, engine=engine) if len(dfs) > 1 else dfs[0]
+        df = PublicationDeduplicator(
+            **COLS_DEDUP_MAPPING[source], near_duplicates=near_duplicates, similarity_threshold=similarity_threshold
+        )(df=df)
+        if len(df):
+            matcher = DataMatcher(
+                **COLS_MATCH_MAPPING[f"drugs_{source}"], engine=engine, fuzzy_max_distance=fuzzy_max_distance)
+            matches[source] = matcher(df_drugs=df_drugs, df_publications=df)
+    tmp_path = os.path.join(part_dir, "matches.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(matches, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(part_dir, "matches.json"))
+    summary = {
+        "partition": partition,
+        "rows": rows,
+        "matches": sum(len(source_matches) for source_matches in matches.values()),
+        "seconds": round(time.perf_counter() - start, 6),
+        "pid": os.getpid(),
+    }
+    logger.info(
+        "Partition %s matched %s entries in %.3fs.", partition, summary["matches"], summary["seconds"],
+        extra={"partition": partition, "rows": summary["rows"]})
+    return summary
+
+
+class PartitionedRunner:
+    """
+    Run the drug-publication matching pipeline over hash partitions of the publications.
+
+    :param n_partitions: Number of partitions.
+    :type n_partitions: int
+    :param max_workers: Number of worker processes running partitions, the number of CPUs if not provided. With a
+                        single worker, partitions run one after the other within the calling process.
+    :type max_workers: Optional[int]
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed along with
+                            exact duplicates.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param strict_validation: Whether a failed validation check should stop the run.
+    :type strict_validation: bool
+    """
+
+    def __init__(
+            self, n_partitions: int = 8, max_workers: Optional[int] = None, engine: str = "pandas",
+            near_duplicates: bool = False, similarity_threshold: float = 0.8,
+            fuzzy_max_distance: Optional[int] = None, strict_validation: bool = False):
+        if n_partitions < 1 or (max_workers is not None and max_workers < 1):
+            raise ValueError("Number of partitions and of workers must be positive.")
+        self.n_partitions = n_partitions
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.engine = engine
+        self.near_duplicates = near_duplicates
+        self.similarity_threshold = similarity_threshold
+        self.fuzzy_max_distance = fuzzy_max_distance
+        self.strict_validation = strict_validation
+
+    @instrument()
+    def split(
+            self, path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str,
+            path_to_clinical_trials: str, file_output_path: str) -> List[int]:
+        """
+        Extract and validate the input files, clean drugs, and write the raw publication rows of each partition within
+        the work directory, replacing the ones of a previous run. The quality report of the input files is saved next to
+        the output.
+
+        :param path_to_drugs: Path to the drugs CSV file.
+        :type path_to_drugs: str
+        :param path_to_pubmed_csv: Path to the PubMed CSV file.
+        :type path_to_pubmed_csv: str
+        :param path_to_pubmed_json: Path to the PubMed JSON file.
+        :type path_to_pubmed_json: str
+        :param path_to_clinical_trials: Path to the clinical trials CSV file.
+        :type path_to_clinical_trials: str
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :return: The partitions to run.
+        :rtype: List[int]
+        :raises ValueError: If expected columns are missing, or if a check failed with strict validation.
+        """
+
+        sources = [
+            ("drugs", "drugs", path_to_drugs), ("clinical", "clinical", path_to_clinical_trials),
+            ("pubmed", "pubmed_json", path_to_pubmed_json), ("pubmed", "pubmed_csv", path_to_pubmed_csv),
+        ]
+        dfs = {}
+        quality_reports = []
+        for source, name, path in sources:
+            df = load_json(json_path=path) if path.lower().endswith(".json") else load_csv(csv_path=path)
+            validator = DataValidator(source, **VALIDATION_SCHEMA[source], dataset=os.path.basename(path))
+            validator(df=df)
+            quality_reports.append(validator.report())
+            record_event({"event": "validation", **quality_reports[-1]})
+            dfs[name] = df
+        quality_report = save_quality_report(quality_reports, file_output_path=file_output_path)
+        if self.strict_validation and not quality_report["passed"]:
+            report_path = quality_report_path(file_output_path)
+            raise ValueError(f"Validation of the input datasets failed, see {report_path}.")
+
+        work_dir = partition_dir(file_output_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        save_frame(
+            DataCleaner(**COLS_CLEAN_MAPPING["drugs"], engine=self.engine)(df=dfs.pop("drugs")),
+            os.path.join(work_dir, _DRUGS))
+        parts = {}
+        for name, source in PARTITION_FILES.items():
+            df, cleaning = dfs[name], COLS_CLEAN_MAPPING[source]
+            # cleaned ids, as built by DataCleaner.clean_id
+            ids = cleaning["id_prefix"] + "_" + df[cleaning["id_column"]].astype(str)
+            parts[name] = partition_ids(ids, self.n_partitions)
+        rows = []
+        for partition in range(self.n_partitions):
+            part_dir = _part_dir(work_dir, partition)
+            os.makedirs(part_dir)
+            for name in PARTITION_FILES:
+                save_frame(
+                    dfs[name][parts[name] == partition].reset_index(drop=True), os.path.join(part_dir, f"{name}.arrow"))
+            rows.append(int(sum((parts[name] == partition).sum() for name in PARTITION_FILES)))
+        with open(os.path.join(work_dir, _MANIFEST), "w", encoding="utf-8") as f:
+            json.dump({"n_partitions": self.n_partitions, "rows": rows}, f)
+        logger.info("Split %s publications into %s partitions of %s rows.", sum(rows), self.n_partitions, rows)
+        return list(range(self.n_partitions))
+
+    def check_split(self, file_output_path: str) -> None:
+        """
+        Check that the work directory holds a split into the configured number of partitions, e.g. before running
+        again some partitions of a previous run.
+
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :return: None
+        :raises ValueError: If the work directory holds no split, or a split into another number of partitions.
+        """
+
+        manifest_path = os.path.join(partition_dir(file_output_path), _MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"No partitions found at {manifest_path}, the input files must be split first.")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            n_partitions = json.load(f)["n_partitions"]
+        if n_partitions != self.n_partitions:
+            raise ValueError(f"Input files were split into {n_partitions} partitions, not {self.n_partitions}.")
+
+    def run_partition(self, file_output_path: str, partition: int) -> Dict[str, Any]:
+        """
+        Clean, deduplicate and match the publications of a partition within the calling process.
+
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :param partition: Partition to run.
+        :type partition: int
+        :return: Summary of the partition.
+        :rtype: Dict[str, Any]
+        """
+
+        return instrument(stage=f"partition[{partition}]")(run_partition)(
+            partition_dir(file_output_path), partition, engine=self.engine, near_duplicates=self.near_duplicates,
+            similarity_threshold=self.similarity_threshold, fuzzy_max_distance=self.fuzzy_max_distance)
+
+    @instrument()
+    def run_partitions(self, file_output_path: str, partitions: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Run partitions with the pool of worker processes, each partition being recorded as a ``"partition"`` event.
+        Every partition runs even if another one fails.
+
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :param partitions: Partitions to run.
+        :type partitions: Iterable[int]
+        :return: Summaries of the successful partitions.
+        :rtype: List[Dict[str, Any]]
+        :raises RuntimeError: If partitions failed, listing them so that they can be run again.
+        """
+
+        partitions = list(partitions)
+        unknown_partitions = [partition for partition in partitions if not 0 <= partition < self.n_partitions]
+        if unknown_partitions:
+            raise ValueError(f"Unknown partitions {unknown_partitions}, expected within [0, {self.n_partitions}).")
+        summaries, errors = [], {}
+        if self.max_workers == 1:
+            for partition in partitions:
+                try:
+                    summaries.append(self.run_partition(file_output_path, partition))
+                except Exception as e:
+                    logger.error("Partition %s failed: %s", partition, e)
+                    errors[partition] = e
+        else:
+            # worker processes are spawned rather than forked, as independent nodes would be, and log as this process
+            log_config = logging_config()
+            with ProcessPoolExecutor(
+                    max_workers=min(self.max_workers, len(partitions) or 1),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=functools.partial(configure_logging, **log_config) if log_config else None) as executor:
+                futures = {
+                    partition: executor.submit(
+                        run_partition, partition_dir(file_output_path), partition, engine=self.engine,
+                        near_duplicates=self.near_duplicates, similarity_threshold=self.similarity_threshold,
+                        fuzzy_max_distance=self.fuzzy_max_distance)
+                    for partition in partitions
+                }
+                for partition, future in futures.items():
+                    try:
+                        summaries.append(future.result())
+                    except Exception as e:
+                        logger.error("Partition %s failed: %s", partition, e)
+                        errors[partition] = e
+        for summary in summaries:
+            record_event({"event": "partition", **summary})
+        if errors:
+            failed = list(errors)
+            raise RuntimeError(
+                f"Partitions {failed} failed, run them again with partitions={failed}.") from errors[failed[0]]
+        return summaries
+
+    @instrument()
+    def merge(self, file_output_path: str) -> int:
+        """
+        Aggregate the matches of every partition and save them to a JSON file, along with their ad-hoc query index.
+
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :return: Number of saved matches.
+        :rtype: int
+        :raises RuntimeError: If partitions have no matches, listing them so that they can be run.
+        """
+
+        from src.adhoc.index import MatchesIndex, index_path
+
+        work_dir = partition_dir(file_output_path)
+        missing = [
+            partition for partition in range(self.n_partitions)
+            if not os.path.exists(os.path.join(_part_dir(work_dir, partition), "matches.json"))
+        ]
+        if missing:
+            raise RuntimeError(f"Partitions {missing} have no matches, run them with partitions={missing}.")
+        matches = {"clinical": [], "pubmed": []}
+        for partition in range(self.n_partitions):
+            with open(os.path.join(_part_dir(work_dir, partition), "matches.json"), "r", encoding="utf-8") as f:
+                for source, source_matches in json.load(f).items():
+                    matches[source].append(source_matches)
+        aggregated_matches = DataAggregator()(data=matches["clinical"] + matches["pubmed"])
+        save_json(data=aggregated_matches, file_output_path=file_output_path)
+        MatchesIndex.from_matches(aggregated_matches).save(index_path(file_output_path), matches_path=file_output_path)
+        return len(aggregated_matches)
+
+    def run(
+            self, path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str,
+            path_to_clinical_trials: str, file_output_path: str, partitions: Optional[List[int]] = None) -> int:
+        """
+        Split the input files, run every partition with the pool of worker processes and merge their matches. When
+        partitions are given, only those partitions of the previous split are run again before the merge, e.g. the
+        ones of a previous run that failed.
+
+        :param path_to_drugs: Path to the drugs CSV file.
+        :type path_to_drugs: str
+        :param path_to_pubmed_csv: Path to the PubMed CSV file.
+        :type path_to_pubmed_csv: str
+        :param path_to_pubmed_json: Path to the PubMed JSON file.
+        :type path_to_pubmed_json: str
+        :param path_to_clinical_trials: Path to the clinical trials CSV file.
+        :type path_to_clinical_trials: str
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :param partitions: Partitions of the previous split to run again, all partitions of a new split if not provided.
+        :type partitions: Optional[List[int]]
+        :return: Number of saved matches.
+        :rtype: int
+        :raises RuntimeError: If partitions failed, listing them so that they can be run again.
+        """
+
+        if partitions is None:
+            partitions = self.split(
+                path_to_drugs=path_to_drugs, path_to_pubmed_csv=path_to_pubmed_csv,
+                path_to_pubmed_json=path_to_pubmed_json, path_to_clinical_trials=path_to_clinical_trials,
+                file_output_path=file_output_path
+            )
+        else:
+            self.check_split(file_output_path)
+        self.run_partitions(file_output_path, partitions)
+        return self.merge(file_output_path)
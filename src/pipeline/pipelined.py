@@ -0,0 +1,327 @@
+"""
+This module contains the pipelined execution mode, in which extract, clean, match, aggregate and load run concurrently
+over record batches.
+
+Each stage runs within its own thread and hands batches to the next one through a bounded queue. A stage blocks while
+the queue of the next one is full, so that at most ``queue_depth`` batches wait between two stages: memory is capped by
+the queue depths and the batch size rather than by the dataset size, and reading or writing files overlaps with
+cleaning and matching.
+
+Output matches are the ones of the sequential execution, in batch order rather than drug by drug:
+- Input files are read by chunks of ``batch_size`` rows, the records of JSON arrays being decoded one by one. JSON
+  content other than arrays of records is read at once.
+- Raw batches are validated before cleaning, counts being accumulated per file so that the quality report covers
+  whole files. In strict mode, the run stops at the first batch after which a file fails a check.
+- Rows whose id was seen within a previous batch of the same file are dropped before cleaning, as the sequential
+  cleaning keeps the first occurrence of each id within a file.
+- Cleaned publications are deduplicated against the ones of previous batches of the same source.
+- Aggregation keeps the already output entries to deduplicate them across batches.
+- Matches are written to the JSON output entry by entry, and the query index is built while writing. The output is
+  replaced once all the matches are written, a failed run leaving the previous one as it was.
+
+With a memory budget, the batch size of each source file is chosen and adapted by ``src.pipeline.memory.MemoryBudget``
+instead of being fixed.
+"""
+
+import logging
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from src.adhoc.index import MatchesIndex, index_path
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_DEDUP_MAPPING, COLS_MATCH_MAPPING, VALIDATION_SCHEMA
+from src.pipeline.instrumentation import instrument, record_event
+from src.pipeline.memory import MemoryBudget
+from src.pipeline.process.extract import iter_csv, iter_json, load_csv
+from src.pipeline.process.load import JsonArrayWriter
+from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.deduplicating import PublicationDeduplicator
+from src.pipeline.process.transform.matching import DataMatcher
+from src.pipeline.process.transform.validating import DataValidator, save_quality_report
+
+logger = logging.getLogger(__name__)
+
+# Marker put on a queue once a stage has produced all its batches
+_END = object()
+
+# Seconds a blocked stage waits on a queue before checking whether the run was cancelled
+_QUEUE_TIMEOUT = 0.1
+
+
+class _Cancelled(Exception):
+    """
+    Raised within a stage when another stage failed.
+    """
+
+
+class _Stage(threading.Thread):
+    """
+    Thread running a pipeline stage, which turns the batches of its inbox into the batches of its outbox.
+
+    :param name: Name of the stage.
+    :type name: str
+    :param work: Function taking the iterator over input batches (None for the first stage), yielding output batches
+                 unless it is the last stage.
+    :type work: Callable
+    :param inbox: Queue of input batches, None for the first stage.
+    :type inbox: Optional[queue.Queue]
+    :param outbox: Queue of output batches, None for the last stage.
+    :type outbox: Optional[queue.Queue]
+    :param cancelled: Event set when a stage fails, stopping every stage.
+    :type cancelled: threading.Event
+    """
+
+    def __init__(
+            self, name: str, work: Callable, inbox: Optional[queue.Queue], outbox: Optional[queue.Queue],
+            cancelled: threading.Event):
+        super().__init__(name=f"pipelined-{name}", daemon=True)
+        self.stage = name
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+        self.cancelled = cancelled
+        self.error: Optional[BaseException] = None
+
+    def _get(self) -> Iterator[Any]:
+        while True:
+            try:
+                batch = self.inbox.get(timeout=_QUEUE_TIMEOUT)
+            except queue.Empty:
+                if self.cancelled.is_set():
+                    raise _Cancelled()
+                continue
+            if batch is _END:
+                return
+            yield batch
+
+    def _put(self, batch: Any) -> None:
+        while True:
+            try:
+                self.outbox.put(batch, timeout=_QUEUE_TIMEOUT)
+                return
+            except queue.Full:
+                if self.cancelled.is_set():
+                    raise _Cancelled()
+
+    def _run_stage(self) -> None:
+        outputs = self.work(self._get() if self.inbox is not None else None)
+        if self.outbox is not None:
+            for batch in outputs:
+                self._put(batch)
+
+    def run(self) -> None:
+        try:
+            instrument(stage=f"pipelined[{self.stage}]")(self._run_stage)()
+            if self.outbox is not None:
+                self._put(_END)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            logger.error("Pipelined stage '%s' failed: %s", self.stage, e)
+            self.error = e
+            self.cancelled.set()
+
+
+class PipelinedRunner:
+    """
+    Run the drug-publication matching pipeline as concurrent stages linked by bounded queues.
+
+    :param batch_size: Number of input rows per batch.
+    :type batch_size: int
+    :param queue_depth: Number of batches a queue holds before blocking the stage feeding it.
+    :type queue_depth: int
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    :param memory_budget: Target RSS of the process e.g. "2GB", batch sizes being derived from it instead of
+                          ``batch_size`` when provided.
+    :type memory_budget: Optional[str]
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed along with
+                            exact duplicates.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param strict_validation: Whether a failed validation check should stop the run.
+    :type strict_validation: bool
+    """
+
+    def __init__(
+            self, batch_size: int = 50_000, queue_depth: int = 4, engine: str = "pandas",
+            memory_budget: Optional[str] = None, near_duplicates: bool = False, similarity_threshold: float = 0.8,
+            fuzzy_max_distance: Optional[int] = None, strict_validation: bool = False):
+        if batch_size < 1 or queue_depth < 1:
+            raise ValueError("Batch size and queue depth must be positive.")
+        self.batch_size = batch_size
+        self.queue_depth = queue_depth
+        self.cleaners = {key: DataCleaner(**COLS_CLEAN_MAPPING[key], engine=engine) for key in COLS_CLEAN_MAPPING}
+        self.matchers = {
+            "clinical": DataMatcher(
+                **COLS_MATCH_MAPPING["drugs_clinical"], engine=engine, fuzzy_max_distance=fuzzy_max_distance),
+            "pubmed": DataMatcher(
+                **COLS_MATCH_MAPPING["drugs_pubmed"], engine=engine, fuzzy_max_distance=fuzzy_max_distance),
+        }
+        self.deduplicators = {
+            key: PublicationDeduplicator(
+                **COLS_DEDUP_MAPPING[key], near_duplicates=near_duplicates, similarity_threshold=similarity_threshold)
+            for key in COLS_DEDUP_MAPPING
+        }
+        self.strict_validation = strict_validation
+        self.validators: Dict[str, DataValidator] = {}
+        self.memory_budget = MemoryBudget(memory_budget, queue_depth=queue_depth) if memory_budget else None
+        self.df_drugs: Optional[pd.DataFrame] = None
+        self.file_output_path: Optional[str] = None
+        self.n_saved = 0
+
+    def _batch_sizes(self, path: str) -> Callable[[], int]:
+        """
+        Build the callable giving the number of rows of the next batch of a source file.
+        """
+
+        if self.memory_budget is None:
+            return lambda: self.batch_size
+        batch_size = self.memory_budget.initial_batch_size(path)
+        is_first = True
+
+        def next_batch_size() -> int:
+            nonlocal batch_size, is_first
+            if not is_first:
+                batch_size = self.memory_budget.adapt(path, batch_size)
+            is_first = False
+            return batch_size
+        return next_batch_size
+
+    def _read(self, path: str) -> Iterator[pd.DataFrame]:
+        next_batch_size = self._batch_sizes(path)
+        if path.lower().endswith(".json"):
+            yield from iter_json(json_path=path, chunk_size=next_batch_size)
+        else:
+            yield from iter_csv(csv_path=path, chunk_size=next_batch_size)
+
+    def _extract(self, sources: List[Tuple[str, str]]) -> Callable:
+        def work(_) -> Iterator[tuple]:
+            for source, path in sources:
+                for df in self._read(path):
+                    yield source, path, df
+        return work
+
+    def _clean(self, batches: Iterator[tuple]) -> Iterator[tuple]:
+        seen_ids: Dict[str, set] = {}
+        for source, path, df in batches:
+            self._validate(path, df)
+            cleaner = self.cleaners[source]
+            if cleaner.id_column in df.columns:
+                ids = df[cleaner.id_column].astype(str)
+                path_ids = seen_ids.setdefault(path, set())
+                df = df[~ids.isin(path_ids)].reset_index(drop=True)
+                path_ids.update(ids)
+            if len(df):
+                df = self.deduplicators[source](df=cleaner(df=df))
+            if len(df):
+                yield source, df
+        for deduplicator in self.deduplicators.values():
+            record_event({"event": "deduplication", **deduplicator.report()})
+
+    def _validate(self, path: str, df: pd.DataFrame) -> None:
+        validator = self.validators[path]
+        validator(df=df)
+        if self.strict_validation:
+            report = validator.report()
+            if not report["passed"]:
+                raise ValueError(f"Validation of the '{validator.dataset}' dataset failed: {report['failures']}")
+
+    def _match(self, batches: Iterator[tuple]) -> Iterator[List[Dict[str, str]]]:
+        for source, df in batches:
+            matches = self.matchers[source](df_drugs=self.df_drugs, df_publications=df)
+            if matches:
+                yield matches
+        for matcher in self.matchers.values():
+            if matcher.prefilter is not None:
+                record_event({"event": "prefilter", **matcher.prefilter.report()})
+
+    @staticmethod
+    def _aggregate(batches: Iterator[List[Dict[str, str]]]) -> Iterator[List[Dict[str, str]]]:
+        seen = set()
+        for matches in batches:
+            unique_matches = []
+            for entry in matches:
+                frozen = frozenset(entry.items())
+                if frozen not in seen:
+                    seen.add(frozen)
+                    unique_matches.append(entry)
+            if unique_matches:
+                yield unique_matches
+
+    def _load(self, batches: Iterator[List[Dict[str, str]]]) -> None:
+        with JsonArrayWriter(self.file_output_path) as writer:
+            def written() -> Iterator[Dict[str, str]]:
+                for matches in batches:
+                    for entry in matches:
+                        writer.write(entry)
+                        yield entry
+            index = MatchesIndex.from_matches(written())
+        index.save(index_path(self.file_output_path), matches_path=self.file_output_path)
+        self.n_saved = writer.n_entries
+        logger.info("Reduced to %s unique entries.", writer.n_entries)
+
+    def run(
+            self, path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str,
+            path_to_clinical_trials: str, file_output_path: str) -> int:
+        """
+        Run the pipeline and save the matches to a JSON file, along with their ad-hoc query index.
+
+        Drugs are cleaned first, as every publication batch is matched against all of them, then publication files are
+        streamed through the stages in the sequential order: clinical trials, pubmed JSON then pubmed CSV.
+
+        :param path_to_drugs: Path to the drugs CSV file.
+        :type path_to_drugs: str
+        :param path_to_pubmed_csv: Path to the PubMed CSV file.
+        :type path_to_pubmed_csv: str
+        :param path_to_pubmed_json: Path to the PubMed JSON file.
+        :type path_to_pubmed_json: str
+        :param path_to_clinical_trials: Path to the clinical trials CSV file.
+        :type path_to_clinical_trials: str
+        :param file_output_path: The file path (including filename) where the JSON output will be saved.
+        :type file_output_path: str
+        :return: Number of saved matches.
+        :rtype: int
+        :raises Exception: The error of the first failing stage, every stage being stopped.
+        """
+
+        self.file_output_path = file_output_path
+        sources = [
+            ("clinical", path_to_clinical_trials), ("pubmed", path_to_pubmed_json), ("pubmed", path_to_pubmed_csv)
+        ]
+        self.validators = {
+            path: DataValidator(source, **VALIDATION_SCHEMA[source], dataset=os.path.basename(path))
+            for source, path in [("drugs", path_to_drugs)] + sources
+        }
+        df_drugs = load_csv(csv_path=path_to_drugs)
+        self._validate(path_to_drugs, df_drugs)
+        self.df_drugs = self.cleaners["drugs"](df=df_drugs)
+        works = [
+            ("extract", self._extract(sources)), ("clean", self._clean), ("match", self._match),
+            ("aggregate", self._aggregate), ("load", self._load)
+        ]
+        queues = [queue.Queue(maxsize=self.queue_depth) for _ in works[1:]]
+        cancelled = threading.Event()
+        stages = [
+            _Stage(
+                name, work, inbox=queues[i - 1] if i > 0 else None, outbox=queues[i] if i < len(queues) else None,
+                cancelled=cancelled
+            )
+            for i, (name, work) in enumerate(works)
+        ]
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+        quality_reports = [validator.report() for validator in self.validators.values() if validator.n_rows]
+        for report in quality_reports:
+            record_event({"event": "validation", **report})
+        save_quality_report(quality_reports, file_output_path=file_output_path)
+        errors = [stage.error for stage in stages if stage.error is not None]
+        if errors:
+            raise errors[0]
+        return self.n_saved
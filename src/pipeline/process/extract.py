@@ -1,18 +1,23 @@
+import codecs
+import io
+import json
 import pandas as pd
 import logging
 from json import JSONDecodeError
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Union
+from src.pipeline.process.storage import open_input
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 ENCODING = "utf-8"
+# Bytes read at a time by the incremental JSON decoder
+JSON_READ_SIZE = 2 ** 16
 
 def load_json(json_path: str) -> pd.DataFrame:
     """
     Load a JSON file into a Pandas DataFrame.
 
-    :param json_path: Path to the input JSON file.
+    :param json_path: Local path or URL (see ``src.pipeline.process.storage``) of the input JSON file.
     :type json_path: str
     :return: The loaded Pandas DataFrame, or None if an exception occurred.
     :rtype: pd.DataFrame or None
@@ -22,21 +27,16 @@ def load_json(json_path: str) -> pd.DataFrame:
     """
 
     try:
-        df = pd.read_json(json_path, encoding=ENCODING)
-        logging.info(f"Successfully loaded JSON: {json_path}")
+        with open_input(json_path) as source:
+            df = pd.read_json(source, encoding=ENCODING)
+        logger.info("Successfully loaded JSON: %s", json_path)
         return df
 
     except FileNotFoundError:
-        logging.error(f"JSON file not found at: {json_path}")
         raise Exception(f"JSON file not found at: {json_path}")
     except ValueError:
-        logging.error(f"Failed to parse file to json object: {json_path}")
         raise Exception(f"Failed to parse file to json object: {json_path}")
     except Exception as e:
-        logging.error(
-            f"Exception occured when loading file to json object: {json_path}\n"
-            f"More details here : {e}"
-        )
         raise Exception(
             f"Exception occured when loading file to json object: {json_path}\n"
             f"More details here : {e}"
@@ -46,7 +46,7 @@ def load_csv(csv_path: str) -> pd.DataFrame:
     """
     Load a CSV file into a Pandas DataFrame.
 
-    :param csv_path: Path to the input CSV file.
+    :param csv_path: Local path or URL (see ``src.pipeline.process.storage``) of the input CSV file.
     :type csv_path: str
     :return: The loaded Pandas DataFrame, or None if an exception occurred.
     :rtype: pd.DataFrame or None
@@ -57,25 +57,138 @@ def load_csv(csv_path: str) -> pd.DataFrame:
     """
 
     try:
-        df = pd.read_csv(csv_path, encoding=ENCODING)
-        logging.info(f"Successfully loaded CSV: {csv_path}")
+        with open_input(csv_path) as source:
+            df = pd.read_csv(source, encoding=ENCODING)
+        logger.info("Successfully loaded CSV: %s", csv_path)
         return df
 
     except FileNotFoundError:
-        logging.error(f"CSV File not found at: {csv_path}")
         raise FileNotFoundError(f"CSV File not found at: {csv_path}")
     except pd.errors.EmptyDataError:
-        logging.warning(f"CSV file is empty: {csv_path}")
+        logger.warning("CSV file is empty: %s", csv_path)
         raise pd.errors.EmptyDataError(f"CSV file is empty: {csv_path}")
     except pd.errors.ParserError:
-        logging.error(f"Failed to parse CSV file: {csv_path}")
         raise pd.errors.ParserError(f"Failed to parse CSV file: {csv_path}")
     except Exception as e:
-        logging.error(
-            f"Exception occured when loading CSV file: {csv_path}\n"
-            f"More details here : {e}"
-        )
         raise Exception(
             f"Exception occured when loading CSV file: {csv_path}\n"
             f"More details here : {e}"
         )
+
+
+def iter_csv(csv_path: str, chunk_size: Union[int, Callable[[], int]]) -> Iterator[pd.DataFrame]:
+    """
+    Load a CSV file into Pandas DataFrames of a given number of rows, the file being read chunk by chunk.
+
+    :param csv_path: Local path or URL (see ``src.pipeline.process.storage``) of the input CSV file.
+    :type csv_path: str
+    :param chunk_size: Number of rows per DataFrame, or a callable returning the number of rows of the next one.
+    :type chunk_size: Union[int, Callable[[], int]]
+    :return: Iterator over the loaded DataFrames, in file order.
+    :rtype: Iterator[pd.DataFrame]
+    :raises FileNotFoundError: If the file does not exist at the specified path.
+    :raises pd.errors.EmptyDataError: If the CSV file is empty.
+    :raises pd.errors.ParserError: If the CSV cannot be parsed properly.
+    """
+
+    next_chunk_size = chunk_size if callable(chunk_size) else lambda: chunk_size
+    try:
+        with open_input(csv_path) as source, pd.read_csv(source, encoding=ENCODING, iterator=True) as reader:
+            while True:
+                try:
+                    yield reader.get_chunk(next_chunk_size())
+                except StopIteration:
+                    break
+        logger.info("Successfully loaded CSV by chunks: %s", csv_path)
+
+    except FileNotFoundError:
+        raise FileNotFoundError(f"CSV File not found at: {csv_path}")
+    except pd.errors.EmptyDataError:
+        logger.warning("CSV file is empty: %s", csv_path)
+        raise pd.errors.EmptyDataError(f"CSV file is empty: {csv_path}")
+    except pd.errors.ParserError:
+        raise pd.errors.ParserError(f"Failed to parse CSV file: {csv_path}")
+
+
+def iter_json_records(f: IO[bytes], max_bytes: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Decode the records of a JSON array one by one, reading the file by chunks of ``JSON_READ_SIZE`` bytes, so that the
+    array is never held as a whole.
+
+    :param f: Binary file holding a UTF-8 JSON array.
+    :type f: IO[bytes]
+    :param max_bytes: Number of bytes read at most, records being decoded until then. The whole file if not provided.
+    :type max_bytes: Optional[int]
+    :return: Iterator over the records, in array order.
+    :rtype: Iterator[Dict[str, Any]]
+    :raises ValueError: If the file does not hold a JSON array, or ends within a record.
+    """
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(ENCODING)()
+    text, position, n_read = "", 0, 0
+    in_array = False
+    while True:
+        while position < len(text) and text[position] in " \t\r\n,":
+            position += 1
+        if position < len(text):
+            if not in_array:
+                if text[position] != "[":
+                    raise ValueError("The JSON content is not an array.")
+                in_array, position = True, position + 1
+                continue
+            if text[position] == "]":
+                return
+            try:
+                record, position = decoder.raw_decode(text, position)
+                yield record
+                continue
+            except JSONDecodeError:
+                pass
+        chunk = f.read(JSON_READ_SIZE)
+        n_read += len(chunk)
+        if not chunk:
+            raise ValueError("The JSON content ends within its array.")
+        if max_bytes is not None and n_read > max_bytes:
+            return
+        text = text[position:] + text_decoder.decode(chunk)
+        position = 0
+
+
+def iter_json(json_path: str, chunk_size: Union[int, Callable[[], int]]) -> Iterator[pd.DataFrame]:
+    """
+    Load a JSON array into Pandas DataFrames of a given number of rows, its records being decoded one by one. The
+    DataFrames are parsed by pandas as the whole file would be by ``load_json``, which loads JSON content other than
+    arrays of records.
+
+    :param json_path: Local path or URL (see ``src.pipeline.process.storage``) of the input JSON file.
+    :type json_path: str
+    :param chunk_size: Number of rows per DataFrame, or a callable returning the number of rows of the next one.
+    :type chunk_size: Union[int, Callable[[], int]]
+    :return: Iterator over the loaded DataFrames, in file order, at least one being loaded.
+    :rtype: Iterator[pd.DataFrame]
+    :raises Exception: If the file does not exist at the specified path, or is not valid JSON.
+    """
+
+    next_chunk_size = chunk_size if callable(chunk_size) else lambda: chunk_size
+    n_loaded = 0
+    try:
+        with open_input(json_path) as source, open(source, "rb") if isinstance(source, str) else source as f:
+            records = iter_json_records(f)
+            while True:
+                batch = [record for _, record in zip(range(next_chunk_size()), records)]
+                if not batch and n_loaded:
+                    break
+                yield pd.read_json(io.StringIO(json.dumps(batch)), encoding=ENCODING)
+                n_loaded += len(batch)
+                if not batch:
+                    break
+        logger.info("Successfully loaded JSON by chunks: %s", json_path)
+
+    except FileNotFoundError:
+        raise Exception(f"JSON file not found at: {json_path}")
+    except ValueError:
+        if n_loaded:
+            raise Exception(f"Failed to parse file to json object: {json_path}")
+        # JSON content other than an array of records is loaded as a whole
+        yield load_json(json_path=json_path)
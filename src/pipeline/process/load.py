@@ -1,43 +1,133 @@
 import json
 import os
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
+from src.pipeline.process.storage import open_output, remove_output, replace_output
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 
-def save_json(data: List[Dict[str, str]], file_output_path: str) -> None:
+def save_json(data: List[Dict[str, str]], file_output_path: str, indent: Optional[int] = 4) -> None:
     """
     Saves a list of dictionaries e.g. drug publication matching results to a JSON file.
 
     :param data: The data to save; must be serializable to JSON.
     :type data: List[Dict[str, str]]
-    :param file_output_path: The path (including filename) to save the JSON output.
+    :param file_output_path: The path (including filename) to save the JSON output, local or a URL (see
+                             ``src.pipeline.process.storage``).
     :type file_output_path: str
+    :param indent: Number of spaces of each indentation level, the JSON being written without any whitespace if None.
+    :type indent: Optional[int]
     :raises ValueError: If the data is not serializable to JSON.
     :raises IOError: If there is an issue writing the file.
     :return: None
     :rtype: None
     """
 
+    separators = None if indent is not None else (",", ":")
     try:
-        json.dumps(data, ensure_ascii=False, indent=4)
+        json.dumps(data, ensure_ascii=False, indent=indent, separators=separators)
+
+        with open_output(file_output_path) as file:
+            json.dump(data, file, indent=indent, separators=separators, ensure_ascii=False)
+
+        logger.info("JSON file successfully saved at: %s", file_output_path)
+
+    except TypeError as e:
+        raise ValueError(f"Data provided is not serializable to JSON: {e}")
+
+    except OSError as e:
+        raise OSError(f"Failed to write JSON file at {file_output_path}: {e}")
+
+
+def append_json_lines(data: List[Dict[str, str]], file_output_path: str) -> None:
+    """
+    Appends a list of dictionaries e.g. drug publication matching results to a JSON lines file, one entry per line.
+
+    Lines are written with a single write followed by a flush, so that readers never see a partial batch of entries.
+
+    :param data: The data to append; must be serializable to JSON.
+    :type data: List[Dict[str, str]]
+    :param file_output_path: The path (including filename) of the JSON lines output.
+    :type file_output_path: str
+    :raises ValueError: If the data is not serializable to JSON.
+    :raises IOError: If there is an issue writing the file.
+    :return: None
+    :rtype: None
+    """
+
+    try:
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in data)
 
         dir_name = os.path.dirname(file_output_path)
         if dir_name:
             os.makedirs(dir_name, exist_ok=True)
 
-        with open(file_output_path, "w", encoding="utf-8") as file:
-            json.dump(data, file, indent=4, ensure_ascii=False)
+        with open(file_output_path, "a", encoding="utf-8") as file:
+            file.write(lines)
+            file.flush()
 
-        logging.info(f"JSON file successfully saved at: {file_output_path}")
+        logger.info("Appended %s entries to JSON lines file: %s", len(data), file_output_path)
 
     except TypeError as e:
-        logging.error(f"Data is not serializable to JSON: {e}")
         raise ValueError(f"Data provided is not serializable to JSON: {e}")
 
     except OSError as e:
-        logging.error(f"Failed to write JSON file at {file_output_path}: {e}")
-        raise OSError(f"Failed to write JSON file at {file_output_path}: {e}")
+        raise OSError(f"Failed to append to JSON lines file at {file_output_path}: {e}")
+
+
+class JsonArrayWriter:
+    """
+    Writes dictionaries e.g. drug publication matching results one by one as a JSON array, without holding them in
+    memory. The file content is the one written by ``save_json`` for the same entries.
+
+    Used as a context manager, the array is written to a "<path>.tmp" file, which replaces the output once the
+    ``with`` block exits without error, so that a failed run leaves the previous output as it was. On error, the
+    partially written file is removed.
+
+    :param file_output_path: The path (including filename) to save the JSON output, local or a URL (see
+                             ``src.pipeline.process.storage``).
+    :type file_output_path: str
+    """
+
+    def __init__(self, file_output_path: str):
+        self.file_output_path = file_output_path
+        self.n_entries = 0
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._file = open_output(self._tmp_path)
+        return self
+
+    @property
+    def _tmp_path(self) -> str:
+        return f"{self.file_output_path}.tmp"
+
+    def write(self, entry: Dict[str, str]) -> None:
+        """
+        Write an entry of the array.
+
+        :param entry: The entry to write; must be serializable to JSON.
+        :type entry: Dict[str, str]
+        :raises ValueError: If the entry is not serializable to JSON.
+        :return: None
+        """
+
+        try:
+            serialized = json.dumps(entry, indent=4, ensure_ascii=False)
+        except TypeError as e:
+            raise ValueError(f"Data provided is not serializable to JSON: {e}")
+        self._file.write(("[\n" if self.n_entries == 0 else ",\n") + "\n".join(
+            "    " + line for line in serialized.split("\n")))
+        self.n_entries += 1
+
+    def __exit__(self, exc_type, exc_value, traceback) -> Optional[bool]:
+        if exc_type is not None:
+            self._file.close()
+            remove_output(self._tmp_path)
+            return None
+        self._file.write("[]" if self.n_entries == 0 else "\n]")
+        self._file.close()
+        replace_output(self._tmp_path, self.file_output_path)
+        logger.info("JSON file of %s entries successfully saved at: %s", self.n_entries, self.file_output_path)
+        return None
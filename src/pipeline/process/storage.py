@@ -0,0 +1,473 @@
+"""
+This module contains the object-store access of the I/O layer, input and output paths being either local paths or
+fsspec URLs e.g. "gs://bucket/pubmed.csv" (the filesystem of the protocol being installed, e.g. gcsfs for GCS).
+
+An object is streamed by an ``ObjectReader`` by ranges of ``block_size`` bytes, the next ranges being fetched ahead by a
+pool of threads, so that readers parsing it by chunks hold a few blocks at a time. Each block goes through a
+``BlockCache`` on the local disk first. Blocks are cached under the version of the object (its ETag, generation or
+modification time, and size), so that a run reading an unchanged input again does not download it, while a modified
+input is downloaded anew. The least recently used blocks are evicted once the cache exceeds its size.
+
+fsspec is an optional dependency, only imported when a URL is read or written.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 8 * 2 ** 20
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "drug-data-pipeline", "blocks")
+DEFAULT_CACHE_BYTES = 2 * 2 ** 30
+
+# Object metadata identifying a version of an object, depending on the filesystem (S3, GCS, local, in-memory...)
+VERSION_KEYS = ("ETag", "etag", "generation", "md5Hash", "LastModified", "updated", "mtime", "created")
+
+_URL = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
+# Block cache of the process, created with the default settings on the first read of a URL if not configured
+_CACHE: Optional["BlockCache"] = None
+
+
+def is_url(path: str) -> bool:
+    """
+    Check whether a path is a URL e.g. "gs://bucket/drugs.csv" or "file:///data/drugs.csv", rather than a local path.
+
+    :param path: Input or output path.
+    :type path: str
+    :return: Whether the path is a URL.
+    :rtype: bool
+    """
+
+    return bool(_URL.match(path))
+
+
+class BlockCache:
+    """
+    Read-through cache of object blocks on the local disk, evicting the least recently used blocks beyond its size.
+
+    Blocks are files named by the hash of their key, whose modification time is updated on every hit, so that
+    successive runs share the recency of blocks.
+
+    :param directory: Directory of the cached blocks.
+    :type directory: str
+    :param max_bytes: Size of the cache in bytes, beyond which blocks are evicted. 0 disables caching.
+    :type max_bytes: int
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIRECTORY, max_bytes: int = DEFAULT_CACHE_BYTES):
+        if max_bytes < 0:
+            raise ValueError(f"Cache size must be positive, got {max_bytes}.")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached block, marking it as recently used.
+
+        :param key: Key of the block.
+        :type key: str
+        :return: Content of the block, None if it is not cached.
+        :rtype: Optional[bytes]
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Cache a block, through a temporary file renamed once complete, then evict the least recently used blocks
+        beyond the size of the cache.
+
+        :param key: Key of the block.
+        :type key: str
+        :param data: Content of the block.
+        :type data: bytes
+        :return: None
+        """
+
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used blocks until the cached blocks fit within the size of the cache.
+
+        :return: Number of removed blocks.
+        :rtype: int
+        """
+
+        with self._lock:
+            blocks = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                blocks.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in blocks)
+            n_removed = 0
+            for _, size, path in sorted(blocks):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                n_removed += 1
+        return n_removed
+
+    def size(self) -> int:
+        """
+        Get the size of the cached blocks.
+
+        :return: Size in bytes.
+        :rtype: int
+        """
+
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if not entry.name.endswith(".tmp"))
+
+
+def configure_storage(
+        cache_directory: Optional[str] = None, cache_max_bytes: int = DEFAULT_CACHE_BYTES) -> BlockCache:
+    """
+    Configure the block cache of the objects read by the process.
+
+    :param cache_directory: Directory of the cached blocks, ``DEFAULT_CACHE_DIRECTORY`` if not provided.
+    :type cache_directory: Optional[str]
+    :param cache_max_bytes: Size of the cache in bytes. 0 disables caching.
+    :type cache_max_bytes: int
+    :return: The block cache.
+    :rtype: BlockCache
+    """
+
+    global _CACHE
+
+    _CACHE = BlockCache(directory=cache_directory or DEFAULT_CACHE_DIRECTORY, max_bytes=cache_max_bytes)
+    return _CACHE
+
+
+def block_cache() -> BlockCache:
+    """
+    Get the block cache of the process, created with the default settings if not configured.
+
+    :return: The block cache.
+    :rtype: BlockCache
+    """
+
+    global _CACHE
+
+    if _CACHE is None:
+        _CACHE = BlockCache()
+    return _CACHE
+
+
+def object_version(info: Dict[str, Any]) -> str:
+    """
+    Build the version of an object from its metadata, changing whenever the object is modified.
+
+    :param info: Metadata of the object, as returned by ``fsspec.AbstractFileSystem.info``.
+    :type info: Dict[str, Any]
+    :return: Version of the object.
+    :rtype: str
+    """
+
+    return "|".join([str(info["size"])] + [f"{key}={info[key]}" for key in VERSION_KEYS if info.get(key) is not None])
+
+
+class ObjectReader(io.RawIOBase):
+    """
+    Sequential, seekable reader of an object, fetching it by blocks through the block cache.
+
+    The blocks following the one being read are fetched ahead by a pool of threads, so that at most the current block
+    and ``max_workers`` prefetched ones are held in memory, e.g. while pandas parses a CSV by chunks.
+
+    :param url: URL of the object.
+    :type url: str
+    :param block_size: Size of a block in bytes, i.e. of a range request.
+    :type block_size: int
+    :param max_workers: Maximum number of concurrent range requests, i.e. of blocks fetched ahead.
+    :type max_workers: int
+    :param cache: Block cache, the one of the process if not provided.
+    :type cache: Optional[BlockCache]
+    :raises FileNotFoundError: If the object does not exist.
+    """
+
+    def __init__(
+            self, url: str, block_size: int = DEFAULT_BLOCK_SIZE, max_workers: int = DEFAULT_MAX_WORKERS,
+            cache: Optional[BlockCache] = None):
+        import fsspec
+
+        super().__init__()
+        self.url = url
+        self.block_size = block_size
+        self.max_workers = max(max_workers, 1)
+        self.cache = cache if cache is not None else block_cache()
+        self._fs, self._path = fsspec.core.url_to_fs(url)
+        info = self._fs.info(self._path)
+        if info.get("type") == "directory":
+            raise FileNotFoundError(f"No object at: {url}")
+        self.size = info["size"]
+        self._version = object_version(info)
+        self._position = 0
+        self._block_index = -1
+        self._block = b""
+        self._futures: Dict[int, Future] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.n_blocks = 0
+        self.n_fetched = 0
+
+    def _fetch(self, index: int) -> bytes:
+        start, end = index * self.block_size, min((index + 1) * self.block_size, self.size)
+        key = f"{self.url}|{self._version}|{start}-{end}"
+        block = self.cache.get(key)
+        if block is None:
+            block = self._fs.cat_file(self._path, start=start, end=end)
+            self.cache.put(key, block)
+            self.n_fetched += 1
+        return block
+
+    def _get_block(self, index: int) -> bytes:
+        n_blocks = -(-self.size // self.block_size)
+        window = range(index, min(index + self.max_workers + 1, n_blocks))
+        # blocks out of the window, e.g. after a seek, are no longer fetched
+        for stale in [i for i in self._futures if i not in window]:
+            self._futures.pop(stale).cancel()
+        if self.max_workers > 1 and len(window) > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="object-reader")
+            for i in window:
+                if i not in self._futures:
+                    self._futures[i] = self._pool.submit(self._fetch, i)
+        future = self._futures.pop(index, None)
+        self.n_blocks += 1
+        return future.result() if future is not None else self._fetch(index)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        if base + offset < 0:
+            raise ValueError(f"Negative seek position {base + offset}.")
+        self._position = base + offset
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        index, offset = divmod(self._position, self.block_size)
+        if index != self._block_index:
+            self._block, self._block_index = self._get_block(index), index
+        n_bytes = min(len(buffer), len(self._block) - offset)
+        buffer[:n_bytes] = memoryview(self._block)[offset:offset + n_bytes]
+        self._position += n_bytes
+        return n_bytes
+
+    def readall(self) -> bytes:
+        # the buffer of BytesIO is handed over by getvalue rather than copied, so that reading a whole object holds
+        # about its size plus the blocks in flight
+        content = io.BytesIO()
+        while self._position < self.size:
+            index, offset = divmod(self._position, self.block_size)
+            if index != self._block_index:
+                self._block, self._block_index = self._get_block(index), index
+            content.write(memoryview(self._block)[offset:])
+            self._position += len(self._block) - offset
+        return content.getvalue()
+
+    def close(self) -> None:
+        if not self.closed:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+            self._futures.clear()
+            self._block = b""
+            logger.info(
+                "Read %s blocks of %s (%s bytes), %s fetched and %s from the cache.", self.n_blocks, self.url,
+                self.size, self.n_fetched, self.n_blocks - self.n_fetched)
+        super().close()
+
+
+def read_object(
+        url: str, block_size: int = DEFAULT_BLOCK_SIZE, max_workers: int = DEFAULT_MAX_WORKERS,
+        cache: Optional[BlockCache] = None) -> bytes:
+    """
+    Read a whole object by blocks, the blocks missing from the cache being fetched by concurrent range requests.
+
+    :param url: URL of the object.
+    :type url: str
+    :param block_size: Size of a block in bytes, i.e. of a range request.
+    :type block_size: int
+    :param max_workers: Maximum number of concurrent range requests.
+    :type max_workers: int
+    :param cache: Block cache, the one of the process if not provided.
+    :type cache: Optional[BlockCache]
+    :return: Content of the object.
+    :rtype: bytes
+    :raises FileNotFoundError: If the object does not exist.
+    """
+
+    with ObjectReader(url, block_size=block_size, max_workers=max_workers, cache=cache) as reader:
+        return reader.readall()
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[Union[str, IO[bytes]]]:
+    """
+    Open what pandas readers should read for an input path: the path itself when local, a buffered ``ObjectReader``
+    streaming the object otherwise, closed on exit.
+
+    :param path: Local path or URL of the input.
+    :type path: str
+    :return: The local path, or a binary file reading the object.
+    :rtype: Iterator[Union[str, IO[bytes]]]
+    :raises FileNotFoundError: If the object does not exist.
+    """
+
+    if not is_url(path):
+        yield path
+        return
+    with io.BufferedReader(ObjectReader(path)) as reader:
+        yield reader
+
+
+def path_exists(path: str) -> bool:
+    """
+    Check whether a local path or an object exists.
+
+    :param path: Local path or URL.
+    :type path: str
+    :return: Whether the path exists.
+    :rtype: bool
+    """
+
+    if is_url(path):
+        import fsspec
+
+        fs, fs_path = fsspec.core.url_to_fs(path)
+        return fs.exists(fs_path)
+    return os.path.exists(path)
+
+
+def read_json(path: str) -> Any:
+    """
+    Read the JSON content of a local path or an object, objects being streamed through the block cache.
+
+    :param path: Local path or URL of a UTF-8 JSON file.
+    :type path: str
+    :return: The decoded content.
+    :rtype: Any
+    :raises FileNotFoundError: If the file does not exist.
+    :raises json.JSONDecodeError: If the file is not valid JSON.
+    """
+
+    with open_input(path) as source, open(source, "rb") if isinstance(source, str) else source as f:
+        return json.load(f)
+
+
+def open_output(path: str, binary: bool = False) -> Union[IO[str], IO[bytes]]:
+    """
+    Open an output path for writing UTF-8 text, or bytes, creating its parent directory if needed. Objects are uploaded
+    when the returned file is closed.
+
+    :param path: Local path or URL of the output.
+    :type path: str
+    :param binary: Whether bytes are written rather than text.
+    :type binary: bool
+    :return: The opened file.
+    :rtype: Union[IO[str], IO[bytes]]
+    """
+
+    encoding = None if binary else "utf-8"
+    if is_url(path):
+        import fsspec
+
+        return fsspec.open(path, "wb" if binary else "w", encoding=encoding, auto_mkdir=True).open()
+    dir_name = os.path.dirname(path)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    return open(path, "wb" if binary else "w", encoding=encoding)
+
+
+def replace_output(source_path: str, path: str) -> None:
+    """
+    Move a written output onto another output path, replacing it. Local outputs are replaced atomically.
+
+    :param source_path: Local path or URL of the written output.
+    :type source_path: str
+    :param path: Local path or URL of the replaced output, on the same filesystem.
+    :type path: str
+    :return: None
+    """
+
+    if is_url(path):
+        import fsspec
+
+        fs, fs_source_path = fsspec.core.url_to_fs(source_path)
+        fs.mv(fs_source_path, fsspec.core.url_to_fs(path)[1])
+    else:
+        os.replace(source_path, path)
+
+
+def remove_output(path: str) -> None:
+    """
+    Remove an output if it exists, e.g. a partially written one.
+
+    :param path: Local path or URL of the output.
+    :type path: str
+    :return: None
+    """
+
+    try:
+        if is_url(path):
+            import fsspec
+
+            fs, fs_path = fsspec.core.url_to_fs(path)
+            fs.rm(fs_path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
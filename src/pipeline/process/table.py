@@ -0,0 +1,364 @@
+"""
+This module contains the versioned match table, a file-based table of drug-publication matches made of Parquet data
+files and a JSON transaction log, which the load stage writes in place of a JSON output rewritten on every run.
+
+Layout of a table directory:
+- ``part-<version>-<id>.parquet``: data files, never modified once written.
+- ``_log/<version>.json``: one commit per version, listing the data files it adds and removes, with the row count and
+  the range of ``date_mention`` values of each added file, the operation and its metrics.
+
+A commit is published by hard-linking a complete temporary file to the name of the next version, which fails if another
+writer committed that version first, so that commits are atomic and serialized. A snapshot of a version is the set of
+data files added and not removed by the commits up to that version: readers pick the latest version once and read its
+files only, so that they never see a partial write (snapshot isolation), and any previous version can be read again
+(time travel) as long as its files were not vacuumed.
+
+Rows are identified by ``KEY_COLUMNS``. Appends and upserts only read the data files whose date range covers the
+dates of the written rows, and only rewrite the files holding updated rows (copy-on-write), so that rerunning a single
+day writes its new and updated matches only, and nothing when they are unchanged. Small files left by successive
+writes are merged by ``compact``.
+
+pyarrow is an optional dependency, only imported when data files are read or written.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns identifying a match, a written row replacing the row of the same key
+KEY_COLUMNS = ("drug", "title", "ref_type", "date_mention")
+
+# Files of fewer rows are merged together by compaction
+SMALL_FILE_ROWS = 100_000
+
+# Age in seconds under which unreferenced data files are kept by vacuum, as a writer may not have committed them yet
+VACUUM_RETAIN_SECONDS = 3600
+
+_LOG_DIR = "_log"
+
+
+def _normalize(record: Dict[str, Any]) -> Dict[str, Any]:
+    # missing values e.g. unparsed dates are NaN within matches, stored as nulls, and null non-key values are dropped
+    row = {}
+    for column, value in record.items():
+        if isinstance(value, float) and value != value:
+            value = None
+        if value is not None or column in KEY_COLUMNS:
+            row[column] = value
+    return row
+
+
+def _key(row: Dict[str, Any]) -> Tuple:
+    return tuple(row.get(column) for column in KEY_COLUMNS)
+
+
+class MatchTable:
+    """
+    Versioned, file-based table of drug-publication matches.
+
+    :param path: Directory of the table, created by its first commit.
+    :type path: str
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # metrics of the last append or upsert, e.g. the number of inserted, updated and unchanged matches
+        self.last_metrics: Dict[str, int] = {}
+
+    def _log_path(self, version: int) -> str:
+        return os.path.join(self.path, _LOG_DIR, f"{version:020d}.json")
+
+    def versions(self) -> List[int]:
+        """
+        List the committed versions of the table.
+
+        :return: Versions in commit order, empty if the table does not exist.
+        :rtype: List[int]
+        """
+
+        log_dir = os.path.join(self.path, _LOG_DIR)
+        if not os.path.isdir(log_dir):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(log_dir) if name.endswith(".json") and name[:-5].isdigit())
+
+    def version(self) -> Optional[int]:
+        """
+        Get the latest version of the table.
+
+        :return: The latest version, None if the table does not exist.
+        :rtype: Optional[int]
+        """
+
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def history(self) -> List[Dict[str, Any]]:
+        """
+        List the commits of the table.
+
+        :return: Version, timestamp, operation and metrics of every commit, in commit order.
+        :rtype: List[Dict[str, Any]]
+        """
+
+        return [
+            {key: commit[key] for key in ("version", "timestamp", "operation", "metrics")}
+            for commit in map(self._read_commit, self.versions())
+        ]
+
+    def _read_commit(self, version: int) -> Dict[str, Any]:
+        with open(self._log_path(version), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshot(self, version: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Replay the log up to a version to get the data files of its snapshot.
+
+        :param version: Version of the snapshot, the latest one if not provided.
+        :type version: Optional[int]
+        :return: Statistics of each data file of the snapshot (rows, min_date, max_date, null_dates), by file name.
+        :rtype: Dict[str, Dict[str, Any]]
+        :raises ValueError: If the version was not committed.
+        """
+
+        versions = self.versions()
+        if version is None:
+            version = versions[-1] if versions else -1
+        elif version not in versions:
+            raise ValueError(f"Version {version} of the match table {self.path} does not exist, versions: {versions}.")
+        files: Dict[str, Dict[str, Any]] = {}
+        for commit in map(self._read_commit, (v for v in versions if v <= version)):
+            for name in commit["remove"]:
+                files.pop(name, None)
+            for added in commit["add"]:
+                files[added["path"]] = added
+        return files
+
+    def read(self, version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read the matches of a version of the table.
+
+        :param version: Version to read (time travel), the latest one if not provided.
+        :type version: Optional[int]
+        :return: Matches, file by file in commit order.
+        :rtype: List[Dict[str, Any]]
+        :raises ValueError: If the version was not committed.
+        """
+
+        rows = []
+        for name in self.snapshot(version):
+            rows.extend(self._read_file(name))
+        return rows
+
+    def _read_file(self, name: str) -> List[Dict[str, Any]]:
+        import pyarrow.parquet as pq
+
+        return [_normalize(row) for row in pq.read_table(os.path.join(self.path, name)).to_pylist()]
+
+    def _write_file(self, rows: List[Dict[str, Any]], version: int) -> Dict[str, Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # rows are sorted by date so that the date ranges of files overlap little
+        rows = sorted(rows, key=lambda row: (row["date_mention"] is None, row["date_mention"] or ""))
+        dates = [row["date_mention"] for row in rows if row["date_mention"] is not None]
+        name = f"part-{version:05d}-{uuid.uuid4().hex[:12]}.parquet"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        os.makedirs(self.path, exist_ok=True)
+        # columns are the union of the row keys, e.g. "distance" only being set on fuzzy matches
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        pq.write_table(pa.table({column: [row.get(column) for row in rows] for column in columns}), tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        return {
+            "path": name, "rows": len(rows), "min_date": min(dates, default=None), "max_date": max(dates, default=None),
+            "null_dates": len(dates) < len(rows)
+        }
+
+    def _commit(
+            self, version: int, operation: str, add: List[Dict[str, Any]], remove: List[str],
+            metrics: Dict[str, int]) -> int:
+        os.makedirs(os.path.join(self.path, _LOG_DIR), exist_ok=True)
+        commit = {
+            "version": version, "timestamp": datetime.now(timezone.utc).isoformat(), "operation": operation,
+            "add": add, "remove": remove, "metrics": metrics
+        }
+        log_path = self._log_path(version)
+        tmp_path = f"{log_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(commit, f)
+        try:
+            # linking fails if the version exists, so that a single writer commits each version
+            os.link(tmp_path, log_path)
+        except FileExistsError:
+            raise RuntimeError(f"Version {version} of the match table {self.path} was committed by another writer.")
+        finally:
+            os.remove(tmp_path)
+        logger.info("Committed version %s of the match table %s: %s %s.", version, self.path, operation, metrics)
+        return version
+
+    def _write(self, records: Iterable[Dict[str, Any]], update: bool) -> int:
+        latest = self.version()
+        version = 0 if latest is None else latest + 1
+        files = self.snapshot(latest) if latest is not None else {}
+        incoming = {}
+        for record in records:
+            row = _normalize(record)
+            incoming[_key(row)] = row
+        dates = sorted({key[3] for key in incoming if key[3] is not None})
+        null_dates = any(key[3] is None for key in incoming)
+
+        def may_hold(stats: Dict[str, Any]) -> bool:
+            if null_dates and stats["null_dates"]:
+                return True
+            if stats["min_date"] is None:
+                return False
+            i = bisect_left(dates, stats["min_date"])
+            return i < len(dates) and dates[i] <= stats["max_date"]
+
+        add, remove = [], []
+        n_unchanged = n_updated = n_read = 0
+        for name, stats in files.items():
+            if not incoming or not may_hold(stats):
+                continue
+            n_read += 1
+            kept, rewrite = [], False
+            for row in self._read_file(name):
+                key = _key(row)
+                if key in incoming and (not update or incoming[key] == row):
+                    # unchanged rows, and existing rows when appending, are left in place
+                    n_unchanged += key in incoming and incoming[key] == row
+                    del incoming[key]
+                    kept.append(row)
+                elif key in incoming:
+                    n_updated += 1
+                    rewrite = True
+                else:
+                    kept.append(row)
+            if rewrite:
+                remove.append(name)
+                if kept:
+                    add.append(self._write_file(kept, version))
+        if incoming:
+            add.append(self._write_file(list(incoming.values()), version))
+        metrics = {
+            "inserted": len(incoming) - n_updated, "updated": n_updated, "unchanged": n_unchanged,
+            "files_read": n_read, "files_added": len(add), "files_removed": len(remove)
+        }
+        self.last_metrics = metrics
+        if not add and not remove:
+            logger.info("Match table %s is unchanged at version %s: %s.", self.path, latest, metrics)
+            return latest if latest is not None else self._commit(version, "create", [], [], metrics)
+        return self._commit(version, "upsert" if update else "append", add, remove, metrics)
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append matches whose key is not within the table yet, rows of existing keys being left as they are.
+
+        :param records: Matches to append.
+        :type records: Iterable[Dict[str, Any]]
+        :return: The version holding the appended matches.
+        :rtype: int
+        :raises RuntimeError: If another writer committed the version first.
+        """
+
+        return self._write(records, update=False)
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Insert matches, or replace the rows of the same key (see ``KEY_COLUMNS``) when their values changed. Data files
+        holding replaced rows are rewritten without them, the new and replaced rows being written to a new file.
+
+        :param records: Matches to upsert.
+        :type records: Iterable[Dict[str, Any]]
+        :return: The version holding the upserted matches.
+        :rtype: int
+        :raises RuntimeError: If another writer committed the version first.
+        """
+
+        return self._write(records, update=True)
+
+    def overwrite(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Replace all the matches of the table, previous versions remaining readable.
+
+        :param records: Matches of the new version.
+        :type records: Iterable[Dict[str, Any]]
+        :return: The new version.
+        :rtype: int
+        :raises RuntimeError: If another writer committed the version first.
+        """
+
+        latest = self.version()
+        version = 0 if latest is None else latest + 1
+        rows = {}
+        for record in records:
+            row = _normalize(record)
+            rows[_key(row)] = row
+        remove = list(self.snapshot(latest)) if latest is not None else []
+        add = [self._write_file(list(rows.values()), version)] if rows else []
+        return self._commit(version, "overwrite", add, remove, {"inserted": len(rows), "files_removed": len(remove)})
+
+    def compact(self, small_file_rows: int = SMALL_FILE_ROWS) -> Optional[int]:
+        """
+        Merge the data files of fewer than ``small_file_rows`` rows into a single file sorted by date, the matches of
+        the table being unchanged.
+
+        :param small_file_rows: Number of rows under which a file is merged.
+        :type small_file_rows: int
+        :return: The new version, None if there were less than two small files.
+        :rtype: Optional[int]
+        :raises RuntimeError: If another writer committed the version first.
+        """
+
+        latest = self.version()
+        if latest is None:
+            return None
+        small_files = [name for name, stats in self.snapshot(latest).items() if stats["rows"] < small_file_rows]
+        if len(small_files) < 2:
+            return None
+        rows = [row for name in small_files for row in self._read_file(name)]
+        add = [self._write_file(rows, latest + 1)]
+        return self._commit(
+            latest + 1, "compact", add, small_files, {"files_removed": len(small_files), "rows": len(rows)})
+
+    def vacuum(self, retain_versions: int = 10, retain_seconds: float = VACUUM_RETAIN_SECONDS) -> List[str]:
+        """
+        Delete the data files which are not part of the snapshots of the last ``retain_versions`` versions, e.g. files
+        replaced by compaction. Previous versions can no longer be read, nor can readers still reading them.
+
+        Files modified within the last ``retain_seconds`` are kept, as they may have been written by a concurrent
+        writer which has not committed them yet.
+
+        :param retain_versions: Number of latest versions kept readable.
+        :type retain_versions: int
+        :param retain_seconds: Age in seconds, by modification time, under which unreferenced files are kept.
+        :type retain_seconds: float
+        :return: Names of the deleted files.
+        :rtype: List[str]
+        :raises ValueError: If less than one version is retained, or if the retention period is negative.
+        """
+
+        if retain_versions < 1:
+            raise ValueError(f"At least one version must be retained, got {retain_versions}.")
+        if retain_seconds < 0:
+            raise ValueError(f"The retention period must not be negative, got {retain_seconds}.")
+        versions = self.versions()
+        referenced = set()
+        for version in versions[-retain_versions:]:
+            referenced.update(self.snapshot(version))
+        min_mtime = time.time() - retain_seconds
+        deleted = [
+            name for name in os.listdir(self.path)
+            if name.endswith(".parquet") and name not in referenced
+            and os.path.getmtime(os.path.join(self.path, name)) <= min_mtime
+        ] if versions else []
+        for name in deleted:
+            os.remove(os.path.join(self.path, name))
+        logger.info("Vacuumed %s data files of the match table %s.", len(deleted), self.path)
+        return deleted
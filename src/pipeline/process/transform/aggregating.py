@@ -1,7 +1,8 @@
 from typing import List, Dict
 import logging
+from src.pipeline.instrumentation import instrument
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
 
 
 class DataAggregator:
@@ -17,6 +18,7 @@ class DataAggregator:
     def __init__(self):
         self.aggregated_data: List[Dict[str, str]] = []
 
+    @instrument()
     def _flatten(self, data: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
         """
         Flatten a list of lists of dictionaries into a single list.
@@ -32,10 +34,11 @@ class DataAggregator:
             raise ValueError("Input must be a list of lists.")
 
         flattened = [item for sublist in data for item in sublist]
-        logging.info(f"Flattened data into {len(flattened)} total entries.")
+        logger.info("Flattened data into %s total entries.", len(flattened))
         self.aggregated_data = flattened
         return flattened
 
+    @instrument()
     def _deduplicate(self) -> List[Dict[str, str]]:
         """
         Remove duplicate dictionaries from the aggregated data.
@@ -51,10 +54,11 @@ class DataAggregator:
             if frozen not in seen:
                 seen.add(frozen)
                 unique_data.append(entry)
-        logging.info(f"Reduced to {len(unique_data)} unique entries.")
+        logger.info("Reduced to %s unique entries.", len(unique_data))
         self.aggregated_data = unique_data
         return unique_data
 
+    @instrument()
     def __call__(self, data: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
         """
         Aggregate data by flattening and deduplicating it.
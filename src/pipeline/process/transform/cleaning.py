@@ -1,8 +1,27 @@
+import re
+import numpy as np
 import pandas as pd
 from typing import List
 import logging
+from src.pipeline.instrumentation import instrument
+from src.pipeline.process.transform.engines import get_engine
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+_SPECIAL_CHARACTERS = re.compile(r"[^\w\s-]")
+_WHITESPACES = re.compile(r"\s+")
+
+
+def _clean_text(text: object) -> object:
+    """
+    Clean a text value as ``remove_special_characters`` followed by ``standardize_text`` do: missing values are kept
+    and other non string values become NaN, as with the pandas string methods.
+    """
+
+    if not isinstance(text, str):
+        return text if pd.isna(text) else np.nan
+    text = _SPECIAL_CHARACTERS.sub("", text.encode("ascii", "ignore").decode("utf-8"))
+    return _WHITESPACES.sub(" ", text.lower().strip())
 
 
 class DataCleaner:
@@ -26,17 +45,22 @@ class DataCleaner:
     :type id_column: str
     :param id_prefix: Prefix to add to each ID value for uniqueness.
     :type id_prefix: str
+    :param engine: Name of the dataframe engine executing the cleaning pipeline e.g. "pandas" or "polars".
+    :type engine: str
     """
 
     def __init__(
-            self, date_columns: list, drop_na_columns: list, text_search_columns: list, id_column: str, id_prefix: str):
+            self, date_columns: list, drop_na_columns: list, text_search_columns: list, id_column: str, id_prefix: str,
+            engine: str = "pandas"):
         self.standard_date_format = "%Y-%m-%d"
         self.date_columns = date_columns
         self.drop_na_columns = drop_na_columns
         self.text_search_columns = text_search_columns
         self.id_prefix = id_prefix
         self.id_column = id_column
+        self.engine = get_engine(engine)
 
+    @instrument()
     def clean_id(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Clean ID by homogenizing type to str and adding a prefix to distinguish identical IDs from different
@@ -56,15 +80,14 @@ class DataCleaner:
                 lambda x: "{}_{}".format(self.id_prefix, x)
             )
             df = df.drop_duplicates(subset=[self.id_column]).reset_index(drop=True)
-            logging.info(f"Cleaned ID '{self.id_column}'.")
+            logger.info("Cleaned ID '%s'.", self.id_column, extra={"source": self.id_prefix, "rows": len(df)})
             return df
         except KeyError:
-            logging.error(f"Column '{self.id_column}' not found in the dataframe.")
             raise ValueError(f"Column '{self.id_column}' not found in the dataframe.")
         except Exception as e:
-            logging.error(f"Error converting ID '{self.id_column}' column to string. More details here: {e}")
             raise Exception(f"Error converting ID '{self.id_column}' column to string. More details here: {e}")
 
+    @instrument()
     def standardize_date_format(self, df: pd.DataFrame, date_column: str) -> pd.DataFrame:
         """
         Standardize all date values to a specific format for a given column.
@@ -84,16 +107,17 @@ class DataCleaner:
             df[date_column] = pd.to_datetime(df[date_column], errors="coerce").dt.strftime(
                 self.standard_date_format
             )
-            logging.info(f"Standardized date column '{date_column}' to '{self.standard_date_format}' format.")
+            logger.info(
+                "Standardized date column '%s' to '%s' format.", date_column, self.standard_date_format,
+                extra={"source": self.id_prefix, "rows": len(df)})
             return df
         except KeyError:
-            logging.error(f"Column '{date_column}' not found in the dataframe.")
             raise ValueError(f"Column '{date_column}' not found in the dataframe.")
         except Exception as e:
-            logging.error(f"Error standardizing date values. More details here: {e}")
             raise Exception(f"Error standardizing date values. More details here: {e}")
 
     @staticmethod
+    @instrument()
     def remove_rows_missing_column_value(df: pd.DataFrame, column_to_drop: str) -> pd.DataFrame:
         """
         Remove rows where a given column NaN.
@@ -109,18 +133,17 @@ class DataCleaner:
         """
 
         try:
-            logging.info(f"Dropped rows where '{column_to_drop}' is NaN.")
+            logger.info("Dropped rows where '%s' is NaN.", column_to_drop)
             return df.dropna(subset=[column_to_drop])
         except KeyError:
-            logging.error(f"Columns '{column_to_drop}' not found in the dataframe.")
             raise ValueError(
                 f"Columns '{column_to_drop}' not found in the dataframe."
             )
         except Exception as e:
-            logging.error(f"Error removing rows with empty titles or journals. More details here: {e}")
             raise Exception(f"Error removing rows with empty titles or journals. More details here: {e}")
 
     @staticmethod
+    @instrument()
     def remove_special_characters(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
         """
         Remove special characters from a specified text column in a dataframe.
@@ -141,16 +164,15 @@ class DataCleaner:
                 df[column_name].str.encode("ascii", "ignore").str.decode("utf-8")
             )
             df[column_name] = df[column_name].str.replace(r"[^\w\s-]", "", regex=True)
-            logging.info(f"Cleaned special characters from column '{column_name}'.")
+            logger.info("Cleaned special characters from column '%s'.", column_name)
             return df
         except KeyError:
-            logging.error(f"Column '{column_name}' not found in the dataframe.")
             raise ValueError(f"Column '{column_name}' not found in the dataframe.")
         except Exception as e:
-            logging.error(f"Error cleaning special characters. More details here: {e}")
             raise Exception(f"Error cleaning special characters. More details here: {e}")
 
     @staticmethod
+    @instrument()
     def standardize_text(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
         """
         Standardize text in a specified column by applying lower casing, trimming whitespace,
@@ -173,15 +195,91 @@ class DataCleaner:
                 .str.strip()
                 .str.replace(r"\s+", " ", regex=True)
             )
-            logging.info(f"Standardized text within column '{column_name}'.")
+            logger.info("Standardized text within column '%s'.", column_name)
             return df
         except KeyError:
-            logging.error(f"Column '{column_name}' not found in the dataframe.")
             raise ValueError(f"Column '{column_name}' not found in the dataframe.")
         except Exception as e:
-            logging.error(f"Error standardizing text. More details here: {e}")
             raise Exception(f"Error standardizing text. More details here: {e}")
 
+    def standardized_dates(self, dates: pd.Series) -> pd.Series:
+        """
+        Standardize date values to the standard format as ``standardize_date_format`` does, parsing each distinct
+        value once as dates repeat across rows.
+
+        :param dates: Date column.
+        :type dates: pd.Series
+        :return: Standardized dates, missing where a value cannot be parsed.
+        :rtype: pd.Series
+        """
+
+        codes, uniques = pd.factorize(dates)
+        parsed = pd.to_datetime(
+            pd.Series(uniques, dtype=object).astype(str).str.replace('/', '-', regex=False), errors="coerce"
+        ).dt.strftime(self.standard_date_format).to_numpy(dtype=object)
+        standardized = np.append(parsed, np.nan)
+        # missing values have the -1 code, which takes the appended missing date
+        return pd.Series(standardized[codes], index=dates.index, name=dates.name)
+
+    @staticmethod
+    def cleaned_text(texts: pd.Series) -> pd.Series:
+        """
+        Remove special characters from text values then standardize them, as ``remove_special_characters`` followed
+        by ``standardize_text`` do, within a single pass so that a single cleaned string is built per value.
+
+        :param texts: Text column.
+        :type texts: pd.Series
+        :return: Cleaned text values.
+        :rtype: pd.Series
+        """
+
+        return pd.Series([_clean_text(text) for text in texts], index=texts.index, name=texts.name, dtype=object)
+
+    @instrument()
+    def clean_vectorized(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Clean a DataFrame as the step by step pipeline does, without copying it between steps:
+        - Ids are prefixed by a vectorized string concatenation and deduplicated as a boolean mask.
+        - Dates are standardized once per distinct value.
+        - Duplicate ids and missing values of all the ``drop_na_columns`` are filtered by a single boolean mask, so
+          that each column is copied once, when kept rows are taken, and the index is reset once.
+        - Text columns are cleaned over the kept rows only, in a single pass per column.
+
+        The input DataFrame is left unchanged.
+
+        :param df: Input DataFrame to be cleaned.
+        :type df: pd.DataFrame
+        :return: The cleaned DataFrame.
+        :rtype: pd.DataFrame
+        :raises ValueError: If a column to clean is not found in the dataframe.
+        """
+
+        missing_columns = [
+            col for col in [self.id_column] + self.date_columns + self.drop_na_columns + self.text_search_columns
+            if col not in df.columns
+        ]
+        if missing_columns:
+            raise ValueError(f"Columns {missing_columns} not found in the dataframe.")
+
+        columns = {self.id_column: f"{self.id_prefix}_" + df[self.id_column].astype(str)}
+        keep = ~columns[self.id_column].duplicated().to_numpy()
+        for col_name in self.date_columns:
+            columns[col_name] = self.standardized_dates(df[col_name])
+        for col_name in self.drop_na_columns:
+            keep &= columns.get(col_name, df[col_name]).notna().to_numpy()
+
+        cleaned = {}
+        for col_name in df.columns:
+            values = columns.get(col_name, df[col_name]).array[keep]
+            if col_name in self.text_search_columns:
+                values = self.cleaned_text(pd.Series(values, name=col_name)).array
+            cleaned[col_name] = values
+        logger.info(
+            "Cleaned %s out of %s rows.", int(keep.sum()), len(df),
+            extra={"source": self.id_prefix, "rows_in": len(df), "rows_out": int(keep.sum())})
+        return pd.DataFrame(cleaned, columns=df.columns)
+
+    @instrument()
     def __call__(self, df):
         """
         Clean the given DataFrame by applying a pipeline of transformations:
@@ -190,23 +288,12 @@ class DataCleaner:
         - Removes special characters from specified text columns.
         - Standardizes text formatting (lowercasing, whitespace normalization) for text columns.
 
+        The pipeline is executed by the configured dataframe engine.
+
         :param df: Input DataFrame to be cleaned.
         :type df: pd.DataFrame
         :return: The cleaned and transformed DataFrame.
         :rtype: pd.DataFrame
         """
 
-        df = self.clean_id(df)
-        for col_name in self.date_columns:
-            df = self.standardize_date_format(
-                df=df, date_column=col_name)
-        for col_name in self.drop_na_columns:
-            df = self.remove_rows_missing_column_value(
-                df=df, column_to_drop=col_name)
-        for col_name in self.text_search_columns:
-            df = self.remove_special_characters(
-                df=df, column_name=col_name)
-        for col_name in self.text_search_columns:
-            df = self.standardize_text(
-                df=df, column_name=col_name)
-        return df.reset_index(drop=True)
+        return self.engine.clean(self, df)
@@ -0,0 +1,188 @@
+import logging
+import zlib
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from src.pipeline.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime modulus of the MinHash permutations
+_MINHASH_PRIME = (1 << 31) - 1
+
+
+class PublicationDeduplicator:
+    """
+    A class collapsing duplicate publications of a cleaned DataFrame before matching, e.g. the same article delivered
+    through both pubmed files or re-exported with a new id.
+
+    Provides functionality to:
+    - Drop exact duplicates, i.e. publications with the same cleaned title, journal and date. Their matches are
+      identical, so dropping them leaves the output unchanged.
+    - Optionally drop near duplicates, i.e. publications of the same date whose titles have a Jaccard similarity of
+      their character shingles above a threshold, estimated with MinHash signatures and candidates found by
+      locality-sensitive hashing (LSH) over bands of the signatures.
+
+    The first occurrence of each publication is kept. Seen publications are kept across calls, so that batches of a
+    same source are deduplicated against each other.
+
+    :param title_col_name: Column name containing publication titles.
+    :type title_col_name: str
+    :param journal_col_name: Column name containing journal names.
+    :type journal_col_name: str
+    :param date_col_name: Column name containing publication dates.
+    :type date_col_name: str
+    :param data_source: Name of the data source (used in reporting).
+    :type data_source: str
+    :param near_duplicates: Whether near duplicates should be dropped too.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param num_perm: Number of MinHash permutations, a multiple of ``bands``.
+    :type num_perm: int
+    :param bands: Number of LSH bands, more bands finding candidates of lower similarity.
+    :type bands: int
+    :param shingle_size: Number of characters of title shingles.
+    :type shingle_size: int
+    :param seed: Seed of the MinHash permutations.
+    :type seed: int
+    """
+
+    def __init__(
+            self, title_col_name: str, journal_col_name: str, date_col_name: str, data_source: str,
+            near_duplicates: bool = False, similarity_threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+            shingle_size: int = 4, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"Number of permutations {num_perm} is not a multiple of the number of bands {bands}.")
+        if not 0 < similarity_threshold <= 1:
+            raise ValueError(f"Similarity threshold must be within ]0, 1]: {similarity_threshold}")
+        self.title_col_name = title_col_name
+        self.journal_col_name = journal_col_name
+        self.date_col_name = date_col_name
+        self.data_source = data_source
+        self.near_duplicates = near_duplicates
+        self.similarity_threshold = similarity_threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+        self._perm_b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)
+        self._seen_keys = set()
+        self._buckets: Dict[Tuple[int, str, bytes], List[np.ndarray]] = {}
+        self.n_rows = 0
+        self.n_exact_duplicates = 0
+        self.n_near_duplicates = 0
+
+    def _keys(self, df: pd.DataFrame) -> pd.Series:
+        # titles and dates are normalized by cleaning, journals are stripped as within journal matches
+        columns = [self.title_col_name, self.journal_col_name, self.date_col_name]
+        try:
+            normalized = df[columns].astype(str).where(df[columns].notna(), "")
+        except KeyError as e:
+            raise ValueError(f"Column {e} not found in the dataframe.")
+        normalized[self.journal_col_name] = normalized[self.journal_col_name].str.strip()
+        return pd.util.hash_pandas_object(normalized, index=False)
+
+    @instrument()
+    def drop_exact_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop publications whose cleaned title, journal and date were already seen.
+
+        :param df: Cleaned publications DataFrame.
+        :type df: pd.DataFrame
+        :return: DataFrame without exact duplicates.
+        :rtype: pd.DataFrame
+        :raises ValueError: If a title, journal or date column is not found in the dataframe.
+        """
+
+        keys = self._keys(df)
+        is_duplicate = keys.duplicated() | keys.isin(self._seen_keys)
+        self._seen_keys.update(keys[~is_duplicate])
+        n_duplicates = int(is_duplicate.sum())
+        self.n_exact_duplicates += n_duplicates
+        logger.info(
+            "Dropped %s exact duplicate publications from '%s'.", n_duplicates, self.data_source,
+            extra={"source": self.data_source, "rows": n_duplicates})
+        return df[~is_duplicate.values].reset_index(drop=True)
+
+    def _signature(self, title: str) -> np.ndarray:
+        title = title if len(title) >= self.shingle_size else title.ljust(self.shingle_size)
+        shingles = {title[i:i + self.shingle_size] for i in range(len(title) - self.shingle_size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._perm_a[:, None] * hashes[None, :] + self._perm_b[:, None]) % _MINHASH_PRIME).min(axis=1)
+
+    @instrument()
+    def drop_near_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop publications whose title is similar to the one of an already seen publication of the same date.
+
+        Candidates share a band of their MinHash signatures, and are near duplicates when the share of equal
+        signature values, which estimates the Jaccard similarity of title shingles, reaches the threshold.
+
+        :param df: Cleaned publications DataFrame.
+        :type df: pd.DataFrame
+        :return: DataFrame without near duplicates.
+        :rtype: pd.DataFrame
+        """
+
+        titles = df[self.title_col_name].fillna("").astype(str)
+        dates = df[self.date_col_name].fillna("").astype(str)
+        keep = np.ones(len(df), dtype=bool)
+        for i, (title, date) in enumerate(zip(titles, dates)):
+            signature = self._signature(title)
+            band_keys = [
+                (band, date, signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+                for band in range(self.bands)
+            ]
+            if any(
+                    np.mean(candidate == signature) >= self.similarity_threshold
+                    for key in band_keys for candidate in self._buckets.get(key, [])):
+                keep[i] = False
+                continue
+            for key in band_keys:
+                self._buckets.setdefault(key, []).append(signature)
+        n_duplicates = int((~keep).sum())
+        self.n_near_duplicates += n_duplicates
+        logger.info(
+            "Dropped %s near duplicate publications from '%s'.", n_duplicates, self.data_source,
+            extra={"source": self.data_source, "rows": n_duplicates})
+        return df[keep].reset_index(drop=True)
+
+    def report(self) -> Dict[str, object]:
+        """
+        Summarize the publications seen and dropped so far.
+
+        :return: Number of input rows, of exact and near duplicates dropped, and of rows saved from matching.
+        :rtype: Dict[str, object]
+        """
+
+        return {
+            "data_source": self.data_source,
+            "rows_in": self.n_rows,
+            "exact_duplicates": self.n_exact_duplicates,
+            "near_duplicates": self.n_near_duplicates,
+            "rows_saved": self.n_exact_duplicates + self.n_near_duplicates,
+        }
+
+    @instrument()
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deduplicate publications by dropping exact duplicates, then near duplicates if enabled.
+
+        :param df: Cleaned publications DataFrame.
+        :type df: pd.DataFrame
+        :return: The deduplicated DataFrame.
+        :rtype: pd.DataFrame
+        """
+
+        self.n_rows += len(df)
+        df = self.drop_exact_duplicates(df)
+        if self.near_duplicates:
+            df = self.drop_near_duplicates(df)
+        summary = self.report()
+        logger.info(
+            "Deduplicated '%s' publications: %s of %s rows saved from matching.", self.data_source,
+            summary["rows_saved"], summary["rows_in"],
+            extra={"source": self.data_source, "rows_out": len(df)})
+        return df
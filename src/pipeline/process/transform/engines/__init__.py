@@ -0,0 +1,32 @@
+import importlib
+from src.pipeline.process.transform.engines.base import DataFrameEngine
+
+# Engines by name, imported on first use so that optional libraries are only required when selected
+ENGINES = {
+    "pandas": ("src.pipeline.process.transform.engines.pandas_engine", "PandasEngine", "pandas"),
+    "pandas_vectorized": ("src.pipeline.process.transform.engines.pandas_engine", "VectorizedPandasEngine", "pandas"),
+    "polars": ("src.pipeline.process.transform.engines.polars_engine", "PolarsEngine", "polars"),
+    "duckdb": ("src.pipeline.process.transform.engines.duckdb_engine", "DuckDBEngine", "duckdb"),
+}
+
+
+def get_engine(engine: str) -> DataFrameEngine:
+    """
+    Get a dataframe engine by name.
+
+    :param engine: Name of the engine, one of the ENGINES keys.
+    :type engine: str
+    :return: The dataframe engine.
+    :rtype: DataFrameEngine
+    :raises ValueError: If the engine is unknown.
+    :raises ImportError: If the library required by the engine is not installed.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown dataframe engine '{engine}', expected one of {sorted(ENGINES)}.")
+    module_name, class_name, requirement = ENGINES[engine]
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+        raise ImportError(f"Dataframe engine '{engine}' requires the '{requirement}' package: {e}")
+    return getattr(module, class_name)()
@@ -0,0 +1,66 @@
+"""
+This module contains the interface of dataframe engines executing the cleaning, concatenation and matching
+transformations.
+
+Engines take and return pandas DataFrames so that they are interchangeable within the task layer, and only differ by
+the library executing the transformations in between.
+"""
+
+from typing import Dict, List
+import pandas as pd
+
+
+class DataFrameEngine:
+    """
+    Base class of dataframe engines.
+
+    The cleaning and matching configurations are read from the ``DataCleaner`` and ``DataMatcher`` instances calling
+    the engine.
+    """
+
+    name = None
+
+    def clean(self, cleaner, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Clean a DataFrame: clean ID, standardize dates, remove rows with missing values, remove special characters and
+        standardize text.
+
+        :param cleaner: Data cleaner holding the cleaning configuration.
+        :type cleaner: DataCleaner
+        :param df: Input DataFrame to be cleaned.
+        :type df: pd.DataFrame
+        :return: The cleaned DataFrame.
+        :rtype: pd.DataFrame
+        """
+
+        raise NotImplementedError
+
+    def concatenate(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenate a list of DataFrames row-wise.
+
+        :param dfs: List of DataFrames to concatenate.
+        :type dfs: List[pd.DataFrame]
+        :return: A single DataFrame resulting from row-wise concatenation.
+        :rtype: pd.DataFrame
+        """
+
+        raise NotImplementedError
+
+    def find_drug_pub_matches(
+            self, matcher, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
+        """
+        Identify matches between drug names and publication titles.
+
+        :param matcher: Data matcher holding the matching configuration.
+        :type matcher: DataMatcher
+        :param df_drugs: DataFrame containing drug names.
+        :type df_drugs: pd.DataFrame
+        :param df_publications: DataFrame containing publication data.
+        :type df_publications: pd.DataFrame
+        :return: A list of dictionaries representing matched drugs and publication metadata, drug by drug in drugs
+                 order then publication by publication in publications order.
+        :rtype: List[Dict[str, str]]
+        """
+
+        raise NotImplementedError
@@ -0,0 +1,276 @@
+"""
+This module contains the DuckDB dataframe engine, executing transformations as vectorized SQL over all cores.
+
+The SQL queries reproduce the pandas transformations and are shared with the DuckDB pipeline backend, which reads
+input files directly:
+- Regex cleaning runs with RE2, whose ``\\w``, ``\\s`` and ``\\b`` classes match Python's ones on the ASCII text left
+  after removing non ASCII characters.
+- Date standardization tries the formats of ``DATE_FORMATS`` in order, as an explicit equivalent of the pandas parsing
+  of the formats found within input data. Dates in any other format are set to null, as unparseable dates are.
+- Matching joins drugs with the title tokens equal to their first word (a title can only match a drug pattern if it
+  contains that word as a token), then checks the exact ``\\b<drug>\\b`` pattern on those candidates only.
+"""
+
+from typing import Dict, List, Optional
+import pandas as pd
+import duckdb
+from src.pipeline.process.transform.engines.base import DataFrameEngine
+
+# Date formats parsed once slashes are replaced by hyphens, month first before day first as with pandas
+DATE_FORMATS = [
+    "%Y-%m-%d", "%m-%d-%Y", "%d-%m-%Y", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%Y-%m-%d %H:%M:%S"
+]
+
+# Name of the column keeping the input row order within queries
+POSITION_COLUMN = "__pos"
+
+
+def quote_identifier(name: str) -> str:
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def quote_literal(value: str) -> str:
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def connect(
+        threads: Optional[int] = None, memory_limit: Optional[str] = None,
+        temp_directory: Optional[str] = None) -> duckdb.DuckDBPyConnection:
+    """
+    Open an in-process DuckDB connection.
+
+    Queries use all cores by default, and spill to the temporary directory when exceeding the memory limit.
+
+    :param threads: Number of threads, all cores if not provided.
+    :type threads: Optional[int]
+    :param memory_limit: Memory limit e.g. "4GB", 80% of the RAM if not provided.
+    :type memory_limit: Optional[str]
+    :param temp_directory: Directory where larger-than-memory intermediates are spilled.
+    :type temp_directory: Optional[str]
+    :return: The DuckDB connection.
+    :rtype: duckdb.DuckDBPyConnection
+    """
+
+    config = {}
+    if threads:
+        config["threads"] = threads
+    if memory_limit:
+        config["memory_limit"] = memory_limit
+    if temp_directory:
+        config["temp_directory"] = temp_directory
+    return duckdb.connect(database=":memory:", config=config)
+
+
+def standardized_date_sql(date_column: str, date_format: str, is_temporal: bool = False) -> str:
+    """
+    Build the SQL expression standardizing a date column to a given format.
+    """
+
+    column = quote_identifier(date_column)
+    if is_temporal:
+        return f"strftime({column}, {quote_literal(date_format)})"
+    dates = f"replace(CAST({column} AS VARCHAR), '/', '-')"
+    parsed = ", ".join(f"try_strptime({dates}, {quote_literal(date_format_in)})" for date_format_in in DATE_FORMATS)
+    return f"strftime(coalesce({parsed}), {quote_literal(date_format)})"
+
+
+def cleaned_text_sql(text_column: str) -> str:
+    """
+    Build the SQL expression removing special characters then standardizing a text column.
+    """
+
+    text = quote_identifier(text_column)
+    text = f"regexp_replace({text}, '[^\\x00-\\x7F]', '', 'g')"
+    text = f"regexp_replace({text}, '[^\\w\\s-]', '', 'g')"
+    text = f"regexp_replace(lower({text}), '^\\s+|\\s+$', '', 'g')"
+    return f"regexp_replace({text}, '\\s+', ' ', 'g')"
+
+
+def clean_sql(cleaner, relation: str, columns: List[str], temporal_columns: List[str] = ()) -> str:
+    """
+    Build the SQL query cleaning a relation with the configuration of a data cleaner.
+
+    The relation must hold the ``__pos`` column giving the input row order, which is kept within the output.
+
+    :param cleaner: Data cleaner holding the cleaning configuration.
+    :type cleaner: DataCleaner
+    :param relation: Name of the relation to clean.
+    :type relation: str
+    :param columns: Columns of the relation, in output order.
+    :type columns: List[str]
+    :param temporal_columns: Columns of the relation already typed as dates or timestamps.
+    :type temporal_columns: List[str]
+    :return: The SQL query.
+    :rtype: str
+    """
+
+    id_column = quote_identifier(cleaner.id_column)
+    projections = []
+    for col_name in columns:
+        if col_name == cleaner.id_column:
+            # ids are cast as pandas does, missing ids becoming "nan"
+            expression = (f"{quote_literal(cleaner.id_prefix + '_')} || "
+                          f"coalesce(CAST({id_column} AS VARCHAR), 'nan')")
+        elif col_name in cleaner.date_columns:
+            expression = standardized_date_sql(
+                col_name, cleaner.standard_date_format, is_temporal=col_name in temporal_columns)
+        elif col_name in cleaner.text_search_columns:
+            expression = cleaned_text_sql(col_name)
+        else:
+            expression = quote_identifier(col_name)
+        projections.append(f"{expression} AS {quote_identifier(col_name)}")
+    not_null = " AND ".join(f"{quote_identifier(col_name)} IS NOT NULL" for col_name in cleaner.drop_na_columns)
+    return f"""
+        SELECT {", ".join(projections)}, {POSITION_COLUMN}
+        FROM (
+            SELECT * FROM {relation}
+            QUALIFY row_number() OVER (
+                PARTITION BY {quote_literal(cleaner.id_prefix + '_')} || coalesce(CAST({id_column} AS VARCHAR), 'nan')
+                ORDER BY {POSITION_COLUMN}) = 1
+        )
+        {f"WHERE {not_null}" if not_null else ""}
+        ORDER BY {POSITION_COLUMN}
+    """
+
+
+def match_sql(drugs_relation: str, drug_column: str, publications_relation: str, title_column: str) -> str:
+    """
+    Build the SQL query finding the publications whose title contains a drug as a whole word.
+
+    Distinct drugs are numbered by first occurrence, and matches are ordered drug by drug then publication by
+    publication, as pandas iterates over them. Both relations must hold the ``__pos`` column giving their row order.
+
+    :param drugs_relation: Name of the drugs relation.
+    :type drugs_relation: str
+    :param drug_column: Name of the drug name column.
+    :type drug_column: str
+    :param publications_relation: Name of the publications relation.
+    :type publications_relation: str
+    :param title_column: Name of the publication title column.
+    :type title_column: str
+    :return: The SQL query, selecting the drug, its position among distinct drugs and the publication position.
+    :rtype: str
+    """
+
+    drug, title = quote_identifier(drug_column), quote_identifier(title_column)
+    return f"""
+        WITH drug_patterns AS (
+            SELECT drug, row_number() OVER (ORDER BY first_pos) - 1 AS drug_pos,
+                '\\b' || regexp_replace(drug, '([\\\\.+*?()|\\[\\]{{}}^$])', '\\\\\\1', 'g') || '\\b' AS pattern,
+                nullif(regexp_extract(drug, '[0-9A-Za-z_]+'), '') AS first_token
+            FROM (
+                SELECT CAST({drug} AS VARCHAR) AS drug, min({POSITION_COLUMN}) AS first_pos FROM {drugs_relation}
+                WHERE {drug} IS NOT NULL GROUP BY 1
+            )
+        ),
+        titles AS (
+            SELECT {POSITION_COLUMN}, CAST({title} AS VARCHAR) AS title FROM {publications_relation}
+            WHERE {title} IS NOT NULL
+        ),
+        tokens AS (
+            SELECT DISTINCT {POSITION_COLUMN}, unnest(regexp_extract_all(title, '[0-9A-Za-z_]+')) AS token
+            FROM titles
+        ),
+        candidates AS (
+            SELECT d.drug, d.drug_pos, d.pattern, t.{POSITION_COLUMN}
+            FROM drug_patterns d JOIN tokens t ON t.token = d.first_token
+            UNION ALL
+            SELECT d.drug, d.drug_pos, d.pattern, t.{POSITION_COLUMN}
+            FROM drug_patterns d CROSS JOIN titles t WHERE d.first_token IS NULL
+        )
+        SELECT c.drug, c.drug_pos, c.{POSITION_COLUMN}
+        FROM candidates c JOIN titles t USING ({POSITION_COLUMN})
+        WHERE regexp_matches(t.title, c.pattern)
+        ORDER BY c.drug_pos, c.{POSITION_COLUMN}
+    """
+
+
+class DuckDBEngine(DataFrameEngine):
+    """
+    Dataframe engine executing transformations with DuckDB, input DataFrames being registered as relations.
+
+    :param threads: Number of threads, all cores if not provided.
+    :type threads: Optional[int]
+    :param memory_limit: Memory limit e.g. "4GB", beyond which intermediates are spilled to disk.
+    :type memory_limit: Optional[str]
+    :param temp_directory: Directory where larger-than-memory intermediates are spilled.
+    :type temp_directory: Optional[str]
+    """
+
+    name = "duckdb"
+
+    def __init__(
+            self, threads: Optional[int] = None, memory_limit: Optional[str] = None,
+            temp_directory: Optional[str] = None):
+        self.connection = connect(threads=threads, memory_limit=memory_limit, temp_directory=temp_directory)
+
+    @staticmethod
+    def _with_positions(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the input row order column, casting object columns of mixed types to strings while keeping missing values.
+        """
+
+        mixed_columns = [
+            col for col in df.columns
+            if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty")
+        ]
+        return df.assign(
+            **{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in mixed_columns},
+            **{POSITION_COLUMN: range(len(df))}
+        )
+
+    def clean(self, cleaner, df: pd.DataFrame) -> pd.DataFrame:
+        for col in [cleaner.id_column] + cleaner.date_columns + cleaner.drop_na_columns + cleaner.text_search_columns:
+            if col not in df.columns:
+                raise ValueError(f"Column '{col}' not found in the dataframe.")
+        # ids are cast as pandas does, float ids keeping their decimal part
+        df = self._with_positions(df.assign(**{cleaner.id_column: df[cleaner.id_column].astype(str)}))
+        temporal_columns = [col for col in cleaner.date_columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+        self.connection.register("source", df)
+        try:
+            query = clean_sql(cleaner, "source", list(df.columns.drop(POSITION_COLUMN)), temporal_columns)
+            df_clean = self.connection.sql(query).df()
+        finally:
+            self.connection.unregister("source")
+        return df_clean.drop(columns=POSITION_COLUMN)
+
+    def concatenate(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
+        relations = []
+        for i, df in enumerate(dfs):
+            self.connection.register(f"source_{i}", self._with_positions(df))
+            relations.append(f"SELECT *, {i} AS __source FROM source_{i}")
+        try:
+            query = " UNION ALL BY NAME ".join(relations) + f" ORDER BY __source, {POSITION_COLUMN}"
+            df_concat = self.connection.sql(query).df()
+        finally:
+            for i in range(len(dfs)):
+                self.connection.unregister(f"source_{i}")
+        return df_concat.drop(columns=["__source", POSITION_COLUMN])
+
+    def find_drug_pub_matches(
+            self, matcher, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
+        self.connection.register("drugs", self._with_positions(df_drugs[[matcher.drug_col_name]]))
+        self.connection.register(
+            "publications", self._with_positions(df_publications[[matcher.pub_title_col_name]]))
+        try:
+            positions = self.connection.sql(match_sql(
+                "drugs", matcher.drug_col_name, "publications", matcher.pub_title_col_name)).fetchall()
+        finally:
+            self.connection.unregister("drugs")
+            self.connection.unregister("publications")
+
+        titles = df_publications[matcher.pub_title_col_name].tolist()
+        journals = df_publications[matcher.journal_col_name].tolist() \
+            if matcher.journal_col_name in df_publications.columns else None
+        dates = df_publications[matcher.date_col_name].tolist() \
+            if matcher.date_col_name in df_publications.columns else None
+        return [
+            {
+                "drug": drug,
+                "source": matcher.data_source,
+                "title": titles[position],
+                "journal": journals[position] if journals is not None else None,
+                "date": dates[position] if dates is not None else None
+            }
+            for drug, _, position in positions
+        ]
@@ -0,0 +1,235 @@
+"""
+This module contains the DuckDB pipeline backend, running cleaning, matching and aggregation as SQL over input files.
+
+Input CSV, JSON and Parquet files are scanned by DuckDB without being materialized as pandas DataFrames, and every
+intermediate result is kept as a DuckDB table, which is spilled to the temporary directory when exceeding the memory
+limit. Only the aggregated matches are fetched to Python. Output matches are identical to the pandas pipeline ones:
+- CSV and JSON values are read as text, CSV missing values being the pandas default ones.
+- Row orders are kept with the ``__pos`` column, so that id and publication deduplication keep first occurrences and
+  matches come in the pandas order (clinical then pubmed, publications then journals, drug by drug then publication
+  by publication).
+- Missing dates are output as NaN, as pandas does.
+"""
+
+import logging
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+from src.pipeline.instrumentation import instrument
+from src.pipeline.process.transform.engines.duckdb_engine import POSITION_COLUMN, connect, clean_sql, match_sql, \
+    quote_identifier, quote_literal
+
+logger = logging.getLogger(__name__)
+
+# Strings read as missing values within CSV files, as pandas.read_csv does by default
+CSV_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA",
+    "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+TEMPORAL_TYPES = ("DATE", "TIMESTAMP")
+
+
+class DuckDBPipeline:
+    """
+    Run the drug-publication matching pipeline with DuckDB, from input files to aggregated matches.
+
+    :param threads: Number of threads, all cores if not provided.
+    :type threads: Optional[int]
+    :param memory_limit: Memory limit e.g. "4GB", beyond which intermediate tables are spilled to disk.
+    :type memory_limit: Optional[str]
+    :param temp_directory: Directory where larger-than-memory intermediate tables are spilled.
+    :type temp_directory: Optional[str]
+    """
+
+    def __init__(
+            self, threads: Optional[int] = None, memory_limit: Optional[str] = None,
+            temp_directory: Optional[str] = None):
+        self.connection = connect(threads=threads, memory_limit=memory_limit, temp_directory=temp_directory)
+
+    def _columns(self, relation: str) -> Dict[str, str]:
+        return {name: column_type for name, column_type, *_ in self.connection.sql(f"DESCRIBE {relation}").fetchall()}
+
+    def _scan(self, path: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Build the scan of an input file depending on its extension, and get its columns and their types.
+
+        :param path: Path to the CSV, JSON or Parquet input file.
+        :type path: str
+        :return: The scan relation and its column types.
+        :rtype: Tuple[str, Dict[str, str]]
+        :raises ValueError: If the file format is not supported.
+        """
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            na_values = ", ".join(quote_literal(value) for value in CSV_NA_VALUES)
+            scan = (f"read_csv({quote_literal(path)}, header = true, all_varchar = true, null_padding = true, "
+                    f"nullstr = [{na_values}])")
+        elif extension == ".json":
+            # column types are inferred first to get column names, values being then read as text
+            columns = self._columns(f"SELECT * FROM read_json({quote_literal(path)})")
+            struct = ", ".join(f"{quote_literal(name)}: 'VARCHAR'" for name in columns)
+            scan = f"read_json({quote_literal(path)}, columns = {{{struct}}})"
+        elif extension == ".parquet":
+            scan = f"read_parquet({quote_literal(path)})"
+        else:
+            raise ValueError(f"Unsupported input file format '{extension}': {path}")
+        return scan, self._columns(f"SELECT * FROM {scan}")
+
+    @instrument()
+    def clean(self, cleaner, paths: List[str], table: str) -> None:
+        """
+        Clean input files with the configuration of a data cleaner, and concatenate them as a table.
+
+        Each file is cleaned separately, as the pandas pipeline does before concatenating sources.
+
+        :param cleaner: Data cleaner holding the cleaning configuration.
+        :type cleaner: DataCleaner
+        :param paths: Paths to the input files, in concatenation order.
+        :type paths: List[str]
+        :param table: Name of the cleaned table to create.
+        :type table: str
+        :return: None
+        :raises ValueError: If a configured column is not found within an input file.
+        """
+
+        cleaned = []
+        for i, path in enumerate(paths):
+            scan, columns = self._scan(path)
+            for col in [cleaner.id_column] + cleaner.date_columns + cleaner.drop_na_columns + \
+                    cleaner.text_search_columns:
+                if col not in columns:
+                    raise ValueError(f"Column '{col}' not found in the dataframe.")
+            temporal_columns = [col for col in cleaner.date_columns if columns[col].startswith(TEMPORAL_TYPES)]
+            source = f"(SELECT *, row_number() OVER () AS {POSITION_COLUMN} FROM {scan})"
+            query = clean_sql(cleaner, source, list(columns), temporal_columns)
+            cleaned.append(f"SELECT *, {i} AS __source FROM ({query})")
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table} AS
+            SELECT * EXCLUDE (__source, {POSITION_COLUMN}),
+                row_number() OVER (ORDER BY __source, {POSITION_COLUMN}) AS {POSITION_COLUMN}
+            FROM ({" UNION ALL BY NAME ".join(cleaned)})
+        """)
+        n_rows = self.connection.sql(f"SELECT count(*) FROM {table}").fetchone()[0]
+        logger.info("Cleaned %s file(s) into table '%s' of %s rows.", len(paths), table, n_rows)
+
+    @instrument()
+    def deduplicate(self, deduplicator, publications_table: str, table: str) -> None:
+        """
+        Collapse the exact duplicates of a cleaned publications table with the configuration of a publication
+        deduplicator, as a table. Publications with the same cleaned title, stripped journal and date are duplicates,
+        missing values being equal to empty strings, and the first occurrence of each publication is kept.
+
+        The number of input rows and of dropped duplicates are added to the counts of the deduplicator, near
+        duplicates not being collapsed.
+
+        :param deduplicator: Publication deduplicator holding the deduplication configuration.
+        :type deduplicator: PublicationDeduplicator
+        :param publications_table: Name of the cleaned publications table.
+        :type publications_table: str
+        :param table: Name of the deduplicated table to create.
+        :type table: str
+        :return: None
+        :raises ValueError: If a title, journal or date column is not found within the publications table.
+        """
+
+        columns = self._columns(publications_table)
+        keys = []
+        for col in [deduplicator.title_col_name, deduplicator.journal_col_name, deduplicator.date_col_name]:
+            if col not in columns:
+                raise ValueError(f"Column '{col}' not found in the dataframe.")
+            key = f"CAST({quote_identifier(col)} AS VARCHAR)"
+            if col == deduplicator.journal_col_name:
+                key = f"trim({key})"
+            keys.append(f"coalesce({key}, '')")
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table} AS
+            SELECT * FROM {publications_table}
+            QUALIFY row_number() OVER (PARTITION BY {", ".join(keys)} ORDER BY {POSITION_COLUMN}) = 1
+        """)
+        n_rows_in = self.connection.sql(f"SELECT count(*) FROM {publications_table}").fetchone()[0]
+        n_rows = self.connection.sql(f"SELECT count(*) FROM {table}").fetchone()[0]
+        deduplicator.n_rows += n_rows_in
+        deduplicator.n_exact_duplicates += n_rows_in - n_rows
+        logger.info(
+            "Dropped %s exact duplicate publications from '%s'.", n_rows_in - n_rows, deduplicator.data_source,
+            extra={"source": deduplicator.data_source, "rows": n_rows_in - n_rows})
+
+    @instrument()
+    def match(self, matcher, drugs_table: str, publications_table: str, table: str) -> None:
+        """
+        Find the publications whose title contains a drug with the configuration of a data matcher, as a table.
+
+        :param matcher: Data matcher holding the matching configuration.
+        :type matcher: DataMatcher
+        :param drugs_table: Name of the cleaned drugs table.
+        :type drugs_table: str
+        :param publications_table: Name of the cleaned publications table.
+        :type publications_table: str
+        :param table: Name of the matches table to create.
+        :type table: str
+        :return: None
+        """
+
+        columns = self._columns(publications_table)
+        journal = f"p.{quote_identifier(matcher.journal_col_name)}" \
+            if matcher.journal_col_name in columns else "NULL"
+        date = f"p.{quote_identifier(matcher.date_col_name)}" if matcher.date_col_name in columns else "NULL"
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table} AS
+            SELECT m.drug, m.drug_pos, m.{POSITION_COLUMN}, {quote_literal(matcher.data_source)} AS source,
+                CAST(p.{quote_identifier(matcher.pub_title_col_name)} AS VARCHAR) AS title,
+                CAST({journal} AS VARCHAR) AS journal, CAST({date} AS VARCHAR) AS date
+            FROM ({match_sql(drugs_table, matcher.drug_col_name, publications_table, matcher.pub_title_col_name)}) m
+            JOIN {publications_table} p USING ({POSITION_COLUMN})
+            ORDER BY m.drug_pos, m.{POSITION_COLUMN}
+        """)
+        n_rows = self.connection.sql(f"SELECT count(*) FROM {table}").fetchone()[0]
+        logger.info("Found %s drug mentions in publications.", n_rows)
+
+    @instrument()
+    def aggregate(self, matches_tables: List[str]) -> List[Dict[str, str]]:
+        """
+        Format matches as publication and journal mentions, then flatten and deduplicate them.
+
+        :param matches_tables: Names of the matches tables, in aggregation order.
+        :type matches_tables: List[str]
+        :return: The aggregated list of formatted matches.
+        :rtype: List[Dict[str, str]]
+        """
+
+        formatted = []
+        for i, table in enumerate(matches_tables):
+            formatted.append(f"""
+                SELECT drug, title, source || '_publication' AS ref_type, date AS date_mention,
+                    {i} AS __source, 0 AS __section, drug_pos, {POSITION_COLUMN}
+                FROM {table}
+            """)
+            formatted.append(f"""
+                SELECT drug, regexp_replace(journal, '^\\s+|\\s+$', '', 'g') AS title, 'journal' AS ref_type,
+                    date AS date_mention, {i} AS __source, 1 AS __section, drug_pos, {POSITION_COLUMN}
+                FROM {table}
+                WHERE journal <> ''
+                QUALIFY row_number() OVER (
+                    PARTITION BY drug, regexp_replace(journal, '^\\s+|\\s+$', '', 'g'), date
+                    ORDER BY drug_pos, {POSITION_COLUMN}) = 1
+            """)
+        rows = self.connection.sql(f"""
+            SELECT drug, title, ref_type, date_mention
+            FROM ({" UNION ALL ".join(formatted)})
+            QUALIFY row_number() OVER (
+                PARTITION BY drug, title, ref_type, date_mention
+                ORDER BY __source, __section, drug_pos, {POSITION_COLUMN}) = 1
+            ORDER BY __source, __section, drug_pos, {POSITION_COLUMN}
+        """).fetchall()
+        logger.info("Reduced to %s unique entries.", len(rows))
+        return [
+            {
+                "drug": drug,
+                "title": title,
+                "ref_type": ref_type,
+                "date_mention": date_mention if date_mention is not None else math.nan
+            }
+            for drug, title, ref_type, date_mention in rows
+        ]
@@ -0,0 +1,70 @@
+"""
+This module contains the pandas dataframe engines: the default engine of the pipeline, and its variant cleaning
+DataFrames with vectorized operations and without intermediate copies.
+"""
+
+import re
+from typing import Dict, List
+import pandas as pd
+from src.pipeline.process.transform.engines.base import DataFrameEngine
+
+
+class PandasEngine(DataFrameEngine):
+    """
+    Dataframe engine executing transformations with pandas, step by step through the ``DataCleaner`` methods.
+    """
+
+    name = "pandas"
+
+    def clean(self, cleaner, df: pd.DataFrame) -> pd.DataFrame:
+        df = cleaner.clean_id(df)
+        for col_name in cleaner.date_columns:
+            df = cleaner.standardize_date_format(
+                df=df, date_column=col_name)
+        for col_name in cleaner.drop_na_columns:
+            df = cleaner.remove_rows_missing_column_value(
+                df=df, column_to_drop=col_name)
+        for col_name in cleaner.text_search_columns:
+            df = cleaner.remove_special_characters(
+                df=df, column_name=col_name)
+        for col_name in cleaner.text_search_columns:
+            df = cleaner.standardize_text(
+                df=df, column_name=col_name)
+        return df.reset_index(drop=True)
+
+    def concatenate(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
+        return pd.concat(dfs, axis=0, ignore_index=True)
+
+    def find_drug_pub_matches(
+            self, matcher, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
+        matches = []
+        drug_patterns = {
+            drug: re.compile(rf"\b{re.escape(drug)}\b") for drug in df_drugs[matcher.drug_col_name].dropna()
+        }
+        for drug, pattern in drug_patterns.items():
+            df_matching = df_publications[df_publications[matcher.pub_title_col_name].str.contains(
+                pattern, regex=True, na=False)]
+            for _, row in df_matching.iterrows():
+                matches.append(
+                    {
+                        "drug": drug,
+                        "source": matcher.data_source,
+                        "title": row[matcher.pub_title_col_name],
+                        "journal": row.get(matcher.journal_col_name),
+                        "date": row.get(matcher.date_col_name)
+                    }
+                )
+        return matches
+
+
+class VectorizedPandasEngine(PandasEngine):
+    """
+    Dataframe engine executing transformations with pandas, cleaning being run by ``DataCleaner.clean_vectorized``:
+    cleaning steps are fused so that a DataFrame is filtered by a single boolean mask and copied once, instead of once
+    per step. Concatenation and matching are the ``PandasEngine`` ones.
+    """
+
+    name = "pandas_vectorized"
+
+    def clean(self, cleaner, df: pd.DataFrame) -> pd.DataFrame:
+        return cleaner.clean_vectorized(df)
@@ -0,0 +1,132 @@
+"""
+This module contains the Polars dataframe engine, executing transformations as lazy, multithreaded query plans.
+
+The engine reproduces the pandas transformations:
+- Regex cleaning runs with the Rust regex engine, whose ``\\w``, ``\\s`` and ``\\b`` classes match Python's ones on the
+  ASCII text left after removing non ASCII characters.
+- Date standardization tries the formats of ``DATE_FORMATS`` in order, as an explicit equivalent of the pandas parsing
+  of the formats found within input data. Dates in any other format are set to null, as unparseable dates are.
+- Matching evaluates the drug patterns of a batch as parallel expressions, and metadata of matched rows is read from
+  the input pandas DataFrame so that matches are identical to the pandas ones.
+"""
+
+from typing import Dict, List
+import pandas as pd
+import polars as pl
+from src.pipeline.process.transform.engines.base import DataFrameEngine
+
+# Date formats parsed once slashes are replaced by hyphens, month first before day first as with pandas
+DATE_FORMATS = [
+    "%Y-%m-%d", "%m-%d-%Y", "%d-%m-%Y", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%Y-%m-%d %H:%M:%S"
+]
+
+
+class PolarsEngine(DataFrameEngine):
+    """
+    Dataframe engine executing transformations with Polars.
+
+    :param match_batch_size: Number of drug patterns evaluated within a single parallel query.
+    :type match_batch_size: int
+    """
+
+    name = "polars"
+
+    def __init__(self, match_batch_size: int = 256):
+        self.match_batch_size = match_batch_size
+
+    @staticmethod
+    def _from_pandas(df: pd.DataFrame) -> pl.DataFrame:
+        """
+        Convert a pandas DataFrame to Polars, casting object columns of mixed types (e.g. integer and string ids
+        within JSON inputs) to strings while keeping missing values null.
+        """
+
+        mixed_columns = [
+            col for col in df.columns
+            if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty")
+        ]
+        if mixed_columns:
+            df = df.assign(**{col: df[col].where(df[col].isna(), df[col].astype(str)) for col in mixed_columns})
+        return pl.from_pandas(df)
+
+    @staticmethod
+    def _check_columns(df: pd.DataFrame, columns: List[str]) -> None:
+        for col in columns:
+            if col not in df.columns:
+                raise ValueError(f"Column '{col}' not found in the dataframe.")
+
+    def _standardized_date(self, lf: pl.LazyFrame, date_column: str, date_format: str) -> pl.Expr:
+        if lf.collect_schema()[date_column].is_temporal():
+            return pl.col(date_column).dt.strftime(date_format)
+        dates = pl.col(date_column).cast(pl.Utf8).str.replace_all("/", "-", literal=True)
+        return pl.coalesce(
+            [dates.str.strptime(pl.Datetime, date_format_in, strict=False) for date_format_in in DATE_FORMATS]
+        ).dt.strftime(date_format)
+
+    @staticmethod
+    def _cleaned_text(text_column: str) -> pl.Expr:
+        return (
+            pl.col(text_column)
+            .str.replace_all(r"[^\x00-\x7F]", "")
+            .str.replace_all(r"[^\w\s-]", "")
+            .str.to_lowercase()
+            .str.strip_chars()
+            .str.replace_all(r"\s+", " ")
+        )
+
+    def clean(self, cleaner, df: pd.DataFrame) -> pd.DataFrame:
+        self._check_columns(
+            df, [cleaner.id_column] + cleaner.date_columns + cleaner.drop_na_columns + cleaner.text_search_columns)
+        # ids are cast as pandas does, missing ids becoming "nan"
+        df = df.assign(**{cleaner.id_column: df[cleaner.id_column].astype(str)})
+        lf = self._from_pandas(df).lazy()
+        lf = lf.with_columns(
+            pl.concat_str([pl.lit(f"{cleaner.id_prefix}_"), pl.col(cleaner.id_column)]).alias(cleaner.id_column)
+        ).unique(subset=[cleaner.id_column], keep="first", maintain_order=True)
+        if cleaner.date_columns:
+            lf = lf.with_columns([
+                self._standardized_date(lf, col_name, cleaner.standard_date_format).alias(col_name)
+                for col_name in cleaner.date_columns
+            ])
+        if cleaner.drop_na_columns:
+            lf = lf.filter(pl.all_horizontal([pl.col(col_name).is_not_null() for col_name in cleaner.drop_na_columns]))
+        if cleaner.text_search_columns:
+            lf = lf.with_columns([
+                self._cleaned_text(col_name).alias(col_name) for col_name in cleaner.text_search_columns
+            ])
+        return lf.collect().to_pandas()
+
+    def concatenate(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
+        return pl.concat([self._from_pandas(df) for df in dfs], how="diagonal_relaxed").to_pandas()
+
+    def find_drug_pub_matches(
+            self, matcher, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
+        drugs = list(dict.fromkeys(df_drugs[matcher.drug_col_name].dropna()))
+        lf_titles = self._from_pandas(df_publications[[matcher.pub_title_col_name]]).lazy()
+
+        titles = df_publications[matcher.pub_title_col_name].tolist()
+        journals = df_publications[matcher.journal_col_name].tolist() \
+            if matcher.journal_col_name in df_publications.columns else None
+        dates = df_publications[matcher.date_col_name].tolist() \
+            if matcher.date_col_name in df_publications.columns else None
+
+        matches = []
+        for start in range(0, len(drugs), self.match_batch_size):
+            batch = drugs[start:start + self.match_batch_size]
+            df_positions = lf_titles.select([
+                pl.col(matcher.pub_title_col_name).cast(pl.Utf8)
+                .str.contains(rf"\b{pl.escape_regex(drug)}\b").arg_true().implode().alias(str(i))
+                for i, drug in enumerate(batch)
+            ]).collect()
+            for i, drug in enumerate(batch):
+                for position in df_positions[str(i)][0]:
+                    matches.append(
+                        {
+                            "drug": drug,
+                            "source": matcher.data_source,
+                            "title": titles[position],
+                            "journal": journals[position] if journals is not None else None,
+                            "date": dates[position] if dates is not None else None
+                        }
+                    )
+        return matches
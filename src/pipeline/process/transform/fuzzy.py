@@ -0,0 +1,180 @@
+import logging
+import re
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Characters ignored when comparing drug names and title words, so that hyphenation and spacing are not edits
+_SEPARATORS = re.compile(r"[\W_]+")
+_WORDS = re.compile(r"[^\W_]+")
+
+
+def canonicalize(text: str) -> str:
+    """
+    Lowercase a text and remove its spaces, hyphens and other separators.
+
+    :param text: Drug name or title words.
+    :type text: str
+    :return: The canonical form, compared within bounded edit distance.
+    :rtype: str
+    """
+
+    return _SEPARATORS.sub("", text.lower())
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Compute the Damerau-Levenshtein (optimal string alignment) distance between two strings, counting insertions,
+    deletions, substitutions and transpositions of adjacent characters, stopping early beyond a maximum distance.
+
+    :param a: First string.
+    :type a: str
+    :param b: Second string.
+    :type b: str
+    :param max_distance: Distance beyond which the exact distance is not computed.
+    :type max_distance: int
+    :return: The distance, or ``max_distance + 1`` if it exceeds ``max_distance``.
+    :rtype: int
+    """
+
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def deletes(term: str, max_distance: int) -> Set[str]:
+    """
+    Generate the strings obtained by deleting up to ``max_distance`` characters of a term, the term included.
+
+    :param term: Term to generate deletes from.
+    :type term: str
+    :param max_distance: Maximum number of deleted characters.
+    :type max_distance: int
+    :return: The deletes of the term.
+    :rtype: Set[str]
+    """
+
+    variants = {term}
+    for n_deleted in range(1, min(max_distance, len(term)) + 1):
+        for positions in combinations(range(len(term)), n_deleted):
+            variants.add("".join(c for i, c in enumerate(term) if i not in positions))
+    return variants
+
+
+class SymSpellIndex:
+    """
+    Symmetric delete index of a vocabulary, finding the terms within a bounded edit distance of a word without
+    comparing it to every term.
+
+    Every term is indexed under its deletes. Two strings within edit distance ``d`` share a delete of at most ``d``
+    characters, so the candidates of a word are the terms indexed under one of its deletes, then verified with the
+    exact distance. Lookups are cached, as title words repeat across publications.
+
+    :param terms: Vocabulary of the index, with the maximum edit distance allowed for each term.
+    :type terms: Dict[str, int]
+    :param cache_size: Number of looked up words kept in cache.
+    :type cache_size: int
+    """
+
+    def __init__(self, terms: Dict[str, int], cache_size: int = 1 << 20):
+        self.terms = terms
+        self.max_distance = max(terms.values(), default=0)
+        self.min_length = min((len(term) for term in terms), default=0)
+        self.max_length = max((len(term) for term in terms), default=0)
+        self.deletes: Dict[str, List[str]] = {}
+        for term, max_distance in terms.items():
+            for variant in deletes(term, max_distance):
+                self.deletes.setdefault(variant, []).append(term)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+        logger.info("Indexed %s terms under %s deletes.", len(terms), len(self.deletes))
+
+    def _lookup(self, word: str) -> Dict[str, int]:
+        if not self.min_length - self.max_distance <= len(word) <= self.max_length + self.max_distance:
+            return {}
+        found = {}
+        for variant in deletes(word, self.max_distance):
+            for term in self.deletes.get(variant, ()):
+                if term not in found:
+                    distance = edit_distance(word, term, self.terms[term])
+                    if distance <= self.terms[term]:
+                        found[term] = distance
+        return found
+
+
+class FuzzyDrugMatcher:
+    """
+    Find the drugs mentioned in titles within a bounded edit distance, tolerating misspellings and different
+    hyphenation or spacing.
+
+    Drug names and title words are compared in canonical form, without separators. Every window of up to
+    ``max_span`` consecutive title words is looked up in a ``SymSpellIndex`` of the drugs, so that a drug split or
+    hyphenated differently within a title is found too. Drugs shorter than ``min_length`` characters are only found
+    exactly, and longer ones within one edit per ``min_length`` characters, up to ``max_distance``, as short names are
+    within a few edits of many common words.
+
+    :param drugs: Drug names, as cleaned within the drugs dataset.
+    :type drugs: Iterable[str]
+    :param max_distance: Maximum edit distance between a drug and its mention.
+    :type max_distance: int
+    :param min_length: Number of characters of a drug name per allowed edit.
+    :type min_length: int
+    :param max_span: Maximum number of title words a mention spans, the number of words of the longest drug name
+                     plus one if not provided.
+    :type max_span: Optional[int]
+    """
+
+    def __init__(
+            self, drugs: Iterable[str], max_distance: int = 1, min_length: int = 5, max_span: Optional[int] = None):
+        if max_distance < 0 or min_length < 1:
+            raise ValueError("Maximum edit distance must not be negative and minimum length must be positive.")
+        self.drugs: Dict[str, List[str]] = {}
+        for drug in drugs:
+            self.drugs.setdefault(canonicalize(drug), []).append(drug)
+        self.drugs.pop("", None)
+        self.max_span = max_span or max((len(_WORDS.findall(d)) for d in self._names()), default=1) + 1
+        self.index = SymSpellIndex({
+            canonical: min(max_distance, len(canonical) // min_length) for canonical in self.drugs
+        })
+
+    def _names(self) -> Iterable[str]:
+        return (drug for names in self.drugs.values() for drug in names)
+
+    def find(self, title: str) -> Dict[str, int]:
+        """
+        Find the drugs mentioned within a title.
+
+        :param title: Publication title.
+        :type title: str
+        :return: Edit distance of the closest mention of each mentioned drug, keyed by drug name.
+        :rtype: Dict[str, int]
+        """
+
+        words = _WORDS.findall(title.lower())
+        found: Dict[str, int] = {}
+        for start in range(len(words)):
+            window = ""
+            for word in words[start:start + self.max_span]:
+                window += word
+                if len(window) > self.index.max_length + self.index.max_distance:
+                    break
+                for canonical, distance in self.index.lookup(window).items():
+                    for drug in self.drugs[canonical]:
+                        if distance < found.get(drug, distance + 1):
+                            found[drug] = distance
+        return found
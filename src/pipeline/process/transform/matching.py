@@ -1,12 +1,13 @@
 import pandas as pd
 import logging
-from typing import Dict, List
-import re
+from src.pipeline.instrumentation import instrument
+from src.pipeline.process.transform.engines import get_engine
+from src.pipeline.process.transform.fuzzy import FuzzyDrugMatcher
+from src.pipeline.process.transform.prefiltering import TokenPrefilter
+from typing import Dict, List, Optional
 from pandas import Timestamp
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
 class DataMatcher:
     """
@@ -22,6 +23,17 @@ class DataMatcher:
     :type date_col_name: str
     :param data_source: Name of the data source (used in output formatting).
     :type data_source: str
+    :param engine: Name of the dataframe engine finding matches e.g. "pandas" or "polars".
+    :type engine: str
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, misspelled or hyphenated differently,
+                               recorded as the "distance" of each match. Drugs are matched exactly by the engine if not
+                               provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param prefilter: Whether publications whose title shares no word with the drug names should be discarded before
+                      exact matching, the pruned rows being reported by ``prefilter.report()``. The "duckdb" engine
+                      already joins titles with drug words in SQL, and fuzzy mentions may not share words with drugs, so
+                      neither is prefiltered.
+    :type prefilter: bool
     """
 
     def __init__(
@@ -30,13 +42,24 @@ class DataMatcher:
             pub_title_col_name: str,
             journal_col_name: str,
             date_col_name: str,
-            data_source: str):
+            data_source: str,
+            engine: str = "pandas",
+            fuzzy_max_distance: Optional[int] = None,
+            prefilter: bool = True):
         self.drug_col_name = drug_col_name
         self.pub_title_col_name = pub_title_col_name
         self.journal_col_name = journal_col_name
         self.date_col_name = date_col_name
         self.data_source = data_source
-
+        self.engine = get_engine(engine)
+        self.fuzzy_max_distance = fuzzy_max_distance
+        self._fuzzy_matcher: Optional[FuzzyDrugMatcher] = None
+        self._fuzzy_drugs: Optional[List[str]] = None
+        self.prefilter: Optional[TokenPrefilter] = None
+        if prefilter and fuzzy_max_distance is None and self.engine.name != "duckdb":
+            self.prefilter = TokenPrefilter(data_source)
+
+    @instrument()
     def find_drug_pub_matches(self, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
         """
         Identify matches between drug names and publication titles.
@@ -49,26 +72,61 @@ class DataMatcher:
         :rtype: List[Dict[str, str]]
         """
 
-        matches = []
-        drug_patterns = {
-            drug: re.compile(rf"\b{re.escape(drug)}\b") for drug in df_drugs[self.drug_col_name].dropna()
-        }
-        for drug, pattern in drug_patterns.items():
-            df_matching = df_publications[df_publications[self.pub_title_col_name].str.contains(
-                pattern, regex=True, na=False)]
-            for _, row in df_matching.iterrows():
-                matches.append(
-                    {
-                        "drug": drug,
-                        "source": self.data_source,
-                        "title": row[self.pub_title_col_name],
-                        "journal": row.get(self.journal_col_name),
-                        "date": row.get(self.date_col_name)
-                    }
-                )
-        logging.info(f"Found {len(matches)} drug mentions in publications.")
+        if self.fuzzy_max_distance is not None:
+            matches = self.find_fuzzy_drug_pub_matches(df_drugs, df_publications)
+        else:
+            if self.prefilter is not None:
+                self.prefilter.fit(df_drugs[self.drug_col_name].dropna().drop_duplicates())
+                df_publications = self.prefilter(df=df_publications, title_col_name=self.pub_title_col_name)
+            matches = self.engine.find_drug_pub_matches(self, df_drugs, df_publications)
+        logger.info(
+            "Found %s drug mentions in publications.", len(matches),
+            extra={"source": self.data_source, "rows_in": len(df_publications), "rows_out": len(matches)})
         return matches
 
+    @instrument()
+    def find_fuzzy_drug_pub_matches(
+            self, df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
+        """
+        Identify drug mentions in publication titles within ``fuzzy_max_distance`` edits, using an index of the drug
+        names rather than comparing every drug to every title.
+
+        Matches are ordered as the exact ones: drug by drug, then by publication.
+
+        :param df_drugs: DataFrame containing drug names.
+        :type df_drugs: pd.DataFrame
+        :param df_publications: DataFrame containing publication data.
+        :type df_publications: pd.DataFrame
+        :return: A list of dictionaries representing matched drugs, publication metadata and edit distance.
+        :rtype: List[Dict[str, str]]
+        """
+
+        drugs = df_drugs[self.drug_col_name].dropna().drop_duplicates().tolist()
+        # the index and its lookup cache are kept across calls on the same drugs e.g. publication batches
+        if self._fuzzy_matcher is None or self._fuzzy_drugs != drugs:
+            self._fuzzy_matcher = FuzzyDrugMatcher(drugs, max_distance=self.fuzzy_max_distance)
+            self._fuzzy_drugs = drugs
+        fuzzy_matcher = self._fuzzy_matcher
+        drug_matches: Dict[str, List[Dict[str, str]]] = {drug: [] for drug in drugs}
+        n_rows = len(df_publications)
+        columns = [
+            df_publications[col].tolist() if col in df_publications.columns else [None] * n_rows
+            for col in [self.pub_title_col_name, self.journal_col_name, self.date_col_name]
+        ]
+        for title, journal, date in zip(*columns):
+            if not isinstance(title, str):
+                continue
+            for drug, distance in fuzzy_matcher.find(title).items():
+                drug_matches[drug].append({
+                    "drug": drug,
+                    "source": self.data_source,
+                    "title": title,
+                    "journal": journal,
+                    "date": date,
+                    "distance": distance
+                })
+        return [match for matches in drug_matches.values() for match in matches]
+
     def _format_drug_pub_matches(self, matches: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
         Format matches between drug names and publication titles.
@@ -81,14 +139,18 @@ class DataMatcher:
 
         formatted_matches = []
         for match in matches:
-            formatted_matches.append({
+            formatted_match = {
                 "drug": match["drug"],
                 "title": match["title"],
                 "ref_type": "{}_publication".format(self.data_source),
                 "date_mention": match["date"]
-            })
+            }
+            if "distance" in match:
+                formatted_match["distance"] = match["distance"]
+            formatted_matches.append(formatted_match)
         return formatted_matches
 
+    @instrument()
     def format_drug_journal_matches(self, matches: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
         Format and deduplicate matches between drug names and journal entries.
@@ -103,9 +165,7 @@ class DataMatcher:
         n_matchings_drugs_pub = len(formatted_matches)
 
         if not matches:
-            logging.warning(
-                "No matches found."
-            )
+            logger.warning("No matches found.")
             return []
 
         seen_journals = set()
@@ -116,14 +176,19 @@ class DataMatcher:
                 key = (match["drug"], journal_cleaned.strip(), match["date"])
                 if key not in seen_journals:
                     seen_journals.add(key)
-                    formatted_matches.append({
+                    formatted_match = {
                         "drug": match[self.drug_col_name],
                         "title": journal_cleaned.strip(),
                         "ref_type": "journal",
                         "date_mention": match[self.date_col_name]
-                    })
-        logging.info(f"Found {len(matches)} drug mentions in publications.")
-        logging.info(f"Found {len(formatted_matches) - n_matchings_drugs_pub} drug mentions in journals.")
+                    }
+                    if "distance" in match:
+                        formatted_match["distance"] = match["distance"]
+                    formatted_matches.append(formatted_match)
+        logger.info(
+            "Found %s drug mentions in publications and %s in journals.", len(matches),
+            len(formatted_matches) - n_matchings_drugs_pub,
+            extra={"source": self.data_source, "rows_out": len(formatted_matches)})
         return formatted_matches
 
 
@@ -148,6 +213,7 @@ class DataMatcher:
             normalized.append(new_d)
         return normalized
 
+    @instrument()
     def __call__(self,  df_drugs: pd.DataFrame, df_publications: pd.DataFrame) -> List[Dict[str, str]]:
         """
         Execute the data matching process when the object is called like a function.
@@ -0,0 +1,114 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from src.pipeline.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# Words of drug names and titles, as delimited by the \b boundaries of the exact drug patterns
+_WORDS = re.compile(r"\w+")
+
+
+class TokenPrefilter:
+    """
+    A class discarding the publications whose title cannot mention any drug, before exact matching runs the pattern of
+    every drug over the remaining titles only.
+
+    A title mentions a drug as a whole word (``\\b<drug>\\b``) only if every word of the drug is a word of the title, so
+    the longest word of each drug, the most selective one, is kept within a hashed set of tokens. Titles sharing no
+    word with that set are discarded in a single pass over the titles, each title being split into words by a compiled
+    regular expression and checked against the set with ``set.isdisjoint``. A set lookup is exact and as fast as a
+    Bloom filter probe for the number of drugs at hand.
+
+    If a drug has no word e.g. "--", titles cannot be prefiltered and are all kept. Pruned rows are counted across
+    calls and summarized by ``report``.
+
+    :param data_source: Name of the data source (used in reporting).
+    :type data_source: str
+    """
+
+    def __init__(self, data_source: str):
+        self.data_source = data_source
+        self.tokens: Optional[set] = None
+        self._drugs: Optional[List[str]] = None
+        self.n_rows = 0
+        self.n_pruned = 0
+
+    def fit(self, drugs: Iterable[str]) -> "TokenPrefilter":
+        """
+        Build the token set of drug names, unless it was built from the same drugs e.g. for a previous batch.
+
+        :param drugs: Drug names, as cleaned within the drugs dataset.
+        :type drugs: Iterable[str]
+        :return: The prefilter.
+        :rtype: TokenPrefilter
+        """
+
+        drugs = list(drugs)
+        if drugs == self._drugs:
+            return self
+        self._drugs = drugs
+        self.tokens = set()
+        for drug in drugs:
+            words = _WORDS.findall(drug)
+            if not words:
+                logger.warning("Drug '%s' has no word, titles are not prefiltered.", drug)
+                self.tokens = None
+                break
+            self.tokens.add(max(words, key=len))
+        return self
+
+    def candidates(self, titles: pd.Series) -> np.ndarray:
+        """
+        Find the titles sharing a word with the token set of drug names.
+
+        :param titles: Publication titles.
+        :type titles: pd.Series
+        :return: Boolean mask of the candidate titles.
+        :rtype: np.ndarray
+        """
+
+        if self.tokens is None:
+            return np.ones(len(titles), dtype=bool)
+        tokens = self.tokens
+        return np.fromiter(
+            (isinstance(title, str) and not tokens.isdisjoint(_WORDS.findall(title)) for title in titles),
+            dtype=bool, count=len(titles))
+
+    @instrument()
+    def __call__(self, df: pd.DataFrame, title_col_name: str) -> pd.DataFrame:
+        """
+        Discard the publications whose title cannot mention any drug of the last fitted drugs.
+
+        :param df: Publications DataFrame.
+        :type df: pd.DataFrame
+        :param title_col_name: Column name containing publication titles.
+        :type title_col_name: str
+        :return: The candidate publications, in their original order.
+        :rtype: pd.DataFrame
+        """
+
+        mask = self.candidates(df[title_col_name])
+        self.n_rows += len(df)
+        self.n_pruned += int(len(df) - mask.sum())
+        logger.info(
+            "Prefiltered %s out of %s %s publications.", len(df) - int(mask.sum()), len(df), self.data_source,
+            extra={"source": self.data_source, "rows_in": len(df), "rows_out": int(mask.sum())})
+        return df[mask].reset_index(drop=True)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the prefiltered rows.
+
+        :return: Data source, number of prefiltered and pruned rows, and the fraction of rows pruned.
+        :rtype: Dict[str, Any]
+        """
+
+        return {
+            "data_source": self.data_source,
+            "rows_in": self.n_rows,
+            "rows_pruned": self.n_pruned,
+            "pruned_fraction": round(self.n_pruned / self.n_rows, 4) if self.n_rows else 0.0,
+        }
@@ -1,17 +1,18 @@
 import pandas as pd
 import logging
 from typing import List
+from src.pipeline.process.transform.engines import get_engine
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
-def concatenate_dataframe_list(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+def concatenate_dataframe_list(dfs: List[pd.DataFrame], engine: str = "pandas") -> pd.DataFrame:
     """
     Concatenate a list of Pandas DataFrames row-wise (i.e., vertically).
 
     :param dfs: List of DataFrames to concatenate.
     :type dfs: List[pd.DataFrame]
+    :param engine: Name of the dataframe engine executing the concatenation e.g. "pandas" or "polars".
+    :type engine: str
     :return: A single DataFrame resulting from row-wise concatenation of all valid input DataFrames.
     :rtype: pd.DataFrame
     :raises ValueError: If no valid DataFrames are provided.
@@ -23,16 +24,11 @@ def concatenate_dataframe_list(dfs: List[pd.DataFrame]) -> pd.DataFrame:
         if isinstance(df, pd.DataFrame):
             valid_dfs.append(df)
         else:
-            logging.warning(f"Item at index {i} is not a DataFrame and will be skipped: {type(df)}")
+            logger.warning("Item at index %s is not a DataFrame and will be skipped: %s", i, type(df))
 
     if not valid_dfs:
-        logging.error("No valid DataFrames to concatenate.")
         raise ValueError("No valid DataFrames to concatenate.")
 
-    try:
-        concat_df = pd.concat(valid_dfs, axis=0, ignore_index=True)
-        logging.info(f"Concatenated {len(valid_dfs)} DataFrames into one.")
-        return concat_df
-    except Exception as e:
-        logging.error(f"Failed to concatenate DataFrames: {e}", exc_info=True)
-        raise
+    concat_df = get_engine(engine).concatenate(valid_dfs)
+    logger.info("Concatenated %s DataFrames into one.", len(valid_dfs))
+    return concat_df
@@ -0,0 +1,266 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from src.pipeline.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# Kinds of column dtypes named within the validation schema, keyed by numpy dtype kind
+_DTYPE_KINDS = {"O": "string", "U": "string", "S": "string", "i": "integer", "u": "integer", "f": "float",
+                "M": "datetime", "b": "boolean"}
+
+# Number of unparseable date values listed within the quality report of a column
+_N_EXAMPLES = 5
+
+
+def dtype_kind(dtype: Any) -> str:
+    """
+    Name the kind of a column dtype, as used within the validation schema.
+
+    :param dtype: Pandas or numpy dtype.
+    :type dtype: Any
+    :return: "string", "integer", "float", "datetime", "boolean" or "other".
+    :rtype: str
+    """
+
+    if isinstance(dtype, pd.StringDtype):
+        return "string"
+    return _DTYPE_KINDS.get(getattr(dtype, "kind", None), "other")
+
+
+def quality_report_path(file_output_path: str) -> str:
+    """
+    Build the path of the quality report written next to the matching output.
+
+    :param file_output_path: Path of the matching output file.
+    :type file_output_path: str
+    :return: Path of the JSON quality report.
+    :rtype: str
+    """
+
+    return "{}.quality_report.json".format(os.path.splitext(file_output_path)[0])
+
+
+class DataValidator:
+    """
+    A class validating a raw dataset against its expected schema before cleaning, so that bad inputs are reported
+    with their extent instead of failing deep within cleaning or being silently dropped.
+
+    Checks performed, with vectorized column operations only:
+    - Column presence: a missing column fails fast with a ``ValueError``, as cleaning cannot run without it.
+    - Column dtypes, among the allowed kinds of the schema.
+    - Null rates, empty strings counting as null, below a maximum rate per column.
+    - Date parse rates, date values being parsed as by cleaning, which coerces unparseable ones to missing dates. Dates
+      are parsed once per distinct value, as dates repeat across rows.
+    - Id uniqueness, cleaning keeping only the first row of each id.
+
+    Counts are accumulated across calls, so that the batches of a same file are validated as a whole, and summarized
+    by ``report``.
+
+    :param data_source: Source of the dataset, "drugs", "pubmed" or "clinical".
+    :type data_source: str
+    :param dtypes: Allowed dtype kinds of each expected column.
+    :type dtypes: Dict[str, List[str]]
+    :param max_null_rates: Maximum rate of null values of each checked column.
+    :type max_null_rates: Dict[str, float]
+    :param date_columns: Columns holding dates.
+    :type date_columns: List[str]
+    :param min_date_parse_rate: Minimum rate of non-null date values parsed as dates.
+    :type min_date_parse_rate: float
+    :param id_column: Column holding the row ids.
+    :type id_column: str
+    :param max_duplicate_id_rate: Maximum rate of rows whose id is the one of a previous row.
+    :type max_duplicate_id_rate: float
+    :param dataset: Name of the validated dataset within the report e.g. its file name, the data source if not
+                    provided.
+    :type dataset: Optional[str]
+    """
+
+    def __init__(
+            self, data_source: str, dtypes: Dict[str, List[str]], max_null_rates: Dict[str, float],
+            date_columns: List[str], min_date_parse_rate: float, id_column: str, max_duplicate_id_rate: float,
+            dataset: Optional[str] = None):
+        self.data_source = data_source
+        self.dtypes = dtypes
+        self.max_null_rates = max_null_rates
+        self.date_columns = date_columns
+        self.min_date_parse_rate = min_date_parse_rate
+        self.id_column = id_column
+        self.max_duplicate_id_rate = max_duplicate_id_rate
+        self.dataset = dataset or data_source
+        self.n_rows = 0
+        self.observed_dtypes: Dict[str, set] = {}
+        self.null_counts = dict.fromkeys(max_null_rates, 0)
+        self.date_counts = {column: {"values": 0, "unparsed": 0} for column in date_columns}
+        self.unparsed_examples: Dict[str, List[str]] = {column: [] for column in date_columns}
+        self.n_duplicate_ids = 0
+        self._seen_id_hashes: set = set()
+
+    def check_columns(self, df: pd.DataFrame) -> None:
+        """
+        Check that the expected columns are present.
+
+        :param df: Raw dataset.
+        :type df: pd.DataFrame
+        :return: None
+        :raises ValueError: If expected columns are missing.
+        """
+
+        missing_columns = [column for column in self.dtypes if column not in df.columns]
+        if missing_columns:
+            raise ValueError(
+                f"Columns {missing_columns} not found within the '{self.dataset}' dataset, found {list(df.columns)}.")
+
+    @staticmethod
+    def count_nulls(series: pd.Series) -> int:
+        """
+        Count the null values of a column, empty strings included.
+
+        :param series: Column.
+        :type series: pd.Series
+        :return: Number of null values.
+        :rtype: int
+        """
+
+        nulls = series.isna()
+        if series.dtype == object:
+            nulls |= series.eq("")
+        return int(nulls.sum())
+
+    def count_unparsed_dates(self, series: pd.Series) -> tuple[int, int, List[str]]:
+        """
+        Count the non-null values of a date column that cleaning would not parse as dates.
+
+        :param series: Date column.
+        :type series: pd.Series
+        :return: Number of non-null values, of unparsed values, and examples of unparsed values.
+        :rtype: tuple[int, int, List[str]]
+        """
+
+        if dtype_kind(series.dtype) == "datetime":
+            return int(series.notna().sum()), 0, []
+        codes, uniques = pd.factorize(series)
+        codes = codes[codes >= 0]
+        parsed = pd.to_datetime(
+            pd.Series(uniques, dtype=object).astype(str).str.replace("/", "-", regex=False), errors="coerce")
+        unparsed = parsed.isna().to_numpy()
+        return len(codes), int(unparsed[codes].sum()), [str(value) for value in uniques[unparsed][:_N_EXAMPLES]]
+
+    def count_duplicate_ids(self, series: pd.Series) -> int:
+        """
+        Count the ids of a column seen within a previous row, of this column or of previous calls. The hashes of the
+        ids of previous calls are kept within a set, so that each call takes a time linear in its number of rows.
+
+        :param series: Id column.
+        :type series: pd.Series
+        :return: Number of duplicate ids.
+        :rtype: int
+        """
+
+        hashes = pd.util.hash_pandas_object(series, index=False)
+        duplicated = hashes.duplicated().to_numpy()
+        hashes = hashes.tolist()
+        if self._seen_id_hashes:
+            duplicated |= np.fromiter((h in self._seen_id_hashes for h in hashes), dtype=bool, count=len(hashes))
+        self._seen_id_hashes.update(hashes)
+        return int(duplicated.sum())
+
+    @instrument()
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate a raw dataset, or a batch of it, accumulating its counts within the quality report.
+
+        :param df: Raw dataset.
+        :type df: pd.DataFrame
+        :return: The dataset, unchanged.
+        :rtype: pd.DataFrame
+        :raises ValueError: If expected columns are missing.
+        """
+
+        self.check_columns(df)
+        self.n_rows += len(df)
+        for column in self.dtypes:
+            self.observed_dtypes.setdefault(column, set()).add(dtype_kind(df[column].dtype))
+        for column in self.max_null_rates:
+            self.null_counts[column] += self.count_nulls(df[column])
+        for column in self.date_columns:
+            n_values, n_unparsed, examples = self.count_unparsed_dates(df[column])
+            self.date_counts[column]["values"] += n_values
+            self.date_counts[column]["unparsed"] += n_unparsed
+            self.unparsed_examples[column] = (self.unparsed_examples[column] + examples)[:_N_EXAMPLES]
+        self.n_duplicate_ids += self.count_duplicate_ids(df[self.id_column])
+        return df
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the validated rows as a quality report, listing the failed checks.
+
+        :return: Data source, dataset, number of rows, observed dtype kinds, null rates, date parse rates with examples
+                 of unparsed values, duplicate ids, failures and whether all checks passed.
+        :rtype: Dict[str, Any]
+        """
+
+        failures = []
+        dtypes = {column: sorted(kinds) for column, kinds in self.observed_dtypes.items()}
+        for column, kinds in dtypes.items():
+            unexpected = [kind for kind in kinds if kind not in self.dtypes[column]]
+            if unexpected:
+                failures.append(f"Column '{column}' has dtype {unexpected}, expected one of {self.dtypes[column]}.")
+        null_rates = {column: self.null_counts[column] / self.n_rows if self.n_rows else 0.0
+                      for column in self.max_null_rates}
+        for column, rate in null_rates.items():
+            if rate > self.max_null_rates[column]:
+                failures.append(
+                    f"Column '{column}' null rate {rate:.2%} exceeds {self.max_null_rates[column]:.2%}.")
+        date_parse_rates = {
+            column: 1 - counts["unparsed"] / counts["values"] if counts["values"] else 1.0
+            for column, counts in self.date_counts.items()
+        }
+        for column, rate in date_parse_rates.items():
+            if rate < self.min_date_parse_rate:
+                failures.append(
+                    f"Column '{column}' date parse rate {rate:.2%} is below {self.min_date_parse_rate:.2%}, "
+                    f"e.g. {self.unparsed_examples[column]}.")
+        duplicate_id_rate = self.n_duplicate_ids / self.n_rows if self.n_rows else 0.0
+        if duplicate_id_rate > self.max_duplicate_id_rate:
+            failures.append(
+                f"Column '{self.id_column}' has {self.n_duplicate_ids} duplicate ids ({duplicate_id_rate:.2%}), "
+                f"only the first row of each id being kept by cleaning.")
+        return {
+            "data_source": self.data_source,
+            "dataset": self.dataset,
+            "rows": self.n_rows,
+            "dtypes": dtypes,
+            "null_rates": {column: round(rate, 6) for column, rate in null_rates.items()},
+            "date_parse_rates": {column: round(rate, 6) for column, rate in date_parse_rates.items()},
+            "unparsed_dates": {column: examples for column, examples in self.unparsed_examples.items() if examples},
+            "duplicate_ids": self.n_duplicate_ids,
+            "failures": failures,
+            "passed": not failures,
+        }
+
+
+def save_quality_report(reports: List[Dict[str, Any]], file_output_path: str) -> Dict[str, Any]:
+    """
+    Save the quality reports of the validated datasets of a run as a JSON quality report, logging their failures.
+
+    :param reports: Quality reports of the validated datasets, as returned by ``DataValidator.report``.
+    :type reports: List[Dict[str, Any]]
+    :param file_output_path: Path of the matching output, the quality report being written next to it.
+    :type file_output_path: str
+    :return: The saved quality report.
+    :rtype: Dict[str, Any]
+    """
+
+    from src.pipeline.process.load import save_json
+
+    for report in reports:
+        for failure in report["failures"]:
+            logger.warning(
+                "Validation of the '%s' dataset failed: %s", report["dataset"], failure,
+                extra={"source": report["data_source"], "rows": report["rows"]})
+    quality_report = {"passed": all(report["passed"] for report in reports), "datasets": reports}
+    save_json(data=quality_report, file_output_path=quality_report_path(file_output_path))
+    return quality_report
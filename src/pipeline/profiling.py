@@ -0,0 +1,270 @@
+"""
+This module contains opt-in profiling hooks of the pipeline stages.
+
+A ``StageProfiler`` is attached to the run recorder and profiles selected stages with one of the following modes:
+- ``cprofile``: deterministic profiling with cProfile, dumped as a pstats file.
+- ``tracemalloc``: Python allocation snapshots taken before and after the stage, dumped as tracemalloc snapshots.
+- ``sampling``: low overhead statistical profiling, sampling the stack of the stage thread at a fixed interval and
+  dumped as collapsed stacks (flame graph input).
+
+Each mode writes its dump and a top-N hotspot summary within the profiles directory of the run output,
+"<stem>.profiles" next to it, which is cleared at the start of every profiled run.
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from src.pipeline.process.load import save_json
+
+logger = logging.getLogger(__name__)
+
+PROFILING_MODES = ("cprofile", "tracemalloc", "sampling")
+
+
+def profile_output_dir(file_output_path: str) -> str:
+    """
+    Build the directory where profile dumps are written, next to the matching output.
+
+    :param file_output_path: Path of the matching output file.
+    :type file_output_path: str
+    :return: Path of the profiles directory, "<stem>.profiles".
+    :rtype: str
+    """
+
+    return "{}.profiles".format(os.path.splitext(os.path.abspath(file_output_path))[0])
+
+
+class _StackSampler:
+    """
+    Sample the stack of a thread at a fixed interval from a background thread.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stage-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class StageProfiler:
+    """
+    Profile pipeline stages and write profile dumps and hotspot summaries.
+
+    Only one stage is profiled at a time: stages nested within a profiled stage are part of its profile.
+
+    :param mode: Profiling mode, one of "cprofile", "tracemalloc" or "sampling".
+    :type mode: str
+    :param output_dir: Directory where profile dumps and summaries are written.
+    :type output_dir: str
+    :param stages: Names of the stages to profile, all top-level stages (``task_*`` functions) if not provided.
+    :type stages: Optional[List[str]]
+    :param top_n: Number of hotspots kept within summaries.
+    :type top_n: int
+    :param sampling_interval: Interval in seconds between two stack samples, for the sampling mode.
+    :type sampling_interval: float
+    :raises ValueError: If the profiling mode is unknown.
+    """
+
+    def __init__(
+            self, mode: str, output_dir: str, stages: Optional[List[str]] = None, top_n: int = 20,
+            sampling_interval: float = 0.005):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {PROFILING_MODES}.")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.stages = set(stages) if stages else None
+        self.top_n = top_n
+        self.sampling_interval = sampling_interval
+        self.hotspots: Dict[str, List[Dict[str, object]]] = {}
+        self._profiling = False
+        self._stage_counts: Counter = Counter()
+
+    def reset(self) -> None:
+        """
+        Remove the dumps and summaries of a previous run from the output directory.
+
+        :return: None
+        """
+
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def should_profile(self, stage: str, parent: Optional[str]) -> bool:
+        """
+        Check whether a stage is to be profiled.
+
+        :param stage: Name of the stage.
+        :type stage: str
+        :param parent: Name of the parent stage, None for top-level stages.
+        :type parent: Optional[str]
+        :return: True if the stage is selected and no other stage is being profiled.
+        :rtype: bool
+        """
+
+        if self._profiling:
+            return False
+        if self.stages is None:
+            return parent is None
+        return stage in self.stages
+
+    def _dump_name(self, stage: str) -> str:
+        """
+        Get a unique file name for a stage, suffixed by its occurrence number when it is profiled several times.
+        """
+
+        self._stage_counts[stage] += 1
+        count = self._stage_counts[stage]
+        return stage if count == 1 else f"{stage}.{count}"
+
+    @contextmanager
+    def profile(self, stage: str) -> Iterator[None]:
+        """
+        Profile the code executed within the context and write its dump and hotspot summary.
+
+        :param stage: Name of the stage being profiled.
+        :type stage: str
+        """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = self._dump_name(stage)
+        self._profiling = True
+        try:
+            if self.mode == "cprofile":
+                with self._profile_cprofile(name):
+                    yield
+            elif self.mode == "tracemalloc":
+                with self._profile_tracemalloc(name):
+                    yield
+            else:
+                with self._profile_sampling(name):
+                    yield
+        finally:
+            self._profiling = False
+        logger.info("Profiled stage '%s' with %s within: %s", stage, self.mode, self.output_dir)
+
+    def _write_summary(self, name: str, hotspots: List[Dict[str, object]], text: str) -> None:
+        self.hotspots[name] = hotspots
+        with open(os.path.join(self.output_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    @contextmanager
+    def _profile_cprofile(self, name: str) -> Iterator[None]:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream).sort_stats(pstats.SortKey.CUMULATIVE)
+            stats.print_stats(self.top_n)
+            hotspots = []
+            for (filename, line, function), (_, n_calls, total_time, cumulative_time, _) in sorted(
+                    stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]:
+                hotspots.append({
+                    "function": f"{function} ({os.path.basename(filename)}:{line})",
+                    "calls": n_calls,
+                    "total_time_s": round(total_time, 6),
+                    "cumulative_time_s": round(cumulative_time, 6)
+                })
+            self._write_summary(name, hotspots, stream.getvalue())
+
+    @contextmanager
+    def _profile_tracemalloc(self, name: str) -> Iterator[None]:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            if started:
+                tracemalloc.stop()
+            after.dump(os.path.join(self.output_dir, f"{name}.tracemalloc"))
+            differences = after.compare_to(before, "lineno")[:self.top_n]
+            hotspots = [
+                {
+                    "location": str(difference.traceback[0]),
+                    "size_delta_bytes": difference.size_diff,
+                    "size_bytes": difference.size,
+                    "count_delta": difference.count_diff
+                }
+                for difference in differences
+            ]
+            self._write_summary(name, hotspots, "\n".join(str(difference) for difference in differences) + "\n")
+
+    @contextmanager
+    def _profile_sampling(self, name: str) -> Iterator[None]:
+        sampler = _StackSampler(thread_id=threading.get_ident(), interval=self.sampling_interval)
+        started_at = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - started_at
+            with open(os.path.join(self.output_dir, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+                for stack, count in sampler.stacks.most_common():
+                    f.write("{} {}\n".format(";".join(stack), count))
+            n_samples = sum(sampler.stacks.values())
+            self_counts, inclusive_counts = Counter(), Counter()
+            for stack, count in sampler.stacks.items():
+                self_counts[stack[-1]] += count
+                for function in set(stack):
+                    inclusive_counts[function] += count
+            hotspots = [
+                {
+                    "function": function,
+                    "self_samples": count,
+                    "self_ratio": round(count / n_samples, 4),
+                    "inclusive_ratio": round(inclusive_counts[function] / n_samples, 4)
+                }
+                for function, count in self_counts.most_common(self.top_n)
+            ]
+            text = f"{n_samples} samples over {duration:.3f}s\n" + "".join(
+                f"{hotspot['self_ratio']:>8.2%} {hotspot['inclusive_ratio']:>8.2%}  {hotspot['function']}\n"
+                for hotspot in hotspots
+            )
+            self._write_summary(name, hotspots, text)
+
+    def save_summary(self) -> None:
+        """
+        Save the top-N hotspots of every profiled stage as ``summary.json`` within the output directory.
+
+        :return: None
+        """
+
+        save_json(
+            data={"mode": self.mode, "top_n": self.top_n, "stages": self.hotspots},
+            file_output_path=os.path.join(self.output_dir, "summary.json")
+        )
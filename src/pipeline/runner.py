@@ -0,0 +1,238 @@
+"""
+This module contains the sequence of pipeline steps, shared by the Prefect flow and the command line entry point.
+
+It does not depend on prefect, and pipeline stages are only imported when the pipeline runs.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from src.pipeline.instrumentation import RunRecorder, record_event, run_report_path
+from src.pipeline.process.storage import BlockCache, configure_storage
+from src.pipeline.profiling import StageProfiler, profile_output_dir
+
+logger = logging.getLogger(__name__)
+
+
+def configure_run_storage(d_config) -> BlockCache:
+    """
+    Configure the cache of the input blocks read from object-store URLs from the run configuration.
+
+    :param d_config: Configuration holding the storage cache directory and size.
+    :type d_config: DeployConfig or RunConfig
+    :return: The block cache.
+    :rtype: BlockCache
+    :raises ValueError: If the cache size is not valid.
+    """
+
+    from src.pipeline.memory import parse_memory_size
+
+    cache_max_bytes = parse_memory_size(d_config.storage_cache_size) if d_config.storage_cache_size else 0
+    return configure_storage(cache_directory=d_config.storage_cache_directory, cache_max_bytes=cache_max_bytes)
+
+
+def check_quality(d_config, quality_reports: List[Dict[str, Any]]) -> None:
+    """
+    Save the quality reports of the raw inputs next to the output, stopping the run on failures in strict mode.
+
+    :param d_config: Configuration holding the output path and whether validation is strict.
+    :type d_config: DeployConfig or RunConfig
+    :param quality_reports: Quality reports of the validated inputs.
+    :type quality_reports: List[Dict[str, Any]]
+    :return: None
+    :raises ValueError: If a validation check failed and validation is strict.
+    """
+
+    from src.pipeline.process.transform.validating import quality_report_path, save_quality_report
+
+    quality_report = save_quality_report(quality_reports, file_output_path=d_config.path_to_output_matching)
+    if d_config.strict_validation and not quality_report["passed"]:
+        report_path = quality_report_path(d_config.path_to_output_matching)
+        raise ValueError(f"Validation of the input datasets failed, see {report_path}.")
+
+
+def run_pipeline(d_config, partitions: Optional[List[int]] = None) -> RunRecorder:
+    """
+    Run the extraction, cleaning, matching, aggregation and saving of drug-publication matches.
+
+    Steps performed:
+    1. Extract drug data from clinical trials source.
+    2. Extract publication data from PubMed (both JSON and CSV).
+    3. Extract clinical trial data from clinical trials source.
+    4. Validate the extracted data, saving a quality report next to the output.
+    5. Clean the drug data.
+    6. Clean and merge PubMed data from JSON and CSV sources.
+    7. Clean clinical trial data.
+    8. Collapse duplicate PubMed and clinical trial publications.
+    9. Perform matching of drugs with clinical trial data.
+    10. Perform matching of drugs with PubMed publication data.
+    11. Aggregate matching results from clinical and publication sources.
+    12. Save aggregated matching results to the configured output path.
+
+    With the "duckdb" engine, the input files are validated batch by batch, then steps 1 to 11 but 4 run as SQL queries
+    over them within a single task, near duplicate publications not being collapsed. In "pipelined" execution mode,
+    steps 2 to 12 run concurrently over batches of input rows within a single task. In "partitioned" execution mode,
+    steps 1 to 4 split publications into hash partitions of their cleaned id, steps 5 to 10 run for each partition
+    within a pool of worker processes, and steps 11 and 12 merge their matches. A memory budget implies the pipelined
+    execution mode, batches being sized to stay under the budget, unless the execution mode is "partitioned".
+
+    Inputs and outputs may be object-store URLs, input blocks being cached within the configured storage cache.
+
+    When a handoff directory is set, the cleaned DataFrames and match tables of the "sequential" execution mode are
+    handed off between steps as Arrow IPC files within it, memory-mapped by the next steps. Other execution modes and
+    the "duckdb" engine do not use it.
+
+    When instrumentation is enabled, the per-stage measurements are saved as a JSON run report next to the output.
+    When profiling is enabled, profile dumps and a hotspot summary of the selected stages are written within the
+    "<stem>.profiles" directory next to the output.
+
+    :param d_config: Configuration holding input and output paths and run options.
+    :type d_config: DeployConfig or RunConfig
+    :param partitions: In "partitioned" execution mode, partitions of the previous run to run again before merging,
+                       e.g. failed ones.
+    :type partitions: Optional[List[int]]
+    :return: The run recorder holding the per-stage measurements.
+    :rtype: RunRecorder
+    """
+
+    from src.pipeline.task import task_extract_drugs, task_extract_pubmed, task_extract_clinical_trials, \
+        task_clean_drugs, task_clean_merge_pubmed, task_clean_clinical, task_matching_drug_pubmed, \
+        task_matching_drug_clinical, task_aggregating_matches, task_load_matches, task_duckdb_pipeline, \
+        task_pipelined_run, task_deduplicate_publications, task_validate_source, task_validate_file, \
+        task_partitioned_run
+    from src.pipeline.handoff import HandoffStore
+
+    configure_run_storage(d_config)
+
+    profiler = None
+    if d_config.profiling_mode:
+        profiler = StageProfiler(
+            mode=d_config.profiling_mode, output_dir=profile_output_dir(d_config.path_to_output_matching),
+            stages=d_config.profiling_stages, top_n=d_config.profiling_top_n,
+            sampling_interval=d_config.profiling_sampling_interval
+        )
+        profiler.reset()
+
+    with RunRecorder(
+            enabled=d_config.enable_instrumentation or profiler is not None,
+            trace_allocations=d_config.enable_instrumentation, profiler=profiler) as recorder, \
+            HandoffStore(d_config.handoff_directory, enabled=d_config.handoff_directory is not None):
+        execution_mode = d_config.execution_mode
+        if d_config.memory_budget and execution_mode == "sequential":
+            logger.info("Memory budget of %s set, running in pipelined execution mode.", d_config.memory_budget)
+            record_event({"event": "memory_budget", "decision": "pipelined_execution_mode"})
+            execution_mode = "pipelined"
+        if d_config.output_format == "table" and execution_mode != "sequential":
+            raise ValueError(f"The match table output requires the sequential execution mode, got '{execution_mode}'.")
+        if d_config.handoff_directory is not None and (execution_mode != "sequential" or d_config.engine == "duckdb"):
+            logger.warning(
+                "The handoff directory only applies to the sequential execution mode of the in-memory engines, "
+                "results are passed as they are.")
+        if execution_mode == "pipelined":
+            task_pipelined_run(
+                path_to_drugs=d_config.path_to_drugs,
+                path_to_pubmed_csv=d_config.path_to_pubmed_csv,
+                path_to_pubmed_json=d_config.path_to_pubmed_json,
+                path_to_clinical_trials=d_config.path_to_clinical_trials,
+                file_output_path=d_config.path_to_output_matching,
+                batch_size=d_config.pipelined_batch_size,
+                queue_depth=d_config.pipelined_queue_depth,
+                engine=d_config.engine,
+                memory_budget=d_config.memory_budget,
+                near_duplicates=d_config.near_deduplication,
+                similarity_threshold=d_config.near_duplicate_threshold,
+                fuzzy_max_distance=d_config.fuzzy_max_distance,
+                strict_validation=d_config.strict_validation
+            )
+        elif execution_mode == "partitioned":
+            task_partitioned_run(
+                path_to_drugs=d_config.path_to_drugs,
+                path_to_pubmed_csv=d_config.path_to_pubmed_csv,
+                path_to_pubmed_json=d_config.path_to_pubmed_json,
+                path_to_clinical_trials=d_config.path_to_clinical_trials,
+                file_output_path=d_config.path_to_output_matching,
+                n_partitions=d_config.n_partitions,
+                max_workers=d_config.partition_workers,
+                engine=d_config.engine,
+                near_duplicates=d_config.near_deduplication,
+                similarity_threshold=d_config.near_duplicate_threshold,
+                fuzzy_max_distance=d_config.fuzzy_max_distance,
+                strict_validation=d_config.strict_validation,
+                partitions=partitions
+            )
+        elif d_config.engine == "duckdb":
+            check_quality(d_config, [
+                task_validate_file(path=path, data_source=data_source, batch_size=d_config.pipelined_batch_size)
+                for data_source, path in [
+                    ("drugs", d_config.path_to_drugs),
+                    ("pubmed", d_config.path_to_pubmed_json),
+                    ("pubmed", d_config.path_to_pubmed_csv),
+                    ("clinical", d_config.path_to_clinical_trials),
+                ]
+            ])
+            if d_config.near_deduplication:
+                logger.warning("The duckdb engine only collapses exact duplicate publications, not near duplicates.")
+            aggregated_matches = task_duckdb_pipeline(
+                path_to_drugs=d_config.path_to_drugs,
+                path_to_pubmed_csv=d_config.path_to_pubmed_csv,
+                path_to_pubmed_json=d_config.path_to_pubmed_json,
+                path_to_clinical_trials=d_config.path_to_clinical_trials,
+                memory_limit=d_config.duckdb_memory_limit,
+                temp_directory=d_config.duckdb_temp_directory
+            )
+        else:
+            df_drugs = task_extract_drugs(
+                path_to_drugs=d_config.path_to_drugs
+            )
+            df_pubmed_json, df_pubmed_csv = task_extract_pubmed(
+                path_to_pubmed_csv=d_config.path_to_pubmed_csv,
+                path_to_pubmed_json=d_config.path_to_pubmed_json
+            )
+            df_clinical_trials = task_extract_clinical_trials(
+                path_to_clinical_trials=d_config.path_to_clinical_trials
+            )
+            quality_reports = [
+                task_validate_source(df=df, data_source=data_source, dataset=os.path.basename(path), strict=False)
+                for df, data_source, path in [
+                    (df_drugs, "drugs", d_config.path_to_drugs),
+                    (df_pubmed_json, "pubmed", d_config.path_to_pubmed_json),
+                    (df_pubmed_csv, "pubmed", d_config.path_to_pubmed_csv),
+                    (df_clinical_trials, "clinical", d_config.path_to_clinical_trials),
+                ]
+            ]
+            check_quality(d_config, quality_reports)
+            df_drugs = task_clean_drugs(df_drugs=df_drugs, engine=d_config.engine)
+            df_pubmed = task_clean_merge_pubmed(
+                df_pubmed_json=df_pubmed_json, df_pubmed_csv=df_pubmed_csv, engine=d_config.engine
+            )
+            df_clinical_trials = task_clean_clinical(df_clinical_trials=df_clinical_trials, engine=d_config.engine)
+            df_pubmed = task_deduplicate_publications(
+                df_publications=df_pubmed, data_source="pubmed", near_duplicates=d_config.near_deduplication,
+                similarity_threshold=d_config.near_duplicate_threshold
+            )
+            df_clinical_trials = task_deduplicate_publications(
+                df_publications=df_clinical_trials, data_source="clinical",
+                near_duplicates=d_config.near_deduplication, similarity_threshold=d_config.near_duplicate_threshold
+            )
+            drug_clinical_matches = task_matching_drug_clinical(
+                df_drugs=df_drugs, df_clinical_trials=df_clinical_trials, engine=d_config.engine,
+                fuzzy_max_distance=d_config.fuzzy_max_distance
+            )
+            drug_pubmed_matches = task_matching_drug_pubmed(
+                df_drugs=df_drugs, df_pubmed=df_pubmed, engine=d_config.engine,
+                fuzzy_max_distance=d_config.fuzzy_max_distance
+            )
+            aggregated_matches = task_aggregating_matches(
+                drug_clinical_matches=drug_clinical_matches, drug_pubmed_matches=drug_pubmed_matches
+            )
+        if execution_mode == "sequential":
+            task_load_matches(
+                aggregated_matches=aggregated_matches, file_output_path=d_config.path_to_output_matching,
+                output_format=d_config.output_format
+            )
+
+    if profiler is not None:
+        profiler.save_summary()
+    if d_config.enable_instrumentation:
+        recorder.save(file_output_path=run_report_path(d_config.path_to_output_matching))
+    return recorder
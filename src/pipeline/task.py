@@ -1,14 +1,22 @@
+import os
 import pandas as pd
-from typing import Dict, List
-from src.config.build_config import COLS_CLEAN_MAPPING, COLS_MATCH_MAPPING
-from src.pipeline.process.extract import load_csv
+from typing import Any, Dict, List, Optional, Union
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_DEDUP_MAPPING, COLS_MATCH_MAPPING, VALIDATION_SCHEMA
+from src.pipeline.process.extract import iter_csv, iter_json, load_csv
 from src.pipeline.process.extract import load_json
 from src.pipeline.process.transform.utils import concatenate_dataframe_list
 from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.deduplicating import PublicationDeduplicator
+from src.pipeline.process.transform.validating import DataValidator
 from src.pipeline.process.transform.matching import DataMatcher
 from src.pipeline.process.transform.aggregating import DataAggregator
-from src.pipeline.process.load import save_json
+from src.pipeline.process.load import JsonArrayWriter, save_json
+from src.pipeline.process.table import MatchTable
+from src.pipeline.handoff import FrameHandle, handoff, iter_records, resolve
+from src.pipeline.instrumentation import instrument, record_event
+from src.adhoc.index import MatchesIndex, index_path
 
+@instrument()
 def task_extract_drugs(path_to_drugs: str) -> pd.DataFrame:
     """
     Extract the drugs dataset from a CSV file.
@@ -23,6 +31,7 @@ def task_extract_drugs(path_to_drugs: str) -> pd.DataFrame:
     return df_drugs
 
 
+@instrument()
 def task_extract_pubmed(path_to_pubmed_csv: str, path_to_pubmed_json: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Extract PubMed data from both CSV and JSON files.
@@ -40,6 +49,7 @@ def task_extract_pubmed(path_to_pubmed_csv: str, path_to_pubmed_json: str) -> tu
     return df_pubmed_json, df_pubmed_csv
 
 
+@instrument()
 def task_extract_clinical_trials(path_to_clinical_trials: str) -> pd.DataFrame:
     """
     Extract the clinical trials dataset from a CSV file.
@@ -54,22 +64,87 @@ def task_extract_clinical_trials(path_to_clinical_trials: str) -> pd.DataFrame:
     return df_clinical_trials
 
 
-def task_clean_drugs(df_drugs: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+def task_validate_source(
+        df: pd.DataFrame, data_source: str, dataset: Optional[str] = None, strict: bool = False) -> Dict[str, Any]:
+    """
+    Validate a raw dataset before cleaning, using the schema specified in VALIDATION_SCHEMA. Its quality report is
+    recorded within the run report events.
+
+    :param df: Raw dataset.
+    :type df: pd.DataFrame
+    :param data_source: Source of the dataset, "drugs", "pubmed" or "clinical".
+    :type data_source: str
+    :param dataset: Name of the dataset within the quality report e.g. its file name.
+    :type dataset: Optional[str]
+    :param strict: Whether a failed check should stop the run, failures being only reported otherwise.
+    :type strict: bool
+    :return: Quality report of the dataset.
+    :rtype: Dict[str, Any]
+    :raises ValueError: If expected columns are missing, or if a check failed in strict mode.
+    """
+
+    validator = DataValidator(data_source, **VALIDATION_SCHEMA[data_source], dataset=dataset)
+    validator(df=df)
+    report = validator.report()
+    record_event({"event": "validation", **report})
+    if strict and not report["passed"]:
+        raise ValueError(f"Validation of the '{report['dataset']}' dataset failed: {report['failures']}")
+    return report
+
+
+@instrument()
+def task_validate_file(path: str, data_source: str, batch_size: int = 50_000) -> Dict[str, Any]:
+    """
+    Validate a raw input file before cleaning, using the schema specified in VALIDATION_SCHEMA. The file is read and
+    validated batch by batch, so that it is not loaded as a whole. Its quality report is recorded within the run report
+    events.
+
+    :param path: Local path or URL of the CSV or JSON input file.
+    :type path: str
+    :param data_source: Source of the file, "drugs", "pubmed" or "clinical".
+    :type data_source: str
+    :param batch_size: Number of rows of the validated batches.
+    :type batch_size: int
+    :return: Quality report of the file, named after its file name.
+    :rtype: Dict[str, Any]
+    :raises ValueError: If expected columns are missing.
+    """
+
+    validator = DataValidator(data_source, **VALIDATION_SCHEMA[data_source], dataset=os.path.basename(path))
+    if path.lower().endswith(".json"):
+        batches = iter_json(json_path=path, chunk_size=batch_size)
+    else:
+        batches = iter_csv(csv_path=path, chunk_size=batch_size)
+    for df in batches:
+        validator(df=df)
+    report = validator.report()
+    record_event({"event": "validation", **report})
+    return report
+
+
+@instrument()
+def task_clean_drugs(df_drugs: pd.DataFrame, engine: str = "pandas") -> Union[pd.DataFrame, FrameHandle]:
     """
     Clean the drugs DataFrame using the configuration specified in COLS_CLEAN_MAPPING.
 
     :param df_drugs: Raw drugs DataFrame.
     :type df_drugs: pd.DataFrame
-    :return: Cleaned drugs DataFrame.
-    :rtype: pd.DataFrame
+    :param engine: Name of the dataframe engine executing the cleaning.
+    :type engine: str
+    :return: Cleaned drugs DataFrame, or its handle when a handoff store is active.
+    :rtype: Union[pd.DataFrame, FrameHandle]
     """
 
-    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["drugs"])
+    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["drugs"], engine=engine)
     df_drugs = data_cleaner(df=df_drugs)
-    return df_drugs
+    return handoff(df_drugs, "drugs_clean")
 
 
-def task_clean_merge_pubmed(df_pubmed_json: pd.DataFrame, df_pubmed_csv: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+def task_clean_merge_pubmed(
+        df_pubmed_json: pd.DataFrame, df_pubmed_csv: pd.DataFrame,
+        engine: str = "pandas") -> Union[pd.DataFrame, FrameHandle]:
     """
     Clean and merge PubMed data from JSON and CSV sources.
 
@@ -77,94 +152,336 @@ def task_clean_merge_pubmed(df_pubmed_json: pd.DataFrame, df_pubmed_csv: pd.Data
     :type df_pubmed_json: pd.DataFrame
     :param df_pubmed_csv: Raw PubMed data from CSV.
     :type df_pubmed_csv: pd.DataFrame
-    :return: Cleaned and merged PubMed DataFrame.
-    :rtype: pd.DataFrame
+    :param engine: Name of the dataframe engine executing the cleaning and concatenation.
+    :type engine: str
+    :return: Cleaned and merged PubMed DataFrame, or its handle when a handoff store is active.
+    :rtype: Union[pd.DataFrame, FrameHandle]
     """
 
-    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["pubmed"])
+    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["pubmed"], engine=engine)
     df_pubmed_json = data_cleaner(df=df_pubmed_json)
     df_pubmed_csv = data_cleaner(df=df_pubmed_csv)
-    df_pubmed = concatenate_dataframe_list(dfs=[df_pubmed_json, df_pubmed_csv])
-    return df_pubmed
+    df_pubmed = concatenate_dataframe_list(dfs=[df_pubmed_json, df_pubmed_csv], engine=engine)
+    return handoff(df_pubmed, "pubmed_clean")
 
 
-def task_clean_clinical(df_clinical_trials: pd.DataFrame) -> pd.DataFrame:
+@instrument()
+def task_clean_clinical(
+        df_clinical_trials: pd.DataFrame, engine: str = "pandas") -> Union[pd.DataFrame, FrameHandle]:
     """
     Clean the clinical trials DataFrame using the configuration specified in COLS_CLEAN_MAPPING.
 
     :param df_clinical_trials: Raw clinical trials DataFrame.
     :type df_clinical_trials: pd.DataFrame
-    :return: Cleaned clinical trials DataFrame.
-    :rtype: pd.DataFrame
+    :param engine: Name of the dataframe engine executing the cleaning.
+    :type engine: str
+    :return: Cleaned clinical trials DataFrame, or its handle when a handoff store is active.
+    :rtype: Union[pd.DataFrame, FrameHandle]
     """
 
-    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["clinical"])
+    data_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["clinical"], engine=engine)
     df_clinical_trials = data_cleaner(df=df_clinical_trials)
-    return df_clinical_trials
+    return handoff(df_clinical_trials, "clinical_clean")
 
 
-def task_matching_drug_clinical(df_drugs: pd.DataFrame,  df_clinical_trials: pd.DataFrame) -> List[Dict[str, str]]:
+@instrument()
+def task_deduplicate_publications(
+        df_publications: Union[pd.DataFrame, FrameHandle], data_source: str, near_duplicates: bool = False,
+        similarity_threshold: float = 0.8) -> Union[pd.DataFrame, FrameHandle]:
     """
-    Perform matching between drug names and clinical trial titles.
-
-    :param df_drugs: Cleaned drugs DataFrame.
-    :type df_drugs: pd.DataFrame
-    :param df_clinical_trials: Cleaned clinical trials DataFrame.
-    :type df_clinical_trials: pd.DataFrame
-    :return: List of dictionaries with matched clinical trial entries.
-    :rtype: List[Dict[str, str]]
+    Collapse duplicate publications of a cleaned source before matching, using the configuration specified in
+    COLS_DEDUP_MAPPING. The number of rows saved from matching is recorded within the run report events.
+
+    :param df_publications: Cleaned publications DataFrame, or its handle.
+    :type df_publications: Union[pd.DataFrame, FrameHandle]
+    :param data_source: Source of the publications, "pubmed" or "clinical".
+    :type data_source: str
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed too.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :return: Deduplicated publications DataFrame, or its handle when a handoff store is active.
+    :rtype: Union[pd.DataFrame, FrameHandle]
     """
 
-    data_matcher = DataMatcher(**COLS_MATCH_MAPPING["drugs_clinical"])
-    drug_clinical_matches = data_matcher(df_drugs=df_drugs, df_publications=df_clinical_trials)
-    return drug_clinical_matches
+    deduplicator = PublicationDeduplicator(
+        **COLS_DEDUP_MAPPING[data_source], near_duplicates=near_duplicates, similarity_threshold=similarity_threshold)
+    df_publications = deduplicator(df=resolve(df_publications))
+    record_event({"event": "deduplication", **deduplicator.report()})
+    return handoff(df_publications, f"{data_source}_deduplicated")
 
 
-def task_matching_drug_pubmed(df_drugs: pd.DataFrame,  df_pubmed: pd.DataFrame) ->  List[Dict[str, str]]:
+@instrument()
+def task_matching_drug_clinical(
+        df_drugs: Union[pd.DataFrame, FrameHandle],  df_clinical_trials: Union[pd.DataFrame, FrameHandle],
+        engine: str = "pandas", fuzzy_max_distance: Optional[int] = None) -> Union[List[Dict[str, str]], FrameHandle]:
+    """
+    Perform matching between drug names and clinical trial titles. The fraction of titles pruned by the token prefilter
+    before exact matching is recorded within the run report events.
+
+    :param df_drugs: Cleaned drugs DataFrame, or its handle.
+    :type df_drugs: Union[pd.DataFrame, FrameHandle]
+    :param df_clinical_trials: Cleaned clinical trials DataFrame, or its handle.
+    :type df_clinical_trials: Union[pd.DataFrame, FrameHandle]
+    :param engine: Name of the dataframe engine finding matches.
+    :type engine: str
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :return: List of dictionaries with matched clinical trial entries, or its handle when a handoff store is active.
+    :rtype: Union[List[Dict[str, str]], FrameHandle]
     """
-    Perform matching between drug names and PubMed publication titles.
 
-    :param df_drugs: Cleaned drugs DataFrame.
-    :type df_drugs: pd.DataFrame
-    :param df_pubmed: Cleaned and combined PubMed DataFrame (CSV + JSON).
-    :type df_pubmed: pd.DataFrame
-    :return: List of dictionaries with matched PubMed entries.
-    :rtype: List[Dict[str, str]]
+    data_matcher = DataMatcher(
+        **COLS_MATCH_MAPPING["drugs_clinical"], engine=engine, fuzzy_max_distance=fuzzy_max_distance)
+    drug_clinical_matches = data_matcher(df_drugs=resolve(df_drugs), df_publications=resolve(df_clinical_trials))
+    if data_matcher.prefilter is not None:
+        record_event({"event": "prefilter", **data_matcher.prefilter.report()})
+    return handoff(drug_clinical_matches, "drug_clinical_matches")
+
+
+@instrument()
+def task_matching_drug_pubmed(
+        df_drugs: Union[pd.DataFrame, FrameHandle],  df_pubmed: Union[pd.DataFrame, FrameHandle],
+        engine: str = "pandas", fuzzy_max_distance: Optional[int] = None) -> Union[List[Dict[str, str]], FrameHandle]:
+    """
+    Perform matching between drug names and PubMed publication titles. The fraction of titles pruned by the token
+    prefilter before exact matching is recorded within the run report events.
+
+    :param df_drugs: Cleaned drugs DataFrame, or its handle.
+    :type df_drugs: Union[pd.DataFrame, FrameHandle]
+    :param df_pubmed: Cleaned and combined PubMed DataFrame (CSV + JSON), or its handle.
+    :type df_pubmed: Union[pd.DataFrame, FrameHandle]
+    :param engine: Name of the dataframe engine finding matches.
+    :type engine: str
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :return: List of dictionaries with matched PubMed entries, or its handle when a handoff store is active.
+    :rtype: Union[List[Dict[str, str]], FrameHandle]
     """
 
-    data_matcher = DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"])
-    drug_pubmed_matches = data_matcher(df_drugs=df_drugs, df_publications=df_pubmed)
-    return drug_pubmed_matches
+    data_matcher = DataMatcher(
+        **COLS_MATCH_MAPPING["drugs_pubmed"], engine=engine, fuzzy_max_distance=fuzzy_max_distance)
+    drug_pubmed_matches = data_matcher(df_drugs=resolve(df_drugs), df_publications=resolve(df_pubmed))
+    if data_matcher.prefilter is not None:
+        record_event({"event": "prefilter", **data_matcher.prefilter.report()})
+    return handoff(drug_pubmed_matches, "drug_pubmed_matches")
 
 
+@instrument()
 def task_aggregating_matches(
-        drug_clinical_matches: List[Dict[str, str]],
-        drug_pubmed_matches: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        drug_clinical_matches: Union[List[Dict[str, str]], FrameHandle],
+        drug_pubmed_matches: Union[List[Dict[str, str]], FrameHandle]) -> Union[List[Dict[str, str]], FrameHandle]:
     """
     Aggregate matched results from clinical trials and PubMed publications.
 
-    :param drug_clinical_matches: Matches between drugs and clinical trials.
-    :type drug_clinical_matches: List[Dict[str, str]]
-    :param drug_pubmed_matches: Matches between drugs and PubMed publications.
-    :type drug_pubmed_matches: List[Dict[str, str]]
+    :param drug_clinical_matches: Matches between drugs and clinical trials, or their handle.
+    :type drug_clinical_matches: Union[List[Dict[str, str]], FrameHandle]
+    :param drug_pubmed_matches: Matches between drugs and PubMed publications, or their handle.
+    :type drug_pubmed_matches: Union[List[Dict[str, str]], FrameHandle]
+    :return: Aggregated list of all matches, or its handle when a handoff store is active.
+    :rtype: Union[List[Dict[str, str]], FrameHandle]
+    """
+
+    data_aggregator = DataAggregator()
+    aggregated_matches = data_aggregator(data=[resolve(drug_clinical_matches), resolve(drug_pubmed_matches)])
+    return handoff(aggregated_matches, "aggregated_matches")
+
+
+@instrument()
+def task_duckdb_pipeline(
+        path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str, path_to_clinical_trials: str,
+        memory_limit: Optional[str] = None, temp_directory: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Clean, match and aggregate the input files with DuckDB, reading files directly and using all cores. Exact
+    duplicate publications are collapsed before matching, the number of rows saved from matching being recorded within
+    the run report events.
+
+    :param path_to_drugs: Path to the drugs file.
+    :type path_to_drugs: str
+    :param path_to_pubmed_csv: Path to the PubMed CSV file.
+    :type path_to_pubmed_csv: str
+    :param path_to_pubmed_json: Path to the PubMed JSON file.
+    :type path_to_pubmed_json: str
+    :param path_to_clinical_trials: Path to the clinical trials file.
+    :type path_to_clinical_trials: str
+    :param memory_limit: DuckDB memory limit e.g. "4GB", beyond which intermediate tables are spilled to disk.
+    :type memory_limit: Optional[str]
+    :param temp_directory: Directory where DuckDB spills larger-than-memory intermediate tables.
+    :type temp_directory: Optional[str]
     :return: Aggregated list of all matches.
     :rtype: List[Dict[str, str]]
     """
 
-    data_aggregator = DataAggregator()
-    aggregated_matches = data_aggregator(data=[drug_clinical_matches, drug_pubmed_matches])
+    # duckdb is an optional dependency, only imported when selected
+    from src.pipeline.process.transform.engines.duckdb_pipeline import DuckDBPipeline
+
+    pipeline = DuckDBPipeline(memory_limit=memory_limit, temp_directory=temp_directory)
+    pipeline.clean(DataCleaner(**COLS_CLEAN_MAPPING["drugs"]), paths=[path_to_drugs], table="drugs")
+    pipeline.clean(
+        DataCleaner(**COLS_CLEAN_MAPPING["pubmed"]), paths=[path_to_pubmed_json, path_to_pubmed_csv], table="pubmed")
+    pipeline.clean(DataCleaner(**COLS_CLEAN_MAPPING["clinical"]), paths=[path_to_clinical_trials], table="clinical")
+    for data_source in ["pubmed", "clinical"]:
+        deduplicator = PublicationDeduplicator(**COLS_DEDUP_MAPPING[data_source])
+        pipeline.deduplicate(deduplicator, publications_table=data_source, table=f"{data_source}_deduplicated")
+        record_event({"event": "deduplication", **deduplicator.report()})
+    pipeline.match(
+        DataMatcher(**COLS_MATCH_MAPPING["drugs_clinical"]), drugs_table="drugs",
+        publications_table="clinical_deduplicated", table="drug_clinical_matches"
+    )
+    pipeline.match(
+        DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"]), drugs_table="drugs",
+        publications_table="pubmed_deduplicated", table="drug_pubmed_matches"
+    )
+    aggregated_matches = pipeline.aggregate(matches_tables=["drug_clinical_matches", "drug_pubmed_matches"])
     return aggregated_matches
 
 
-def task_load_matches(aggregated_matches: List[Dict[str, str]], file_output_path: str) -> None:
+@instrument()
+def task_pipelined_run(
+        path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str, path_to_clinical_trials: str,
+        file_output_path: str, batch_size: int = 50_000, queue_depth: int = 4, engine: str = "pandas",
+        memory_budget: Optional[str] = None, near_duplicates: bool = False, similarity_threshold: float = 0.8,
+        fuzzy_max_distance: Optional[int] = None, strict_validation: bool = False) -> int:
+    """
+    Extract, validate, clean, match, aggregate and save matches as concurrent stages over batches of input rows, linked
+    by bounded queues. The quality report of the input files is saved next to the output.
+
+    :param path_to_drugs: Path to the drugs CSV file.
+    :type path_to_drugs: str
+    :param path_to_pubmed_csv: Path to the PubMed CSV file.
+    :type path_to_pubmed_csv: str
+    :param path_to_pubmed_json: Path to the PubMed JSON file.
+    :type path_to_pubmed_json: str
+    :param path_to_clinical_trials: Path to the clinical trials CSV file.
+    :type path_to_clinical_trials: str
+    :param file_output_path: The file path (including filename) where the JSON output will be saved. The index is saved
+                             next to it as "<stem>.index.json".
+    :type file_output_path: str
+    :param batch_size: Number of input rows per batch.
+    :type batch_size: int
+    :param queue_depth: Number of batches waiting between two stages, beyond which the producing stage blocks.
+    :type queue_depth: int
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    :param memory_budget: Target RSS of the process e.g. "2GB", batch sizes being derived from it when provided.
+    :type memory_budget: Optional[str]
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed along with
+                            exact duplicates.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param strict_validation: Whether a failed validation check should stop the run.
+    :type strict_validation: bool
+    :return: Number of saved matches.
+    :rtype: int
+    """
+
+    from src.pipeline.pipelined import PipelinedRunner
+
+    runner = PipelinedRunner(
+        batch_size=batch_size, queue_depth=queue_depth, engine=engine, memory_budget=memory_budget,
+        near_duplicates=near_duplicates, similarity_threshold=similarity_threshold,
+        fuzzy_max_distance=fuzzy_max_distance, strict_validation=strict_validation)
+    n_matches = runner.run(
+        path_to_drugs=path_to_drugs, path_to_pubmed_csv=path_to_pubmed_csv, path_to_pubmed_json=path_to_pubmed_json,
+        path_to_clinical_trials=path_to_clinical_trials, file_output_path=file_output_path
+    )
+    return n_matches
+
+
+@instrument()
+def task_partitioned_run(
+        path_to_drugs: str, path_to_pubmed_csv: str, path_to_pubmed_json: str, path_to_clinical_trials: str,
+        file_output_path: str, n_partitions: int = 8, max_workers: Optional[int] = None, engine: str = "pandas",
+        near_duplicates: bool = False, similarity_threshold: float = 0.8, fuzzy_max_distance: Optional[int] = None,
+        strict_validation: bool = False, partitions: Optional[List[int]] = None) -> int:
+    """
+    Split publications into hash partitions of their cleaned id, clean and match each partition with a pool of worker
+    processes, then merge and save matches. The quality report of the input files is saved next to the output.
+
+    :param path_to_drugs: Path to the drugs CSV file.
+    :type path_to_drugs: str
+    :param path_to_pubmed_csv: Path to the PubMed CSV file.
+    :type path_to_pubmed_csv: str
+    :param path_to_pubmed_json: Path to the PubMed JSON file.
+    :type path_to_pubmed_json: str
+    :param path_to_clinical_trials: Path to the clinical trials CSV file.
+    :type path_to_clinical_trials: str
+    :param file_output_path: The file path (including filename) where the JSON output will be saved. Partitions are
+                             written next to it within "<stem>.partitions".
+    :type file_output_path: str
+    :param n_partitions: Number of partitions.
+    :type n_partitions: int
+    :param max_workers: Number of worker processes, the number of CPUs if not provided.
+    :type max_workers: Optional[int]
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    :param near_duplicates: Whether publications of the same date with similar titles should be collapsed along with
+                            exact duplicates, within each partition.
+    :type near_duplicates: bool
+    :param similarity_threshold: Estimated Jaccard similarity of titles above which publications are near duplicates.
+    :type similarity_threshold: float
+    :param fuzzy_max_distance: Maximum edit distance of fuzzy drug mentions, exact matching if not provided.
+    :type fuzzy_max_distance: Optional[int]
+    :param strict_validation: Whether a failed validation check should stop the run.
+    :type strict_validation: bool
+    :param partitions: Partitions of the previous split to run again before merging, e.g. failed ones, all partitions
+                       of a new split if not provided.
+    :type partitions: Optional[List[int]]
+    :return: Number of saved matches.
+    :rtype: int
+    """
+
+    from src.pipeline.partitioned import PartitionedRunner
+
+    runner = PartitionedRunner(
+        n_partitions=n_partitions, max_workers=max_workers, engine=engine, near_duplicates=near_duplicates,
+        similarity_threshold=similarity_threshold, fuzzy_max_distance=fuzzy_max_distance,
+        strict_validation=strict_validation)
+    n_matches = runner.run(
+        path_to_drugs=path_to_drugs, path_to_pubmed_csv=path_to_pubmed_csv, path_to_pubmed_json=path_to_pubmed_json,
+        path_to_clinical_trials=path_to_clinical_trials, file_output_path=file_output_path, partitions=partitions
+    )
+    return n_matches
+
+
+@instrument()
+def task_load_matches(
+        aggregated_matches: Union[List[Dict[str, str]], FrameHandle], file_output_path: str,
+        output_format: str = "json") -> None:
     """
-    Save aggregated matching results to a JSON file.
+    Save aggregated matching results to a JSON file, along with their ad-hoc query index, or upsert them into a
+    versioned match table.
+
+    A handed off match table is written to the JSON output batch by batch from its memory-mapped columns, rather than
+    loaded as a list of records.
 
-    :param aggregated_matches: A list of dictionaries containing aggregated drug-publication matches.
-    :type aggregated_matches: List[Dict[str, str]]
-    :param file_output_path: The file path (including filename) where the JSON output will be saved.
+    :param aggregated_matches: A list of dictionaries containing aggregated drug-publication matches, or its handle.
+    :type aggregated_matches: Union[List[Dict[str, str]], FrameHandle]
+    :param file_output_path: The file path (including filename) where the JSON output will be saved. The index is saved
+                             next to it as "<stem>.index.json". The directory of the match table in "table" format.
     :type file_output_path: str
+    :param output_format: "json" to overwrite the JSON output, or "table" to upsert the matches into the match table,
+                          only the changed matches being written.
+    :type output_format: str
     :return: None
     """
 
+    if isinstance(aggregated_matches, FrameHandle) and aggregated_matches.records and output_format == "json":
+        with JsonArrayWriter(file_output_path) as writer:
+            for record in iter_records(aggregated_matches.path):
+                writer.write(record)
+        MatchesIndex.from_matches(iter_records(aggregated_matches.path)).save(
+            index_path(file_output_path), matches_path=file_output_path)
+        return
+    aggregated_matches = resolve(aggregated_matches)
+    if output_format == "table":
+        table = MatchTable(file_output_path)
+        version = table.upsert(aggregated_matches)
+        record_event({"event": "match_table", "version": version, **table.last_metrics})
+        return
     save_json(data=aggregated_matches, file_output_path=file_output_path)
+    MatchesIndex.from_matches(aggregated_matches).save(
+        index_path(file_output_path), matches_path=file_output_path)
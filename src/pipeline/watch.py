@@ -0,0 +1,293 @@
+"""
+This module contains the directory watch mode of the pipeline, matching newly landed publication files by
+micro-batches instead of waiting for a full pipeline run.
+
+The input directory is polled for pubmed (CSV or JSON) and clinical trials (CSV or JSON) files, recognized by their name
+containing "pubmed" or "clinical". A file is picked up once its size and modification time are unchanged between two
+polls, so that files still being written are not read. New files are grouped within a batching window, then each
+micro-batch is cleaned and matched against the cleaned drugs, which are kept in memory and only cleaned again when the
+drugs file changes. Matches already written are skipped, and new ones are appended to a JSON lines output. Written
+matches are remembered by a 64-bit digest of their serialization, so that the memory of a long-lived watcher grows by a
+few dozen bytes per match whatever the length of titles, the output being streamed once at startup to rebuild them.
+
+Processed files are recorded within a state file next to the output, so that a restarted watcher skips them. A file
+modified after being processed is processed again.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_MATCH_MAPPING
+from src.pipeline.instrumentation import instrument
+from src.pipeline.process.extract import load_csv, load_json
+from src.pipeline.process.load import append_json_lines, save_json
+from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.matching import DataMatcher
+from src.pipeline.process.transform.aggregating import DataAggregator
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Publication sources recognized within file names, with their cleaning and matching configurations
+SOURCES = {
+    "pubmed": ("pubmed", "drugs_pubmed"),
+    "clinical": ("clinical", "drugs_clinical"),
+}
+
+LOADERS = {".csv": load_csv, ".json": load_json}
+
+
+def state_path(file_output_path: str) -> str:
+    """
+    Build the path of the watcher state written next to the JSON lines output.
+
+    :param file_output_path: Path of the JSON lines output.
+    :type file_output_path: str
+    :return: Path of the JSON state file.
+    :rtype: str
+    """
+
+    return "{}.watch_state.json".format(os.path.splitext(file_output_path)[0])
+
+
+def detect_source(path: str) -> Optional[str]:
+    """
+    Detect the publication source of an input file from its name and extension.
+
+    :param path: Path of the input file.
+    :type path: str
+    :return: "pubmed" or "clinical", or None if the file is not a publication file.
+    :rtype: Optional[str]
+    """
+
+    name, extension = os.path.splitext(os.path.basename(path).lower())
+    if extension not in LOADERS:
+        return None
+    for source in SOURCES:
+        if source in name:
+            return source
+    return None
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _match_key(entry: Dict[str, str]) -> int:
+    # serialized entries compare missing dates equal, unlike NaN values, and are kept as a fixed-size digest
+    serialized = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return int.from_bytes(hashlib.blake2b(serialized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DirectoryWatcher:
+    """
+    Watch an input directory and append the matches of newly landed publication files to a JSON lines output.
+
+    :param input_dir: Directory where publication files land.
+    :type input_dir: str
+    :param path_to_drugs: Path to the drugs file.
+    :type path_to_drugs: str
+    :param path_to_output: Path to the JSON lines output, matches being appended to it.
+    :type path_to_output: str
+    :param batch_window: Seconds to wait after the first new file of a micro-batch for more files to land.
+    :type batch_window: float
+    :param poll_interval: Seconds between two scans of the input directory.
+    :type poll_interval: float
+    :param max_batch_files: Number of files beyond which a micro-batch is processed before the end of its window.
+    :type max_batch_files: int
+    :param engine: Name of the dataframe engine executing cleaning and matching.
+    :type engine: str
+    """
+
+    def __init__(
+            self, input_dir: str, path_to_drugs: str, path_to_output: str, batch_window: float = 1.0,
+            poll_interval: float = 0.5, max_batch_files: int = 100, engine: str = "pandas"):
+        self.input_dir = input_dir
+        self.path_to_drugs = path_to_drugs
+        self.path_to_output = path_to_output
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.max_batch_files = max_batch_files
+        self.cleaners = {
+            source: DataCleaner(**COLS_CLEAN_MAPPING[clean_key], engine=engine)
+            for source, (clean_key, _) in SOURCES.items()
+        }
+        self.matchers = {
+            source: DataMatcher(**COLS_MATCH_MAPPING[match_key], engine=engine)
+            for source, (_, match_key) in SOURCES.items()
+        }
+        self.drug_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["drugs"], engine=engine)
+        self.processed_files = self._load_state()
+        self.written_matches = self._load_written_matches()
+        self._df_drugs: Optional[pd.DataFrame] = None
+        self._drugs_signature: Optional[Tuple[int, int]] = None
+        self._candidates: Dict[str, Tuple[int, int]] = {}
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._window_start: Optional[float] = None
+
+    def _load_state(self) -> Dict[str, List[int]]:
+        path = state_path(self.path_to_output)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+
+    def _load_written_matches(self) -> Set[int]:
+        written_matches = set()
+        if not os.path.exists(self.path_to_output):
+            return written_matches
+        with open(self.path_to_output, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    written_matches.add(_match_key(json.loads(line)))
+        logger.info("Loaded the digests of %s written matches from: %s", len(written_matches), self.path_to_output)
+        return written_matches
+
+    def drugs(self) -> pd.DataFrame:
+        """
+        Get the cleaned drugs, cleaned again only when the drugs file changed.
+
+        :return: Cleaned drugs DataFrame.
+        :rtype: pd.DataFrame
+        """
+
+        signature = _file_signature(self.path_to_drugs)
+        if signature != self._drugs_signature:
+            self._df_drugs = self.drug_cleaner(df=LOADERS[os.path.splitext(self.path_to_drugs)[1].lower()](
+                self.path_to_drugs))
+            self._drugs_signature = signature
+            logger.info("Cached %s cleaned drugs from: %s", len(self._df_drugs), self.path_to_drugs)
+        return self._df_drugs
+
+    def poll(self) -> List[str]:
+        """
+        Scan the input directory for new or modified publication files, pending them once they are stable.
+
+        :return: Paths of the files newly added to the pending micro-batch.
+        :rtype: List[str]
+        """
+
+        candidates = {}
+        for name in os.listdir(self.input_dir):
+            path = os.path.join(self.input_dir, name)
+            if not os.path.isfile(path) or detect_source(path) is None or path in self._pending:
+                continue
+            try:
+                signature = _file_signature(path)
+            except FileNotFoundError:
+                continue
+            if list(signature) != self.processed_files.get(name):
+                candidates[path] = signature
+        new_paths = [path for path, signature in candidates.items() if self._candidates.get(path) == signature]
+        for path in new_paths:
+            self._pending[path] = candidates.pop(path)
+        self._candidates = candidates
+        if new_paths and self._window_start is None:
+            self._window_start = time.monotonic()
+        return new_paths
+
+    def _batch_ready(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_batch_files
+            or time.monotonic() - self._window_start >= self.batch_window
+        )
+
+    @instrument()
+    def process_batch(self, files: Dict[str, Tuple[int, int]]) -> List[Dict[str, str]]:
+        """
+        Clean and match a micro-batch of publication files, append its new matches to the output and record the files
+        as processed.
+
+        A file that fails to load or clean is logged and recorded too, so that it is only retried once modified.
+
+        :param files: Signatures (size, modification time) of the files to process, keyed by path.
+        :type files: Dict[str, Tuple[int, int]]
+        :return: The matches appended to the output.
+        :rtype: List[Dict[str, str]]
+        """
+
+        df_drugs = self.drugs()
+        matches = []
+        for path in sorted(files, key=lambda p: (files[p][1], p)):
+            source = detect_source(path)
+            try:
+                df_publications = LOADERS[os.path.splitext(path)[1].lower()](path)
+                df_publications = self.cleaners[source](df=df_publications)
+                matches.append(self.matchers[source](df_drugs=df_drugs, df_publications=df_publications))
+            except Exception as e:
+                logger.error("Failed to process publication file %s: %s", path, e)
+            self.processed_files[os.path.basename(path)] = list(files[path])
+
+        new_matches = []
+        for entry in DataAggregator()(data=matches):
+            key = _match_key(entry)
+            if key not in self.written_matches:
+                self.written_matches.add(key)
+                new_matches.append(entry)
+        append_json_lines(data=new_matches, file_output_path=self.path_to_output)
+        save_json(data={"files": self.processed_files}, file_output_path=state_path(self.path_to_output))
+        return new_matches
+
+    def run(self, max_batches: Optional[int] = None, timeout: Optional[float] = None) -> int:
+        """
+        Watch the input directory, processing micro-batches as files land.
+
+        :param max_batches: Number of micro-batches after which watching stops, unlimited if not provided.
+        :type max_batches: Optional[int]
+        :param timeout: Seconds after which watching stops, unlimited if not provided.
+        :type timeout: Optional[float]
+        :return: Number of processed micro-batches.
+        :rtype: int
+        """
+
+        start = time.monotonic()
+        n_batches = 0
+        logger.info("Watching %s for new publication files.", self.input_dir)
+        while True:
+            self.poll()
+            if self._batch_ready():
+                files = dict(sorted(self._pending.items(), key=lambda item: item[1][1])[:self.max_batch_files])
+                batch_start = time.monotonic()
+                new_matches = self.process_batch(files)
+                n_batches += 1
+                logger.info(
+                    "Processed micro-batch of %s file(s) into %s new matches in %.3fs, %.3fs after its first file was "
+                    "detected.", len(files), len(new_matches), time.monotonic() - batch_start,
+                    time.monotonic() - self._window_start)
+                for path in files:
+                    del self._pending[path]
+                self._window_start = time.monotonic() if self._pending else None
+            if max_batches is not None and n_batches >= max_batches:
+                break
+            if timeout is not None and time.monotonic() - start >= timeout:
+                break
+            time.sleep(self.poll_interval)
+        return n_batches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match newly landed publication files by micro-batches.")
+    add_logging_arguments(parser)
+    parser.add_argument("input_dir", type=str, help="Directory where pubmed and clinical trials files land")
+    parser.add_argument("--drugs", type=str, required=True, help="Path to the drugs file")
+    parser.add_argument("--output", type=str, required=True, help="Path to the JSON lines output")
+    parser.add_argument("--batch-window", type=float, default=1.0, help="Seconds to wait for more files per batch")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between two directory scans")
+    parser.add_argument("--max-batch-files", type=int, default=100, help="Maximum number of files per batch")
+    parser.add_argument(
+        "--engine", choices=["pandas", "pandas_vectorized", "polars", "duckdb"], default="pandas",
+        help="Dataframe engine")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    DirectoryWatcher(
+        input_dir=args.input_dir, path_to_drugs=args.drugs, path_to_output=args.output,
+        batch_window=args.batch_window, poll_interval=args.poll_interval, max_batch_files=args.max_batch_files,
+        engine=args.engine
+    ).run()
@@ -0,0 +1,157 @@
+"""
+This module contains the latency benchmark of the sales queries, run on synthetic transactions at several data sizes.
+
+For each engine and size, a database is populated, the recommended indexes are created (SQLite only), then each query
+is run several times and its median latency reported, along with the populate and index creation times.
+
+With rollups, transactions are loaded through the incrementally maintained rollup tables, so that the populate time
+includes their maintenance, and the rollup version of each query is measured too, after a consistency check.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+from src.pipeline.process.load import save_json
+from src.sales.queries import ENGINES, QUERY_NAMES, SalesDatabase
+from src.sales.rollups import SalesRollups
+from src.sales.synthetic import SalesDataGenerator
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (100_000, 1_000_000, 10_000_000)
+
+
+def benchmark_size(
+        n_transactions: int, engine: str = "sqlite", indexes: bool = True, repeat: int = 3, seed: int = 42,
+        work_dir: Optional[str] = None, rollups: bool = False) -> List[Dict[str, Any]]:
+    """
+    Populate a database with synthetic transactions then measure the latency of each query.
+
+    :param n_transactions: Number of transactions.
+    :type n_transactions: int
+    :param engine: "sqlite" or "duckdb".
+    :type engine: str
+    :param indexes: Whether the recommended indexes should be created before querying.
+    :type indexes: bool
+    :param repeat: Number of runs of each query, the median latency being reported.
+    :type repeat: int
+    :param seed: Seed of the synthetic data generator.
+    :type seed: int
+    :param work_dir: Directory of the database file, a temporary one if not provided.
+    :type work_dir: Optional[str]
+    :param rollups: Whether transactions should be loaded through rollups, and the rollup queries measured too.
+    :type rollups: bool
+    :return: One measurement per query.
+    :raises AssertionError: If the rollups are inconsistent with the transactions.
+    :rtype: List[Dict[str, Any]]
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(work_dir or tmp_dir, f"sales_{engine}_{n_transactions}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        with SalesDatabase(path, engine=engine) as database:
+            sales_rollups = SalesRollups(database) if rollups else None
+            start = time.perf_counter()
+            SalesDataGenerator(n_transactions=n_transactions, seed=seed).populate(database, rollups=sales_rollups)
+            populate_s = time.perf_counter() - start
+            start = time.perf_counter()
+            created_indexes = database.create_indexes() if indexes else []
+            index_s = time.perf_counter() - start
+
+            queries = {name: partial(database.query, name) for name in QUERY_NAMES}
+            if sales_rollups is not None:
+                consistency = sales_rollups.check_consistency()
+                assert all(checks["consistent"] for checks in consistency.values()), \
+                    f"Inconsistent rollups: {consistency}"
+                queries.update({f"rollups/{name}": partial(sales_rollups.query, name) for name in QUERY_NAMES})
+
+            measurements = []
+            for name, run_query in queries.items():
+                latencies = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    df_result = run_query()
+                    latencies.append(time.perf_counter() - start)
+                measurements.append({
+                    "engine": engine,
+                    "n_transactions": n_transactions,
+                    "indexes": created_indexes,
+                    "populate_s": round(populate_s, 3),
+                    "index_s": round(index_s, 3),
+                    "query": name,
+                    "latency_s": round(statistics.median(latencies), 4),
+                    "rows_out": len(df_result),
+                })
+                logger.info("Query '%s' on %s %s transactions: %.4fs", name, n_transactions, engine, latencies[-1])
+    return measurements
+
+
+def run_benchmark(
+        sizes: Sequence[int] = DEFAULT_SIZES, engines: Sequence[str] = ("sqlite",), indexes: bool = True,
+        repeat: int = 3, seed: int = 42, work_dir: Optional[str] = None, rollups: bool = False) -> List[Dict[str, Any]]:
+    """
+    Measure the latency of each query for every engine and data size.
+
+    :param sizes: Numbers of transactions.
+    :type sizes: Sequence[int]
+    :param engines: Engines to benchmark among ``ENGINES``.
+    :type engines: Sequence[str]
+    :param indexes: Whether the recommended indexes should be created before querying.
+    :type indexes: bool
+    :param repeat: Number of runs of each query, the median latency being reported.
+    :type repeat: int
+    :param seed: Seed of the synthetic data generator.
+    :type seed: int
+    :param work_dir: Directory of the database files, a temporary one if not provided.
+    :type work_dir: Optional[str]
+    :param rollups: Whether transactions should be loaded through rollups, and the rollup queries measured too.
+    :type rollups: bool
+    :return: One measurement per engine, size and query.
+    :rtype: List[Dict[str, Any]]
+    """
+
+    return [
+        measurement
+        for engine in engines for n_transactions in sizes
+        for measurement in benchmark_size(
+            n_transactions, engine=engine, indexes=indexes, repeat=repeat, seed=seed, work_dir=work_dir,
+            rollups=rollups)
+    ]
+
+
+def _print_results(measurements: List[Dict[str, Any]]) -> None:
+    print(f"{'engine':<8}{'transactions':>14}{'query':>46}{'latency (s)':>13}{'populate (s)':>14}{'index (s)':>11}")
+    for m in measurements:
+        print(
+            f"{m['engine']:<8}{m['n_transactions']:>14,}{m['query']:>46}{m['latency_s']:>13.4f}"
+            f"{m['populate_s']:>14.2f}{m['index_s']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sales queries of the sql/ directory.")
+    add_logging_arguments(parser)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Numbers of transactions")
+    parser.add_argument("--engine", choices=ENGINES, nargs="+", default=["sqlite"], help="Embedded database engines")
+    parser.add_argument("--no-indexes", action="store_true", help="Do not create the recommended indexes")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each query")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data generator")
+    parser.add_argument("--work-dir", type=str, help="Directory kept for the database files")
+    parser.add_argument("--rollups", action="store_true", help="Load and query through the rollup tables too")
+    parser.add_argument("--output", type=str, help="Path where the JSON results are saved")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    results = run_benchmark(
+        sizes=args.sizes, engines=args.engine, indexes=not args.no_indexes, repeat=args.repeat, seed=args.seed,
+        work_dir=args.work_dir, rollups=args.rollups)
+    if args.output:
+        save_json(data=results, file_output_path=args.output)
+    _print_results(results)
@@ -0,0 +1,289 @@
+"""
+This module runs the sales analytics queries of the ``sql/`` directory against an embedded database, SQLite or DuckDB,
+holding the ``transactions`` and ``products_nomenclature`` tables.
+
+The scripts are kept as written, in a generic SQL dialect, and adapted to the selected engine when loaded: their
+``DATE(year, month, day)`` literals become ISO date strings for SQLite, which stores dates as ISO text, and ``DATE``
+literals for DuckDB.
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sql")
+
+ENGINES = ("sqlite", "duckdb")
+
+QUERY_NAMES = ("total_ventes_daily", "total_ventes_client_id_meuble_deco")
+
+SCHEMA = {
+    "transactions": """
+        CREATE TABLE IF NOT EXISTS transactions (
+            date DATE NOT NULL,
+            order_id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            prod_id INTEGER NOT NULL,
+            prod_price DOUBLE NOT NULL,
+            prod_qty INTEGER NOT NULL
+        )
+    """,
+    "products_nomenclature": """
+        CREATE TABLE IF NOT EXISTS products_nomenclature (
+            product_id INTEGER PRIMARY KEY,
+            product_type VARCHAR NOT NULL,
+            product_name VARCHAR NOT NULL
+        )
+    """,
+}
+
+# Recommended SQLite indexes. Both queries filter transactions on a date range then only read the client, product,
+# price and quantity columns, which this index covers: SQLite range scans it without reading the table rows, and the
+# daily query reads dates in order without sorting. The nomenclature join is served by its primary key.
+# DuckDB does not use indexes for range aggregations but min/max zone maps, so transactions are inserted in date order
+# instead.
+INDEXES = {
+    "idx_transactions_date_covering": (
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date_covering "
+        "ON transactions (date, client_id, prod_id, prod_price, prod_qty)"
+    ),
+}
+
+# Temporary table holding the batch of transactions being loaded
+STAGING_TABLE = "transactions_batch"
+
+_DATE_LITERAL = re.compile(r"\bDATE\(\s*(\d{4})\s*,\s*(\d{1,2})\s*,\s*(\d{1,2})\s*\)", re.IGNORECASE)
+
+
+def adapt_sql(sql: str, engine: str) -> str:
+    """
+    Adapt a query of the ``sql/`` directory to the dialect of an embedded engine.
+
+    :param sql: Query using ``DATE(year, month, day)`` literals.
+    :type sql: str
+    :param engine: "sqlite" or "duckdb".
+    :type engine: str
+    :return: The adapted query.
+    :rtype: str
+    :raises ValueError: If the engine is not supported.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+    literal = "'{}-{:02d}-{:02d}'" if engine == "sqlite" else "DATE '{}-{:02d}-{:02d}'"
+    return _DATE_LITERAL.sub(
+        lambda match: literal.format(int(match.group(1)), int(match.group(2)), int(match.group(3))), sql)
+
+
+def load_query(name: str, engine: str) -> str:
+    """
+    Load a query of the ``sql/`` directory adapted to an embedded engine.
+
+    :param name: Name of the query, the file name without its ".sql" extension.
+    :type name: str
+    :param engine: "sqlite" or "duckdb".
+    :type engine: str
+    :return: The adapted query.
+    :rtype: str
+    :raises FileNotFoundError: If the query does not exist.
+    """
+
+    with open(os.path.join(SQL_DIR, f"{name}.sql"), "r", encoding="utf-8") as f:
+        return adapt_sql(f.read(), engine)
+
+
+class SalesDatabase:
+    """
+    Embedded sales database holding the ``transactions`` and ``products_nomenclature`` tables.
+
+    :param path: Path of the database file, in memory by default.
+    :type path: str
+    :param engine: "sqlite" or "duckdb", the latter being imported only when selected.
+    :type engine: str
+    """
+
+    def __init__(self, path: str = ":memory:", engine: str = "sqlite"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}.")
+        self.path = path
+        self.engine = engine
+        if engine == "duckdb":
+            # duckdb is an optional dependency, only imported when selected
+            import duckdb
+            self.connection = duckdb.connect(path)
+        else:
+            self.connection = sqlite3.connect(path)
+
+    def __enter__(self) -> "SalesDatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Commit pending inserts and close the connection.
+
+        :return: None
+        """
+
+        self.connection.commit()
+        self.connection.close()
+
+    def create_schema(self) -> None:
+        """
+        Create the ``transactions`` and ``products_nomenclature`` tables if they do not exist.
+
+        :return: None
+        """
+
+        for ddl in SCHEMA.values():
+            self.connection.execute(ddl)
+
+    def create_indexes(self, indexes: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Create the recommended indexes, with SQLite only.
+
+        :param indexes: Names of the indexes to create among ``INDEXES``, all of them if not provided.
+        :type indexes: Optional[Iterable[str]]
+        :return: Names of the created indexes.
+        :rtype: List[str]
+        """
+
+        if self.engine != "sqlite":
+            logger.info("Skipping indexes with the '%s' engine, which relies on zone maps.", self.engine)
+            return []
+        names = list(indexes or INDEXES)
+        for name in names:
+            self.connection.execute(INDEXES[name])
+        self.connection.execute("ANALYZE")
+        self.connection.commit()
+        logger.info("Created indexes: %s", names)
+        return names
+
+    def begin(self) -> None:
+        """
+        Start a transaction, committed by ``connection.commit()``.
+
+        :return: None
+        """
+
+        if self.engine == "duckdb":
+            self.connection.begin()
+        elif not self.connection.in_transaction:
+            self.connection.execute("BEGIN")
+
+    def insert(self, table: str, df: pd.DataFrame, commit: bool = True) -> None:
+        """
+        Append the rows of a DataFrame to a table, dates being stored as ISO strings.
+
+        :param table: Name of the table.
+        :type table: str
+        :param df: Rows to insert, with the columns of the table in order.
+        :type df: pd.DataFrame
+        :param commit: Whether the insert should be committed, or left within the current transaction.
+        :type commit: bool
+        :return: None
+        :raises ValueError: If the table is not part of the schema.
+        """
+
+        if table not in SCHEMA:
+            raise ValueError(f"Unknown table '{table}', expected one of {list(SCHEMA)}.")
+        self._insert_rows(table, df)
+        if commit:
+            self.connection.commit()
+
+    def stage(self, df_transactions: pd.DataFrame) -> str:
+        """
+        Load a batch of transactions into the temporary ``STAGING_TABLE``, replacing the previous batch, without
+        committing, so that it can be aggregated before being appended to ``transactions``.
+
+        :param df_transactions: Transactions, with the columns of ``transactions`` in order.
+        :type df_transactions: pd.DataFrame
+        :return: Name of the staging table.
+        :rtype: str
+        """
+
+        self.connection.execute(SCHEMA["transactions"].replace(
+            "TABLE IF NOT EXISTS transactions", f"TEMP TABLE IF NOT EXISTS {STAGING_TABLE}"))
+        self.connection.execute(f"DELETE FROM {STAGING_TABLE}")
+        self._insert_rows(STAGING_TABLE, df_transactions)
+        return STAGING_TABLE
+
+    def _insert_rows(self, table: str, df: pd.DataFrame) -> None:
+        if self.engine == "duckdb":
+            self.connection.register("_rows", df)
+            self.connection.execute(f"INSERT INTO {table} SELECT * FROM _rows")
+            self.connection.unregister("_rows")
+        else:
+            placeholders = ", ".join("?" * len(df.columns))
+            self.connection.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                zip(*(df[column].tolist() for column in df.columns)))
+
+    def count(self, table: str) -> int:
+        """
+        Count the rows of a table.
+
+        :param table: Name of the table.
+        :type table: str
+        :return: Number of rows.
+        :rtype: int
+        """
+
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def query(self, name: str) -> pd.DataFrame:
+        """
+        Run a query of the ``sql/`` directory.
+
+        :param name: Name of the query e.g. "total_ventes_daily", or "rollups/total_ventes_daily" for its rollup
+                     version.
+        :type name: str
+        :return: The query result.
+        :rtype: pd.DataFrame
+        """
+
+        sql = load_query(name, self.engine)
+        if self.engine == "duckdb":
+            return self.connection.execute(sql).df()
+        return pd.read_sql_query(sql, self.connection)
+
+    def explain(self, name: str) -> str:
+        """
+        Get the query plan of a query of the ``sql/`` directory e.g. to check the indexes it uses.
+
+        :param name: Name of the query e.g. "total_ventes_daily", or "rollups/total_ventes_daily" for its rollup
+                     version.
+        :type name: str
+        :return: The query plan.
+        :rtype: str
+        """
+
+        sql = load_query(name, self.engine)
+        if self.engine == "duckdb":
+            return "\n".join(row[-1] for row in self.connection.execute(f"EXPLAIN {sql}").fetchall())
+        return "\n".join(row[-1] for row in self.connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the sales queries of the sql/ directory on a database file.")
+    add_logging_arguments(parser)
+    parser.add_argument("database", type=str, help="Path to the SQLite or DuckDB database file")
+    parser.add_argument("--engine", choices=ENGINES, default="sqlite", help="Embedded database engine")
+    parser.add_argument("--query", choices=QUERY_NAMES, action="append", help="Queries to run, all by default")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    with SalesDatabase(args.database, engine=args.engine) as database:
+        results: Dict[str, pd.DataFrame] = {name: database.query(name) for name in args.query or QUERY_NAMES}
+    for name, df_result in results.items():
+        print(f"-- {name} ({len(df_result)} rows)")
+        print(df_result.to_string(index=False))
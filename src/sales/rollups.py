@@ -0,0 +1,242 @@
+"""
+This module maintains rollup tables of the ``transactions`` table, so that the sales reports of the ``sql/rollups/``
+directory read pre-aggregated revenues instead of scanning transactions:
+
+- ``sales_daily``: revenue per date, read by the daily sales report;
+- ``sales_client_product_type``: revenue per year, client and product type, read by the MEUBLE/DECO per-client report.
+  The year is part of the key as the report only covers the transactions of 2019. Transactions of products missing
+  from the nomenclature are rolled up under an empty product type, so that their clients are still reported.
+
+Each batch of transactions is loaded through a staging table: it is aggregated and its revenues added to the rollups
+within the transaction appending it to ``transactions``, so that rollups are never out of sync with the loaded
+transactions. The reports then read a number of rows bounded by the number of days and clients, whatever the number
+of transactions.
+
+Rollups are computed with the product types of the nomenclature at load time: after a product changes type, the
+consistency check reports mismatches until the rollups are rebuilt.
+"""
+
+import argparse
+import logging
+from typing import Any, Dict
+import pandas as pd
+from src.sales.queries import ENGINES, QUERY_NAMES, SalesDatabase
+from src.pipeline.logs import add_logging_arguments, configure_logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_SCHEMA = {
+    "sales_daily": """
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            date DATE PRIMARY KEY,
+            ventes DOUBLE NOT NULL
+        )
+    """,
+    "sales_client_product_type": """
+        CREATE TABLE IF NOT EXISTS sales_client_product_type (
+            year INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            product_type VARCHAR NOT NULL,
+            ventes DOUBLE NOT NULL,
+            PRIMARY KEY (year, client_id, product_type)
+        )
+    """,
+}
+
+ROLLUP_KEYS = {
+    "sales_daily": ["date"],
+    "sales_client_product_type": ["year", "client_id", "product_type"],
+}
+
+# Year of an ISO date string with SQLite, of a DATE with DuckDB
+_YEAR = {
+    "sqlite": "CAST(substr(t.date, 1, 4) AS INTEGER)",
+    "duckdb": "CAST(year(t.date) AS INTEGER)",
+}
+
+_AGGREGATES = {
+    "sales_daily": """
+        SELECT t.date AS date, SUM(t.prod_price * t.prod_qty) AS ventes
+        FROM {source} AS t
+        GROUP BY t.date
+    """,
+    "sales_client_product_type": """
+        SELECT {year} AS year, t.client_id AS client_id, COALESCE(p.product_type, '') AS product_type,
+               SUM(t.prod_price * t.prod_qty) AS ventes
+        FROM {source} AS t
+        LEFT JOIN products_nomenclature AS p ON p.product_id = t.prod_id
+        GROUP BY 1, 2, 3
+    """,
+}
+
+
+class SalesRollups:
+    """
+    Rollup tables of a sales database, maintained incrementally as transactions are loaded.
+
+    :param database: Sales database holding the ``transactions`` and ``products_nomenclature`` tables.
+    :type database: SalesDatabase
+    """
+
+    def __init__(self, database: SalesDatabase):
+        self.database = database
+
+    def _aggregate_sql(self, table: str, source: str) -> str:
+        return _AGGREGATES[table].format(source=source, year=_YEAR[self.database.engine])
+
+    def _upsert(self, table: str, source: str) -> None:
+        keys = ", ".join(ROLLUP_KEYS[table])
+        self.database.connection.execute(
+            f"INSERT INTO {table} ({keys}, ventes) {self._aggregate_sql(table, source)} "
+            f"ON CONFLICT ({keys}) DO UPDATE SET ventes = {table}.ventes + excluded.ventes"
+        )
+
+    def _read(self, sql: str) -> pd.DataFrame:
+        if self.database.engine == "duckdb":
+            return self.database.connection.execute(sql).df()
+        return pd.read_sql_query(sql, self.database.connection)
+
+    def create(self) -> None:
+        """
+        Create the rollup tables if they do not exist.
+
+        :return: None
+        """
+
+        for ddl in ROLLUP_SCHEMA.values():
+            self.database.connection.execute(ddl)
+
+    def load_batch(self, df_transactions: pd.DataFrame) -> None:
+        """
+        Append a batch of transactions to ``transactions`` and add its revenues to the rollups, within a single
+        transaction.
+
+        :param df_transactions: Transactions, with the columns of ``transactions`` in order.
+        :type df_transactions: pd.DataFrame
+        :return: None
+        """
+
+        connection = self.database.connection
+        try:
+            self.database.begin()
+            staging_table = self.database.stage(df_transactions)
+            connection.execute(f"INSERT INTO transactions SELECT * FROM {staging_table}")
+            for table in ROLLUP_SCHEMA:
+                self._upsert(table, staging_table)
+            connection.execute(f"DELETE FROM {staging_table}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def rebuild(self) -> None:
+        """
+        Recompute the rollups from all the transactions, e.g. after transactions were inserted without them or the
+        nomenclature changed.
+
+        :return: None
+        """
+
+        self.create()
+        self.database.begin()
+        for table in ROLLUP_SCHEMA:
+            self.database.connection.execute(f"DELETE FROM {table}")
+            self._upsert(table, "transactions")
+        self.database.connection.commit()
+        logger.info("Rebuilt rollups from %s transactions.", self.database.count('transactions'))
+
+    def recompute(self, table: str) -> pd.DataFrame:
+        """
+        Compute the content of a rollup table from all the transactions, without writing it.
+
+        :param table: Name of the rollup table.
+        :type table: str
+        :return: The expected rollup rows, sorted by key.
+        :rtype: pd.DataFrame
+        """
+
+        return self._read(self._aggregate_sql(table, "transactions")).sort_values(ROLLUP_KEYS[table], ignore_index=True)
+
+    def read(self, table: str) -> pd.DataFrame:
+        """
+        Read a rollup table.
+
+        :param table: Name of the rollup table.
+        :type table: str
+        :return: The rollup rows, sorted by key.
+        :rtype: pd.DataFrame
+        """
+
+        return self._read(f"SELECT {', '.join(ROLLUP_KEYS[table])}, ventes FROM {table}").sort_values(
+            ROLLUP_KEYS[table], ignore_index=True)
+
+    def check_consistency(self, tolerance: float = 1e-6) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare each rollup table with a full recompute from the transactions. Incremental sums are added in a
+        different order than recomputed ones, so revenues are compared within a relative tolerance.
+
+        :param tolerance: Relative tolerance on revenues.
+        :type tolerance: float
+        :return: Per rollup table, its number of rows, of rows missing from or extra to the recompute, of rows whose
+                 revenue differs and whether it is consistent.
+        :rtype: Dict[str, Dict[str, Any]]
+        """
+
+        report = {}
+        for table, keys in ROLLUP_KEYS.items():
+            df_rollup, df_expected = self.read(table), self.recompute(table)
+            if "date" in keys:
+                df_rollup["date"] = df_rollup["date"].astype(str)
+                df_expected["date"] = df_expected["date"].astype(str)
+            df_compared = df_rollup.merge(
+                df_expected, on=keys, how="outer", suffixes=("_rollup", "_expected"), indicator=True)
+            both = df_compared[df_compared["_merge"] == "both"]
+            mismatched = (both["ventes_rollup"] - both["ventes_expected"]).abs() > \
+                tolerance * both["ventes_expected"].abs().clip(lower=1.0)
+            report[table] = {
+                "rows": len(df_rollup),
+                "missing": int((df_compared["_merge"] == "right_only").sum()),
+                "extra": int((df_compared["_merge"] == "left_only").sum()),
+                "mismatched": int(mismatched.sum()),
+            }
+            report[table]["consistent"] = not (
+                report[table]["missing"] or report[table]["extra"] or report[table]["mismatched"])
+            if not report[table]["consistent"]:
+                logger.warning("Rollup '%s' is inconsistent with the transactions: %s", table, report[table])
+        return report
+
+    def query(self, name: str) -> pd.DataFrame:
+        """
+        Run the rollup version of a sales report of the ``sql/`` directory.
+
+        :param name: Name of the report e.g. "total_ventes_daily".
+        :type name: str
+        :return: The report, as returned by the query of the ``sql/`` directory.
+        :rtype: pd.DataFrame
+        """
+
+        return self.database.query(f"rollups/{name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or check the sales rollups of a database file.")
+    add_logging_arguments(parser)
+    parser.add_argument("database", type=str, help="Path to the SQLite or DuckDB database file")
+    parser.add_argument("--engine", choices=ENGINES, default="sqlite", help="Embedded database engine")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollups from all the transactions")
+    args = parser.parse_args()
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    with SalesDatabase(args.database, engine=args.engine) as database:
+        rollups = SalesRollups(database)
+        if args.rebuild:
+            rollups.rebuild()
+        consistency = rollups.check_consistency()
+        results = {name: rollups.query(name) for name in QUERY_NAMES}
+    for table, checks in consistency.items():
+        print(f"-- {table}: {checks}")
+    for name, df_result in results.items():
+        print(f"-- {name} ({len(df_result)} rows)")
+        print(df_result.to_string(index=False))
+    if not all(checks["consistent"] for checks in consistency.values()):
+        raise SystemExit(1)
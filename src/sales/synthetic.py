@@ -0,0 +1,121 @@
+"""
+This module contains a deterministic synthetic data generator for the ``transactions`` and ``products_nomenclature``
+tables, used to test and benchmark the sales queries at scale.
+
+Transactions are generated chunk by chunk, in date order as they would be appended by a sales system, over a period
+surrounding the year 2019 the queries filter on.
+"""
+
+import logging
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+from src.sales.queries import SalesDatabase
+from src.sales.rollups import SalesRollups
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_TYPES = ["MEUBLE", "DECO"]
+PRODUCT_NAMES = {
+    "MEUBLE": ["Chaise", "Table", "Armoire", "Lit", "Canapé", "Bureau", "Commode", "Étagère"],
+    "DECO": ["Boule Noël", "Mug", "Cadre", "Bougie", "Vase", "Coussin", "Tapis", "Miroir"],
+}
+
+
+class SalesDataGenerator:
+    """
+    A class generating deterministic synthetic sales data.
+
+    :param n_transactions: Number of transaction rows, one per product of an order.
+    :type n_transactions: int
+    :param n_clients: Number of distinct clients.
+    :type n_clients: int
+    :param n_products: Number of products within the nomenclature.
+    :type n_products: int
+    :param start_date: First day of transactions.
+    :type start_date: str
+    :param end_date: Last day of transactions.
+    :type end_date: str
+    :param seed: Seed of the random generator.
+    :type seed: int
+    :param chunk_size: Number of transactions generated at once, bounding the generator memory.
+    :type chunk_size: int
+    """
+
+    def __init__(
+            self, n_transactions: int, n_clients: int = 100_000, n_products: int = 10_000,
+            start_date: str = "2018-07-01", end_date: str = "2020-06-30", seed: int = 42, chunk_size: int = 1_000_000):
+        self.n_transactions = n_transactions
+        self.n_clients = n_clients
+        self.n_products = n_products
+        self.days = pd.date_range(start_date, end_date, freq="D").strftime("%Y-%m-%d").to_numpy()
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    def _rng(self, stream: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, stream])
+
+    def generate_products(self) -> pd.DataFrame:
+        """
+        Generate the products nomenclature.
+
+        :return: Products DataFrame with the columns of ``products_nomenclature``.
+        :rtype: pd.DataFrame
+        """
+
+        rng = self._rng(0)
+        types = rng.integers(len(PRODUCT_TYPES), size=self.n_products)
+        names = rng.integers(len(PRODUCT_NAMES["MEUBLE"]), size=self.n_products)
+        return pd.DataFrame({
+            "product_id": np.arange(self.n_products, dtype=np.int64),
+            "product_type": [PRODUCT_TYPES[t] for t in types],
+            "product_name": [f"{PRODUCT_NAMES[PRODUCT_TYPES[t]][n]} {i}" for i, (t, n) in enumerate(zip(types, names))],
+        })
+
+    def generate_transactions(self) -> Iterator[pd.DataFrame]:
+        """
+        Generate transactions chunk by chunk, in date order. Each chunk only depends on the seed and its position.
+
+        :return: Iterator over transactions DataFrames with the columns of ``transactions``.
+        :rtype: Iterator[pd.DataFrame]
+        """
+
+        prices = np.round(self._rng(1).uniform(1, 500, size=self.n_products), 2)
+        for start_row in range(0, self.n_transactions, self.chunk_size):
+            n_rows = min(self.chunk_size, self.n_transactions - start_row)
+            rng = self._rng(2 + start_row // self.chunk_size)
+            rows = np.arange(start_row, start_row + n_rows, dtype=np.int64)
+            prod_ids = rng.integers(self.n_products, size=n_rows)
+            yield pd.DataFrame({
+                "date": self.days[rows * len(self.days) // self.n_transactions],
+                # orders of about 3 products, ids following the transaction order
+                "order_id": rows // 3,
+                "client_id": rng.integers(self.n_clients, size=n_rows),
+                "prod_id": prod_ids,
+                "prod_price": prices[prod_ids],
+                "prod_qty": rng.integers(1, 6, size=n_rows),
+            })
+
+    def populate(self, database: SalesDatabase, rollups: Optional[SalesRollups] = None) -> None:
+        """
+        Create the schema of a database and insert the generated products and transactions.
+
+        :param database: Database to populate.
+        :type database: SalesDatabase
+        :param rollups: Rollups of the database, created then maintained as transaction chunks are loaded if provided.
+        :type rollups: Optional[SalesRollups]
+        :return: None
+        """
+
+        database.create_schema()
+        database.insert("products_nomenclature", self.generate_products())
+        if rollups is not None:
+            rollups.create()
+        for df_transactions in self.generate_transactions():
+            if rollups is not None:
+                rollups.load_batch(df_transactions)
+            else:
+                database.insert("transactions", df_transactions)
+        logger.info(
+            "Generated %s products and %s transactions of %s clients within the '%s' database.", self.n_products,
+            self.n_transactions, self.n_clients, database.engine)
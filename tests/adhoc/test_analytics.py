@@ -0,0 +1,58 @@
+import os
+import json
+import pytest
+from src.adhoc.index import MatchesIndex
+from tests.data.adhoc import TEST_ADHOC_DATA_DIR
+
+pytest.importorskip("scipy")
+from src.adhoc.analytics import CoMentionAnalytics  # noqa: E402
+
+MATCHES = [
+    {"drug": "a", "title": "title 1", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+    {"drug": "b", "title": "Title 1 ", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+    {"drug": "c", "title": "title 2", "ref_type": "clinical_publication", "date_mention": "2020-01-02"},
+    {"drug": "a", "title": "title 2", "ref_type": "clinical_publication", "date_mention": "2020-01-02"},
+    {"drug": "d", "title": "title 3", "ref_type": "pubmed_publication", "date_mention": "2020-01-03"},
+    {"drug": "a", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "b", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "c", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-02"},
+    {"drug": "a", "title": "journal 2", "ref_type": "journal", "date_mention": "2020-01-02"},
+    {"drug": "c", "title": "Journal 2", "ref_type": "journal", "date_mention": "2020-01-02"},
+    {"drug": "d", "title": "journal 2", "ref_type": "journal", "date_mention": "2020-01-03"},
+]
+
+
+def test_incidence():
+    analytics = CoMentionAnalytics(MATCHES)
+    assert analytics.ref_types == ["clinical_publication", "pubmed_publication"]
+    assert analytics.entities["journal"] == ["journal 1", "journal 2"]
+    assert analytics.incidence(by="publication").shape == (4, 3)
+    # journal mentions are attributed to the ref_types of publications mentioning their drug at their date
+    pubmed_journals = analytics.incidence(by="journal", ref_types=["pubmed_publication"]).toarray().tolist()
+    assert pubmed_journals == [[1, 0], [1, 0], [0, 0], [0, 1]]
+    with pytest.raises(ValueError):
+        analytics.incidence(by="unknown")
+
+
+def test_related_drugs():
+    analytics = CoMentionAnalytics(MATCHES)
+    assert analytics.related_drugs("A") == [("c", 2), ("b", 1), ("d", 1)]
+    assert analytics.related_drugs("a", by="publication") == [("b", 1), ("c", 1)]
+    assert analytics.related_drugs("a", include=["pubmed_publication"]) == [("b", 1)]
+    assert analytics.related_drugs("a", exclude=["clinical_publication"]) == [("b", 1), ("d", 1)]
+    assert analytics.related_drugs("a", k=1) == [("c", 2)]
+    assert analytics.related_drugs("unknown") == []
+
+
+def test_top_pairs():
+    analytics = CoMentionAnalytics(MATCHES)
+    assert analytics.top_pairs(k=2) == [("a", "c", 2), ("a", "b", 1)]
+    assert analytics.top_pairs(by="publication", ref_types=["clinical_publication"]) == [("a", "c", 1)]
+
+
+def test_top_entities_match_index():
+    matches_path = os.path.join(TEST_ADHOC_DATA_DIR, "matches.json")
+    analytics = CoMentionAnalytics.from_file(matches_path)
+    with open(matches_path, "r", encoding="utf-8") as f:
+        index = MatchesIndex.from_matches(json.load(f))
+    assert analytics.top_entities(k=3) == index.top_journals(k=3)
@@ -0,0 +1,105 @@
+import os
+import json
+import shutil
+import numpy as np
+import pytest
+from tempfile import TemporaryDirectory
+from src.adhoc.index import MatchesIndex, index_path
+from tests.data.adhoc import TEST_ADHOC_DATA_DIR
+
+MATCHES = [
+    {"drug": "a", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "b", "title": "Journal 2 ", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "c", "title": "journal 2", "ref_type": "journal", "date_mention": "2020-01-02"},
+    {"drug": "b", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "a", "title": "journal 3", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "a", "title": "a title", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+]
+
+
+def test_index_path():
+    assert index_path(os.path.join("output", "matches.json")) == os.path.join("output", "matches.index.json")
+
+
+def test_top_journals_ties():
+    index = MatchesIndex.from_matches(MATCHES)
+    assert index.top_journals(k=1) == [("journal 1", 2)]
+    assert index.top_journals(k=1, with_ties=True) == [("journal 1", 2), ("journal 2", 2)]
+    assert index.top_journals(k=10) == [("journal 1", 2), ("journal 2", 2), ("journal 3", 1)]
+
+
+def test_lookups():
+    index = MatchesIndex.from_matches(MATCHES)
+    assert index.drugs_of_journal("Journal 2") == {"b", "c"}
+    assert index.journals_of_drug("a") == ["journal 1", "journal 3"]
+    assert index.journals_of_drug("unknown") == []
+    assert index.drugs_of_journal("unknown") == set()
+
+
+def test_top_journals_window():
+    index = MatchesIndex.from_matches(MATCHES)
+    assert index.top_journals(k=10, start="2020-01-01", end="2020-01-01") == [
+        ("journal 1", 2), ("journal 2", 1), ("journal 3", 1)]
+    assert index.top_journals(k=10, start="2020-01-02") == [("journal 2", 1)]
+    assert index.top_journals(k=10, end="2019-12-31") == []
+    assert index.drugs_of_journal("journal 2", end="2020-01-01") == {"b"}
+    with pytest.raises(ValueError):
+        index.top_journals(start="2020-13-01")
+
+
+def test_drug_timeline():
+    matches = MATCHES + [
+        {"drug": "a", "title": "another title", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+        {"drug": "a", "title": "a trial", "ref_type": "clinical_publication", "date_mention": "2019-06-01"},
+        {"drug": "a", "title": "undated", "ref_type": "clinical_publication", "date_mention": None},
+    ]
+    index = MatchesIndex.from_matches(matches)
+    assert index.drug_timeline("A ") == [
+        ("2019-06-01", "clinical_publication", 1), ("2020-01-01", "journal", 2),
+        ("2020-01-01", "pubmed_publication", 2)]
+    assert index.drug_timeline("a", start="2020-01-01", end="2020-01-01") == [
+        ("2020-01-01", "journal", 2), ("2020-01-01", "pubmed_publication", 2)]
+    assert index.drug_timeline("c", end="2020-01-01") == []
+    assert index.drug_timeline("unknown") == []
+
+
+def test_first_mentioned_drugs():
+    index = MatchesIndex.from_matches(MATCHES)
+    assert index.first_mentioned_drugs() == [("a", "2020-01-01"), ("b", "2020-01-01"), ("c", "2020-01-02")]
+    assert index.first_mentioned_drugs(start="2020-01-02") == [("c", "2020-01-02")]
+    assert index.first_mentioned_drugs(end="2019-12-31") == []
+
+
+def test_save_load():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        shutil.copy(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), matches_path)
+        with open(matches_path, "r", encoding="utf-8") as f:
+            index = MatchesIndex.from_matches(json.load(f))
+        index.save(index_path(matches_path), matches_path=matches_path)
+        with open(index_path(matches_path), "r", encoding="utf-8") as f:
+            assert "\n" not in f.read()
+        loaded = MatchesIndex.load(index_path(matches_path))
+        assert loaded.is_fresh(matches_path)
+        # dated arrays are only mapped by dated questions
+        assert loaded._journal_mentions is None
+        assert loaded.top_journals(k=3, with_ties=True) == index.top_journals(k=3, with_ties=True)
+        assert loaded.drugs_of_journal("psychopharmacology") == {"ethanol", "tetracycline"}
+        assert loaded.journals_of_drug("ethanol") == index.journals_of_drug("ethanol")
+        assert loaded.top_journals(k=3, start="2020-01-01") == index.top_journals(k=3, start="2020-01-01")
+        assert isinstance(loaded.journal_mentions["dates"], np.memmap)
+        assert loaded.drug_timeline("ethanol") == index.drug_timeline("ethanol")
+        assert loaded.first_mentioned_drugs() == index.first_mentioned_drugs()
+
+        with open(matches_path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        assert not loaded.is_fresh(matches_path)
+
+
+def test_load_unsupported_version():
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "matches.index.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 0}, f)
+        with pytest.raises(ValueError):
+            MatchesIndex.load(path)
@@ -1,6 +1,9 @@
 import os
+import shutil
 import pytest
-from src.adhoc.main import get_journal_with_most_drug_mentions
+from tempfile import TemporaryDirectory
+from src.adhoc.main import get_journal_with_most_drug_mentions, build_index, load_index, get_top_journals, \
+    get_drug_journals, get_drug_timeline, get_first_mentioned_drugs
 from tests.data.adhoc import TEST_ADHOC_DATA_DIR
 
 def test_get_journal_with_most_drug_mentions_valid():
@@ -12,3 +15,62 @@ def test_get_journal_with_most_drug_mentions_valid():
 def test_get_journal_with_most_drug_mentions_missing():
     with pytest.raises(FileNotFoundError):
         get_journal_with_most_drug_mentions(os.path.join(TEST_ADHOC_DATA_DIR, "missing_matches.json"))
+
+
+def test_get_journal_with_most_drug_mentions_index():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        shutil.copy(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), matches_path)
+        build_index(matches_path)
+        assert load_index(matches_path) is not None
+        result = get_journal_with_most_drug_mentions(matches_path)
+        expected = get_journal_with_most_drug_mentions(matches_path, use_index=False)
+        assert expected == result
+        assert get_top_journals(matches_path, k=1) == [("psychopharmacology", 2)]
+        assert "psychopharmacology" in get_drug_journals(matches_path, "ethanol")
+
+        with open(matches_path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        assert load_index(matches_path) is None
+
+
+def test_get_journal_with_most_drug_mentions_window():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        shutil.copy(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), matches_path)
+        expected = {"journal": "journal of emergency nursing", "mentions": {"diphenhydramine"}}
+        assert get_journal_with_most_drug_mentions(matches_path, use_index=False, end="2019-12-31") == expected
+        build_index(matches_path)
+        assert get_journal_with_most_drug_mentions(matches_path, end="2019-12-31") == expected
+        assert get_journal_with_most_drug_mentions(matches_path, start="2021-01-01") is None
+        with pytest.raises(ValueError):
+            get_journal_with_most_drug_mentions(matches_path, start="2020-02-30")
+
+        assert get_top_journals(matches_path, k=1, start="2020-01-02", end="2020-01-03") == [
+            ("the journal of maternal-fetal & neonatal medicine", 2)]
+        assert get_drug_timeline(matches_path, "epinephrine", start="2020-01-02", end="2020-01-03") == [
+            ("2020-01-02", "journal", 1), ("2020-01-02", "pubmed_publication", 1), ("2020-01-03", "journal", 1),
+            ("2020-01-03", "pubmed_publication", 1)]
+        assert get_first_mentioned_drugs(matches_path, end="2019-01-01") == [("diphenhydramine", "2019-01-01")]
+
+
+def test_index_on_object_store(monkeypatch):
+    fsspec = pytest.importorskip("fsspec")
+    import src.pipeline.process.storage as storage
+
+    monkeypatch.setattr(storage, "_CACHE", None)
+    fs = fsspec.filesystem("memory")
+    fs.put(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), "/adhoc/matches.json")
+    matches_path = "memory://adhoc/matches.json"
+    try:
+        with TemporaryDirectory() as tmp_dir:
+            storage.configure_storage(cache_directory=tmp_dir)
+            assert load_index(matches_path) is None
+            build_index(matches_path)
+            assert fs.exists("/adhoc/matches.index.json") and fs.exists("/adhoc/matches.index.dates.npy")
+            assert load_index(matches_path) is not None
+            assert get_top_journals(matches_path, k=1) == [("psychopharmacology", 2)]
+            assert get_first_mentioned_drugs(matches_path, end="2019-01-01") == [("diphenhydramine", "2019-01-01")]
+            assert get_journal_with_most_drug_mentions(matches_path, use_index=False)["journal"] == "psychopharmacology"
+    finally:
+        fs.rm("/adhoc", recursive=True)
@@ -0,0 +1,100 @@
+import os
+import json
+import shutil
+import threading
+import pytest
+from tempfile import TemporaryDirectory
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from src.adhoc.server import LRUCache, MatchesStore, create_server
+from tests.data.adhoc import TEST_ADHOC_DATA_DIR
+
+MATCHES = [
+    {"drug": "a", "title": "title 1", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+    {"drug": "a", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-01-01"},
+    {"drug": "b", "title": "journal 1", "ref_type": "journal", "date_mention": "2020-03-01"},
+    {"drug": "b", "title": "journal 2", "ref_type": "journal", "date_mention": "2019-12-01"},
+]
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_store_queries_and_reload():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        with open(matches_path, "w", encoding="utf-8") as f:
+            json.dump(MATCHES, f)
+        store = MatchesStore(matches_path)
+
+        assert store.query("/top-journals", {"k": "1"}) == [{"journal": "journal 1", "n_drugs": 2}]
+        assert store.query("/journal-drugs", {"journal": "journal 1"}) == ["a", "b"]
+        assert store.query("/drug-journals", {"drug": "b"}) == ["journal 1", "journal 2"]
+        mentions = store.query("/mentions", {"start": "2020-01-01", "end": "2020-02-01"})
+        assert mentions["count"] == 2
+        assert store.query("/mentions", {"drug": "b", "ref_type": "journal", "limit": "1"}) == {
+            "count": 2,
+            "mentions": [{"drug": "b", "title": "journal 2", "ref_type": "journal", "date_mention": "2019-12-01"}]
+        }
+        assert store.query("/top-journals", {"k": "1", "end": "2019-12-31"}) == [{"journal": "journal 2", "n_drugs": 1}]
+        assert store.query("/drug-timeline", {"drug": "b", "start": "2020-01-01"}) == [
+            {"date_mention": "2020-03-01", "ref_type": "journal", "count": 1}
+        ]
+        store.query("/top-journals", {"k": "1"})
+        assert store.cache.hits == 1
+
+        with open(matches_path, "w", encoding="utf-8") as f:
+            json.dump(MATCHES[:2], f)
+        os.utime(matches_path, ns=(0, os.stat(matches_path).st_mtime_ns + 1_000_000))
+        assert store.query("/top-journals", {"k": "1"}) == [{"journal": "journal 1", "n_drugs": 1}]
+        assert store.n_reloads == 2
+
+        with pytest.raises(ValueError):
+            store.query("/journal-drugs", {})
+        with pytest.raises(ValueError):
+            store.query("/mentions", {"start": "foo"})
+        with pytest.raises(KeyError):
+            store.query("/unknown", {})
+
+
+def test_server_http():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        shutil.copy(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), matches_path)
+        server = create_server(matches_path, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = "http://{}:{}".format(*server.server_address)
+            with urlopen(f"{url}/top-journals?k=1") as response:
+                assert json.load(response) == [{"journal": "psychopharmacology", "n_drugs": 2}]
+            with urlopen(f"{url}/journal-drugs?journal=psychopharmacology") as response:
+                assert json.load(response) == ["ethanol", "tetracycline"]
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{url}/unknown")
+            assert error.value.code == 404
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{url}/drug-journals")
+            assert error.value.code == 400
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_server_unix_socket_path():
+    with TemporaryDirectory() as tmp_dir:
+        matches_path = os.path.join(tmp_dir, "matches.json")
+        shutil.copy(os.path.join(TEST_ADHOC_DATA_DIR, "matches.json"), matches_path)
+        # a file other than a socket is never removed
+        with pytest.raises(ValueError):
+            create_server(matches_path, unix_socket=matches_path)
+        assert os.path.exists(matches_path)
@@ -0,0 +1,39 @@
+import pytest
+from src.benchmark.main import run_benchmark, compare_to_baseline, measure_cold_start
+
+SCALE = {"n_drugs": 10, "n_pubmed_csv": 50, "n_pubmed_json": 50, "n_clinical": 20}
+
+
+def test_run_benchmark():
+    results = run_benchmark(scale=SCALE, end_to_end=False)
+    assert results["scale"] == SCALE
+    assert results["stages"]["load_csv[pubmed]"]["rows_out"] == 50
+    for stage in ["DataCleaner[pubmed_csv]", "DataMatcher[pubmed]", "DataAggregator", "save_json"]:
+        assert results["stages"][stage]["wall_time_s"] > 0
+
+
+def test_run_benchmark_compare_cleaning():
+    results = run_benchmark(scale=SCALE, end_to_end=False, compare_cleaning=True, trace_allocations=True)
+    for dataset in ["drugs", "pubmed_csv", "pubmed_json", "clinical"]:
+        vectorized = results["stages"][f"DataCleaner[{dataset}][vectorized]"]
+        assert vectorized["rows_out"] == results["stages"][f"DataCleaner[{dataset}]"]["rows_out"]
+        assert vectorized["alloc_peak_bytes"] > 0
+
+
+def test_compare_to_baseline():
+    baseline = {"scale": SCALE, "stages": {"save_json": {"wall_time_s": 1.0}, "DataAggregator": {"wall_time_s": 1.0}}}
+    results = {"scale": SCALE, "stages": {"save_json": {"wall_time_s": 1.1}, "DataAggregator": {"wall_time_s": 1.5}}}
+    comparison = {row["stage"]: row for row in compare_to_baseline(results, baseline, tolerance=0.2)}
+    assert not comparison["save_json"]["regression"]
+    assert comparison["DataAggregator"]["regression"]
+
+
+def test_compare_to_baseline_other_scale():
+    with pytest.raises(ValueError):
+        compare_to_baseline({"scale": SCALE, "stages": {}}, {"scale": {"n_drugs": 1}, "stages": {}}, tolerance=0.2)
+
+
+def test_measure_cold_start():
+    cold_start = measure_cold_start(repeat=1)
+    assert set(cold_start) == {"cli", "prefect"}
+    assert all(wall_time > 0 for wall_time in cold_start.values())
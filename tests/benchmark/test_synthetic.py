@@ -0,0 +1,43 @@
+import os
+import pandas as pd
+from tempfile import TemporaryDirectory
+from src.benchmark.synthetic import SyntheticDataGenerator, SEED_DRUGS
+
+
+def test_generate_drugs():
+    df_drugs = SyntheticDataGenerator(n_drugs=100, n_pubmed_csv=0, n_pubmed_json=0, n_clinical=0).generate_drugs()
+    assert len(df_drugs) == 100
+    assert df_drugs["drug"].is_unique
+    assert df_drugs["atccode"].is_unique
+    assert list(df_drugs["drug"].iloc[:len(SEED_DRUGS)]) == [drug for _, drug in SEED_DRUGS]
+
+
+def test_write_deterministic():
+    generator = SyntheticDataGenerator(
+        n_drugs=20, n_pubmed_csv=30, n_pubmed_json=20, n_clinical=10, seed=7, chunk_size=8)
+    with TemporaryDirectory() as tmp_dir:
+        first_paths = generator.write(os.path.join(tmp_dir, "first"))
+        second_paths = SyntheticDataGenerator(
+            n_drugs=20, n_pubmed_csv=30, n_pubmed_json=20, n_clinical=10, seed=7, chunk_size=8
+        ).write(os.path.join(tmp_dir, "second"))
+        for name, path in first_paths.items():
+            with open(path, "rb") as first, open(second_paths[name], "rb") as second:
+                assert first.read() == second.read()
+
+        df_pubmed_csv = pd.read_csv(first_paths["path_to_pubmed_csv"])
+        df_pubmed_json = pd.read_json(first_paths["path_to_pubmed_json"])
+        df_clinical = pd.read_csv(first_paths["path_to_clinical_trials"])
+
+    assert list(df_pubmed_csv.columns) == ["id", "title", "date", "journal"]
+    assert list(df_clinical.columns) == ["id", "scientific_title", "date", "journal"]
+    assert (len(df_pubmed_csv), len(df_pubmed_json), len(df_clinical)) == (30, 20, 10)
+    assert df_pubmed_json["id"].astype(int).min() > 30
+    assert df_clinical["id"].str.startswith("NCT").all()
+
+
+def test_titles_mention_drugs():
+    generator = SyntheticDataGenerator(
+        n_drugs=10, n_pubmed_csv=0, n_pubmed_json=0, n_clinical=0, mention_rate=1.0)
+    titles = generator._generate_titles(generator._rng(2), 50)
+    drugs = [drug.lower() for drug in generator.drug_names]
+    assert all(any(drug in title.lower() for drug in drugs) for title in titles)
@@ -0,0 +1,52 @@
+import json
+import os
+import typing
+import pytest
+from dataclasses import fields, MISSING
+from tempfile import TemporaryDirectory
+from src.config.deploy_config import DeployConfig
+from src.config.run_config import RunConfig, ENGINES, EXECUTION_MODES, PROFILING_MODES
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
+
+PATHS = {**TEST_TASK_INPUT_PATHS, "path_to_output_matching": "matches.json"}
+
+
+
+def test_parity_with_deploy_config():
+    run_fields = {field.name: field for field in fields(RunConfig)}
+    assert list(run_fields) == list(DeployConfig.model_fields)
+    for name, deploy_field in DeployConfig.model_fields.items():
+        default = run_fields[name].default
+        assert (default is MISSING) == deploy_field.is_required()
+        if not deploy_field.is_required():
+            assert default == deploy_field.default
+    assert typing.get_args(DeployConfig.model_fields["engine"].annotation) == ENGINES
+    assert typing.get_args(DeployConfig.model_fields["execution_mode"].annotation) == EXECUTION_MODES
+    profiling_mode = typing.get_args(DeployConfig.model_fields["profiling_mode"].annotation)[0]
+    assert typing.get_args(profiling_mode) == PROFILING_MODES
+
+
+def test_from_dict():
+    r_config = RunConfig.from_dict({"d_config": {**PATHS, "engine": "polars"}})
+    assert r_config.engine == "polars"
+    assert RunConfig.from_dict(PATHS) == RunConfig(**PATHS)
+    with pytest.raises(ValueError):
+        RunConfig.from_dict({**PATHS, "unknown": 1})
+    with pytest.raises(ValueError):
+        RunConfig.from_dict({"path_to_drugs": "drugs.csv"})
+    with pytest.raises(ValueError):
+        RunConfig.from_dict({**PATHS, "engine": "spark"})
+    with pytest.raises(ValueError):
+        RunConfig.from_dict({**PATHS, "profiling_mode": "perf"})
+    with pytest.raises(ValueError):
+        RunConfig.from_dict({**PATHS, "execution_mode": "parallel"})
+
+
+def test_from_file():
+    with TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({**PATHS, "enable_instrumentation": True}, f)
+        r_config = RunConfig.from_file(config_path)
+    assert r_config.enable_instrumentation
+    assert DeployConfig(**PATHS, enable_instrumentation=True).model_dump() == r_config.__dict__
@@ -1,3 +1,11 @@
 import os
 
 TEST_TASK_INPUT_DATA_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Input paths of a pipeline run over the task inputs
+TEST_TASK_INPUT_PATHS = {
+    "path_to_drugs": os.path.join(TEST_TASK_INPUT_DATA_DIR, "drugs.csv"),
+    "path_to_pubmed_csv": os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv"),
+    "path_to_pubmed_json": os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.json"),
+    "path_to_clinical_trials": os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv"),
+}
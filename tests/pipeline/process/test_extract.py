@@ -1,8 +1,11 @@
+import io
 import os
+import json
 import pandas as pd
 import pytest
 import pandas.testing as pdt
-from src.pipeline.process.extract import load_json, load_csv
+from tempfile import TemporaryDirectory
+from src.pipeline.process.extract import iter_json, iter_json_records, load_json, load_csv
 from tests.data.pipeline.process.extract import PROCESS_EXTRACT_DATA_TEST_DIR
 
 # load_json tests
@@ -23,6 +26,37 @@ def test_load_json_malformed():
     with pytest.raises(Exception):
         load_json(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "malformed.json"))
 
+# iter_json tests
+
+def test_iter_json_records():
+    records = [{"id": i, "title": "title é" * i} for i in range(1000)]
+    content = json.dumps(records, indent=4, ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_records(io.BytesIO(content))) == records
+    assert list(iter_json_records(io.BytesIO(b" [ ] "))) == []
+    assert 0 < len(list(iter_json_records(io.BytesIO(content), max_bytes=2 ** 16))) < len(records)
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.BytesIO(content[:-100])))
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.BytesIO(b'{"key1": {"0": "value11"}}')))
+
+
+def test_iter_json():
+    path = os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "valid.json")
+    dfs = list(iter_json(path, chunk_size=1))
+    assert [len(df) for df in dfs] == [1, 1]
+    pdt.assert_frame_equal(load_json(path), pd.concat(dfs, ignore_index=True))
+
+    with TemporaryDirectory() as tmp_dir:
+        # JSON content other than arrays of records is loaded at once
+        path = os.path.join(tmp_dir, "columns.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"key1": {"0": "value11", "1": "value21"}}, f)
+        [df] = iter_json(path, chunk_size=1)
+        pdt.assert_frame_equal(load_json(path), df)
+
+    with pytest.raises(Exception):
+        list(iter_json(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "malformed.json"), chunk_size=1))
+
 # load_csv tests
 
 def test_load_csv_success():
@@ -1,8 +1,8 @@
 import os
 import json
 import pytest
-from tempfile import NamedTemporaryFile
-from src.pipeline.process.load import save_json
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from src.pipeline.process.load import JsonArrayWriter, save_json
 
 def test_save_json_success():
     data = [{"key": "value"}, {"key2": "value2"}]
@@ -22,3 +22,22 @@ def test_save_json_unserializable():
     with pytest.raises(ValueError):
         save_json(data, tmp_path)
     os.unlink(tmp_path)
+
+def test_json_array_writer():
+    data = [{"key": "value"}, {"key2": "value2"}]
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "matches.json")
+        with JsonArrayWriter(path) as writer:
+            for entry in data:
+                writer.write(entry)
+        with open(path, "r", encoding="utf-8") as f:
+            assert json.load(f) == data
+
+        # a failed write leaves the previous output as it was
+        with pytest.raises(ValueError):
+            with JsonArrayWriter(path) as writer:
+                writer.write({"key": "new value"})
+                writer.write({"a": {1, 2, 3}})
+        with open(path, "r", encoding="utf-8") as f:
+            assert json.load(f) == data
+        assert os.listdir(tmp_dir) == ["matches.json"]
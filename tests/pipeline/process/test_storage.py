@@ -0,0 +1,150 @@
+import os
+import json
+import pytest
+import pandas as pd
+import pandas.testing as pdt
+from tempfile import TemporaryDirectory
+import src.pipeline.process.storage as storage
+from src.pipeline.process.extract import iter_csv, load_csv, load_json
+from src.pipeline.process.load import JsonArrayWriter, save_json
+from src.pipeline.process.storage import BlockCache, ObjectReader, configure_storage, is_url, read_object
+from tests.data.pipeline.process.extract import PROCESS_EXTRACT_DATA_TEST_DIR
+
+fsspec = pytest.importorskip("fsspec")
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    # the in-memory filesystem stands in for the bucket, with a cache of its own for each test
+    monkeypatch.setattr(storage, "_CACHE", None)
+    fs = fsspec.filesystem("memory")
+    with TemporaryDirectory() as tmp_dir:
+        configure_storage(cache_directory=tmp_dir)
+        yield fs
+    fs.rm("/bucket", recursive=True)
+
+
+def test_is_url():
+    assert is_url("gs://bucket/pubmed.csv")
+    assert is_url("memory://bucket/pubmed.csv")
+    assert is_url("file:///data/pubmed.csv")
+    assert not is_url("/data/pubmed.csv")
+    assert not is_url("data/pubmed.csv")
+
+
+def test_read_object(bucket):
+    content = bytes(range(256)) * 4
+    bucket.pipe("/bucket/object.bin", content)
+    with TemporaryDirectory() as tmp_dir:
+        cache = BlockCache(tmp_dir)
+        assert read_object("memory://bucket/object.bin", block_size=100, max_workers=4, cache=cache) == content
+        assert (cache.hits, cache.misses) == (0, 11)
+        assert read_object("memory://bucket/object.bin", block_size=100, max_workers=4, cache=cache) == content
+        assert (cache.hits, cache.misses) == (11, 11)
+
+        # a modified object is a new version, fetched again
+        bucket.pipe("/bucket/object.bin", content[::-1])
+        assert read_object("memory://bucket/object.bin", block_size=100, max_workers=4, cache=cache) == content[::-1]
+        assert (cache.hits, cache.misses) == (11, 22)
+
+        with pytest.raises(FileNotFoundError):
+            read_object("memory://bucket/missing.bin", cache=cache)
+
+    uncached = BlockCache(max_bytes=0)
+    assert read_object("memory://bucket/object.bin", block_size=100, cache=uncached) == content[::-1]
+    assert uncached.size() == 0
+
+
+def test_object_reader(bucket):
+    content = b"".join(f"{i},title {i}\n".encode("utf-8") for i in range(100_000))
+    bucket.pipe("/bucket/object.csv", b"id,title\n" + content)
+    with TemporaryDirectory() as tmp_dir:
+        cache = BlockCache(tmp_dir)
+        with ObjectReader("memory://bucket/object.csv", block_size=2 ** 16, max_workers=2, cache=cache) as reader:
+            # the object is streamed, only the blocks read so far and the ones fetched ahead being requested
+            chunks = pd.read_csv(reader, iterator=True)
+            assert len(chunks.get_chunk(5)) == 5
+            assert cache.misses <= reader.n_blocks + 2 < 10 < -(-reader.size // reader.block_size)
+            assert len(pd.concat([chunk for chunk in chunks])) == 99_995
+
+            reader.seek(9)
+            assert reader.read(7) == b"0,title"
+            reader.seek(-2, os.SEEK_END)
+            assert reader.read() == b"9\n"
+
+
+def test_block_cache_eviction():
+    with TemporaryDirectory() as tmp_dir:
+        cache = BlockCache(tmp_dir, max_bytes=100)
+        cache.put("a", b"a" * 40)
+        cache.put("b", b"b" * 40)
+        os.utime(cache._path("a"), (1, 1))
+        os.utime(cache._path("b"), (2, 2))
+        # a hit makes "a" the most recently used block, "b" being evicted first
+        assert cache.get("a") == b"a" * 40
+        cache.put("c", b"c" * 40)
+        assert cache.get("b") is None
+        assert cache.get("c") == b"c" * 40
+        assert cache.size() == 80
+
+        cache.put("d", b"d" * 200)
+        assert cache.get("d") is None
+
+
+def test_load_from_object_store(bucket):
+    for name in ["valid.csv", "valid.json"]:
+        with open(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, name), "rb") as f:
+            bucket.pipe(f"/bucket/{name}", f.read())
+
+    pdt.assert_frame_equal(
+        load_csv(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "valid.csv")), load_csv("memory://bucket/valid.csv"))
+    pdt.assert_frame_equal(
+        load_json(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "valid.json")), load_json("memory://bucket/valid.json"))
+    assert len(pd.concat(iter_csv("memory://bucket/valid.csv", chunk_size=1))) == 2
+    # a local directory stands in for the bucket as well
+    pdt.assert_frame_equal(
+        load_csv(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "valid.csv")),
+        load_csv("file://" + os.path.abspath(os.path.join(PROCESS_EXTRACT_DATA_TEST_DIR, "valid.csv"))))
+    assert storage.block_cache().hits > 0
+    with pytest.raises(FileNotFoundError):
+        load_csv("memory://bucket/missing.csv")
+
+
+def test_save_to_object_store(bucket):
+    data = [{"drug": "atropine", "ref_type": "pubmed_publication"}, {"drug": "ethanol", "ref_type": "journal"}]
+    save_json(data, "memory://bucket/output/matches.json")
+    with JsonArrayWriter("memory://bucket/output/streamed.json") as writer:
+        for entry in data:
+            writer.write(entry)
+
+    assert json.loads(bucket.cat_file("/bucket/output/matches.json")) == data
+    assert bucket.cat_file("/bucket/output/streamed.json") == bucket.cat_file("/bucket/output/matches.json")
+
+    with pytest.raises(ValueError):
+        with JsonArrayWriter("memory://bucket/output/streamed.json") as writer:
+            writer.write({"a": {1, 2, 3}})
+    assert json.loads(bucket.cat_file("/bucket/output/streamed.json")) == data
+    assert not bucket.exists("/bucket/output/streamed.json.tmp")
+
+
+def test_run_from_object_store(bucket):
+    from src.config.run_config import RunConfig
+    from src.pipeline.runner import run_pipeline
+    from tests.data.pipeline.task.input import TEST_TASK_INPUT_DATA_DIR
+    from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+    for name in ["drugs.csv", "pubmed.csv", "pubmed.json", "clinical_trials.csv"]:
+        with open(os.path.join(TEST_TASK_INPUT_DATA_DIR, name), "rb") as f:
+            bucket.pipe(f"/bucket/input/{name}", f.read())
+    with TemporaryDirectory() as tmp_dir:
+        run_pipeline(RunConfig(
+            path_to_drugs="memory://bucket/input/drugs.csv", path_to_pubmed_csv="memory://bucket/input/pubmed.csv",
+            path_to_pubmed_json="memory://bucket/input/pubmed.json",
+            path_to_clinical_trials="memory://bucket/input/clinical_trials.csv",
+            path_to_output_matching="memory://bucket/output/matches.json", storage_cache_directory=tmp_dir))
+        assert storage.block_cache().directory == tmp_dir
+
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+    assert json.loads(bucket.cat_file("/bucket/output/matches.json")) == matches_expected
+    assert bucket.exists("/bucket/output/matches.index.json")
@@ -0,0 +1,131 @@
+import os
+import json
+import pytest
+from tempfile import TemporaryDirectory
+from src.config.run_config import RunConfig
+from src.pipeline.instrumentation import RunRecorder
+from src.pipeline.process.table import MatchTable
+from src.pipeline.runner import run_pipeline
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
+from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+pytest.importorskip("pyarrow")
+
+MATCHES = [
+    {"drug": "atropine", "title": "a title", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+    {"drug": "ethanol", "title": "another title", "ref_type": "clinical_publication", "date_mention": "2020-01-02"},
+    {"drug": "ethanol", "title": "journal of emergency nursing", "ref_type": "journal", "date_mention": float("nan")},
+]
+
+
+def _sorted(matches):
+    return sorted(matches, key=lambda match: json.dumps(match, sort_keys=True))
+
+
+def test_upsert_and_time_travel():
+    with TemporaryDirectory() as tmp_dir:
+        table = MatchTable(os.path.join(tmp_dir, "matches"))
+        assert table.version() is None and table.read() == []
+
+        assert table.upsert(MATCHES) == 0
+        expected = [{**match, "date_mention": None} if match["ref_type"] == "journal" else match for match in MATCHES]
+        assert _sorted(table.read()) == _sorted(expected)
+
+        # unchanged matches are not written again
+        assert table.upsert(MATCHES[:2]) == 0
+        assert table.last_metrics["unchanged"] == 2
+
+        update = {**MATCHES[0], "distance": 1}
+        new = {**MATCHES[0], "date_mention": "2021-05-05"}
+        assert table.upsert([update, new]) == 1
+        assert table.last_metrics["inserted"] == 1 and table.last_metrics["updated"] == 1
+        assert _sorted(table.read()) == _sorted([update, new] + expected[1:])
+        assert _sorted(table.read(version=0)) == _sorted(expected)
+
+        # appends leave existing matches as they are
+        assert table.append([MATCHES[0]]) == 1
+        assert table.append([{**MATCHES[1], "date_mention": "2022-01-01"}]) == 2
+        assert len(table.read()) == 5
+        assert [commit["operation"] for commit in table.history()] == ["upsert", "upsert", "append"]
+
+        with pytest.raises(ValueError):
+            table.read(version=7)
+
+
+def test_upsert_prunes_files_by_date():
+    with TemporaryDirectory() as tmp_dir:
+        table = MatchTable(tmp_dir)
+        for day in range(1, 6):
+            table.upsert([{**MATCHES[0], "title": f"title {i}", "date_mention": f"2020-01-0{day}"} for i in range(3)])
+        table.upsert([{**MATCHES[0], "title": "title 0", "date_mention": "2020-01-03", "distance": 2}])
+        # only the file of the updated day is read and rewritten, along with the file of the updated match
+        assert table.last_metrics == {
+            "inserted": 0, "updated": 1, "unchanged": 0, "files_read": 1, "files_added": 2, "files_removed": 1
+        }
+        assert len(table.snapshot()) == 6 and len(table.read()) == 15
+
+
+def test_compact_and_vacuum():
+    with TemporaryDirectory() as tmp_dir:
+        table = MatchTable(tmp_dir)
+        for day in range(1, 4):
+            table.append([{**MATCHES[1], "date_mention": f"2020-01-0{day}"}])
+        matches = table.read()
+        assert table.compact(small_file_rows=10) == 3
+        assert len(table.snapshot()) == 1
+        assert _sorted(table.read()) == _sorted(matches)
+        assert table.compact(small_file_rows=10) is None
+
+        # files replaced by compaction are kept until vacuumed, so that previous versions remain readable
+        assert len(table.read(version=2)) == 3
+        # files written within the retention period may not be committed yet, so they are kept
+        assert table.vacuum(retain_versions=1) == []
+        uncommitted = os.path.join(tmp_dir, "part-00004-uncommitted.parquet")
+        with open(uncommitted, "wb"):
+            pass
+        for name in os.listdir(tmp_dir):
+            if name.endswith(".parquet") and name != os.path.basename(uncommitted):
+                past = os.path.getmtime(os.path.join(tmp_dir, name)) - 7200
+                os.utime(os.path.join(tmp_dir, name), (past, past))
+        assert len(table.vacuum(retain_versions=1)) == 3
+        assert os.path.exists(uncommitted)
+        assert len(table.vacuum(retain_versions=1, retain_seconds=0)) == 1
+        assert len([name for name in os.listdir(tmp_dir) if name.endswith(".parquet")]) == 1
+        with pytest.raises(ValueError):
+            table.vacuum(retain_seconds=-1)
+
+        table.overwrite(MATCHES[:1])
+        assert table.read() == MATCHES[:1]
+
+
+def test_concurrent_commit():
+    with TemporaryDirectory() as tmp_dir:
+        table = MatchTable(tmp_dir)
+        table.upsert(MATCHES[:1])
+        with pytest.raises(RuntimeError):
+            table._commit(0, "upsert", [], [], {})
+
+
+def test_run_with_match_table():
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+
+    with TemporaryDirectory() as tmp_dir:
+        table_path = os.path.join(tmp_dir, "matches")
+        config = RunConfig(**TEST_TASK_INPUT_PATHS, path_to_output_matching=table_path, output_format="table")
+        run_pipeline(config)
+        assert _sorted(MatchTable(table_path).read()) == _sorted(matches_expected)
+
+        # a rerun over the same inputs does not write anything
+        with RunRecorder(trace_allocations=False) as recorder:
+            run_pipeline(config)
+        assert MatchTable(table_path).version() == 0
+        [event] = [event for event in recorder.events if event["event"] == "match_table"]
+        assert event["unchanged"] == len(matches_expected) and event["files_added"] == 0
+
+        with pytest.raises(ValueError):
+            run_pipeline(RunConfig(
+                **TEST_TASK_INPUT_PATHS, path_to_output_matching=table_path, output_format="table",
+                execution_mode="pipelined"))
+    with pytest.raises(ValueError):
+        RunConfig(**TEST_TASK_INPUT_PATHS, path_to_output_matching="matches", output_format="parquet")
@@ -53,3 +53,18 @@ def test_pipeline_call(cleaner, sample_df):
     assert df['text_col'].iloc[0] == 'hello world'
     assert df['text_col'].iloc[1] == 'foo bar'
     assert df['id'].str.startswith('prefix_').all()
+
+def test_clean_vectorized(cleaner, sample_df):
+    df = pd.concat([sample_df, sample_df.assign(text_col="Duplicate"), pd.DataFrame({
+        'id': [4, 5], 'date': [None, 'not a date'], 'text_col': [' Été\tÀ ', None], 'drop_col': ['keep', 'keep']
+    })], ignore_index=True)
+    raw = df.copy()
+    result = cleaner.clean_vectorized(df)
+    pd.testing.assert_frame_equal(raw, df)  # input is left unchanged
+    pd.testing.assert_frame_equal(cleaner(df.copy()), result)
+    assert result['id'].tolist() == ['prefix_1', 'prefix_3', 'prefix_4', 'prefix_5']
+    assert result['text_col'].tolist()[2:] == ['t', None]
+
+def test_clean_vectorized_missing_column(cleaner, sample_df):
+    with pytest.raises(ValueError):
+        cleaner.clean_vectorized(sample_df.drop(columns=['drop_col']))
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from src.config.build_config import COLS_DEDUP_MAPPING
+from src.pipeline.process.transform.deduplicating import PublicationDeduplicator
+
+
+@pytest.fixture
+def df_pubmed():
+    return pd.DataFrame({
+        "id": ["pubmed_1", "pubmed_2", "pubmed_3", "pubmed_4", "pubmed_5"],
+        "title": [
+            "time to epinephrine treatment is associated with the risk of mortality in children",
+            "time to epinephrine treatment is associated with the risk of mortality in children",
+            "time to epinephrine treatment is associated with the risk of mortality in children",
+            "time to epinephrine treatment is associated with the risk of mortality in kids",
+            "appositional tetracycline bone formation rates in the beagle",
+        ],
+        "date": ["2020-01-03", "2020-01-03", "2020-01-04", "2020-01-03", "2020-02-01"],
+        "journal": ["Journal of pediatrics", "Journal of pediatrics ", "Journal of pediatrics",
+                    "Journal of pediatrics", "American journal of veterinary research"],
+    })
+
+
+# test drop_exact_duplicates
+
+def test_drop_exact_duplicates(df_pubmed):
+    deduplicator = PublicationDeduplicator(**COLS_DEDUP_MAPPING["pubmed"])
+    df_result = deduplicator(df=df_pubmed)
+    assert df_result["id"].tolist() == ["pubmed_1", "pubmed_3", "pubmed_4", "pubmed_5"]
+    assert deduplicator.report() == {
+        "data_source": "pubmed", "rows_in": 5, "exact_duplicates": 1, "near_duplicates": 0, "rows_saved": 1
+    }
+
+
+def test_drop_exact_duplicates_across_calls(df_pubmed):
+    deduplicator = PublicationDeduplicator(**COLS_DEDUP_MAPPING["pubmed"])
+    deduplicator(df=df_pubmed.iloc[:1])
+    df_result = deduplicator(df=df_pubmed.iloc[1:])
+    assert df_result["id"].tolist() == ["pubmed_3", "pubmed_4", "pubmed_5"]
+    assert deduplicator.report()["rows_in"] == 5
+
+
+def test_drop_exact_duplicates_missing_column(df_pubmed):
+    deduplicator = PublicationDeduplicator(**COLS_DEDUP_MAPPING["clinical"])
+    with pytest.raises(ValueError, match="not found in the dataframe"):
+        deduplicator(df=df_pubmed)
+
+
+# test drop_near_duplicates
+
+def test_drop_near_duplicates(df_pubmed):
+    deduplicator = PublicationDeduplicator(**COLS_DEDUP_MAPPING["pubmed"], near_duplicates=True)
+    df_result = deduplicator(df=df_pubmed)
+    # the near duplicate title of another date is kept
+    assert df_result["id"].tolist() == ["pubmed_1", "pubmed_3", "pubmed_5"]
+    assert deduplicator.report()["near_duplicates"] == 1
+    assert deduplicator.report()["rows_saved"] == 2
+
+
+def test_drop_near_duplicates_threshold(df_pubmed):
+    deduplicator = PublicationDeduplicator(
+        **COLS_DEDUP_MAPPING["pubmed"], near_duplicates=True, similarity_threshold=1.0)
+    assert len(deduplicator(df=df_pubmed)) == 4
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        PublicationDeduplicator(**COLS_DEDUP_MAPPING["pubmed"], num_perm=64, bands=10)
+    with pytest.raises(ValueError):
+        PublicationDeduplicator(**COLS_DEDUP_MAPPING["pubmed"], similarity_threshold=0)
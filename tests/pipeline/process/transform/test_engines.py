@@ -0,0 +1,151 @@
+import os
+import pytest
+import pandas as pd
+import pandas.testing as pdt
+from tempfile import TemporaryDirectory
+from src.config.build_config import COLS_CLEAN_MAPPING, COLS_DEDUP_MAPPING, COLS_MATCH_MAPPING
+from src.benchmark.synthetic import SyntheticDataGenerator
+from src.pipeline.process.transform.engines import ENGINES as ENGINE_MODULES, get_engine
+from src.pipeline.process.transform.cleaning import DataCleaner
+from src.pipeline.process.transform.deduplicating import PublicationDeduplicator
+from src.pipeline.process.transform.matching import DataMatcher
+from src.pipeline.process.transform.utils import concatenate_dataframe_list
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_DATA_DIR
+
+ENGINES = ["pandas_vectorized", "polars", "duckdb"]
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    with TemporaryDirectory() as tmp_dir:
+        paths = SyntheticDataGenerator(
+            n_drugs=30, n_pubmed_csv=300, n_pubmed_json=200, n_clinical=100, noise_rate=0.1, chunk_size=120
+        ).write(tmp_dir)
+        synthetic = {
+            "drugs": pd.read_csv(paths["path_to_drugs"]),
+            "pubmed_csv": pd.read_csv(paths["path_to_pubmed_csv"]),
+            "pubmed_json": pd.read_json(paths["path_to_pubmed_json"]),
+            "clinical": pd.read_csv(paths["path_to_clinical_trials"]),
+        }
+    fixtures = {
+        "drugs": pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "drugs.csv")),
+        "pubmed_csv": pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv")),
+        "pubmed_json": pd.read_json(os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.json")),
+        "clinical": pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv")),
+    }
+    return {"fixtures": fixtures, "synthetic": synthetic}
+
+
+def clean(dfs, engine):
+    pubmed_cleaner = DataCleaner(**COLS_CLEAN_MAPPING["pubmed"], engine=engine)
+    return {
+        "drugs": DataCleaner(**COLS_CLEAN_MAPPING["drugs"], engine=engine)(dfs["drugs"].copy()),
+        "pubmed": concatenate_dataframe_list(
+            [pubmed_cleaner(dfs["pubmed_json"].copy()), pubmed_cleaner(dfs["pubmed_csv"].copy())], engine=engine),
+        "clinical": DataCleaner(**COLS_CLEAN_MAPPING["clinical"], engine=engine)(dfs["clinical"].copy()),
+    }
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("dataset", ["fixtures", "synthetic"])
+def test_engine_cleaning_equality(inputs, engine, dataset):
+    pytest.importorskip(ENGINE_MODULES[engine][2])
+    expected = clean(inputs[dataset], "pandas")
+    result = clean(inputs[dataset], engine)
+    for source in expected:
+        pdt.assert_frame_equal(expected[source], result[source], check_dtype=False)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("dataset", ["fixtures", "synthetic"])
+def test_engine_matching_equality(inputs, engine, dataset):
+    pytest.importorskip(ENGINE_MODULES[engine][2])
+    cleaned = clean(inputs[dataset], "pandas")
+    for mapping, source in [("drugs_clinical", "clinical"), ("drugs_pubmed", "pubmed")]:
+        expected = DataMatcher(**COLS_MATCH_MAPPING[mapping])(cleaned["drugs"], cleaned[source])
+        result = DataMatcher(**COLS_MATCH_MAPPING[mapping], engine=engine)(cleaned["drugs"], cleaned[source])
+        assert expected
+        assert expected == result
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_missing_column(engine):
+    pytest.importorskip(ENGINE_MODULES[engine][2])
+    cleaner = DataCleaner(**COLS_CLEAN_MAPPING["pubmed"], engine=engine)
+    with pytest.raises(ValueError):
+        cleaner(pd.DataFrame({"title": ["a title"]}))
+
+
+def test_get_engine_unknown():
+    with pytest.raises(ValueError):
+        get_engine("unknown")
+
+
+def test_duckdb_pipeline_equality():
+    pytest.importorskip("duckdb")
+    from src.pipeline.process.transform.engines.duckdb_pipeline import DuckDBPipeline
+    from src.pipeline.process.transform.aggregating import DataAggregator
+
+    with TemporaryDirectory() as tmp_dir:
+        paths = SyntheticDataGenerator(
+            n_drugs=30, n_pubmed_csv=300, n_pubmed_json=200, n_clinical=100, noise_rate=0.1, chunk_size=120
+        ).write(tmp_dir)
+        dfs = {
+            "drugs": pd.read_csv(paths["path_to_drugs"]),
+            "pubmed_csv": pd.read_csv(paths["path_to_pubmed_csv"]),
+            "pubmed_json": pd.read_json(paths["path_to_pubmed_json"]),
+            "clinical": pd.read_csv(paths["path_to_clinical_trials"]),
+        }
+        cleaned = clean(dfs, "pandas")
+        expected = DataAggregator()([
+            DataMatcher(**COLS_MATCH_MAPPING["drugs_clinical"])(cleaned["drugs"], cleaned["clinical"]),
+            DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"])(cleaned["drugs"], cleaned["pubmed"])
+        ])
+
+        pipeline = DuckDBPipeline(threads=2, memory_limit="256MB", temp_directory=os.path.join(tmp_dir, "spill"))
+        pipeline.clean(DataCleaner(**COLS_CLEAN_MAPPING["drugs"]), [paths["path_to_drugs"]], "drugs")
+        pipeline.clean(
+            DataCleaner(**COLS_CLEAN_MAPPING["pubmed"]),
+            [paths["path_to_pubmed_json"], paths["path_to_pubmed_csv"]], "pubmed")
+        pipeline.clean(DataCleaner(**COLS_CLEAN_MAPPING["clinical"]), [paths["path_to_clinical_trials"]], "clinical")
+        pipeline.match(DataMatcher(**COLS_MATCH_MAPPING["drugs_clinical"]), "drugs", "clinical", "clinical_matches")
+        pipeline.match(DataMatcher(**COLS_MATCH_MAPPING["drugs_pubmed"]), "drugs", "pubmed", "pubmed_matches")
+        result = pipeline.aggregate(["clinical_matches", "pubmed_matches"])
+
+    assert expected
+    assert expected == result
+
+
+def test_duckdb_pipeline_deduplication():
+    pytest.importorskip("duckdb")
+    from src.pipeline.process.transform.engines.duckdb_pipeline import DuckDBPipeline
+
+    with TemporaryDirectory() as tmp_dir:
+        paths = SyntheticDataGenerator(n_drugs=10, n_pubmed_csv=0, n_pubmed_json=0, n_clinical=200, noise_rate=0.2)\
+            .write(tmp_dir)
+        df_clinical = pd.read_csv(paths["path_to_clinical_trials"])
+        # re-exported publications, with new ids and journals padded with spaces
+        df_clinical = pd.concat([df_clinical, df_clinical.iloc[:20].assign(
+            id=[f"NCTX{i}" for i in range(20)], journal=df_clinical["journal"].iloc[:20] + " ")])
+        df_clinical.to_csv(paths["path_to_clinical_trials"], index=False)
+        cleaned = DataCleaner(**COLS_CLEAN_MAPPING["clinical"])(df_clinical)
+        expected = PublicationDeduplicator(**COLS_DEDUP_MAPPING["clinical"])
+        df_expected = expected(df=cleaned)
+
+        pipeline = DuckDBPipeline(threads=2)
+        pipeline.clean(DataCleaner(**COLS_CLEAN_MAPPING["clinical"]), [paths["path_to_clinical_trials"]], "clinical")
+        result = PublicationDeduplicator(**COLS_DEDUP_MAPPING["clinical"])
+        pipeline.deduplicate(result, "clinical", "clinical_deduplicated")
+        ids = pipeline.connection.sql("SELECT id FROM clinical_deduplicated ORDER BY __pos").fetchall()
+
+    assert expected.report()["exact_duplicates"]
+    assert result.report() == expected.report()
+    assert [id_ for id_, in ids] == df_expected["id"].tolist()
+
+
+def test_duckdb_pipeline_unsupported_format():
+    pytest.importorskip("duckdb")
+    from src.pipeline.process.transform.engines.duckdb_pipeline import DuckDBPipeline
+
+    with pytest.raises(ValueError):
+        DuckDBPipeline().clean(DataCleaner(**COLS_CLEAN_MAPPING["drugs"]), ["drugs.xlsx"], "drugs")
@@ -0,0 +1,54 @@
+import pytest
+from src.pipeline.process.transform.fuzzy import FuzzyDrugMatcher, SymSpellIndex, canonicalize, deletes, edit_distance
+
+
+# test edit_distance
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("tetracycline", "tetracycline", 0),
+    ("tetracycline", "tetracylcine", 1),
+    ("epinephrine", "epinephrin", 1),
+    ("atropine", "atropina", 1),
+    ("atropine", "tropin", 2),
+    ("ethanol", "diphenhydramine", 3),
+])
+def test_edit_distance(a, b, expected):
+    assert edit_distance(a, b, max_distance=2) == expected
+
+
+def test_deletes():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert len(deletes("abc", 5)) == 8
+
+
+def test_canonicalize():
+    assert canonicalize("Beta-Methasone ") == "betamethasone"
+
+
+# test SymSpellIndex
+
+def test_symspell_index_lookup():
+    index = SymSpellIndex({"tetracycline": 2, "ethanol": 1, "atropine": 0})
+    assert index.lookup("tetracylcine") == {"tetracycline": 1}
+    assert index.lookup("methanol") == {"ethanol": 1}
+    assert index.lookup("atropina") == {}
+    assert index.lookup("atropine") == {"atropine": 0}
+
+
+# test FuzzyDrugMatcher
+
+def test_fuzzy_drug_matcher():
+    matcher = FuzzyDrugMatcher(["tetracycline", "betamethasone", "ethanol", "aspirin"], max_distance=2)
+    assert matcher.find("appositional tetracylcine bone formation") == {"tetracycline": 1}
+    assert matcher.find("effects of beta-methasone and beta methasone") == {"betamethasone": 0}
+    assert matcher.find("acute ethanol and methanol withdrawal") == {"ethanol": 0}
+    # the closest mention of a drug is kept
+    assert matcher.find("asprin and aspirin") == {"aspirin": 0}
+    assert matcher.find("asprin") == {"aspirin": 1}
+    assert matcher.find("aspen") == {}
+
+
+def test_fuzzy_drug_matcher_exact():
+    matcher = FuzzyDrugMatcher(["tetracycline"], max_distance=0)
+    assert matcher.find("tetracylcine") == {}
+    assert matcher.find("tetracycline-resistant strains") == {"tetracycline": 0}
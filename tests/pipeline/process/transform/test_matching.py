@@ -117,3 +117,34 @@ def test___call___(matcher, df_drugs, df_publications):
     assert 'Aspirin' in drugs
     assert 'Ibuprofen' in drugs
     assert 'Paracetamol' in drugs
+
+
+def test___call___fuzzy(df_drugs, df_publications):
+    matcher = DataMatcher(
+        drug_col_name='drug', pub_title_col_name='title', journal_col_name='journal', date_col_name='date',
+        data_source='test_source', fuzzy_max_distance=1
+    )
+    df_publications.loc[3, 'title'] = 'Ibuprofn in treatment'
+    results = matcher(df_drugs, df_publications)
+    publications = [(d['drug'], d['title'], d['distance']) for d in results if d['ref_type'] != 'journal']
+    assert publications == [
+        ('Aspirin', 'Aspirin reduces fever', 0),
+        ('Aspirin', 'Ibuprofen and Aspirin combo', 0),
+        ('Ibuprofen', 'Ibuprofn in treatment', 1),
+        ('Ibuprofen', 'Ibuprofen and Aspirin combo', 0),
+        ('Paracetamol', 'Paracetamol and its effects', 0),
+    ]
+    assert {'drug': 'Ibuprofen', 'title': 'Medical Reports', 'ref_type': 'journal', 'date_mention': '2022-03-10',
+            'distance': 1} in results
+
+
+@pytest.mark.parametrize("engine", ["pandas", "polars"])
+def test___call___prefilter(engine, df_drugs, df_publications):
+    kwargs = dict(
+        drug_col_name='drug', pub_title_col_name='title', journal_col_name='journal', date_col_name='date',
+        data_source='test_source', engine=engine)
+    matcher = DataMatcher(**kwargs)
+    results = matcher(df_drugs, df_publications)
+    assert results == DataMatcher(**kwargs, prefilter=False)(df_drugs, df_publications)
+    assert matcher.prefilter.report() == {
+        'data_source': 'test_source', 'rows_in': 5, 'rows_pruned': 1, 'pruned_fraction': 0.2}
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from src.pipeline.process.transform.prefiltering import TokenPrefilter
+
+
+@pytest.fixture
+def df_pubmed():
+    return pd.DataFrame({
+        "title": [
+            "time to epinephrine treatment is associated with the risk of mortality",
+            "appositional tetracycline bone formation rates in the beagle",
+            "comparison of pressure release phonophoresis and dry needling",
+            "effects of beta-methasone on imiquimod-induced psoriasis",
+            None,
+        ],
+    })
+
+
+def test_fit():
+    prefilter = TokenPrefilter("pubmed").fit(["epinephrine", "beta-methasone", "isoprenaline hydrochloride"])
+    assert prefilter.tokens == {"epinephrine", "methasone", "hydrochloride"}
+    assert TokenPrefilter("pubmed").fit(["--"]).tokens is None
+
+
+def test_candidates(df_pubmed):
+    prefilter = TokenPrefilter("pubmed").fit(["epinephrine", "beta-methasone", "tetra"])
+    assert prefilter.candidates(df_pubmed["title"]).tolist() == [True, False, False, True, False]
+    prefilter.fit(["--"])
+    assert prefilter.candidates(df_pubmed["title"]).tolist() == [True] * 5
+
+
+def test___call__(df_pubmed):
+    prefilter = TokenPrefilter("pubmed").fit(["tetracycline"])
+    df_result = prefilter(df=df_pubmed, title_col_name="title")
+    assert df_result["title"].tolist() == ["appositional tetracycline bone formation rates in the beagle"]
+    prefilter(df=df_pubmed.iloc[:0], title_col_name="title")
+    assert prefilter.report() == {"data_source": "pubmed", "rows_in": 5, "rows_pruned": 4, "pruned_fraction": 0.8}
+    assert TokenPrefilter("clinical").report()["pruned_fraction"] == 0.0
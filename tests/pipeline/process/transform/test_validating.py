@@ -0,0 +1,86 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from tempfile import TemporaryDirectory
+from src.config.build_config import VALIDATION_SCHEMA
+from src.pipeline.process.transform.validating import (
+    DataValidator, dtype_kind, quality_report_path, save_quality_report)
+
+
+@pytest.fixture
+def df_clinical():
+    return pd.DataFrame({
+        "id": ["NCT01", "NCT02", "NCT03", "NCT02", None],
+        "scientific_title": ["Use of Diphenhydramine", "", "Betamethasone", "Ropivacaine", "Glucagon"],
+        "date": ["1 January 2020", "25/05/2020", "2020-01-01", "not a date", np.nan],
+        "journal": ["Journal of emergency nursing"] * 5,
+    })
+
+
+def test_dtype_kind():
+    assert dtype_kind(pd.Series(["a"]).dtype) == "string"
+    assert dtype_kind(pd.Series([1]).dtype) == "integer"
+    assert dtype_kind(pd.Series([1.0]).dtype) == "float"
+    assert dtype_kind(pd.to_datetime(pd.Series(["2020-01-01"])).dtype) == "datetime"
+    assert dtype_kind(pd.Series(["a"], dtype="string").dtype) == "string"
+
+
+def test___call__(df_clinical):
+    validator = DataValidator("clinical", **VALIDATION_SCHEMA["clinical"], dataset="clinical_trials.csv")
+    df_result = validator(df=df_clinical)
+    report = validator.report()
+    assert df_result is df_clinical
+    assert report["rows"] == 5
+    assert report["null_rates"] == {"id": 0.2, "scientific_title": 0.2, "date": 0.2, "journal": 0.0}
+    assert report["date_parse_rates"] == {"date": 0.75}
+    assert report["unparsed_dates"] == {"date": ["not a date"]}
+    assert report["duplicate_ids"] == 1
+    assert not report["passed"]
+    assert len(report["failures"]) == 5
+
+
+def test___call___batches(df_clinical):
+    validator = DataValidator("clinical", **VALIDATION_SCHEMA["clinical"])
+    validator(df=df_clinical.iloc[:2])
+    validator(df=df_clinical.iloc[2:])
+    report = validator.report()
+    assert report["rows"] == 5
+    assert report["duplicate_ids"] == 1
+    assert report["date_parse_rates"] == {"date": 0.75}
+
+
+def test___call___passed():
+    df_pubmed = pd.DataFrame({
+        "id": [1, 2], "title": ["a", "b"], "date": pd.to_datetime(["2020-01-01", "2020-01-02"]), "journal": ["j", "j"]
+    })
+    validator = DataValidator("pubmed", **VALIDATION_SCHEMA["pubmed"])
+    validator(df=df_pubmed)
+    assert validator.report()["passed"]
+    assert validator.report()["dtypes"] == {
+        "id": ["integer"], "title": ["string"], "date": ["datetime"], "journal": ["string"]}
+
+
+def test___call___dtype_mismatch():
+    validator = DataValidator("drugs", **VALIDATION_SCHEMA["drugs"])
+    validator(df=pd.DataFrame({"atccode": [1, 2], "drug": ["ETHANOL", "ATROPINE"]}))
+    assert validator.report()["failures"] == ["Column 'atccode' has dtype ['integer'], expected one of ['string']."]
+
+
+def test___call___missing_column(df_clinical):
+    validator = DataValidator("clinical", **VALIDATION_SCHEMA["clinical"])
+    with pytest.raises(ValueError):
+        validator(df=df_clinical.drop(columns=["scientific_title"]))
+
+
+def test_save_quality_report(df_clinical):
+    validator = DataValidator("clinical", **VALIDATION_SCHEMA["clinical"])
+    validator(df=df_clinical)
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        quality_report = save_quality_report([validator.report()], file_output_path=output_path)
+        with open(quality_report_path(output_path), "r", encoding="utf-8") as f:
+            assert json.load(f) == quality_report
+    assert quality_report_path(output_path).endswith("matches.quality_report.json")
+    assert not quality_report["passed"]
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import subprocess
+from src.pipeline.cli import main
+from tests.data.pipeline.task import TEST_TASK_DATA_DIR
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_cli(tmp_path):
+    config_path = os.path.join(tmp_path, "cli_config.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+            "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+            "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+            "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+            "path_to_output_matching": os.path.join(tmp_path, "cli_matches.json"),
+        }, f)
+
+    main([config_path])
+
+    with open(
+            os.path.join(TEST_TASK_DATA_DIR, "expected", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+
+    with open(os.path.join(tmp_path, "cli_matches.json"), "r", encoding="utf-8") as f:
+        matches_results = json.load(f)
+
+    assert matches_expected == matches_results
+
+
+def test_cli_does_not_import_prefect():
+    code = (
+        "import sys; import src.pipeline.cli, src.pipeline.runner, src.pipeline.task; "
+        "print(','.join(m for m in ('prefect', 'pydantic') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == ""
+
+
+def test_cli_partitioned(tmp_path):
+    config_path = os.path.join(tmp_path, "cli_partitioned_config.json")
+    output_path = os.path.join(tmp_path, "cli_partitioned_matches.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+            "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+            "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+            "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+            "path_to_output_matching": output_path,
+            "execution_mode": "partitioned",
+            "n_partitions": 2,
+            "partition_workers": 1,
+        }, f)
+
+    main([config_path])
+    os.remove(output_path)
+    main([config_path, "--partition", "1"])
+
+    with open(
+            os.path.join(TEST_TASK_DATA_DIR, "expected", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        matches_results = json.load(f)
+
+    assert sorted(map(json.dumps, matches_expected)) == sorted(map(json.dumps, matches_results))
@@ -1,19 +1,101 @@
 import os
 import json
+import pytest
 from prefect.testing.utilities import prefect_test_harness
 from src.config.deploy_config import DeployConfig
 from src.pipeline.dag import main_flow
+from src.pipeline.runner import run_pipeline
 from tests.data.pipeline.task import TEST_TASK_DATA_DIR
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
 
-def test_dag():
-    os.makedirs(os.path.join(TEST_TASK_DATA_DIR, "output"), exist_ok=True)
+def test_dag(tmp_path):
+    d_config_dict = {
+        "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+        "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+        "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+        "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+        "path_to_output_matching": os.path.join(tmp_path, "aggregated_matches.json"),
+    }
 
+    test_config = DeployConfig(**d_config_dict)
+
+    with prefect_test_harness():
+        main_flow(test_config)
+
+    with open(
+            os.path.join(TEST_TASK_DATA_DIR, "expected", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+
+    with open(
+            os.path.join(tmp_path, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_results = json.load(f)
+
+    assert matches_expected == matches_results
+    assert os.path.exists(os.path.join(tmp_path, "aggregated_matches.index.json"))
+
+
+def test_dag_instrumented(tmp_path):
     d_config_dict = {
         "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
         "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
         "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
         "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
-        "path_to_output_matching": os.path.join(TEST_TASK_DATA_DIR, "output", "aggregated_matches.json"),
+        "path_to_output_matching": os.path.join(tmp_path, "instrumented_matches.json"),
+        "enable_instrumentation": True,
+    }
+
+    test_config = DeployConfig(**d_config_dict)
+
+    with prefect_test_harness():
+        main_flow(test_config)
+
+    with open(
+            os.path.join(tmp_path, "instrumented_matches.run_report.json"), "r",
+            encoding="utf-8") as f:
+        run_report = json.load(f)
+
+    stages = {stage["stage"] for stage in run_report["stages"]}
+    assert "task_load_matches" in stages
+    assert "DataCleaner.__call__" in stages
+    assert "DataMatcher.__call__" in stages
+    assert "DataAggregator.__call__" in stages
+
+
+def test_dag_profiled(tmp_path):
+    d_config_dict = {
+        "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+        "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+        "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+        "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+        "path_to_output_matching": os.path.join(tmp_path, "profiled_matches.json"),
+        "profiling_mode": "cprofile",
+        "profiling_stages": ["task_matching_drug_pubmed"],
+    }
+
+    test_config = DeployConfig(**d_config_dict)
+
+    with prefect_test_harness():
+        main_flow(test_config)
+
+    profiles_dir = os.path.join(tmp_path, "profiled_matches.profiles")
+    with open(os.path.join(profiles_dir, "summary.json"), "r", encoding="utf-8") as f:
+        summary = json.load(f)
+
+    assert list(summary["stages"]) == ["task_matching_drug_pubmed"]
+    assert os.path.exists(os.path.join(profiles_dir, "task_matching_drug_pubmed.prof"))
+
+
+def test_dag_duckdb_engine(tmp_path):
+    pytest.importorskip("duckdb")
+    d_config_dict = {
+        "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+        "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+        "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+        "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+        "path_to_output_matching": os.path.join(tmp_path, "duckdb_matches.json"),
+        "engine": "duckdb",
+        "duckdb_memory_limit": "256MB",
+        "duckdb_temp_directory": os.path.join(tmp_path, "duckdb_spill"),
     }
 
     test_config = DeployConfig(**d_config_dict)
@@ -26,7 +108,79 @@ def test_dag():
         matches_expected = json.load(f)
 
     with open(
-            os.path.join(TEST_TASK_DATA_DIR, "output", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+            os.path.join(tmp_path, "duckdb_matches.json"), "r", encoding="utf-8") as f:
         matches_results = json.load(f)
 
     assert matches_expected == matches_results
+    assert os.path.exists(os.path.join(tmp_path, "duckdb_matches.quality_report.json"))
+
+    # the clinical trials input fails validation, stopping the run before the SQL pipeline in strict mode
+    with pytest.raises(ValueError):
+        run_pipeline(test_config.model_copy(update={"strict_validation": True}))
+
+
+def test_dag_partitioned(tmp_path):
+    d_config_dict = {
+        "path_to_drugs": os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+        "path_to_pubmed_csv": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"),
+        "path_to_pubmed_json": os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.json"),
+        "path_to_clinical_trials": os.path.join(TEST_TASK_DATA_DIR, "input", "clinical_trials.csv"),
+        "path_to_output_matching": os.path.join(tmp_path, "partitioned_matches.json"),
+        "execution_mode": "partitioned",
+        "n_partitions": 3,
+        "enable_instrumentation": True,
+    }
+
+    test_config = DeployConfig(**d_config_dict)
+
+    with prefect_test_harness():
+        main_flow(test_config)
+        os.remove(os.path.join(tmp_path, "partitioned_matches.partitions", "part-00002",
+                               "matches.json"))
+        main_flow(test_config, partitions=[2])
+
+    with open(
+            os.path.join(TEST_TASK_DATA_DIR, "expected", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+
+    with open(
+            os.path.join(tmp_path, "partitioned_matches.json"), "r", encoding="utf-8") as f:
+        matches_results = json.load(f)
+
+    with open(
+            os.path.join(tmp_path, "partitioned_matches.run_report.json"), "r",
+            encoding="utf-8") as f:
+        run_report = json.load(f)
+
+    assert sorted(map(json.dumps, matches_expected)) == sorted(map(json.dumps, matches_results))
+    assert [event["partition"] for event in run_report["events"] if event["event"] == "partition"] == [2]
+
+
+def test_dag_partitioned_profiled(tmp_path):
+    output_path = tmp_path / "partitioned_matches.json"
+    test_config = DeployConfig(
+        **TEST_TASK_INPUT_PATHS, path_to_output_matching=str(output_path), execution_mode="partitioned",
+        n_partitions=2, profiling_mode="cprofile", profiling_stages=["PartitionedRunner.merge"])
+
+    with prefect_test_harness():
+        main_flow(test_config)
+
+    profiles_dir = tmp_path / "partitioned_matches.profiles"
+    with open(profiles_dir / "summary.json", "r", encoding="utf-8") as f:
+        summary = json.load(f)
+
+    assert list(summary["stages"]) == ["PartitionedRunner.merge"]
+    assert (profiles_dir / "PartitionedRunner.merge.prof").exists()
+    # the run report is only saved with instrumentation
+    assert not (tmp_path / "partitioned_matches.run_report.json").exists()
+
+
+def test_dag_json_logging(tmp_path, capsys):
+    test_config = DeployConfig(
+        **TEST_TASK_INPUT_PATHS, path_to_output_matching=str(tmp_path / "aggregated_matches.json"), log_format="json")
+
+    with prefect_test_harness():
+        main_flow(test_config)
+
+    records = [json.loads(line) for line in capsys.readouterr().err.splitlines() if line.startswith("{")]
+    assert records and all(record["level"] in ("INFO", "WARNING") for record in records)
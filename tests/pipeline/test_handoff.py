@@ -0,0 +1,126 @@
+import os
+import json
+import pytest
+import pandas as pd
+import pandas.testing as pdt
+from tempfile import TemporaryDirectory
+from src.config.run_config import RunConfig
+import src.pipeline.handoff as handoff_module
+from src.pipeline.handoff import FrameHandle, HandoffStore, handoff, iter_records, load_frame, load_records, resolve, \
+    save_frame, save_records
+from src.pipeline.instrumentation import RunRecorder
+from src.pipeline.runner import run_pipeline
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_DATA_DIR, TEST_TASK_INPUT_PATHS
+from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+pytest.importorskip("pyarrow")
+
+
+def test_save_load_frame():
+    df = pd.DataFrame(
+        {"n_mentions": [3, 1, 2], "journal": ["journal of emergency nursing", None, "psychopharmacology"]},
+        index=[4, 7, 9])
+    with TemporaryDirectory() as tmp_dir:
+        handle = save_frame(df, os.path.join(tmp_dir, "frame.arrow"))
+        assert handle.n_rows == 3
+        df_result = load_frame(handle.path)
+        pdt.assert_frame_equal(df, df_result)
+        # numeric columns are used in place from the mapped file, hence read-only
+        assert not df_result["n_mentions"].values.flags.writeable
+
+        # object columns mixing types, as raw extracts do, read back with the very same values
+        df = pd.DataFrame({"id": [1, "2", float("nan")], "title": ["a", "b", "c"], "n": [1, 2, 3]}).astype(object)
+        df_result = load_frame(save_frame(df, os.path.join(tmp_dir, "mixed.arrow")).path)
+        pdt.assert_frame_equal(df, df_result)
+        assert [type(value) for value in df_result["n"]] == [int, int, int]
+        with pytest.raises(ValueError):
+            save_frame(pd.DataFrame({"id": [1, object()]}), os.path.join(tmp_dir, "unserializable.arrow"))
+
+        # NaN values of object columns are not read back as None
+        df = pd.DataFrame({"date": ["2020-01-01", float("nan")], "journal": [None, float("nan")]}, dtype=object)
+        df_result = load_frame(save_frame(df, os.path.join(tmp_dir, "nan.arrow")).path)
+        assert df_result["date"][0] == "2020-01-01" and df_result["date"][1] != df_result["date"][1]
+        assert df_result["journal"][0] is None and df_result["journal"][1] != df_result["journal"][1]
+
+
+def test_save_load_records(monkeypatch):
+    records = [
+        {"drug": "atropine", "title": "a title", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"},
+        {"drug": "atropine", "title": "a title", "ref_type": "pubmed_publication", "date_mention": float("nan")},
+        {"drug": "ethanol", "title": "another title", "ref_type": "pubmed_publication", "date_mention": None,
+         "distance": 1},
+        {"drug": "ethanol", "title": "a journal", "ref_type": "journal", "date_mention": "2020-01-02",
+         "distance": float("nan")},
+    ]
+    with TemporaryDirectory() as tmp_dir:
+        handle = save_records(records, os.path.join(tmp_dir, "matches.arrow"))
+        assert handle.records and handle.n_rows == 4
+        records_result = load_records(handle.path)
+        # records are converted batch by batch
+        monkeypatch.setattr(handoff_module, "RECORD_BATCH_SIZE", 3)
+        handle = save_records(records, os.path.join(tmp_dir, "batched_matches.arrow"))
+        assert json.dumps(list(iter_records(handle.path))) == json.dumps(records)
+    # records keep their keys, NaN values and integers, which a DataFrame would not
+    assert json.dumps(records_result) == json.dumps(records)
+    assert [list(record) for record in records_result] == [list(record) for record in records]
+    assert isinstance(records_result[2]["distance"], int)
+
+
+def test_handoff_store():
+    df = pd.DataFrame({"drug": ["atropine", "ethanol"], "atccode": ["A03BA01", "V03AB16"]})
+    matches = [{"drug": "atropine", "title": "a title", "ref_type": "pubmed_publication", "date_mention": "2020-01-01"}]
+    assert handoff(df, "drugs") is df
+
+    with TemporaryDirectory() as tmp_dir:
+        with HandoffStore(tmp_dir) as store:
+            df_handle, matches_handle = handoff(df, "drugs"), handoff(matches, "matches")
+            assert isinstance(df_handle, FrameHandle) and os.path.dirname(df_handle.path) == store.path
+            pdt.assert_frame_equal(df, resolve(df_handle))
+            assert resolve(matches_handle) == matches
+            assert resolve(handoff([], "no_matches")) == []
+            assert resolve(df) is df
+            with pytest.raises(RuntimeError):
+                HandoffStore(tmp_dir).__enter__()
+        assert not os.path.exists(store.path)
+
+        with HandoffStore(tmp_dir, enabled=False):
+            assert handoff(df, "drugs") is df
+
+
+def test_run_with_handoff():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        with RunRecorder(trace_allocations=False) as recorder:
+            run_pipeline(RunConfig(
+                **TEST_TASK_INPUT_PATHS, path_to_output_matching=output_path, handoff_directory=tmp_dir))
+        with open(output_path, "r", encoding="utf-8") as f:
+            matches_results = json.load(f)
+        # handed off files are removed once the run completes
+        assert sorted(os.listdir(tmp_dir)) == [
+            "matches.index.dates.npy", "matches.index.json", "matches.json", "matches.quality_report.json"]
+
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+    assert matches_expected == matches_results
+    stages = {stage["stage"]: stage for stage in recorder.stages}
+    # handles count the rows of their file
+    assert stages["task_clean_drugs"]["rows_out"] == 7
+    assert stages["task_aggregating_matches"]["rows_in"] == stages["task_load_matches"]["rows_in"] == 35
+
+
+def test_run_with_handoff_unparsed_date():
+    with TemporaryDirectory() as tmp_dir:
+        # a pubmed date which cannot be parsed gives matches without a date
+        df_pubmed = pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv"))
+        df_pubmed.loc[0, "date"] = "not a date"
+        paths = {**TEST_TASK_INPUT_PATHS, "path_to_pubmed_csv": os.path.join(tmp_dir, "pubmed.csv")}
+        df_pubmed.to_csv(paths["path_to_pubmed_csv"], index=False)
+
+        outputs = []
+        for handoff_directory in [None, tmp_dir]:
+            output_path = os.path.join(tmp_dir, f"matches_{len(outputs)}.json")
+            run_pipeline(RunConfig(**paths, path_to_output_matching=output_path, handoff_directory=handoff_directory))
+            with open(output_path, "r", encoding="utf-8") as f:
+                outputs.append(f.read())
+    assert "NaN" in outputs[0]
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,58 @@
+import os
+import json
+import pandas as pd
+from tempfile import TemporaryDirectory
+from src.pipeline.instrumentation import RunRecorder, instrument, count_rows, run_report_path
+
+
+@instrument()
+def double_rows(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([df, df], ignore_index=True)
+
+
+@instrument(stage="outer")
+def outer_stage(df: pd.DataFrame) -> pd.DataFrame:
+    return double_rows(df)
+
+
+def test_instrument_disabled():
+    df = pd.DataFrame({"a": [1, 2]})
+    with RunRecorder(enabled=False) as recorder:
+        result = double_rows(df)
+    assert len(result) == 4
+    assert recorder.stages == []
+
+
+def test_instrument_records_stages():
+    df = pd.DataFrame({"a": [1, 2]})
+    with RunRecorder() as recorder:
+        outer_stage(df)
+    inner, outer = recorder.stages
+    assert inner["stage"] == "double_rows"
+    assert inner["parent"] == "outer"
+    assert outer["stage"] == "outer"
+    assert outer["parent"] is None
+    assert (inner["rows_in"], inner["rows_out"]) == (2, 4)
+    assert outer["wall_time_s"] >= inner["wall_time_s"]
+    assert outer["alloc_peak_bytes"] >= inner["alloc_peak_bytes"]
+
+
+def test_count_rows():
+    assert count_rows(pd.DataFrame({"a": [1, 2, 3]})) == 3
+    assert count_rows([{"a": 1}, {"a": 2}]) == 2
+    assert count_rows([[{"a": 1}], [{"a": 2}, {"a": 3}]]) == 3
+    assert count_rows((pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [1, 2]}))) == 3
+    assert count_rows("not rows") is None
+
+
+def test_run_report_saved():
+    with TemporaryDirectory() as tmp_dir:
+        report_path = run_report_path(os.path.join(tmp_dir, "matches.json"))
+        with RunRecorder() as recorder:
+            double_rows(pd.DataFrame({"a": [1]}))
+        recorder.save(report_path)
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    assert report_path.endswith("matches.run_report.json")
+    assert report["stages"][0]["stage"] == "double_rows"
+    assert report["wall_time_s"] is not None
@@ -0,0 +1,104 @@
+import io
+import json
+import time
+import logging
+import threading
+import pytest
+from src.pipeline.instrumentation import RunRecorder, instrument
+from src.pipeline.logs import RateLimitFilter, configure_logging, logging_config, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+
+class CountingStr:
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "value"
+
+
+@instrument(stage="logging_stage")
+def log_within_stage():
+    logger.info("Within a stage.", extra={"source": "pubmed", "rows": 3})
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+
+
+def read_records(stream):
+    shutdown_logging()
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    return [record for record in records if record["logger"] == __name__]
+
+
+def test_json_records(stream):
+    configure_logging(log_format="json", stream=stream)
+    with RunRecorder(trace_allocations=False):
+        log_within_stage()
+    logger.warning("Outside %s stage.", "any")
+
+    within, outside = read_records(stream)
+    assert within["message"] == "Within a stage."
+    assert (within["stage"], within["source"], within["rows"]) == ("logging_stage", "pubmed", 3)
+    assert within["logger"] == __name__
+    assert outside["message"] == "Outside any stage."
+    assert "stage" not in outside
+
+
+def test_text_records(stream):
+    configure_logging(stream=stream)
+    logger.info("Matched %s rows.", 2, extra={"source": "clinical"})
+    shutdown_logging()
+    assert stream.getvalue().rstrip().endswith("INFO - Matched 2 rows. [source=clinical]")
+
+
+def test_lazy_formatting(stream, monkeypatch):
+    # handlers of the pytest logging plugin would format records within the logging thread
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    configure_logging(level="WARNING", stream=stream)
+    value = CountingStr()
+    logger.info("Not logged %s.", value)
+    assert value.threads == []
+    logger.warning("Logged %s.", value)
+    shutdown_logging()
+    # records are formatted by the listener thread, not by the logging one
+    assert value.threads and threading.current_thread().name not in value.threads
+    assert stream.getvalue().rstrip().endswith("WARNING - Logged value.")
+
+
+def test_rate_limit(stream):
+    configure_logging(log_format="json", stream=stream, rate_limit_burst=2, rate_limit_interval=0.2)
+    for i in range(5):
+        logger.info("Batch %s cleaned.", i)
+    logger.error("Always logged.")
+    logger.info("Another message.")
+    time.sleep(0.25)
+    logger.info("Batch %s cleaned.", 5)
+
+    records = read_records(stream)
+    assert [record["message"] for record in records] == [
+        "Batch 0 cleaned.", "Batch 1 cleaned.", "Always logged.", "Another message.", "Batch 5 cleaned."]
+    assert records[-1]["suppressed"] == 3
+
+
+def test_configure_logging():
+    with pytest.raises(ValueError):
+        configure_logging(log_format="xml")
+    with pytest.raises(ValueError):
+        RateLimitFilter(burst=0)
+    root = logging.getLogger()
+    n_handlers, level = len(root.handlers), root.level
+    configure_logging(level="DEBUG", log_format="json", stream=io.StringIO())
+    configure_logging(level="DEBUG", log_format="json", stream=io.StringIO())
+    assert len(root.handlers) == n_handlers + 1
+    assert root.level == logging.DEBUG
+    assert logging_config()["log_format"] == "json"
+    shutdown_logging()
+    assert (len(root.handlers), root.level) == (n_handlers, level)
+    assert logging_config() is None
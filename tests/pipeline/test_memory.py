@@ -0,0 +1,88 @@
+import os
+import json
+import pytest
+import pandas as pd
+from tempfile import TemporaryDirectory
+from src.config.run_config import RunConfig
+from src.pipeline.memory import MemoryBudget, parse_memory_size, estimate_row_bytes, MIN_BATCH_SIZE, MAX_BATCH_SIZE, \
+    SAMPLE_BYTES
+from src.pipeline.runner import run_pipeline
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
+from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+
+def test_parse_memory_size():
+    assert parse_memory_size("512MB") == 512 * 10 ** 6
+    assert parse_memory_size("2GiB") == 2 * 2 ** 30
+    assert parse_memory_size("1.5 gb") == 1_500_000_000
+    assert parse_memory_size(1024) == 1024
+    for size in ["", "12XB", "-1GB", "0"]:
+        with pytest.raises(ValueError):
+            parse_memory_size(size)
+
+
+def test_estimate_row_bytes():
+    assert estimate_row_bytes(TEST_TASK_INPUT_PATHS["path_to_pubmed_csv"]) \
+        > estimate_row_bytes(TEST_TASK_INPUT_PATHS["path_to_drugs"]) > 0
+    assert estimate_row_bytes(TEST_TASK_INPUT_PATHS["path_to_pubmed_json"]) > 0
+
+
+def test_estimate_row_bytes_from_prefix():
+    records = [{"id": i, "title": f"title {i}", "journal": "journal"} for i in range(5000)]
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "pubmed.json")
+        # the file is cut within a record, only its first records being sampled
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(records, indent=2)[:-100])
+        assert estimate_row_bytes(path, sample_rows=100) > 0
+        with pytest.raises(ValueError):
+            pd.read_json(path)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"title": {"0": "title"}}, f)
+        assert estimate_row_bytes(path) > 0
+
+
+def test_estimate_row_bytes_unsampled():
+    with TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "pubmed.json")
+        # the first record is larger than the bytes read at most
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1, "title": "t" * (SAMPLE_BYTES + 1)}], f)
+        assert estimate_row_bytes(path) is None
+
+        budget = MemoryBudget("1TB", queue_depth=4)
+        assert budget.initial_batch_size(path) == MIN_BATCH_SIZE
+        assert budget.decisions[0]["decision"] == "unsampled_batch_size"
+
+
+def test_batch_sizes():
+    budget = MemoryBudget("1TB", queue_depth=4)
+    assert budget.batches_in_flight == 21
+    assert budget.initial_batch_size(TEST_TASK_INPUT_PATHS["path_to_pubmed_csv"]) == MAX_BATCH_SIZE
+    assert budget.adapt(TEST_TASK_INPUT_PATHS["path_to_pubmed_csv"], 1000) == 2000
+
+    budget = MemoryBudget("1MB", queue_depth=4)
+    assert budget.initial_batch_size(TEST_TASK_INPUT_PATHS["path_to_pubmed_csv"]) == MIN_BATCH_SIZE
+    assert budget.adapt(TEST_TASK_INPUT_PATHS["path_to_pubmed_csv"], 1000) == 500
+    assert [decision["decision"] for decision in budget.decisions] == ["initial_batch_size", "shrink_batch_size"]
+
+
+def test_run_with_memory_budget():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        run_pipeline(RunConfig(
+            **TEST_TASK_INPUT_PATHS, path_to_output_matching=output_path, memory_budget="1MB",
+            enable_instrumentation=True))
+        with open(output_path, "r", encoding="utf-8") as f:
+            matches_results = json.load(f)
+        with open(os.path.join(tmp_dir, "matches.run_report.json"), "r", encoding="utf-8") as f:
+            run_report = json.load(f)
+
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+    assert sorted(map(json.dumps, matches_expected)) == sorted(map(json.dumps, matches_results))
+    decisions = [event["decision"] for event in run_report["events"] if event["event"] == "memory_budget"]
+    assert decisions[0] == "pipelined_execution_mode"
+    assert decisions.count("initial_batch_size") == 3
+    assert "task_pipelined_run" in {stage["stage"] for stage in run_report["stages"]}
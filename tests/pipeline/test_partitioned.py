@@ -0,0 +1,117 @@
+import os
+import json
+import shutil
+import pytest
+import pandas as pd
+from tempfile import TemporaryDirectory
+from src.adhoc.index import index_path
+from src.pipeline.instrumentation import RunRecorder
+from src.pipeline.partitioned import PartitionedRunner, partition_dir, partition_ids
+from src.pipeline.process.transform.validating import quality_report_path
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
+from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+
+def load_expected():
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        return sorted(map(json.dumps, json.load(f)))
+
+
+def load_output(output_path):
+    with open(output_path, "r", encoding="utf-8") as f:
+        return sorted(map(json.dumps, json.load(f)))
+
+
+def test_partition_ids():
+    ids = pd.Series(["pubmed_1", "pubmed_2", "clinical_NCT01967433", "pubmed_1"])
+    partitions = partition_ids(ids, n_partitions=4)
+    # crc32 does not depend on the process, so partitions are the same on every worker
+    assert partitions.tolist() == [0, 2, 2, 0]
+    assert partition_ids(ids, n_partitions=1).tolist() == [0, 0, 0, 0]
+
+
+@pytest.mark.parametrize("n_partitions", [1, 3])
+def test_partitioned_run(n_partitions):
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        with RunRecorder(trace_allocations=False) as recorder:
+            n_matches = PartitionedRunner(n_partitions=n_partitions, max_workers=1).run(
+                **TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+        matches_results = load_output(output_path)
+        assert os.path.exists(index_path(output_path))
+        assert os.path.exists(quality_report_path(output_path))
+
+    assert matches_results == load_expected()
+    assert n_matches == len(matches_results)
+    partitions = [event for event in recorder.events if event["event"] == "partition"]
+    assert [event["partition"] for event in partitions] == list(range(n_partitions))
+    assert sum(sum(event["rows"].values()) for event in partitions) == 8 + 5 + 8
+    parents = {stage["parent"] for stage in recorder.stages if stage["stage"] == "DataMatcher.__call__"}
+    assert parents <= {f"partition[{partition}]" for partition in range(n_partitions)}
+
+
+def test_partitioned_run_worker_processes():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        with RunRecorder(trace_allocations=False) as recorder:
+            PartitionedRunner(n_partitions=2, max_workers=2).run(**TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+        matches_results = load_output(output_path)
+
+    assert matches_results == load_expected()
+    pids = {event["pid"] for event in recorder.events if event["event"] == "partition"}
+    assert os.getpid() not in pids
+
+
+def test_partitioned_run_failed_partition():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        runner = PartitionedRunner(n_partitions=3, max_workers=1)
+        runner.split(**TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+        part_path = os.path.join(partition_dir(output_path), "part-00001", "pubmed_csv.arrow")
+        shutil.move(part_path, os.path.join(tmp_dir, "pubmed_csv.arrow"))
+        with pytest.raises(RuntimeError, match=r"partitions=\[1\]"):
+            runner.run_partitions(output_path, partitions=[0, 1, 2])
+        with pytest.raises(RuntimeError, match=r"partitions=\[1\]"):
+            runner.merge(output_path)
+
+        shutil.move(os.path.join(tmp_dir, "pubmed_csv.arrow"), part_path)
+        with RunRecorder(trace_allocations=False) as recorder:
+            runner.run(**TEST_TASK_INPUT_PATHS, file_output_path=output_path, partitions=[1])
+        matches_results = load_output(output_path)
+
+        with pytest.raises(ValueError):
+            PartitionedRunner(n_partitions=2).run(**TEST_TASK_INPUT_PATHS, file_output_path=output_path, partitions=[1])
+        with pytest.raises(ValueError):
+            runner.run_partitions(output_path, partitions=[3])
+
+    assert matches_results == load_expected()
+    assert [event["partition"] for event in recorder.events if event["event"] == "partition"] == [1]
+
+
+def test_partitioned_runner_invalid_sizes():
+    with pytest.raises(ValueError):
+        PartitionedRunner(n_partitions=0)
+    with pytest.raises(ValueError):
+        PartitionedRunner(max_workers=0)
+
+
+def test_partitioned_run_object_store(monkeypatch):
+    fsspec = pytest.importorskip("fsspec")
+    import src.pipeline.partitioned as partitioned
+
+    fs = fsspec.filesystem("memory")
+    output_path = "memory://partitioned/matches.json"
+    try:
+        with TemporaryDirectory() as tmp_dir:
+            monkeypatch.setattr(partitioned, "PARTITIONS_DIRECTORY", tmp_dir)
+            work_dir = partition_dir(output_path)
+            assert os.path.dirname(work_dir) == tmp_dir and work_dir != partition_dir("memory://other/matches.json")
+            PartitionedRunner(n_partitions=2, max_workers=1).run(**TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+            assert os.path.exists(os.path.join(work_dir, "part-00001", "matches.json"))
+        with fs.open("/partitioned/matches.json", "r") as f:
+            matches_results = sorted(map(json.dumps, json.load(f)))
+        assert fs.exists("/partitioned/matches.index.json")
+    finally:
+        fs.rm("/partitioned", recursive=True)
+
+    assert matches_results == load_expected()
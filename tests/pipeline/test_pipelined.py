@@ -0,0 +1,59 @@
+import os
+import json
+import pytest
+from tempfile import TemporaryDirectory
+from src.adhoc.index import MatchesIndex, index_path
+from src.pipeline.instrumentation import RunRecorder
+from src.pipeline.pipelined import PipelinedRunner
+from src.pipeline.process.transform.validating import quality_report_path
+from tests.data.pipeline.task.input import TEST_TASK_INPUT_PATHS
+from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1000])
+def test_pipelined_run(batch_size):
+    with open(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        with RunRecorder(trace_allocations=False) as recorder:
+            PipelinedRunner(batch_size=batch_size, queue_depth=1).run(
+                **TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+        with open(output_path, "r", encoding="utf-8") as f:
+            matches_results = json.load(f)
+        index = MatchesIndex.load(index_path(output_path))
+
+    assert sorted(map(json.dumps, matches_expected)) == sorted(map(json.dumps, matches_results))
+    # ties are broken by first mention, which follows the batch order
+    assert sorted(index.top_journals(k=100)) == sorted(MatchesIndex.from_matches(matches_expected).top_journals(k=100))
+    stages = {stage["stage"]: stage["parent"] for stage in recorder.stages}
+    assert stages["pipelined[match]"] is None
+    assert stages["DataMatcher.__call__"] == "pipelined[match]"
+
+
+def test_pipelined_run_quality_report():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        PipelinedRunner(batch_size=3, queue_depth=1).run(**TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+        with open(quality_report_path(output_path), "r", encoding="utf-8") as f:
+            quality_report = json.load(f)
+        assert [report["dataset"] for report in quality_report["datasets"]] == [
+            "drugs.csv", "clinical_trials.csv", "pubmed.json", "pubmed.csv"]
+        assert [report["rows"] for report in quality_report["datasets"]] == [7, 8, 5, 8]
+        with pytest.raises(ValueError):
+            PipelinedRunner(batch_size=3, queue_depth=1, strict_validation=True).run(
+                **TEST_TASK_INPUT_PATHS, file_output_path=output_path)
+
+
+def test_pipelined_run_failing_stage():
+    with TemporaryDirectory() as tmp_dir:
+        with pytest.raises(FileNotFoundError):
+            PipelinedRunner(batch_size=2, queue_depth=1).run(
+                **{**TEST_TASK_INPUT_PATHS, "path_to_pubmed_csv": os.path.join(tmp_dir, "missing.csv")},
+                file_output_path=os.path.join(tmp_dir, "matches.json")
+            )
+
+
+def test_pipelined_runner_invalid_sizes():
+    with pytest.raises(ValueError):
+        PipelinedRunner(batch_size=0)
@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import pytest
+from tempfile import TemporaryDirectory
+from src.pipeline.instrumentation import RunRecorder, instrument
+from src.pipeline.profiling import StageProfiler, profile_output_dir
+
+
+@instrument()
+def busy_inner():
+    return sum(i * i for i in range(50_000))
+
+
+@instrument()
+def busy_stage():
+    time.sleep(0.02)
+    return [busy_inner() for _ in range(3)]
+
+
+@pytest.mark.parametrize("mode,dump_extension", [
+    ("cprofile", ".prof"), ("tracemalloc", ".tracemalloc"), ("sampling", ".collapsed")])
+def test_profiler_modes(mode, dump_extension):
+    with TemporaryDirectory() as tmp_dir:
+        profiler = StageProfiler(mode=mode, output_dir=tmp_dir, top_n=5, sampling_interval=0.001)
+        with RunRecorder(trace_allocations=False, profiler=profiler):
+            busy_stage()
+        profiler.save_summary()
+        files = set(os.listdir(tmp_dir))
+        with open(os.path.join(tmp_dir, "summary.json"), "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    # only the top-level stage is profiled, nested stages belong to its profile
+    assert files == {"busy_stage" + dump_extension, "busy_stage.txt", "summary.json"}
+    assert summary["mode"] == mode
+    assert 0 < len(summary["stages"]["busy_stage"]) <= 5
+
+
+def test_profiler_selected_stages():
+    with TemporaryDirectory() as tmp_dir:
+        profiler = StageProfiler(mode="cprofile", output_dir=tmp_dir, stages=["busy_inner"])
+        with RunRecorder(trace_allocations=False, profiler=profiler):
+            busy_stage()
+        files = set(os.listdir(tmp_dir))
+    assert {"busy_inner.prof", "busy_inner.2.prof", "busy_inner.3.prof"} <= files
+    assert "busy_stage.prof" not in files
+
+
+def test_profiler_unknown_mode():
+    with pytest.raises(ValueError):
+        StageProfiler(mode="unknown", output_dir=".")
+
+
+def test_profiler_reset():
+    assert profile_output_dir("/data/output/matches.json") == "/data/output/matches.profiles"
+    with TemporaryDirectory() as tmp_dir:
+        output_dir = profile_output_dir(os.path.join(tmp_dir, "matches.json"))
+        profiler = StageProfiler(mode="cprofile", output_dir=output_dir, stages=["busy_inner"])
+        with RunRecorder(trace_allocations=False, profiler=profiler):
+            busy_stage()
+
+        # dumps of a previous run are not left next to the ones of the next run
+        profiler = StageProfiler(mode="cprofile", output_dir=output_dir)
+        profiler.reset()
+        with RunRecorder(trace_allocations=False, profiler=profiler):
+            busy_stage()
+        assert set(os.listdir(output_dir)) == {"busy_stage.prof", "busy_stage.txt"}
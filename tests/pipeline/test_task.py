@@ -2,6 +2,8 @@ import os
 import json
 import pandas as pd
 import pandas.testing as pdt
+import pytest
+from tempfile import TemporaryDirectory
 import src.pipeline.task as tasks
 from tests.data.pipeline.task.input import TEST_TASK_INPUT_DATA_DIR
 from tests.data.pipeline.task.expected import TEST_TASK_EXPECTED_DATA_DIR
@@ -31,6 +33,33 @@ def test_task_clean_merge_pubmed():
     pdt.assert_frame_equal(df_expected, df_result)
 
 
+def test_task_validate_source():
+    df_drugs = pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "drugs.csv"))
+    report = tasks.task_validate_source(df_drugs, data_source="drugs", dataset="drugs.csv")
+    assert report["dataset"] == "drugs.csv"
+    assert report["passed"]
+    df_clinical = pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv"))
+    assert not tasks.task_validate_source(df_clinical, data_source="clinical")["passed"]
+    with pytest.raises(ValueError):
+        tasks.task_validate_source(df_clinical, data_source="clinical", strict=True)
+
+
+def test_task_validate_file():
+    path = os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv")
+    report = tasks.task_validate_file(path, data_source="clinical", batch_size=2)
+    assert report == tasks.task_validate_source(
+        pd.read_csv(path), data_source="clinical", dataset="clinical_trials.csv")
+
+
+def test_task_deduplicate_publications():
+    df_pubmed = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "pubmed_clean_merged.json"))
+    df_pubmed['date'] = df_pubmed['date'].astype(str)
+    df_reexported = df_pubmed.assign(id=df_pubmed["id"] + "_reexported")
+    df_result = tasks.task_deduplicate_publications(
+        pd.concat([df_pubmed, df_reexported], ignore_index=True), data_source="pubmed")
+    pdt.assert_frame_equal(df_pubmed, df_result)
+
+
 def test_task_matching_drug_clinical():
     df_drugs = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "drugs_clean.json"))
     df_clinical = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "clinical_trials_clean.json"))
@@ -52,6 +81,17 @@ def test_task_matching_drug_pubmed():
     assert matches_expected == matches_result
 
 
+def test_task_matching_drug_pubmed_fuzzy():
+    df_drugs = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "drugs_clean.json"))
+    df_pubmed = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "pubmed_clean_merged.json"))
+    matches_result = tasks.task_matching_drug_pubmed(df_drugs, df_pubmed, fuzzy_max_distance=2)
+    with open(
+            os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "drug_pubmed_matches.json"), "r", encoding="utf-8") as f:
+        matches_expected = json.load(f)
+    assert all(match.pop("distance") == 0 for match in matches_result)
+    assert matches_expected == matches_result
+
+
 def test_task_aggregating_matches():
     with open(
             os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "drug_pubmed_matches.json"), "r", encoding="utf-8") as f:
@@ -65,3 +105,46 @@ def test_task_aggregating_matches():
             os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
         aggregated_expected = json.load(f)
     assert aggregated_expected == aggregated_result
+
+
+def test_task_clean_merge_pubmed_polars_engine():
+    pytest.importorskip("polars")
+    df_pubmed_csv = pd.read_csv(os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv"))
+    df_pubmed_json = pd.read_json(os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.json"))
+    df_result = tasks.task_clean_merge_pubmed(df_pubmed_json, df_pubmed_csv, engine="polars")
+    df_expected = pd.read_json(os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "pubmed_clean_merged.json"))
+    df_expected['date'] = df_expected['date'].astype(str)
+    pdt.assert_frame_equal(df_expected, df_result)
+
+
+def test_task_duckdb_pipeline():
+    pytest.importorskip("duckdb")
+    aggregated_result = tasks.task_duckdb_pipeline(
+        path_to_drugs=os.path.join(TEST_TASK_INPUT_DATA_DIR, "drugs.csv"),
+        path_to_pubmed_csv=os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv"),
+        path_to_pubmed_json=os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.json"),
+        path_to_clinical_trials=os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv")
+    )
+    with open(
+            os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        aggregated_expected = json.load(f)
+    assert aggregated_expected == aggregated_result
+
+
+def test_task_pipelined_run():
+    with TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "matches.json")
+        n_matches = tasks.task_pipelined_run(
+            path_to_drugs=os.path.join(TEST_TASK_INPUT_DATA_DIR, "drugs.csv"),
+            path_to_pubmed_csv=os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.csv"),
+            path_to_pubmed_json=os.path.join(TEST_TASK_INPUT_DATA_DIR, "pubmed.json"),
+            path_to_clinical_trials=os.path.join(TEST_TASK_INPUT_DATA_DIR, "clinical_trials.csv"),
+            file_output_path=output_path, batch_size=4, queue_depth=1
+        )
+        with open(output_path, "r", encoding="utf-8") as f:
+            aggregated_result = json.load(f)
+    with open(
+            os.path.join(TEST_TASK_EXPECTED_DATA_DIR, "aggregated_matches.json"), "r", encoding="utf-8") as f:
+        aggregated_expected = json.load(f)
+    assert n_matches == len(aggregated_result)
+    assert sorted(map(json.dumps, aggregated_expected)) == sorted(map(json.dumps, aggregated_result))
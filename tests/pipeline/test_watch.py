@@ -0,0 +1,53 @@
+import os
+import json
+import shutil
+from tempfile import TemporaryDirectory
+from src.pipeline.watch import DirectoryWatcher, detect_source, state_path
+from tests.data.pipeline.task import TEST_TASK_DATA_DIR
+
+
+def _read_json_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _keys(matches):
+    return sorted(json.dumps(entry, sort_keys=True) for entry in matches)
+
+
+def test_detect_source():
+    assert detect_source(os.path.join("input", "pubmed_2024_01.json")) == "pubmed"
+    assert detect_source("Clinical_Trials.csv") == "clinical"
+    assert detect_source("drugs.csv") is None
+    assert detect_source("pubmed.csv.part") is None
+
+
+def test_watch_micro_batches():
+    with TemporaryDirectory() as tmp_dir:
+        input_dir = os.path.join(tmp_dir, "landing")
+        os.makedirs(input_dir)
+        output_path = os.path.join(tmp_dir, "output", "matches.jsonl")
+        watcher = DirectoryWatcher(
+            input_dir=input_dir, path_to_drugs=os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+            path_to_output=output_path, batch_window=0, poll_interval=0.01)
+
+        for name in ["pubmed.json", "pubmed.csv", "clinical_trials.csv"]:
+            shutil.copy(os.path.join(TEST_TASK_DATA_DIR, "input", name), input_dir)
+        assert watcher.run(max_batches=1, timeout=10) == 1
+
+        with open(os.path.join(TEST_TASK_DATA_DIR, "expected", "aggregated_matches.json"), "r", encoding="utf-8") as f:
+            matches_expected = json.load(f)
+        assert _keys(_read_json_lines(output_path)) == _keys(matches_expected)
+        assert os.path.exists(state_path(output_path))
+
+        # a restarted watcher skips processed files, and a re-landed file does not duplicate matches
+        restarted = DirectoryWatcher(
+            input_dir=input_dir, path_to_drugs=os.path.join(TEST_TASK_DATA_DIR, "input", "drugs.csv"),
+            path_to_output=output_path, batch_window=0, poll_interval=0.01)
+        assert restarted.run(timeout=0.1) == 0
+        # written matches are remembered by fixed-size digests
+        assert len(restarted.written_matches) == len(set(_keys(matches_expected)))
+        assert all(isinstance(key, int) and key < 2 ** 64 for key in restarted.written_matches)
+        shutil.copy(os.path.join(TEST_TASK_DATA_DIR, "input", "pubmed.csv"), os.path.join(input_dir, "pubmed_2.csv"))
+        assert restarted.run(max_batches=1, timeout=10) == 1
+        assert _keys(_read_json_lines(output_path)) == _keys(matches_expected)
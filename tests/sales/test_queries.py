@@ -0,0 +1,82 @@
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from src.sales.queries import INDEXES, SalesDatabase, adapt_sql, load_query
+
+@pytest.fixture
+def df_transactions():
+    return pd.DataFrame({
+        "date": ["2018-12-31", "2019-01-01", "2019-01-01", "2019-06-15", "2019-12-31", "2020-01-01"],
+        "order_id": [1, 2, 2, 3, 4, 5],
+        "client_id": [10, 10, 10, 20, 20, 30],
+        "prod_id": [1, 1, 2, 2, 3, 1],
+        "prod_price": [100.0, 100.0, 5.0, 5.0, 50.0, 100.0],
+        "prod_qty": [1, 2, 4, 1, 1, 3],
+    })
+
+
+@pytest.fixture
+def df_products():
+    return pd.DataFrame({
+        "product_id": [1, 2, 3],
+        "product_type": ["MEUBLE", "DECO", "MEUBLE"],
+        "product_name": ["Chaise", "Mug", "Table"],
+    })
+
+
+def _database(engine, df_transactions, df_products):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+    database = SalesDatabase(engine=engine)
+    database.create_schema()
+    database.insert("transactions", df_transactions)
+    database.insert("products_nomenclature", df_products)
+    database.create_indexes()
+    return database
+
+
+def test_adapt_sql():
+    sql = "WHERE date BETWEEN DATE(2019, 1, 1) AND DATE(2019, 12, 31)"
+    assert adapt_sql(sql, "sqlite") == "WHERE date BETWEEN '2019-01-01' AND '2019-12-31'"
+    assert adapt_sql(sql, "duckdb") == "WHERE date BETWEEN DATE '2019-01-01' AND DATE '2019-12-31'"
+    with pytest.raises(ValueError):
+        adapt_sql(sql, "oracle")
+
+
+def test_load_query():
+    assert "DATE(" not in load_query("total_ventes_daily", "sqlite")
+    with pytest.raises(FileNotFoundError):
+        load_query("unknown", "sqlite")
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "duckdb"])
+def test_total_ventes_daily(engine, df_transactions, df_products):
+    with _database(engine, df_transactions, df_products) as database:
+        df_result = database.query("total_ventes_daily")
+    df_result["date"] = df_result["date"].astype(str)
+    pdt.assert_frame_equal(df_result, pd.DataFrame({
+        "date": ["2019-01-01", "2019-06-15", "2019-12-31"],
+        "ventes": [220.0, 5.0, 50.0],
+    }))
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "duckdb"])
+def test_total_ventes_client_id_meuble_deco(engine, df_transactions, df_products):
+    with _database(engine, df_transactions, df_products) as database:
+        df_result = database.query("total_ventes_client_id_meuble_deco")
+    assert df_result.to_dict(orient="records") == [
+        {"client_id": 20, "ventes_meuble": 50.0, "ventes_deco": 5.0},
+        {"client_id": 10, "ventes_meuble": 200.0, "ventes_deco": 20.0},
+    ]
+
+
+def test_indexes_used(df_transactions, df_products):
+    with _database("sqlite", df_transactions, df_products) as database:
+        for name in ["total_ventes_daily", "total_ventes_client_id_meuble_deco"]:
+            assert f"COVERING INDEX {next(iter(INDEXES))}" in database.explain(name)
+
+
+def test_insert_unknown_table(df_products):
+    with SalesDatabase() as database:
+        with pytest.raises(ValueError):
+            database.insert("products", df_products)
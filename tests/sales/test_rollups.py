@@ -0,0 +1,106 @@
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from src.sales.queries import QUERY_NAMES, SalesDatabase
+from src.sales.rollups import SalesRollups
+from src.sales.synthetic import SalesDataGenerator
+
+@pytest.fixture
+def df_transactions():
+    return pd.DataFrame({
+        "date": ["2018-12-31", "2019-01-01", "2019-01-01", "2019-06-15", "2019-12-31", "2020-01-01", "2019-03-01"],
+        "order_id": [1, 2, 2, 3, 4, 5, 6],
+        "client_id": [10, 10, 10, 20, 20, 30, 40],
+        "prod_id": [1, 1, 2, 2, 3, 1, 9],
+        "prod_price": [100.0, 100.0, 5.0, 5.0, 50.0, 100.0, 7.0],
+        "prod_qty": [1, 2, 4, 1, 1, 3, 1],
+    })
+
+
+@pytest.fixture
+def df_products():
+    return pd.DataFrame({
+        "product_id": [1, 2, 3],
+        "product_type": ["MEUBLE", "DECO", "MEUBLE"],
+        "product_name": ["Chaise", "Mug", "Table"],
+    })
+
+
+def _rollups(engine, df_products):
+    if engine == "duckdb":
+        pytest.importorskip("duckdb")
+    database = SalesDatabase(engine=engine)
+    database.create_schema()
+    database.insert("products_nomenclature", df_products)
+    rollups = SalesRollups(database)
+    rollups.create()
+    return rollups
+
+
+def _sorted(df_result):
+    df_result = df_result.astype({df_result.columns[0]: str})
+    return df_result.sort_values(list(df_result.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "duckdb"])
+def test_load_batch(engine, df_transactions, df_products):
+    rollups = _rollups(engine, df_products)
+    with rollups.database:
+        rollups.load_batch(df_transactions.iloc[:3])
+        rollups.load_batch(df_transactions.iloc[3:])
+        assert rollups.database.count("transactions") == 7
+        df_daily = rollups.read("sales_daily")
+        df_clients = rollups.read("sales_client_product_type")
+        consistency = rollups.check_consistency()
+    assert df_daily[df_daily["date"].astype(str) == "2019-01-01"]["ventes"].tolist() == [220.0]
+    assert df_clients.values.tolist() == [
+        [2018, 10, "MEUBLE", 100.0], [2019, 10, "DECO", 20.0], [2019, 10, "MEUBLE", 200.0],
+        [2019, 20, "DECO", 5.0], [2019, 20, "MEUBLE", 50.0], [2019, 40, "", 7.0], [2020, 30, "MEUBLE", 300.0],
+    ]
+    assert all(checks["consistent"] for checks in consistency.values())
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "duckdb"])
+def test_query(engine, df_transactions, df_products):
+    rollups = _rollups(engine, df_products)
+    with rollups.database:
+        for _, df_batch in df_transactions.groupby("order_id"):
+            rollups.load_batch(df_batch)
+        for name in QUERY_NAMES:
+            pdt.assert_frame_equal(_sorted(rollups.query(name)), _sorted(rollups.database.query(name)))
+        df_clients = rollups.query("total_ventes_client_id_meuble_deco")
+    assert df_clients[df_clients["client_id"] == 40][["ventes_meuble", "ventes_deco"]].values.tolist() == [[0.0, 0.0]]
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "duckdb"])
+def test_check_consistency(engine, df_transactions, df_products):
+    rollups = _rollups(engine, df_products)
+    with rollups.database:
+        rollups.load_batch(df_transactions.iloc[:4])
+        rollups.database.insert("transactions", df_transactions.iloc[4:])
+        consistency = rollups.check_consistency()
+        assert consistency["sales_daily"]["missing"] == 3
+        assert consistency["sales_daily"]["mismatched"] == 0
+        assert not consistency["sales_client_product_type"]["consistent"]
+        rollups.rebuild()
+        assert all(checks["consistent"] for checks in rollups.check_consistency().values())
+
+
+def test_load_batch_rollback(df_transactions, df_products):
+    rollups = _rollups("sqlite", df_products)
+    with rollups.database:
+        rollups.load_batch(df_transactions.iloc[:2])
+        with pytest.raises(Exception):
+            rollups.load_batch(df_transactions.iloc[2:].assign(prod_price=None))
+        assert rollups.database.count("transactions") == 2
+        assert all(checks["consistent"] for checks in rollups.check_consistency().values())
+
+
+def test_populate_rollups():
+    generator = SalesDataGenerator(n_transactions=3_000, n_clients=50, n_products=20, chunk_size=1_000)
+    with SalesDatabase() as database:
+        rollups = SalesRollups(database)
+        generator.populate(database, rollups=rollups)
+        assert database.count("transactions") == 3_000
+        assert len(rollups.read("sales_daily")) == 731
+        assert all(checks["consistent"] for checks in rollups.check_consistency().values())
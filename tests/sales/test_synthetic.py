@@ -0,0 +1,40 @@
+import pandas.testing as pdt
+from src.sales.benchmark import run_benchmark
+from src.sales.queries import SalesDatabase
+from src.sales.synthetic import SalesDataGenerator
+
+
+def test_generate_transactions():
+    generator = SalesDataGenerator(n_transactions=2_500, n_clients=50, n_products=20, chunk_size=1_000)
+    chunks = list(generator.generate_transactions())
+    assert [len(df) for df in chunks] == [1_000, 1_000, 500]
+    dates = [date for df in chunks for date in df["date"]]
+    assert dates == sorted(dates)
+    assert dates[0] == "2018-07-01" and dates[-1] == "2020-06-30"
+    again = SalesDataGenerator(n_transactions=2_500, n_clients=50, n_products=20, chunk_size=1_000)
+    pdt.assert_frame_equal(chunks[1], list(again.generate_transactions())[1])
+
+
+def test_populate():
+    generator = SalesDataGenerator(n_transactions=2_000, n_clients=50, n_products=20)
+    with SalesDatabase() as database:
+        generator.populate(database)
+        assert database.count("transactions") == 2_000
+        assert database.count("products_nomenclature") == 20
+        df_daily = database.query("total_ventes_daily")
+    assert len(df_daily) == 365
+
+
+def test_run_benchmark():
+    measurements = run_benchmark(sizes=[1_000], repeat=1)
+    assert [m["query"] for m in measurements] == ["total_ventes_daily", "total_ventes_client_id_meuble_deco"]
+    assert all(m["latency_s"] >= 0 and m["rows_out"] > 0 for m in measurements)
+
+
+def test_run_benchmark_rollups():
+    measurements = run_benchmark(sizes=[1_000], repeat=1, rollups=True)
+    assert [m["query"] for m in measurements] == [
+        "total_ventes_daily", "total_ventes_client_id_meuble_deco",
+        "rollups/total_ventes_daily", "rollups/total_ventes_client_id_meuble_deco",
+    ]
+    assert measurements[0]["rows_out"] == measurements[2]["rows_out"]